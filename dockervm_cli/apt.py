@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import subprocess
+from dockervm_cli.utils import run_command, console, ensure_cache_dir
+
+# Paketlisten gelten so lange als frisch, sofern sich keine Quelle geändert hat
+DEFAULT_MAX_AGE = 6 * 3600
+
+APT_SOURCES = ["/etc/apt/sources.list", "/etc/apt/sources.list.d"]
+
+# Wird unter Ubuntu nach jedem erfolgreichen 'apt update' angefasst (15update-stamp),
+# auch wenn das Update nicht von dvm kam (z.B. unattended-upgrades).
+UPDATE_STAMP = "/var/lib/apt/periodic/update-success-stamp"
+
+
+def _state_file() -> str:
+    return os.path.join(ensure_cache_dir("state"), "apt-state.json")
+
+
+def load_state() -> dict:
+    try:
+        with open(_state_file(), "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_state(state: dict):
+    try:
+        with open(_state_file(), "w") as f:
+            json.dump(state, f, indent=4)
+    except Exception as e:
+        console.print(f"[dim]APT-Status konnte nicht gespeichert werden: {e}[/dim]")
+
+
+def sources_fingerprint() -> dict:
+    """Returns {Pfad: [mtime_ns, Größe]} für alle APT-Quelldateien."""
+    fingerprint = {}
+    for source in APT_SOURCES:
+        paths = [source]
+        if os.path.isdir(source):
+            paths = [os.path.join(source, f) for f in sorted(os.listdir(source))]
+        for path in paths:
+            try:
+                st = os.stat(path)
+                if os.path.isfile(path):
+                    fingerprint[path] = [st.st_mtime_ns, st.st_size]
+            except OSError:
+                pass
+    return fingerprint
+
+
+def last_update_time(state: dict) -> float:
+    """Zeitpunkt des letzten erfolgreichen 'apt update' (dvm oder System)."""
+    stamp = 0.0
+    try:
+        stamp = os.path.getmtime(UPDATE_STAMP)
+    except OSError:
+        pass
+    return max(stamp, state.get("updated_at", 0.0))
+
+
+def apt_update(force: bool = False, max_age: int = DEFAULT_MAX_AGE) -> bool:
+    """
+    Aktualisiert die Paketlisten nur, wenn nötig:
+    - eine Datei in sources.list(.d) wurde hinzugefügt, geändert oder entfernt, oder
+    - das letzte Update ist älter als max_age Sekunden.
+    """
+    state = load_state()
+    current = sources_fingerprint()
+    previous = state.get("sources", {})
+    changed = sorted(p for p in set(current) | set(previous) if current.get(p) != previous.get(p))
+    age = time.time() - last_update_time(state)
+
+    if not force and not changed and age < max_age:
+        console.print(f"[dim]Paketlisten sind aktuell (vor {int(age / 60)} min aktualisiert) - überspringe apt update.[/dim]")
+        return True
+
+    if changed and previous:
+        console.print(f"[dim]Geänderte Paketquellen: {', '.join(os.path.basename(p) for p in changed)}[/dim]")
+
+    if not run_command("sudo apt-get update", desc="Aktualisiere Paketlisten"):
+        return False
+
+    from dockervm_cli import plan
+    if plan.recording():
+        # Nur geplant, die Listen sind also noch nicht aktualisiert
+        return True
+    save_state({"updated_at": time.time(), "sources": sources_fingerprint()})
+    return True
+
+
+def missing_packages(packages: list) -> list:
+    """Returns die Pakete aus der Liste, die noch nicht (vollständig) installiert sind."""
+    if not packages:
+        return []
+    result = subprocess.run(
+        ["dpkg-query", "-W", "-f", "${Package} ${db:Status-Abbrev}\\n", *packages],
+        capture_output=True, text=True
+    )
+    installed = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[1].startswith("ii"):
+            installed.add(parts[0])
+    return [p for p in packages if p.split("=")[0] not in installed]
+
+
+def apt_install(packages: list, desc: str = None, max_age: int = DEFAULT_MAX_AGE) -> bool:
+    """
+    Installiert alle fehlenden Pakete mit einem einzigen 'apt-get install' Aufruf.
+    Bereits installierte Pakete lösen weder ein 'apt update' noch eine Installation aus.
+    """
+    missing = missing_packages(packages)
+    if not missing:
+        console.print(f"[dim]Bereits installiert: {' '.join(packages)}[/dim]")
+        return True
+
+    if not apt_update(max_age=max_age):
+        return False
+
+    install_cmd = f"sudo DEBIAN_FRONTEND=noninteractive apt-get install -y {' '.join(missing)}"
+    desc = desc or f"Installiere {' '.join(missing)}"
+    if run_command(install_cmd, desc=desc, error_msg="Installation fehlgeschlagen, aktualisiere Paketlisten und versuche es erneut..."):
+        return True
+
+    # Veraltete Listen verweisen ggf. auf nicht mehr vorhandene Paketversionen (404)
+    return apt_update(force=True) and run_command(install_cmd, desc=desc)
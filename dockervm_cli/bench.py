@@ -0,0 +1,394 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import statistics
+
+# Binaries, die im Testsystem durch Fakes ersetzt werden. Jeder Fake schreibt seinen Aufruf
+# nach calls.log und gibt die für ihn hinterlegte Ausgabe (out/<name>) mit Exit-Code (rc/<name>) aus.
+FAKE_BINARIES = [
+    "apt", "apt-get", "apt-mark", "blkid", "df", "docker", "dpkg", "dpkg-query",
+    "gdu", "lsblk", "mount", "nvidia-smi", "systemctl", "umount",
+]
+
+_FAKE_SCRIPT = """#!/bin/sh
+name=${0##*/}
+{ printf '%s' "$name"; for a in "$@"; do printf '\\t%s' "$a"; done; printf '\\n'; } >> "$DVM_FAKE_ROOT/calls.log"
+[ -f "$DVM_FAKE_ROOT/out/$name" ] && cat "$DVM_FAKE_ROOT/out/$name"
+exit $(cat "$DVM_FAKE_ROOT/rc/$name" 2>/dev/null || echo 0)
+"""
+
+# sudo zeichnet auf und reicht nur an Fakes weiter: 'sudo mount -a' landet beim Fake,
+# 'sudo mv ... /etc/fstab' wird lediglich protokolliert und verändert das echte System nie.
+_FAKE_SUDO = """#!/bin/sh
+{ printf 'sudo'; for a in "$@"; do printf '\\t%s' "$a"; done; printf '\\n'; } >> "$DVM_FAKE_ROOT/calls.log"
+while [ $# -gt 0 ]; do
+    case "$1" in -*|*=*) shift ;; *) break ;; esac
+done
+if [ $# -gt 0 ] && [ -x "$DVM_FAKE_ROOT/bin/$1" ]; then
+    bin=$1; shift
+    exec "$DVM_FAKE_ROOT/bin/$bin" "$@"
+fi
+exit 0
+"""
+
+
+class FakeSystem:
+    """
+    Temporäres Testsystem für Benchmarks und tests/: Fake-Binaries vorne im PATH und ein eigener
+    Dateibaum, auf den die Pfad-Konstanten der Module (/proc/mounts, /etc/fstab, sysfs,
+    dpkg status, dvm Cache) für die Dauer des with-Blocks umgelenkt werden.
+    """
+
+    def __init__(self):
+        self.root = tempfile.mkdtemp(prefix="dvm-bench-")
+        self._saved_env = {}
+        self._patched = []
+        for sub in ("bin", "out", "rc", "cache", "tmp"):
+            os.makedirs(os.path.join(self.root, sub))
+        for name in FAKE_BINARIES:
+            self._write_script(name, _FAKE_SCRIPT)
+        self._write_script("sudo", _FAKE_SUDO)
+
+    def _write_script(self, name: str, content: str):
+        path = os.path.join(self.root, "bin", name)
+        with open(path, "w") as f:
+            f.write(content)
+        os.chmod(path, 0o755)
+
+    def path(self, system_path: str) -> str:
+        """Pfad im Testbaum für einen Systempfad, z.B. /proc/mounts."""
+        return os.path.join(self.root, "fs", system_path.lstrip("/"))
+
+    def file(self, system_path: str, content: str) -> str:
+        path = self.path(system_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def output(self, binary: str, text: str, exit_code: int = 0):
+        """Hinterlegt die Ausgabe eines Fake-Binaries."""
+        with open(os.path.join(self.root, "out", binary), "w") as f:
+            f.write(text)
+        with open(os.path.join(self.root, "rc", binary), "w") as f:
+            f.write(str(exit_code))
+
+    def calls(self) -> list:
+        """Aufgezeichnete Aufrufe als Listen [binary, arg1, ...]."""
+        try:
+            with open(os.path.join(self.root, "calls.log"), "r") as f:
+                return [line.rstrip("\n").split("\t") for line in f]
+        except OSError:
+            return []
+
+    def reset_calls(self):
+        try:
+            os.remove(os.path.join(self.root, "calls.log"))
+        except OSError:
+            pass
+
+    def patch(self, module, attr: str, value):
+        self._patched.append((module, attr, getattr(module, attr)))
+        setattr(module, attr, value)
+
+    def __enter__(self):
+        from dockervm_cli import utils
+
+        env = {
+            "PATH": os.path.join(self.root, "bin") + os.pathsep + os.environ.get("PATH", ""),
+            "DVM_FAKE_ROOT": self.root,
+            "DVM_NVIDIA_SMI": os.path.join(self.root, "bin", "nvidia-smi"),
+        }
+        for key, value in env.items():
+            self._saved_env[key] = os.environ.get(key)
+            os.environ[key] = value
+        self.patch(utils, "DVM_CACHE_DIR", os.path.join(self.root, "cache"))
+        # write_root_file legt Temp-Dateien an, die der Fake-sudo nie verschiebt
+        self.patch(tempfile, "tempdir", os.path.join(self.root, "tmp"))
+        self.patch(utils.console, "quiet", True)
+        return self
+
+    def __exit__(self, *exc):
+        for module, attr, value in reversed(self._patched):
+            setattr(module, attr, value)
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+# --- Testdaten in realistischer Größe --------------------------------------------
+
+def _uuid(i: int) -> str:
+    return f"{i:08x}-1a2b-4c3d-8e9f-{i * 7919 % 16**12:012x}"
+
+
+def fake_packages(count: int) -> list:
+    """Paketnamen wie auf einer Docker VM mit NVIDIA Treiber und CUDA."""
+    nvidia = ["nvidia-driver-550", "nvidia-dkms-550", "nvidia-utils-550", "libnvidia-compute-550",
+              "libnvidia-gl-550", "libnvidia-decode-550", "cuda-toolkit-12-4", "cuda", "libcudart12", "libcuda1"]
+    stems = ["lib", "python3-", "gir1.2-", "fonts-", "linux-modules-", "golang-", ""]
+    words = ["ssl", "xml", "gtk", "curl", "systemd", "docker", "perl", "yaml", "zstd", "boost"]
+    packages = [f"{stems[i % len(stems)]}{words[i % len(words)]}{i}" for i in range(max(0, count - len(nvidia)))]
+    return sorted(packages + nvidia)
+
+
+def fake_dpkg_status(packages: list) -> str:
+    blocks = []
+    for i, name in enumerate(packages):
+        selection = "hold" if name.startswith("nvidia-driver") else "install"
+        blocks.append(
+            f"Package: {name}\nStatus: {selection} ok installed\nPriority: optional\nSection: libs\n"
+            f"Installed-Size: {100 + i}\nMaintainer: Ubuntu Developers <ubuntu-devel-discuss@lists.ubuntu.com>\n"
+            f"Architecture: amd64\nVersion: 1.{i % 50}.{i % 7}-1ubuntu1\nDescription: Paket {name}\n"
+        )
+    return "\n".join(blocks)
+
+
+def fake_block_devices(count: int) -> list:
+    """count Partitionen auf je vier pro Platte (sdaa, sdab, ...), jeweils mit Mountpoint."""
+    devices = []
+    for i in range(count):
+        k = i // 4
+        disk = "sd" + chr(ord("a") + k // 26 % 26) + chr(ord("a") + k % 26)
+        devices.append({
+            "name": f"{disk}{i % 4 + 1}", "disk": disk, "partn": str(i % 4 + 1),
+            "size": (20 + i % 200) * 1024**3, "uuid": _uuid(i), "fstype": "ext4" if i % 5 else "xfs",
+            "mountpoint": f"/mnt/volumes/vol{i}",
+        })
+    return devices
+
+
+def fake_lsblk_pairs(devices: list) -> str:
+    """Ausgabe von 'lsblk -P -b' mit allen Spalten, die dvm abfragt."""
+    lines = []
+    for disk in dict.fromkeys(d["disk"] for d in devices):
+        lines.append(f'NAME="{disk}" SIZE="{1024**4}" PKNAME="" PARTN="" TYPE="disk" UUID="" FSTYPE="" MOUNTPOINT=""')
+    for d in devices:
+        lines.append(
+            f'NAME="{d["name"]}" SIZE="{d["size"]}" PKNAME="{d["disk"]}" PARTN="{d["partn"]}" TYPE="part" '
+            f'UUID="{d["uuid"]}" FSTYPE="{d["fstype"]}" MOUNTPOINT="{d["mountpoint"]}"'
+        )
+    return "\n".join(lines) + "\n"
+
+
+def fake_proc_mounts(devices: list) -> str:
+    lines = [
+        "sysfs /sys sysfs rw,nosuid,nodev,noexec,relatime 0 0",
+        "proc /proc proc rw,nosuid,nodev,noexec,relatime 0 0",
+        "/dev/sda2 / ext4 rw,relatime 0 0",
+        "tmpfs /run tmpfs rw,nosuid,nodev,size=1632492k,mode=755 0 0",
+    ]
+    for i, d in enumerate(devices):
+        lines.append(f"/dev/{d['name']} {d['mountpoint']} {d['fstype']} rw,relatime 0 0")
+        if i % 3 == 0:
+            lines.append(f"overlay /var/lib/docker/overlay2/{i:064x}/merged overlay rw,relatime 0 0")
+    return "\n".join(lines) + "\n"
+
+
+def fake_fstab(devices: list, broken_every: int = 10) -> tuple:
+    """fstab mit UUID-Einträgen; jeder broken_every-te verweist auf eine nicht mehr vorhandene UUID."""
+    lines = ["# /etc/fstab: static file system information.", "UUID=root-uuid / ext4 defaults 0 1"]
+    broken = 0
+    for i, d in enumerate(devices):
+        if i % broken_every == 0:
+            lines.append(f"UUID=deadbeef-{i:04d} {d['mountpoint']} {d['fstype']} defaults,nofail 0 2")
+            broken += 1
+        else:
+            lines.append(f"UUID={d['uuid']} {d['mountpoint']} {d['fstype']} defaults,nofail 0 2")
+    return "\n".join(lines) + "\n", broken
+
+
+def fake_blkid_export(devices: list) -> str:
+    return "".join(f"DEVNAME=/dev/{d['name']}\nUUID={d['uuid']}\n\n" for d in devices)
+
+
+def fake_df(devices: list) -> str:
+    lines = ["Filesystem      Size  Used Avail Use% Mounted on", "/dev/sda2        98G   41G   52G  45% /"]
+    for i, d in enumerate(devices):
+        size = d["size"] // 1024**3
+        lines.append(f"/dev/{d['name']:<10} {size:>4}G {size * (i % 90) // 100:>4}G {size:>4}G {i % 90:>3}% {d['mountpoint']}")
+    return "\n".join(lines) + "\n"
+
+
+def fake_sysfs_pci(fs: FakeSystem, count: int) -> str:
+    """PCI Baum unter <root>/sys/bus/pci/devices mit count Funktionen, davon ein Viertel NVIDIA."""
+    root = fs.path("/sys/bus/pci/devices")
+    os.makedirs(root, exist_ok=True)
+    for i in range(count):
+        address = f"0000:{i // 8:02x}:{i % 8:02x}.0"
+        nvidia = i % 4 == 0
+        fs.file(f"/sys/bus/pci/devices/{address}/vendor", "0x10de\n" if nvidia else "0x8086\n")
+        fs.file(f"/sys/bus/pci/devices/{address}/device", f"0x{0x2204 + i:04x}\n")
+        fs.file(f"/sys/bus/pci/devices/{address}/class", "0x030000\n" if nvidia else "0x060400\n")
+        if nvidia:
+            os.makedirs(fs.path("/sys/bus/pci/drivers/nvidia"), exist_ok=True)
+            os.symlink(fs.path("/sys/bus/pci/drivers/nvidia"), os.path.join(root, address, "driver"))
+    return root
+
+
+# --- Benchmarks -----------------------------------------------------------------
+# Jeder Benchmark bereitet das Testsystem vor und liefert (Funktion, Prüfung). Die Prüfung
+# bekommt das Ergebnis und die aufgezeichneten Aufrufe und liefert None oder eine Fehlermeldung.
+
+def _bench_blacklist_holds(fs: FakeSystem, scale: float):
+    from dockervm_cli.commands.update import DEFAULT_BLACKLIST, blacklisted_packages
+
+    packages = fake_packages(int(3000 * scale))
+    patterns = DEFAULT_BLACKLIST + ["linux-image-.*", "linux-headers-.*", "docker-ce", "containerd.io", "libnvidia-gl-.*"]
+
+    def check(result, calls):
+        return None if len(result) == 8 else f"8 gehaltene Pakete erwartet, {len(result)} gefunden"
+    return (lambda: blacklisted_packages(patterns, packages)), check
+
+
+def _bench_update_system(fs: FakeSystem, scale: float):
+    from dockervm_cli import apt
+    from dockervm_cli.commands import update
+
+    packages = fake_packages(int(3000 * scale))
+    blacklist = "Unattended-Upgrade::Package-Blacklist {\n" + "".join(f'    "{p}";\n' for p in update.DEFAULT_BLACKLIST) + "};\n"
+    fs.patch(update, "BLACKLIST_FILE", fs.file(update.BLACKLIST_FILE, blacklist))
+    fs.patch(apt, "APT_SOURCES", [fs.file("/etc/apt/sources.list", "deb http://archive.ubuntu.com/ubuntu noble main\n")])
+    fs.patch(apt, "UPDATE_STAMP", fs.path(apt.UPDATE_STAMP))
+    fs.output("dpkg-query", "\n".join(packages) + "\n")
+
+    def check(result, calls):
+        holds = [c for c in calls if c[:3] == ["sudo", "apt-mark", "hold"]]
+        if not holds or "nvidia-driver-550" not in holds[-1]:
+            return "kein 'apt-mark hold' für die NVIDIA Pakete aufgezeichnet"
+        if ["sudo", "apt", "upgrade", "-y"] not in calls:
+            return "kein 'apt upgrade' aufgezeichnet"
+        return None
+    return (lambda: update.update_system(refresh=True, ignore_blacklist=False)), check
+
+
+def _bench_expandable_partitions(fs: FakeSystem, scale: float):
+    from dockervm_cli.commands import disk
+
+    devices = fake_block_devices(int(200 * scale))
+    fs.patch(disk, "PROC_MOUNTS", fs.file("/proc/mounts", fake_proc_mounts(devices)))
+    fs.patch(disk, "SYSFS_BLOCK", fs.path("/sys/class/block"))
+    fs.output("lsblk", fake_lsblk_pairs(devices))
+
+    def check(result, calls):
+        # Alle Partitionen plus / (sda2 ist lsblk unbekannt und läuft über den sysfs Fallback)
+        return None if len(result) == len(devices) + 1 else f"{len(devices) + 1} Partitionen erwartet, {len(result)} gefunden"
+    return disk.get_expandable_partitions, check
+
+
+def _bench_remount(fs: FakeSystem, scale: float):
+    from dockervm_cli.commands import disk
+
+    devices = fake_block_devices(int(200 * scale))
+    fstab, broken = fake_fstab(devices)
+    fs.patch(disk, "FSTAB", fs.file("/etc/fstab", fstab))
+    fs.output("blkid", fake_blkid_export(devices))
+    fs.output("lsblk", fake_lsblk_pairs(devices))
+
+    def check(result, calls):
+        if ["mount", "-a"] not in calls:
+            return "kein 'mount -a' nach dem Schreiben der fstab aufgezeichnet"
+        return None
+    return (lambda: disk.remount_disk(action="delete", yes=True)), check
+
+
+def _bench_usage_choices(fs: FakeSystem, scale: float):
+    from dockervm_cli.commands import disk
+
+    devices = fake_block_devices(int(500 * scale))
+    output = fake_df(devices)
+
+    def check(result, calls):
+        return None if len(result) == len(devices) + 1 else f"{len(devices) + 1} Einträge erwartet, {len(result)} gefunden"
+    return (lambda: disk.usage_choices(output)), check
+
+
+def _bench_dpkg_status(fs: FakeSystem, scale: float):
+    from dockervm_cli import host_state
+
+    packages = fake_packages(int(3000 * scale))
+    fs.patch(host_state, "DPKG_STATUS", fs.file("/var/lib/dpkg/status", fake_dpkg_status(packages)))
+
+    def check(result, calls):
+        return None if len(result) == len(packages) else f"{len(packages)} Pakete erwartet, {len(result)} gelesen"
+    return host_state.read_dpkg_status, check
+
+
+def _bench_pci_scan(fs: FakeSystem, scale: float):
+    from dockervm_cli import pci
+
+    count = int(64 * scale)
+    root = fake_sysfs_pci(fs, count)
+
+    def check(result, calls):
+        nvidia = [d for d in result if d["driver"] == "nvidia"]
+        return None if len(nvidia) == (count + 3) // 4 else f"{(count + 3) // 4} NVIDIA Geräte erwartet, {len(nvidia)} gefunden"
+    return (lambda: pci.scan_devices(root)), check
+
+
+# Name -> (Beschreibung der Größe bei scale=1, Vorbereitung)
+BENCHMARKS = {
+    "update.blacklist_holds": ("3000 Pakete, 9 Muster", _bench_blacklist_holds),
+    "update.system": ("3000 Pakete, Fake apt", _bench_update_system),
+    "disk.expandable_partitions": ("200 Mounts", _bench_expandable_partitions),
+    "disk.remount": ("200 fstab Einträge, 20 defekt", _bench_remount),
+    "disk.usage_choices": ("500 Zeilen df", _bench_usage_choices),
+    "host_state.dpkg_status": ("3000 Pakete", _bench_dpkg_status),
+    "pci.scan_devices": ("64 PCI Funktionen", _bench_pci_scan),
+}
+
+
+def run_benchmark(name: str, scale: float = 1.0, repeat: int = 5) -> dict:
+    """
+    Führt einen Benchmark in einem frischen Testsystem aus (ein Aufwärmlauf, dann repeat Messungen).
+    Returns ein Dict mit best, median (Sekunden), calls (Fake-Aufrufe pro Lauf) und error.
+    """
+    _, setup = BENCHMARKS[name]
+    with FakeSystem() as fs:
+        try:
+            func, check = setup(fs, scale)
+            result = func()
+            error = check(result, fs.calls())
+        except (Exception, SystemExit) as e:
+            # Auch typer.Exit und Abbrüche zählen als Fehler des Benchmarks
+            error = f"{type(e).__name__}: {e}"
+        if error:
+            return {"best": None, "median": None, "calls": 0, "error": error}
+
+        timings = []
+        for _ in range(repeat):
+            fs.reset_calls()
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return {"best": min(timings), "median": statistics.median(timings), "calls": len(fs.calls()), "error": None}
+
+
+def save_baseline(path: str, results: dict, scale: float):
+    with open(path, "w") as f:
+        json.dump({"scale": scale, "results": {name: {"best": r["best"], "median": r["median"]}
+                                                for name, r in results.items() if not r["error"]}}, f, indent=4)
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """
+    Vergleicht die Bestzeiten mit der Baseline. Returns {Name: Faktor} für alle Benchmarks
+    mit Baseline-Wert (Faktor > 1 = langsamer geworden).
+    Verglichen wird die Bestzeit, weil sie am wenigsten von anderer Last auf dem CI-Runner abhängt.
+    """
+    factors = {}
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name, {}).get("best")
+        if base and result["best"] is not None:
+            factors[name] = result["best"] / base
+    return factors
@@ -0,0 +1,136 @@
+import os
+import json
+import shutil
+import hashlib
+import subprocess
+from dockervm_cli.utils import run_command, console, ensure_cache_dir
+
+UV_INSTALLER_URL = "https://astral.sh/uv/install.sh"
+
+
+def _stats_file() -> str:
+    return os.path.join(ensure_cache_dir("state"), "stats.json")
+
+
+def load_stats() -> dict:
+    try:
+        with open(_stats_file(), "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def record(kind: str, hit: bool):
+    """Zählt einen Cache-Treffer bzw. -Fehlgriff für die Statistik in 'dvm cache status'."""
+    stats = load_stats()
+    entry = stats.setdefault(kind, {"hits": 0, "misses": 0})
+    entry["hits" if hit else "misses"] += 1
+    try:
+        with open(_stats_file(), "w") as f:
+            json.dump(stats, f, indent=4)
+    except Exception:
+        pass
+
+
+def ensure_uv() -> bool:
+    """
+    Stellt sicher, dass uv installiert ist. Das Binary wird unter
+    /var/cache/dvm/bin vorgehalten, sodass eine Neuinstallation ohne Download auskommt.
+    Das Verzeichnis gehört root und wird nur per sudo beschrieben, da root das Binary installiert.
+    """
+    if shutil.which("uv"):
+        return True
+
+    bin_dir = ensure_cache_dir("bin", root_owned=True)
+    cached_uv = os.path.join(bin_dir, "uv")
+
+    if os.path.exists(cached_uv):
+        record("uv", hit=True)
+        console.print("[dim]Installiere uv aus dem lokalen Cache...[/dim]")
+    else:
+        import tempfile
+        record("uv", hit=False)
+        console.print("[dim]Installiere uv (Fast Python Package Installer)...[/dim]")
+        with tempfile.TemporaryDirectory() as download_dir:
+            if not run_command(
+                f"curl -LsSf {UV_INSTALLER_URL} | env CARGO_DIST_FORCE_INSTALL_DIR={download_dir} INSTALLER_NO_MODIFY_PATH=1 sh"
+                f" && sudo install -m 755 -o root -g root {download_dir}/uv {cached_uv}",
+                error_msg="uv konnte nicht heruntergeladen werden."
+            ):
+                return False
+
+    return run_command(f"sudo install -m 755 {cached_uv} /usr/local/bin/uv", error_msg="uv konnte nicht installiert werden.")
+
+
+def pins_fingerprint(repo_dir: str) -> str:
+    """SHA-256 über requirements.txt und setup.py (entspricht 'cat requirements.txt setup.py | sha256sum')."""
+    digest = hashlib.sha256()
+    for name in ("requirements.txt", "setup.py"):
+        try:
+            with open(os.path.join(repo_dir, name), "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            pass
+    return digest.hexdigest()
+
+
+def uv_cache_dir() -> str:
+    """uv Cache (Wheelhouse) unter /var/cache/dvm/uv."""
+    return ensure_cache_dir("uv")
+
+
+def wheels_cached(repo_dir: str) -> bool:
+    """
+    True, wenn die Wheels für die aktuellen Pins bereits im Cache liegen.
+    Dann kann 'uv pip install --offline' ohne Index-Zugriff installieren.
+    """
+    pins_file = os.path.join(ensure_cache_dir("state"), "wheel-pins")
+    try:
+        with open(pins_file, "r") as f:
+            cached = f.read().split()[0]
+    except (OSError, IndexError):
+        return False
+    return cached == pins_fingerprint(repo_dir) and bool(os.listdir(uv_cache_dir()))
+
+
+def mark_wheels_cached(repo_dir: str):
+    """Merkt sich die Pins, für die der Wheel-Cache vollständig ist."""
+    try:
+        with open(os.path.join(ensure_cache_dir("state"), "wheel-pins"), "w") as f:
+            f.write(pins_fingerprint(repo_dir) + "\n")
+    except OSError:
+        pass
+
+
+def uv_pip_install(repo_dir: str, args: str, env: dict = None) -> int:
+    """
+    Führt 'uv pip install <args>' im Repo aus und nutzt dabei den lokalen Wheel-Cache.
+    Solange sich die Pins nicht geändert haben, wird offline installiert; schlägt das fehl,
+    wird einmal online nachgeladen. Returns den Exit-Code.
+    """
+    env = dict(env or os.environ)
+    env["UV_CACHE_DIR"] = uv_cache_dir()
+
+    if wheels_cached(repo_dir):
+        result = subprocess.run(f"cd {repo_dir} && uv pip install --offline {args}", shell=True, env=env)
+        if result.returncode == 0:
+            record("wheels", hit=True)
+            return 0
+        console.print("[yellow]Offline-Installation aus dem Cache fehlgeschlagen, lade vom Index nach...[/yellow]")
+
+    record("wheels", hit=False)
+    result = subprocess.run(f"cd {repo_dir} && uv pip install {args}", shell=True, env=env)
+    if result.returncode == 0:
+        mark_wheels_cached(repo_dir)
+    return result.returncode
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
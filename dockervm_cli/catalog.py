@@ -0,0 +1,373 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import subprocess
+import urllib.request
+import urllib.error
+from dockervm_cli import download, runlog, utils
+
+# Signatur-Namespace für 'ssh-keygen -Y sign -n dvm-catalog catalog.json'
+NAMESPACE = "dvm-catalog"
+CATALOG_FILE = "catalog.json"
+SIGNATURE_FILE = "catalog.json.sig"
+CATALOG_VERSION = 1
+
+# So lange gilt der lokale Stand bei 'dvm install container' als aktuell
+CHECK_INTERVAL = 6 * 3600
+
+
+class CatalogError(Exception):
+    pass
+
+
+class OfflineError(CatalogError):
+    pass
+
+
+# --- Lokaler Stand --------------------------------------------------------------
+
+def catalog_dir() -> str:
+    return os.path.join(utils.DVM_CACHE_DIR, "catalog")
+
+
+def templates_dir() -> str:
+    return os.path.join(catalog_dir(), "templates")
+
+
+def index_file() -> str:
+    return os.path.join(catalog_dir(), "index.json")
+
+
+def _state_file() -> str:
+    return os.path.join(catalog_dir(), "state.json")
+
+
+def load_state() -> dict:
+    try:
+        with open(_state_file(), "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_json(path: str, data: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def configured_source(state: dict = None) -> str:
+    """Katalog-Quelle aus DVM_TEMPLATE_CATALOG oder dem letzten 'dvm install template-sync --source'."""
+    return os.environ.get("DVM_TEMPLATE_CATALOG") or (state if state is not None else load_state()).get("source")
+
+
+def cached_templates() -> dict:
+    """Templates aus dem zuletzt synchronisierten Katalog (ohne Netzwerkzugriff)."""
+    try:
+        with open(index_file(), "r") as f:
+            templates = json.load(f).get("templates", {})
+    except (OSError, ValueError):
+        return {}
+    for name, template in templates.items():
+        template["dir"] = os.path.join(templates_dir(), name)
+    return templates
+
+
+# --- Katalog prüfen -------------------------------------------------------------
+
+def _safe_relpath(path: str) -> bool:
+    return bool(path) and not os.path.isabs(path) and ".." not in path.split("/") and "\\" not in path
+
+
+def parse_catalog(data: bytes) -> dict:
+    """
+    catalog.json: {"version": 1, "templates": {"<name>": {"files": {"<pfad>": "<sha256>"}}}}
+    Die Pfade sind relativ zum Template-Ordner der Quelle (<quelle>/<name>/<pfad>).
+    """
+    try:
+        catalog = json.loads(data)
+    except ValueError as e:
+        raise CatalogError(f"{CATALOG_FILE} ist kein gültiges JSON: {e}")
+    if not isinstance(catalog, dict) or catalog.get("version") != CATALOG_VERSION:
+        raise CatalogError(f"{CATALOG_FILE} hat nicht Version {CATALOG_VERSION}.")
+    for name, entry in (catalog.get("templates") or {}).items():
+        files = entry.get("files") if isinstance(entry, dict) else None
+        if not _safe_relpath(name) or "/" in name or not isinstance(files, dict) or not files:
+            raise CatalogError(f"Ungültiger Katalog-Eintrag: {name}")
+        for path, digest in files.items():
+            if not _safe_relpath(path) or not isinstance(digest, str) or len(digest) != 64:
+                raise CatalogError(f"Ungültige Datei im Template {name}: {path}")
+    catalog.setdefault("templates", {})
+    return catalog
+
+
+def verify_signature(data: bytes, signature: bytes, allowed_signers: str):
+    """
+    Prüft die SSH-Signatur des Katalogs gegen eine allowed_signers Datei
+    (Format wie bei 'git config gpg.ssh.allowedSignersFile').
+    """
+    import tempfile
+    if not allowed_signers or not os.path.exists(allowed_signers):
+        raise CatalogError(f"allowed_signers Datei nicht gefunden: {allowed_signers or '-'} (--allowed-signers)")
+    with tempfile.NamedTemporaryFile(suffix=".sig") as sig:
+        sig.write(signature)
+        sig.flush()
+        found = subprocess.run(
+            ["ssh-keygen", "-Y", "find-principals", "-s", sig.name, "-f", allowed_signers],
+            capture_output=True, text=True
+        )
+        principal = found.stdout.split("\n", 1)[0].strip()
+        if found.returncode != 0 or not principal:
+            raise CatalogError("Signatur des Katalogs stammt von keinem erlaubten Schlüssel.")
+        result = subprocess.run(
+            ["ssh-keygen", "-Y", "verify", "-f", allowed_signers, "-I", principal, "-n", NAMESPACE, "-s", sig.name],
+            input=data, capture_output=True
+        )
+    if result.returncode != 0:
+        raise CatalogError(f"Signatur des Katalogs ist ungültig: {result.stderr.decode(errors='replace').strip()}")
+
+
+def write_catalog(directory: str) -> str:
+    """Erzeugt catalog.json für einen Quell-Ordner (ein Unterordner je Template). Returns den Pfad."""
+    from dockervm_cli import compose_templates
+
+    templates = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isdir(path) or name.startswith((".", "_")):
+            continue
+        # Prüft das Manifest, bevor der Katalog veröffentlicht wird
+        try:
+            compose_templates.read_manifest(name, path)
+        except compose_templates.TemplateError as e:
+            raise CatalogError(str(e))
+        files = {}
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for file in sorted(names):
+                full = os.path.join(root, file)
+                with open(full, "rb") as f:
+                    files[os.path.relpath(full, path).replace(os.sep, "/")] = hashlib.sha256(f.read()).hexdigest()
+        templates[name] = {"files": files}
+    if not templates:
+        raise CatalogError(f"Keine Templates in {directory} gefunden.")
+    target = os.path.join(directory, CATALOG_FILE)
+    _write_json(target, {"version": CATALOG_VERSION, "templates": templates})
+    return target
+
+
+# --- Quellen --------------------------------------------------------------------
+
+def _http_get(url: str, headers: dict = None, timeout: float = 10) -> tuple:
+    """Returns (status, body, response-headers); 304 liefert body None. Netzwerkfehler -> OfflineError."""
+    request = urllib.request.Request(url, headers={"User-Agent": "dvm", **(headers or {})})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read(), response.headers
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, None, e.headers
+        raise CatalogError(f"{url}: HTTP {e.code}")
+    except (urllib.error.URLError, OSError) as e:
+        raise OfflineError(f"{url} nicht erreichbar: {getattr(e, 'reason', e)}")
+
+
+class HttpSource:
+    """Katalog auf einem Webserver: <url>/catalog.json, <url>/catalog.json.sig und <url>/<name>/<datei>."""
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def catalog(self, state: dict) -> tuple:
+        """Returns (daten, signatur, validators) oder (None, None, validators) bei unverändertem Katalog (304)."""
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        status, data, response_headers = _http_get(f"{self.url}/{CATALOG_FILE}", headers, self.timeout)
+        validators = {"etag": response_headers.get("ETag"), "last_modified": response_headers.get("Last-Modified")}
+        if status == 304:
+            return None, None, {k: v or state.get(k) for k, v in validators.items()}
+        try:
+            _, signature, _ = _http_get(f"{self.url}/{SIGNATURE_FILE}", timeout=self.timeout)
+        except CatalogError:
+            signature = None
+        return data, signature, validators
+
+    def file(self, name: str, path: str) -> bytes:
+        return _http_get(f"{self.url}/{name}/{path}", timeout=self.timeout)[1]
+
+
+class GitSource:
+    """Katalog in einem Git-Repository (git+https://...); flacher Klon im Cache, Änderungen per fetch."""
+
+    def __init__(self, url: str, timeout: float = 60):
+        self.url = url[len("git+"):] if url.startswith("git+") else url
+        self.timeout = timeout
+        self.checkout = os.path.join(catalog_dir(), "git")
+
+    def _git(self, *args):
+        try:
+            result = subprocess.run(["git", *args], capture_output=True, text=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise OfflineError(f"{self.url}: Zeitüberschreitung")
+        if result.returncode != 0:
+            raise OfflineError(f"{self.url}: {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'git fehlgeschlagen'}")
+        return result.stdout.strip()
+
+    def catalog(self, state: dict) -> tuple:
+        if os.path.isdir(os.path.join(self.checkout, ".git")) and self._git("-C", self.checkout, "remote", "get-url", "origin") == self.url:
+            self._git("-C", self.checkout, "fetch", "--depth", "1", "origin", "HEAD")
+            self._git("-C", self.checkout, "reset", "--hard", "FETCH_HEAD")
+        else:
+            shutil.rmtree(self.checkout, ignore_errors=True)
+            self._git("clone", "--depth", "1", self.url, self.checkout)
+        commit = self._git("-C", self.checkout, "rev-parse", "HEAD")
+        if commit == state.get("etag"):
+            return None, None, {"etag": commit, "last_modified": None}
+        with open(os.path.join(self.checkout, CATALOG_FILE), "rb") as f:
+            data = f.read()
+        signature_path = os.path.join(self.checkout, SIGNATURE_FILE)
+        signature = open(signature_path, "rb").read() if os.path.exists(signature_path) else None
+        return data, signature, {"etag": commit, "last_modified": None}
+
+    def file(self, name: str, path: str) -> bytes:
+        with open(os.path.join(self.checkout, name, path), "rb") as f:
+            return f.read()
+
+
+def make_source(url: str):
+    if url.startswith("git+") or url.endswith(".git"):
+        return GitSource(url)
+    if url.startswith(("http://", "https://")):
+        return HttpSource(url)
+    raise CatalogError(f"Unbekannte Katalog-Quelle: {url} (erwartet http(s)://... oder git+https://...)")
+
+
+# --- Synchronisieren ------------------------------------------------------------
+
+def sync(source: str = None, allowed_signers: str = None, verify: bool = True, force: bool = False) -> dict:
+    """
+    Gleicht den lokalen Katalog mit der Quelle ab. Der Katalog wird nur bei Änderungen
+    (ETag/Last-Modified bzw. Git-Commit) geladen und seine Signatur geprüft; danach werden nur
+    Dateien geladen, deren SHA-256 sich gegenüber dem lokalen Stand geändert hat.
+    Ist die Quelle nicht erreichbar, bleibt der lokale Stand gültig (status "offline").
+    Returns ein Dict mit status ("updated", "unchanged", "offline"), downloaded, removed und templates.
+    Raises CatalogError bei ungültigem Katalog oder Signatur; der lokale Stand bleibt dann unverändert.
+    """
+    from dockervm_cli import compose_templates
+
+    state = load_state()
+    source = source or configured_source(state)
+    if not source:
+        raise CatalogError("Keine Katalog-Quelle konfiguriert (--source oder DVM_TEMPLATE_CATALOG).")
+    allowed_signers = allowed_signers or state.get("allowed_signers")
+    if source != state.get("source"):
+        state = {}
+    utils.ensure_cache_dir("catalog")
+
+    start = time.perf_counter()
+    cached = cached_templates()
+    remote = make_source(source)
+    try:
+        data, signature, validators = remote.catalog({} if force else state)
+    except OfflineError:
+        if not os.path.exists(index_file()):
+            raise
+        runlog.event("catalog", source=source, status="offline", duration=round(time.perf_counter() - start, 4))
+        return {"status": "offline", "downloaded": [], "removed": [], "templates": len(cached)}
+
+    state.update({"source": source, "allowed_signers": allowed_signers, "checked": time.time()})
+    if data is None:
+        state.update(validators)
+        _write_json(_state_file(), state)
+        return {"status": "unchanged", "downloaded": [], "removed": [], "templates": len(cached)}
+
+    if verify:
+        if signature is None:
+            raise CatalogError(f"{SIGNATURE_FILE} fehlt in der Quelle.")
+        verify_signature(data, signature, allowed_signers)
+    catalog = parse_catalog(data)
+
+    # 1. Vollständigen neuen Stand in einem Zwischenordner aufbauen: unveränderte Dateien
+    #    (gleicher SHA-256) werden lokal kopiert, nur geänderte aus der Quelle geladen
+    staging = os.path.join(catalog_dir(), "staging")
+    shutil.rmtree(staging, ignore_errors=True)
+    downloaded = []
+    try:
+        for name, entry in catalog["templates"].items():
+            for path, digest in entry["files"].items():
+                current = os.path.join(templates_dir(), name, path)
+                staged = os.path.join(staging, name, path)
+                os.makedirs(os.path.dirname(staged), exist_ok=True)
+                if not force and os.path.isfile(current) and download.sha256_file(current) == digest.lower():
+                    shutil.copy2(current, staged)
+                    continue
+                content = remote.file(name, path)
+                if hashlib.sha256(content).hexdigest() != digest.lower():
+                    raise CatalogError(f"SHA-256 von {name}/{path} stimmt nicht mit dem Katalog überein.")
+                with open(staged, "wb") as f:
+                    f.write(content)
+                downloaded.append(f"{name}/{path}")
+
+        # 2. Index aus dem Zwischenordner erzeugen - ungültige Templates verhindern die Übernahme
+        os.makedirs(staging, exist_ok=True)
+        try:
+            index = compose_templates.build_index(staging)
+        except compose_templates.TemplateError as e:
+            raise CatalogError(f"Katalog enthält ein ungültiges Template: {e}")
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # 3. Entfernte Templates/Dateien ermitteln und den Zwischenordner als Ganzes übernehmen
+    removed = []
+    if os.path.isdir(templates_dir()):
+        for name in sorted(os.listdir(templates_dir())):
+            if name not in catalog["templates"]:
+                removed.append(name)
+                continue
+            for root, _, files in os.walk(os.path.join(templates_dir(), name)):
+                for file in files:
+                    rel = os.path.relpath(os.path.join(root, file), os.path.join(templates_dir(), name)).replace(os.sep, "/")
+                    if rel not in catalog["templates"][name]["files"]:
+                        removed.append(f"{name}/{rel}")
+    retired = os.path.join(catalog_dir(), "templates.old")
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.isdir(templates_dir()):
+        os.replace(templates_dir(), retired)
+    os.replace(staging, templates_dir())
+    shutil.rmtree(retired, ignore_errors=True)
+
+    _write_json(index_file(), index)
+    with open(os.path.join(catalog_dir(), CATALOG_FILE), "wb") as f:
+        f.write(data)
+    state.update(validators)
+    state["synced"] = time.time()
+    _write_json(_state_file(), state)
+    compose_templates.load_index.cache_clear()
+
+    runlog.event("catalog", source=source, status="updated", files=len(downloaded),
+                 duration=round(time.perf_counter() - start, 4))
+    return {"status": "updated", "downloaded": downloaded, "removed": removed, "templates": len(index["templates"])}
+
+
+def refresh_if_stale() -> dict:
+    """
+    Für 'dvm install container': synchronisiert einen konfigurierten Katalog, wenn die letzte
+    Prüfung länger als CHECK_INTERVAL zurückliegt. Fehler werden nicht weitergereicht - es gilt
+    dann der lokale Stand. Returns das sync()-Ergebnis, {"error": ...} oder None.
+    """
+    state = load_state()
+    if not configured_source(state) or time.time() - state.get("checked", 0) < CHECK_INTERVAL:
+        return None
+    try:
+        return sync()
+    except CatalogError as e:
+        return {"error": str(e)}
@@ -0,0 +1,67 @@
+import os
+import typer
+from typing import Annotated
+from dockervm_cli import cache, prompts
+from dockervm_cli.utils import run_command, console, DVM_CACHE_DIR
+
+app = typer.Typer(help="Lokalen dvm Cache (Wheels, Tools, Downloads) verwalten.")
+
+
+def _format_size(size_bytes: int) -> str:
+    if size_bytes > 1024**3:
+        return f"{size_bytes / (1024**3):.1f} GB"
+    elif size_bytes > 1024**2:
+        return f"{size_bytes / (1024**2):.1f} MB"
+    elif size_bytes > 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    return f"{size_bytes} B"
+
+
+@app.command("status")
+def cache_status():
+    """
+    Zeigt Größe und Trefferquote des lokalen Caches unter /var/cache/dvm.
+    """
+    from rich.table import Table
+
+    console.print(f"[bold blue]dvm Cache ({DVM_CACHE_DIR})[/bold blue]")
+
+    if not os.path.isdir(DVM_CACHE_DIR):
+        console.print("[yellow]Der Cache ist noch leer.[/yellow]")
+        return
+
+    stats = cache.load_stats()
+
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Cache", style="cyan")
+    table.add_column("Treffer", justify="right", style="green")
+    table.add_column("Fehlgriffe", justify="right", style="yellow")
+    table.add_column("Trefferquote", justify="right")
+
+    for kind, entry in sorted(stats.items()):
+        total = entry.get("hits", 0) + entry.get("misses", 0)
+        rate = f"{entry.get('hits', 0) / total * 100:.0f}%" if total else "-"
+        table.add_row(kind, str(entry.get("hits", 0)), str(entry.get("misses", 0)), rate)
+    console.print(table)
+
+    sizes = Table(show_header=True, header_style="bold magenta")
+    sizes.add_column("Verzeichnis", style="cyan")
+    sizes.add_column("Größe", justify="right")
+    for name in sorted(os.listdir(DVM_CACHE_DIR)):
+        path = os.path.join(DVM_CACHE_DIR, name)
+        if os.path.isdir(path):
+            sizes.add_row(name, _format_size(cache.dir_size(path)))
+    console.print(sizes)
+
+
+@app.command("clear")
+def cache_clear(
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage löschen")] = False,
+):
+    """
+    Leert den lokalen dvm Cache (Wheels, Tools, Downloads und Statistik).
+    """
+    if not prompts.confirm(f"Soll der gesamte Cache unter {DVM_CACHE_DIR} gelöscht werden?", yes=yes, default=False):
+        raise typer.Exit()
+    if run_command(f"sudo rm -rf {DVM_CACHE_DIR}", desc="Lösche Cache"):
+        console.print("[bold green]Cache geleert.[/bold green]")
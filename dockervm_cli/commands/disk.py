@@ -8,10 +8,18 @@ import tempfile
 import subprocess
 import os
 import json
-from dockervm_cli.utils import run_command, console, DVM_BASE_PATH
+from typing import Annotated, Optional
+from dockervm_cli import plan, prompts
+from dockervm_cli.apt import apt_install
+from dockervm_cli.utils import run_command, console, update_daemon_json, write_root_file, DVM_BASE_PATH
 
 app = typer.Typer(help="Verwaltung von Festplatten und Laufwerken (vdisks).")
 
+# Gelesene Systemdateien (dvm bench ersetzt sie durch einen Testbaum)
+PROC_MOUNTS = "/proc/mounts"
+FSTAB = "/etc/fstab"
+SYSFS_BLOCK = "/sys/class/block"
+
 def get_expandable_partitions():
     """Returns a list of mounted partitions that could potentially be expanded."""
     EXPANDABLE_FSTYPES = {'ext2', 'ext3', 'ext4', 'xfs', 'btrfs', 'vfat'}
@@ -19,7 +27,7 @@ def get_expandable_partitions():
     # --- Step 1: Read /proc/mounts (kernel ground truth) ---
     mounts = []
     try:
-        with open('/proc/mounts', 'r') as f:
+        with open(PROC_MOUNTS, 'r') as f:
             for line in f:
                 parts = line.split()
                 if len(parts) < 3:
@@ -67,7 +75,7 @@ def get_expandable_partitions():
         if not lb:
             try:
                 real_name = os.path.basename(os.path.realpath(dev_path))
-                with open(f'/sys/class/block/{real_name}/size') as sf:
+                with open(os.path.join(SYSFS_BLOCK, real_name, 'size')) as sf:
                     size_bytes = int(sf.read().strip()) * 512
                     if size_bytes > 1024**3:
                         return f"{size_bytes / (1024**3):.1f} GB"
@@ -172,7 +180,12 @@ def get_available_disks():
         return []
 
 @app.command("mount")
-def mount_disk():
+def mount_disk(
+    disk: Annotated[Optional[str], typer.Option("--disk", help="Festplatte, z.B. /dev/sdb")] = None,
+    mount_point: Annotated[Optional[str], typer.Option("--mount-point", help="Mountpoint (Standard: /mnt/volumes)")] = None,
+    fstype: Annotated[Optional[str], typer.Option("--fstype", help="Dateisystem: ext4, xfs oder btrfs (Standard: ext4)")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Formatieren ohne Rückfrage bestätigen")] = False,
+):
     """
     Formatiert eine neue vdisk und bindet sie automatisch ein.
     """
@@ -185,49 +198,37 @@ def mount_disk():
         console.print("[yellow]Keine unformatierten/unmontierten Festplatten gefunden.[/yellow]")
         raise typer.Exit()
         
-    selected_disk_str = questionary.select(
-        "Welche Festplatte möchtest du formatieren und einbinden?",
-        choices=disks
-    ).ask()
-    
-    if not selected_disk_str:
-        raise typer.Exit()
-        
-    selected_disk = selected_disk_str.split()[0]  # Get /dev/sdX
+    choices = [questionary.Choice(d, value=d.split()[0]) for d in disks]  # value: /dev/sdX
+    selected_disk = prompts.select(disk, "Welche Festplatte möchtest du formatieren und einbinden?", choices, "--disk", yes=yes)
     
     # 2. Warnung und Bestätigung
     console.print(f"\n[bold red]WARNUNG:[/bold red] Alle Daten auf [cyan]{selected_disk}[/cyan] werden unwiderruflich gelöscht!")
-    if not questionary.confirm("Bist du sicher, dass du diese Festplatte formatieren möchtest?", default=False).ask():
+    if not prompts.confirm("Bist du sicher, dass du diese Festplatte formatieren möchtest?", yes=yes, default=False):
         console.print("[yellow]Vorgang abgebrochen.[/yellow]")
         raise typer.Exit()
         
     # 3. Mount-Point abfragen
-    mount_point = questionary.text(
-        "Wo soll die Festplatte eingebunden werden (z.B. /mnt/data)?",
-        default="/mnt/volumes"
-    ).ask()
+    mount_point = prompts.text(
+        mount_point, "Wo soll die Festplatte eingebunden werden (z.B. /mnt/data)?", "--mount-point",
+        default="/mnt/volumes", yes=yes
+    )
     
     if not mount_point:
         raise typer.Exit()
         
     # 4. Dateisystem abfragen
-    fstype = questionary.select(
-        "Welches Dateisystem soll verwendet werden?",
-        choices=["ext4", "xfs", "btrfs"]
-    ).ask()
-    
-    if not fstype:
-        raise typer.Exit()
+    fstype = prompts.select(
+        fstype, "Welches Dateisystem soll verwendet werden?", ["ext4", "xfs", "btrfs"], "--fstype",
+        default="ext4" if yes else None, yes=yes
+    )
         
     # 5. Formatieren
     console.print(f"\n[blue]Formatiere {selected_disk} mit {fstype}...[/blue]")
     if fstype == "xfs":
-        subprocess.run(["sudo", "apt-get", "update"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        run_command("sudo apt-get install -y xfsprogs", desc="Installiere xfsprogs", check=False)
+        apt_install(["xfsprogs"], desc="Installiere xfsprogs")
         format_cmd = f"sudo mkfs.xfs -f {selected_disk}"
     elif fstype == "btrfs":
-        subprocess.run(["sudo", "apt-get", "update"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        run_command("sudo apt-get install -y btrfs-progs", desc="Installiere btrfs-progs", check=False)
+        apt_install(["btrfs-progs"], desc="Installiere btrfs-progs")
         format_cmd = f"sudo mkfs.btrfs -f {selected_disk}"
     else:
         format_cmd = f"sudo mkfs.ext4 -F {selected_disk}"
@@ -254,20 +255,13 @@ def mount_disk():
     fstab_entry = f"UUID={disk_uuid} {mount_point} {fstype} defaults 0 2\n"
     
     # Check if UUID already in fstab
-    with open('/etc/fstab', 'r') as f:
+    with open(FSTAB, 'r') as f:
         fstab_content = f.read()
         
     if disk_uuid not in fstab_content and mount_point not in fstab_content:
         console.print("[blue]Füge Eintrag zur /etc/fstab hinzu...[/blue]")
-        # Write to temp file and move to avoid echo sudo permission issues
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".fstab", delete=False) as tf:
-            tf.write(fstab_content + fstab_entry)
-            tmp_fstab = tf.name
-            
-        run_command(f"sudo cp /etc/fstab /etc/fstab.backup", desc="Erstelle Backup von /etc/fstab")
-        run_command(f"sudo mv {tmp_fstab} /etc/fstab", desc="Aktualisiere /etc/fstab")
-        run_command("sudo chown root:root /etc/fstab && sudo chmod 644 /etc/fstab", desc="Setze Berechtigungen für /etc/fstab")
+        run_command("sudo cp /etc/fstab /etc/fstab.backup", desc="Erstelle Backup von /etc/fstab")
+        write_root_file("/etc/fstab", fstab_content + fstab_entry, desc="Aktualisiere /etc/fstab", mode="644")
     else:
         console.print("[yellow]Festplatte oder Mountpoint bereits in /etc/fstab vorhanden.[/yellow]")
 
@@ -282,7 +276,11 @@ def mount_disk():
         raise typer.Exit(code=1)
 
 @app.command("docker-storage")
-def docker_storage():
+def docker_storage(
+    new_path: Annotated[Optional[str], typer.Option("--path", help="Neuer Pfad für Docker (Standard: <Basispfad>/docker_data)")] = None,
+    keep_backup: Annotated[Optional[bool], typer.Option("--keep-backup/--delete-old", help="Altes Verzeichnis als Backup behalten oder löschen")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage fortfahren (altes Verzeichnis wird behalten)")] = False,
+):
     """
     Ändert den Docker Speicherort (data-root) für Images, Volumes etc.
     """
@@ -290,10 +288,10 @@ def docker_storage():
     
     # 1. Neuen Pfad abfragen
     default_new_path = f"{DVM_BASE_PATH}/docker_data"
-    new_path = questionary.text(
-        "Neuer Basis-Pfad für Docker (wird bei Bedarf erstellt):",
-        default=default_new_path
-    ).ask()
+    new_path = prompts.text(
+        new_path, "Neuer Basis-Pfad für Docker (wird bei Bedarf erstellt):", "--path",
+        default=default_new_path, yes=yes
+    )
     
     if not new_path:
         raise typer.Exit()
@@ -317,7 +315,7 @@ def docker_storage():
         raise typer.Exit()
         
     console.print(f"\n[bold yellow]WARNUNG:[/bold yellow] Docker wird gestoppt und alle Container werden kurzzeitig unterbrochen.")
-    if not questionary.confirm("Möchtest du fortfahren?", default=True).ask():
+    if not prompts.confirm("Möchtest du fortfahren?", yes=yes, default=True):
         console.print("[yellow]Vorgang abgebrochen.[/yellow]")
         raise typer.Exit()
         
@@ -329,7 +327,7 @@ def docker_storage():
     console.print(f"[blue]Kopiere Docker Daten von {current_path} nach {new_path}... (Das kann je nach Datenmenge dauern!)[/blue]")
     run_command(f"sudo mkdir -p {new_path}", desc="Erstelle neues Verzeichnis")
     
-    run_command("sudo apt-get update && sudo apt-get install -y rsync", desc="Installiere Abhängigkeit: rsync", check=False)
+    apt_install(["rsync"], desc="Installiere Abhängigkeit: rsync")
     
     # WICHTIG: -aP behält Rechte, Time, etc. rsync ist sicherer als cp
     if not run_command(f"sudo rsync -aP {current_path}/ {new_path}/", desc="Kopiere Dateien via rsync (bitte warten)"):
@@ -339,33 +337,12 @@ def docker_storage():
         
     # 5. daemon.json anpassen
     console.print("[blue]Passe /etc/docker/daemon.json an...[/blue]")
-    daemon_json_path = "/etc/docker/daemon.json"
-    
-    # Lese aktuelle Datei, falls sie existiert
-    daemon_data = {}
-    try:
-        result = subprocess.run(['sudo', 'cat', daemon_json_path], capture_output=True, text=True)
-        if result.returncode == 0 and result.stdout.strip():
-            daemon_data = json.loads(result.stdout.strip())
-    except Exception:
-        pass # Ignorieren falls nicht da oder kein valides JSON
-        
-    daemon_data["data-root"] = new_path
-    
-    try:
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as tf:
-            json.dump(daemon_data, tf, indent=4)
-            tmp_daemon = tf.name
-            
-        run_command(f"sudo mkdir -p /etc/docker", desc="Stelle sicher, dass /etc/docker existiert")
-        run_command(f"sudo mv {tmp_daemon} {daemon_json_path}", desc="Setze Konfiguration in daemon.json")
-    except Exception as e:
-        console.print(f"[bold red]Fehler beim Speichern der daemon.json: {e}[/bold red]")
+    if not update_daemon_json({"data-root": new_path}):
+        console.print("[bold red]Fehler beim Speichern der daemon.json.[/bold red]")
         raise typer.Exit(code=1)
         
     # Optional: Altes Verzeichnis umbenennen als Backup
-    if questionary.confirm(f"Soll das alte Verzeichnis ({current_path}) als Backup behalten werden? (Nein = Löschen)", default=True).ask():
+    if prompts.confirm(f"Soll das alte Verzeichnis ({current_path}) als Backup behalten werden? (Nein = Löschen)", yes=yes, default=True, value=keep_backup, option="--keep-backup/--delete-old"):
         run_command(f"sudo mv {current_path} {current_path}.backup", desc="Erstelle Backup des alten Verzeichnisses")
     else:
         run_command(f"sudo rm -rf {current_path}", desc="Lösche altes Verzeichnis")
@@ -379,16 +356,19 @@ def docker_storage():
         raise typer.Exit(code=1)
 
 @app.command("docker-clean-backup")
-def docker_clean_backup():
+def docker_clean_backup(
+    backup_path: Annotated[Optional[str], typer.Option("--path", help="Pfad zum Backup (Standard: /var/lib/docker.backup)")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage löschen")] = False,
+):
     """
     Löscht ein altes Docker Volume Backup, falls dieses verschoben wurde.
     """
     console.print("[bold blue]Lösche Docker Backup[/bold blue]")
     
-    backup_path = questionary.text(
-        "Pfad zum alten Docker Backup:",
-        default="/var/lib/docker.backup"
-    ).ask()
+    backup_path = prompts.text(
+        backup_path, "Pfad zum alten Docker Backup:", "--path",
+        default="/var/lib/docker.backup", yes=yes
+    )
     
     if not backup_path:
         raise typer.Exit()
@@ -405,7 +385,7 @@ def docker_clean_backup():
         raise typer.Exit()
         
     console.print(f"\n[bold red]WARNUNG:[/bold red] Alle Dateien in [cyan]{backup_path}[/cyan] werden unwiderruflich gelöscht!")
-    if not questionary.confirm("Bist du sicher, dass du das Backup löschen möchtest?", default=False).ask():
+    if not prompts.confirm("Bist du sicher, dass du das Backup löschen möchtest?", yes=yes, default=False):
         console.print("[yellow]Vorgang abgebrochen.[/yellow]")
         raise typer.Exit()
         
@@ -417,10 +397,14 @@ def docker_clean_backup():
         raise typer.Exit(code=1)
 
 @app.command("expand")
-def expand_disk():
+def expand_disk(
+    device: Annotated[Optional[str], typer.Option("--device", help="Gerät oder Mountpoint, z.B. /dev/sda2 oder /mnt/volumes")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage vergrößern")] = False,
+):
     """
     Vergrößert eine eingebundene Partition und deren Dateisystem (z.B. nach Vergrößerung der vdisk).
     """
+    plan.unsupported("dvm disk expand")
     console.print("[bold blue]Laufwerk / Partition erweitern[/bold blue]")
     
     # 1. Partitionen abfragen
@@ -431,13 +415,13 @@ def expand_disk():
         raise typer.Exit()
         
     # 2. Auswahl
-    selected = questionary.select(
-        "Welche Partition möchtest du vergrößern?",
-        choices=[p["name"] for p in partitions]
-    ).ask()
-    
-    if not selected:
-        raise typer.Exit()
+    if device:
+        selected = next((p["name"] for p in partitions if device in (p["value"]["dev"], p["value"]["mountpoint"])), None)
+        if not selected:
+            console.print(f"[bold red]{device} ist keine erweiterbare Partition.[/bold red]")
+            raise typer.Exit(code=1)
+    else:
+        selected = prompts.select(None, "Welche Partition möchtest du vergrößern?", [p["name"] for p in partitions], "--device", yes=yes)
         
     part_info = next((p["value"] for p in partitions if p["name"] == selected), None)
     if not part_info:
@@ -460,15 +444,14 @@ def expand_disk():
         console.print(f"Diese Partition liegt auf [cyan]{pkname}[/cyan] (Partition {partn}).")
         
     console.print(f"\n[bold yellow]HINWEIS:[/bold yellow] Diese Aktion vergrößert den Speicherplatz auf den maximal verfügbaren Bereich.")
-    if not questionary.confirm("Möchtest du fortfahren?", default=False).ask():
+    if not prompts.confirm("Möchtest du fortfahren?", yes=yes, default=False):
         console.print("[yellow]Vorgang abgebrochen.[/yellow]")
         raise typer.Exit()
         
     if is_lvm:
         # 3a. LVM: growpart auf PV-Partition → pvresize → lvextend
         console.print("[blue]Installiere Abhängigkeiten (cloud-guest-utils für growpart)...[/blue]")
-        subprocess.run(["sudo", "apt-get", "update"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        run_command("sudo apt-get install -y cloud-guest-utils", desc="Installiere cloud-guest-utils", check=False)
+        apt_install(["cloud-guest-utils"], desc="Installiere cloud-guest-utils")
 
         # VG des LV ermitteln
         vg_name = ''
@@ -564,8 +547,7 @@ def expand_disk():
     elif not is_disk and pkname and partn:
         # 3b. Normales Partition-Layout: growpart
         console.print("[blue]Prüfe Abhängigkeiten (cloud-guest-utils für growpart)...[/blue]")
-        subprocess.run(["sudo", "apt-get", "update"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        run_command("sudo apt-get install -y cloud-guest-utils", desc="Installiere cloud-guest-utils", check=False)
+        apt_install(["cloud-guest-utils"], desc="Installiere cloud-guest-utils")
 
         console.print(f"[blue]Erweitere Partition {partn} auf {pkname}...[/blue]")
         growpart_result = subprocess.run(['sudo', 'growpart', pkname, partn], capture_output=True, text=True)
@@ -598,14 +580,52 @@ def expand_disk():
         console.print("[bold red]Fehler bei der Erweiterung des Dateisystems.[/bold red]")
         raise typer.Exit(code=1)
 
+def usage_choices(df_output: str) -> list:
+    """Auswahlliste (name/value) aus der Ausgabe von 'df -h', Spalten bündig ausgerichtet."""
+    parsed_lines = []
+    for line in df_output.strip().split("\n")[1:]:
+        parts = line.split()
+        if len(parts) >= 6:
+            parsed_lines.append({
+                "mountpoint": " ".join(parts[5:]),
+                "size": parts[1],
+                "used": parts[2],
+                "use_percent": parts[4]
+            })
+    if not parsed_lines:
+        return []
+
+    max_mount_len = max(len(item["mountpoint"]) for item in parsed_lines)
+    max_size_len = max(len(item["size"]) for item in parsed_lines)
+    max_used_len = max(len(item["used"]) for item in parsed_lines)
+    max_pcent_len = max(len(item["use_percent"]) for item in parsed_lines)
+
+    choices = []
+    for item in parsed_lines:
+        mnt_padded = item["mountpoint"].ljust(max_mount_len + 2)
+        size_padded = item["size"].rjust(max_size_len)
+        used_padded = item["used"].rjust(max_used_len)
+        pcent_padded = item["use_percent"].rjust(max_pcent_len)
+        
+        display_str = f"{mnt_padded} [Größe: {size_padded} | Belegt: {pcent_padded} ({used_padded})]"
+        choices.append({"name": display_str, "value": item["mountpoint"]})
+    return choices
+
+
 @app.command("usage")
-def cmd_usage():
+def cmd_usage(
+    path: Annotated[Optional[str], typer.Option("--path", help="Zu analysierender Pfad (ohne Auswahl)")] = None,
+):
     """
     Speicherplatz analysieren (gdu)
     """
     console.print("[bold blue]Laufwerk Speicherplatz analysieren[/bold blue]")
     
-    # 1. Speicherplatz auslesen
+    # 1. Speicherplatz auslesen (nur für die Auswahl nötig)
+    if path:
+        _run_gdu(path)
+        return
+
     console.print("[blue]Lese Mountpoints...[/blue]")
     result = subprocess.run(
         ["df", "-h", "-x", "tmpfs", "-x", "devtmpfs", "-x", "overlay", "-x", "squashfs", "-x", "efivarfs"], 
@@ -616,48 +636,10 @@ def cmd_usage():
         console.print(f"[bold red]Fehler beim Auslesen der Festplatten: {result.stderr}[/bold red]")
         raise typer.Exit(code=1)
         
-    lines = result.stdout.strip().split("\n")
-    if len(lines) < 2:
+    choices = usage_choices(result.stdout)
+    if not choices:
         console.print("[yellow]Keine passenden Laufwerke gefunden.[/yellow]")
         raise typer.Exit()
-        
-    # Header überspringen und Spalten ausrichten
-    choices = []
-    parsed_lines = []
-    
-    max_mount_len = 0
-    max_size_len = 0
-    max_used_len = 0
-    max_pcent_len = 0
-    
-    for line in lines[1:]:
-        parts = line.split()
-        if len(parts) >= 6:
-            size = parts[1]
-            used = parts[2]
-            use_percent = parts[4]
-            mountpoint = " ".join(parts[5:])
-            
-            parsed_lines.append({
-                "mountpoint": mountpoint,
-                "size": size,
-                "used": used,
-                "use_percent": use_percent
-            })
-            
-            max_mount_len = max(max_mount_len, len(mountpoint))
-            max_size_len = max(max_size_len, len(size))
-            max_used_len = max(max_used_len, len(used))
-            max_pcent_len = max(max_pcent_len, len(use_percent))
-            
-    for item in parsed_lines:
-        mnt_padded = item["mountpoint"].ljust(max_mount_len + 2)
-        size_padded = item["size"].rjust(max_size_len)
-        used_padded = item["used"].rjust(max_used_len)
-        pcent_padded = item["use_percent"].rjust(max_pcent_len)
-        
-        display_str = f"{mnt_padded} [Größe: {size_padded} | Belegt: {pcent_padded} ({used_padded})]"
-        choices.append({"name": display_str, "value": item["mountpoint"]})
             
     choices.append({"name": "Eigener Pfad... (Manuelle Eingabe)", "value": "custom"})
     
@@ -680,11 +662,15 @@ def cmd_usage():
         if not selected_path:
             raise typer.Exit()
     
+    _run_gdu(selected_path)
+
+
+def _run_gdu(selected_path: str):
     # Check if gdu is installed
     check_gdu = subprocess.run(["dpkg", "-s", "gdu"], capture_output=True, text=True)
     if check_gdu.returncode != 0:
         console.print("[yellow]gdu ist nicht installiert. Installiere...[/yellow]")
-        success = run_command("sudo apt-get update && sudo apt-get install -y gdu", desc="Installiere gdu")
+        success = apt_install(["gdu"], desc="Installiere gdu")
         if not success:
             console.print("[bold red]Fehler bei der Installation von gdu.[/bold red]")
             raise typer.Exit(code=1)
@@ -696,13 +682,22 @@ def cmd_usage():
         console.print(f"[bold red]Fehler beim Starten von gdu: {e}[/bold red]")
 
 @app.command("docker-prune-cron")
-def docker_prune_cron():
+def docker_prune_cron(
+    backend: Annotated[str, typer.Option("--backend", help="cron oder systemd (Timer mit RandomizedDelaySec)")] = "cron",
+    random_delay: Annotated[int, typer.Option("--random-delay", help="Maximale zufällige Verzögerung in Minuten (verteilt Bereinigungen in der Flotte)")] = 15,
+    frequency: Annotated[Optional[str], typer.Option("--frequency", help="daily, weekly oder off")] = None,
+):
     """
-    Konfiguriert einen automatischen Cronjob zur regelmäßigen Bereinigung von Docker (image prune).
+    Konfiguriert einen automatischen Cronjob (oder systemd Timer) zur regelmäßigen Bereinigung von Docker (image prune).
     """
     import questionary
     import getpass
     import shutil
+    from dockervm_cli import scheduler
+
+    if backend not in ("cron", "systemd"):
+        console.print(f"[bold red]Unbekanntes Backend: {backend} (erlaubt: cron, systemd)[/bold red]")
+        raise typer.Exit(code=1)
     
     console.print("[bold blue]Konfiguration Automatische Docker Bereinigung (Cron)[/bold blue]")
     
@@ -715,77 +710,49 @@ def docker_prune_cron():
     log_file = f"/home/{user}/dvm_docker_prune.log" if user != "root" else "/var/log/dvm_docker_prune.log"
     
     # 1. Frequency
-    frequency = questionary.select(
+    frequency = prompts.select(
+        frequency,
         "Wie oft soll die Docker Bereinigung (image prune -a -f) durchgeführt werden?",
-        choices=[
-            "Täglich (um 03:00 Uhr)",
-            "Wöchentlich (Sonntags um 03:00 Uhr)",
-            "Deaktivieren (Cron entfernen)"
-        ]
-    ).ask()
-    
-    if not frequency:
-        raise typer.Exit()
+        [
+            questionary.Choice("Täglich (um 03:00 Uhr)", value="daily"),
+            questionary.Choice("Wöchentlich (Sonntags um 03:00 Uhr)", value="weekly"),
+            questionary.Choice("Deaktivieren (Cron entfernen)", value="off"),
+        ],
+        "--frequency",
+    )
         
     cron_cmd = f"docker image prune -a -f >> {log_file} 2>&1"
-    
-    # 2. Manage Crontab
-    try:
-        # Get current crontab
-        result = subprocess.run("crontab -l", shell=True, capture_output=True, text=True)
-        current_crontab = result.stdout.strip().splitlines()
-        
-        # Filter out existing docker prune jobs
-        new_crontab = [line for line in current_crontab if "docker image prune" not in line and "dvm_docker_prune.log" not in line]
-        
-        if frequency == "Deaktivieren (Cron entfernen)":
-            if len(new_crontab) < len(current_crontab):
-                console.print("[yellow]Bestehender Cron-Job entfernt.[/yellow]")
-            else:
-                console.print("[dim]Kein bestehender Cron-Job gefunden.[/dim]")
-        else:
-            # Add new job
-            if frequency == "Täglich (um 03:00 Uhr)":
-                schedule = "0 3 * * *"
-            else: # Weekly
-                schedule = "0 3 * * 0"
-                
-            job = f"{schedule} {cron_cmd}"
-            new_crontab.append(job)
-            new_crontab.append("") # Ensure newline at end
-            
-            console.print(f"[green]Füge Cron-Job hinzu:[/green] {job}")
-            console.print(f"[dim]Log-Datei: {log_file}[/dim]")
-            
-        # Write back
-        new_crontab_str = "\n".join(new_crontab) + "\n"
-        
-        run_result = subprocess.run(
-            "crontab -", 
-            input=new_crontab_str, 
-            shell=True, 
-            text=True, 
-            capture_output=True
-        )
-        
-        if run_result.returncode == 0:
-            console.print("[bold green]Crontab erfolgreich aktualisiert![/bold green]")
-        else:
-            console.print(f"[bold red]Fehler beim Schreiben der Crontab: {run_result.stderr}[/bold red]")
-            
-    except Exception as e:
-        console.print(f"[bold red]Fehler bei der Cron-Konfiguration: {e}[/bold red]")
+
+    # 2. Job setzen bzw. entfernen (eine Crontab-Schreiboperation)
+    if frequency == "off":
+        entry = None
+    else:
+        schedule = "0 3 * * *" if frequency == "daily" else "0 3 * * 0"
+        entry = scheduler.job("docker-prune", schedule, cron_cmd, backend=backend, random_delay=random_delay * 60,
+                              description="dvm Docker Bereinigung")
+        console.print(f"[dim]Log-Datei: {log_file}[/dim]")
+
+    if scheduler.apply({"docker-prune": entry}):
+        console.print("[bold green]Zeitplan erfolgreich aktualisiert![/bold green]")
+    else:
+        console.print("[bold red]Fehler bei der Cron-Konfiguration.[/bold red]")
 
 @app.command("remount")
-def remount_disk():
+def remount_disk(
+    action: Annotated[Optional[str], typer.Option("--action", help="Für alle defekten Einträge: ignore, delete oder replace (nächstes freie Laufwerk)")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Änderungen ohne Rückfrage speichern")] = False,
+):
     """
     Repariert defekte Mounts (z.B. nach Änderung der vdisk UUID) und bindet sie neu ein.
     """
+    if action not in (None, "ignore", "delete", "replace"):
+        console.print(f"[bold red]Ungültige Aktion: {action} (erlaubt: ignore, delete, replace)[/bold red]")
+        raise typer.Exit(code=1)
     console.print("[bold blue]Defekte Mounts reparieren (UUIDs anpassen)[/bold blue]")
     
     # 1. Read current fstab
     try:
-        with open('/etc/fstab', 'r') as f:
+        with open(FSTAB, 'r') as f:
             fstab_lines = f.readlines()
     except Exception as e:
         console.print(f"[bold red]Fehler beim Lesen der /etc/fstab: {e}[/bold red]")
@@ -884,14 +851,17 @@ def remount_disk():
             desc = f"Ersetzen durch {d['dev']} (UUID: {d['uuid']}, FS: {d['fstype']}, Größe: {d['size']})"
             choices.append({"name": desc, "value": d})
             
-        choice = questionary.select(
-            f"Was möchtest du mit dem defekten Mountpoint {b['mountpoint']} tun?",
-            choices=choices
-        ).ask()
-        
-        if not choice:
-            console.print("[yellow]Abbruch.[/yellow]")
-            raise typer.Exit()
+        if action == "replace":
+            choice = unassigned_devices[0] if unassigned_devices else "ignore"
+        elif action:
+            choice = action
+        else:
+            # Ohne --action bleibt der Eintrag bei --yes unverändert
+            choice = prompts.select(
+                None, f"Was möchtest du mit dem defekten Mountpoint {b['mountpoint']} tun?",
+                [questionary.Choice(c["name"], value=c["value"]) for c in choices], "--action",
+                default="ignore" if yes else None, yes=yes
+            )
             
         if choice == "ignore":
             continue
@@ -909,15 +879,9 @@ def remount_disk():
             modifications = True
 
     if modifications:
-        if questionary.confirm("\nÄnderungen an der /etc/fstab speichern und anwenden?", default=True).ask():
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".fstab", delete=False) as tf:
-                tf.writelines(fstab_lines)
-                tmp_fstab = tf.name
-                
+        if prompts.confirm("\nÄnderungen an der /etc/fstab speichern und anwenden?", yes=yes, default=True):
             run_command("sudo cp /etc/fstab /etc/fstab.backup", desc="Erstelle Backup von /etc/fstab")
-            run_command(f"sudo mv {tmp_fstab} /etc/fstab", desc="Aktualisiere /etc/fstab")
-            run_command("sudo chown root:root /etc/fstab && sudo chmod 644 /etc/fstab", desc="Setze Berechtigungen für /etc/fstab")
+            write_root_file("/etc/fstab", "".join(fstab_lines), desc="Aktualisiere /etc/fstab", mode="644")
             
             run_command("sudo systemctl daemon-reload", desc="Lade systemd daemon neu", check=False)
             if run_command("sudo mount -a", desc="Lade fstab neu und mounte"):
@@ -927,35 +891,34 @@ def remount_disk():
 
 
 @app.command("mount-cifs")
-def mount_cifs():
+def mount_cifs(
+    server_path: Annotated[Optional[str], typer.Option("--source", help="Netzwerkpfad, z.B. //192.168.1.100/share")] = None,
+    mount_point: Annotated[Optional[str], typer.Option("--mount-point", help="Lokaler Mountpoint (Standard: /mnt/cifs)")] = None,
+    username: Annotated[Optional[str], typer.Option("--username", help="Benutzername")] = None,
+    password: Annotated[Optional[str], typer.Option("--password", envvar="DVM_CIFS_PASSWORD", help="Passwort (besser über DVM_CIFS_PASSWORD)")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Standardwerte ohne Rückfrage verwenden")] = False,
+):
     """
     Bindet ein CIFS/SMB Netzlaufwerk ein.
     """
     console.print("[bold blue]CIFS/SMB Laufwerk einbinden[/bold blue]")
     
-    server_path = questionary.text(
-        "Netzwerkpfad (z.B. //192.168.1.100/share):"
-    ).ask()
+    server_path = prompts.text(server_path, "Netzwerkpfad (z.B. //192.168.1.100/share):", "--source", yes=yes)
     if not server_path:
         raise typer.Exit()
         
-    mount_point = questionary.text(
-        "Lokaler Mountpoint (z.B. /mnt/cifs):",
-        default="/mnt/cifs"
-    ).ask()
+    mount_point = prompts.text(mount_point, "Lokaler Mountpoint (z.B. /mnt/cifs):", "--mount-point", default="/mnt/cifs", yes=yes)
     if not mount_point:
         raise typer.Exit()
         
-    username = questionary.text("Benutzername:").ask()
+    username = prompts.text(username, "Benutzername:", "--username", yes=yes)
     if not username:
         raise typer.Exit()
         
-    password = questionary.password("Passwort:").ask()
-    if password is None:
-        raise typer.Exit()
+    password = prompts.password(password, "Passwort:", "--password", yes=yes)
         
     # Install cifs-utils
-    run_command("sudo apt-get update && sudo apt-get install -y cifs-utils", desc="Installiere cifs-utils", check=False)
+    apt_install(["cifs-utils"], desc="Installiere cifs-utils")
     
     # Store credentials in a secure file
     creds_dir = "/etc/dvm-credentials"
@@ -966,30 +929,20 @@ def mount_cifs():
     safe_name = re.sub(r'[^a-zA-Z0-9]', '_', server_path)
     creds_file = f"{creds_dir}/.smb_{safe_name}"
     
-    with tempfile.NamedTemporaryFile(mode="w", delete=False) as tf:
-        tf.write(f"username={username}\npassword={password}\n")
-        tmp_creds = tf.name
-        
-    run_command(f"sudo mv {tmp_creds} {creds_file}", desc="Speichere Anmeldedaten")
-    run_command(f"sudo chown root:root {creds_file} && sudo chmod 600 {creds_file}", desc="Sichere Anmeldedaten-Datei")
+    write_root_file(creds_file, f"username={username}\npassword={password}\n", desc="Speichere Anmeldedaten", mode="600")
     
     run_command(f"sudo mkdir -p {mount_point}", desc=f"Erstelle Mountpoint {mount_point}")
     
     # fstab entry
     fstab_entry = f"{server_path} {mount_point} cifs credentials={creds_file},uid=1000,gid=1000,x-systemd.automount,_netdev,nofail 0 0\n"
     
-    with open('/etc/fstab', 'r') as f:
+    with open(FSTAB, 'r') as f:
         fstab_content = f.read()
         
     if server_path not in fstab_content and mount_point not in fstab_content:
         console.print("[blue]Füge Eintrag zur /etc/fstab hinzu...[/blue]")
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".fstab", delete=False) as tf:
-            tf.write(fstab_content + fstab_entry)
-            tmp_fstab = tf.name
-            
-        run_command(f"sudo cp /etc/fstab /etc/fstab.backup", desc="Erstelle Backup von /etc/fstab")
-        run_command(f"sudo mv {tmp_fstab} /etc/fstab", desc="Aktualisiere /etc/fstab")
-        run_command("sudo chown root:root /etc/fstab && sudo chmod 644 /etc/fstab", desc="Setze Berechtigungen für /etc/fstab")
+        run_command("sudo cp /etc/fstab /etc/fstab.backup", desc="Erstelle Backup von /etc/fstab")
+        write_root_file("/etc/fstab", fstab_content + fstab_entry, desc="Aktualisiere /etc/fstab", mode="644")
     else:
         console.print("[yellow]Netzwerkpfad oder Mountpoint bereits in /etc/fstab vorhanden.[/yellow]")
         
@@ -1003,45 +956,39 @@ def mount_cifs():
 
 
 @app.command("mount-nfs")
-def mount_nfs():
+def mount_nfs(
+    server_path: Annotated[Optional[str], typer.Option("--source", help="Netzwerkpfad, z.B. 192.168.1.100:/volume1/share")] = None,
+    mount_point: Annotated[Optional[str], typer.Option("--mount-point", help="Lokaler Mountpoint (Standard: /mnt/nfs)")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Standardwerte ohne Rückfrage verwenden")] = False,
+):
     """
     Bindet ein NFS Netzlaufwerk ein.
     """
     console.print("[bold blue]NFS Laufwerk einbinden[/bold blue]")
     
-    server_path = questionary.text(
-        "Netzwerkpfad (z.B. 192.168.1.100:/volume1/share):"
-    ).ask()
+    server_path = prompts.text(server_path, "Netzwerkpfad (z.B. 192.168.1.100:/volume1/share):", "--source", yes=yes)
     if not server_path:
         raise typer.Exit()
         
-    mount_point = questionary.text(
-        "Lokaler Mountpoint (z.B. /mnt/nfs):",
-        default="/mnt/nfs"
-    ).ask()
+    mount_point = prompts.text(mount_point, "Lokaler Mountpoint (z.B. /mnt/nfs):", "--mount-point", default="/mnt/nfs", yes=yes)
     if not mount_point:
         raise typer.Exit()
         
     # Install nfs-common
-    run_command("sudo apt-get update && sudo apt-get install -y nfs-common", desc="Installiere nfs-common", check=False)
+    apt_install(["nfs-common"], desc="Installiere nfs-common")
     
     run_command(f"sudo mkdir -p {mount_point}", desc=f"Erstelle Mountpoint {mount_point}")
     
     # fstab entry
     fstab_entry = f"{server_path} {mount_point} nfs x-systemd.automount,_netdev,nofail 0 0\n"
     
-    with open('/etc/fstab', 'r') as f:
+    with open(FSTAB, 'r') as f:
         fstab_content = f.read()
         
     if server_path not in fstab_content and mount_point not in fstab_content:
         console.print("[blue]Füge Eintrag zur /etc/fstab hinzu...[/blue]")
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".fstab", delete=False) as tf:
-            tf.write(fstab_content + fstab_entry)
-            tmp_fstab = tf.name
-            
-        run_command(f"sudo cp /etc/fstab /etc/fstab.backup", desc="Erstelle Backup von /etc/fstab")
-        run_command(f"sudo mv {tmp_fstab} /etc/fstab", desc="Aktualisiere /etc/fstab")
-        run_command("sudo chown root:root /etc/fstab && sudo chmod 644 /etc/fstab", desc="Setze Berechtigungen für /etc/fstab")
+        run_command("sudo cp /etc/fstab /etc/fstab.backup", desc="Erstelle Backup von /etc/fstab")
+        write_root_file("/etc/fstab", fstab_content + fstab_entry, desc="Aktualisiere /etc/fstab", mode="644")
     else:
         console.print("[yellow]Netzwerkpfad oder Mountpoint bereits in /etc/fstab vorhanden.[/yellow]")
         
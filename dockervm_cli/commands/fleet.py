@@ -0,0 +1,73 @@
+import typer
+import threading
+from typing import Annotated, List, Optional
+from dockervm_cli.utils import console, print_error
+
+app = typer.Typer(help="dvm Befehle auf mehreren Docker VMs gleichzeitig ausführen (SSH).")
+
+_COLORS = ["cyan", "magenta", "green", "yellow", "blue", "bright_cyan", "bright_magenta", "bright_green"]
+
+
+@app.command("run")
+def fleet_run(
+    args: Annotated[List[str], typer.Argument(help="dvm Befehl nach '--', z.B. -- update system")],
+    inventory: Annotated[str, typer.Option("--hosts", "-H", help="Inventar-Datei (YAML)")] = "inventory.yaml",
+    limit: Annotated[Optional[List[str]], typer.Option("--limit", "-l", help="Nur diese Hosts oder Gruppen (Muster, mehrfach möglich)")] = None,
+    concurrency: Annotated[int, typer.Option("--concurrency", "-j", help="Maximale Anzahl gleichzeitiger Hosts")] = 10,
+    timeout: Annotated[int, typer.Option("--timeout", help="Abbruch pro Host nach Sekunden (0 = kein Limit)")] = 0,
+    quiet: Annotated[bool, typer.Option("--quiet", "-q", help="Keine Live-Ausgabe, nur die Zusammenfassung")] = False,
+    ssh: Annotated[Optional[str], typer.Option("--ssh", help="Alternatives ssh Binary (auch über DVM_SSH)")] = None,
+):
+    """
+    Führt einen dvm Befehl parallel auf allen Hosts des Inventars aus, z.B.:
+    dvm fleet run --hosts inventory.yaml -- update stacks
+    """
+    import time
+    from rich.table import Table
+    from rich.markup import escape
+    from dockervm_cli import fleet
+
+    try:
+        hosts = fleet.select_hosts(fleet.load_inventory(inventory), limit)
+    except fleet.InventoryError as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
+    if not hosts:
+        print_error(f"Kein Host in {inventory} passt zu {', '.join(limit)}.")
+        raise typer.Exit(code=1)
+
+    console.print(f"[bold blue]dvm {' '.join(args)}[/bold blue] [dim]auf {len(hosts)} Host(s), max. {concurrency} gleichzeitig[/dim]")
+
+    width = max(len(h["name"]) for h in hosts)
+    colors = {h["name"]: _COLORS[i % len(_COLORS)] for i, h in enumerate(hosts)}
+    lock = threading.Lock()
+
+    def on_line(host, line):
+        # Zeilen verschiedener Hosts nicht ineinander schreiben
+        with lock:
+            console.print(f"[{colors[host['name']]}]{host['name'].ljust(width)}[/] | {escape(line)}", highlight=False, soft_wrap=True)
+
+    start = time.perf_counter()
+    results = fleet.run(hosts, args, concurrency=concurrency, on_line=None if quiet else on_line, ssh=ssh, timeout=timeout)
+
+    table = Table(title="Ergebnis", show_header=True, header_style="bold magenta")
+    table.add_column("Host", style="cyan")
+    table.add_column("Exit", justify="right")
+    table.add_column("Dauer", justify="right")
+    table.add_column("Letzte Ausgabe")
+    for r in results:
+        if r["timed_out"]:
+            status = "[red]Timeout[/red]"
+        elif r["exit_code"] == 0:
+            status = "[green]0[/green]"
+        elif r["exit_code"] == fleet.SSH_ERROR:
+            status = "[red]SSH[/red]"
+        else:
+            status = f"[red]{r['exit_code']}[/red]"
+        table.add_row(r["name"], status, f"{r['duration']:.1f}s", escape(r["last_line"][:80]))
+    console.print(table)
+
+    failed = [r for r in results if r["exit_code"] != 0]
+    console.print(f"[dim]{len(results) - len(failed)}/{len(results)} erfolgreich, Gesamtdauer: {time.perf_counter() - start:.1f}s[/dim]")
+    if failed:
+        raise typer.Exit(code=1)
@@ -2,79 +2,428 @@ import typer
 import subprocess
 import os
 import sys
+import shlex
+import time
 import questionary
-from typing import Optional
+from typing import Annotated, Optional
+from dockervm_cli import download, plan, prompts
+from dockervm_cli.apt import apt_install
 from dockervm_cli.utils import print_status, print_error, print_success, run_command
 
 app = typer.Typer(help="Verwaltung der NVIDIA GPU Einstellungen.")
 
+# Hinweise je nach gebundenem Kernel-Treiber
+DRIVER_HINTS = {
+    "nvidia": "[green]NVIDIA Treiber aktiv[/green]",
+    "vfio-pci": "[yellow]an vfio-pci gebunden (für Passthrough reserviert, in dieser VM nicht nutzbar)[/yellow]",
+    "nouveau": "[yellow]nouveau aktiv (wird bei der Treiber-Installation deaktiviert)[/yellow]",
+    None: "[dim]kein Treiber geladen ('dvm gpu install-driver')[/dim]",
+}
+
+def _preflight(require_driver: bool = False) -> list:
+    """
+    Schneller Vorab-Check über sysfs (kein lspci/Subprozess).
+    Bricht ab, wenn keine NVIDIA GPU sichtbar ist oder (mit require_driver) der nvidia Treiber nicht gebunden ist.
+    """
+    from dockervm_cli import pci
+
+    gpus = pci.nvidia_devices(gpus_only=True)
+    if not gpus:
+        print_error("Keine NVIDIA GPU am PCI-Bus gefunden. Bitte Proxmox VM Konfiguration (PCI Passthrough) prüfen.")
+        raise typer.Exit(code=1)
+
+    drivers = {g["driver"] for g in gpus}
+    if require_driver and "nvidia" not in drivers:
+        print_error(f"Der NVIDIA Treiber ist für keine GPU aktiv (gebunden: {', '.join(sorted(str(d) for d in drivers))}).")
+        print_status("Bitte zuerst 'dvm gpu install-driver' ausführen und das System neu starten.")
+        raise typer.Exit(code=1)
+    if "vfio-pci" in drivers:
+        print_status("Hinweis: Mindestens eine GPU ist an vfio-pci gebunden und kann hier nicht genutzt werden.")
+    return gpus
+
 @app.command("check")
 def check():
     """Prüft, ob die VM die NVIDIA GPU sieht."""
+    from rich.table import Table
+    from dockervm_cli import pci
+    from dockervm_cli.utils import console
+
     print_status("Prüfe auf NVIDIA GPU...", nl=False)
+    devices = pci.nvidia_devices()
+    if not any(d["class"] in pci.GPU_CLASSES for d in devices):
+        print_error(" Keine NVIDIA GPU erkannt.")
+        print("Bitte Proxmox VM Konfiguration prüfen.")
+        raise typer.Exit(code=1)
+    print_success(" NVIDIA GPU erkannt!")
+
+    names = pci.device_names(devices)
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Adresse", style="cyan")
+    table.add_column("Typ")
+    table.add_column("Gerät")
+    table.add_column("Treiber")
+    table.add_column("IOMMU", justify="right")
+    for d in devices:
+        name = names.get((d["vendor"], d["device"]), "")
+        table.add_row(
+            d["address"], d["class_name"],
+            f"{d['device']} {name}".strip(),
+            DRIVER_HINTS.get(d["driver"], d["driver"]) if d["class"] in pci.GPU_CLASSES else (d["driver"] or "-"),
+            d["iommu_group"] or "-",
+        )
+    console.print(table)
+
+@app.command("monitor")
+def monitor(
+    interval: Annotated[int, typer.Option("--interval", "-i", help="Abtastintervall in Millisekunden")] = 1000,
+    output: Annotated[str, typer.Option("--format", "-f", help="Ausgabe: live, json (JSON-Lines) oder prometheus")] = "live",
+    count: Annotated[int, typer.Option("--count", "-n", help="Nach N Intervallen beenden (0 = endlos)")] = 0,
+    buffer_size: Annotated[int, typer.Option("--buffer", help="Größe des Ringpuffers (Samples)")] = 600,
+    nvidia_smi: Annotated[Optional[str], typer.Option("--nvidia-smi", help="Pfad zu nvidia-smi (z.B. Fake-Emitter für Tests)")] = None,
+):
+    """Zeigt GPU Auslastung, Speicher, Temperatur und Leistung kontinuierlich an."""
+    import json
+    from dockervm_cli.gpu_telemetry import GpuSampler, prometheus_lines
+
+    if output not in ("live", "json", "prometheus"):
+        print_error(f"Unbekanntes Format: {output} (erlaubt: live, json, prometheus)")
+        raise typer.Exit(code=1)
+
+    sampler = GpuSampler(interval_ms=interval, buffer_size=buffer_size, binary=nvidia_smi)
+    if output == "json":
+        sampler.on_sample(lambda sample: print(json.dumps(sample), flush=True))
+    sampler.start()
+
+    def render():
+        from rich.table import Table
+        table = Table(title=f"GPU Monitor ({sampler.backend}, {interval} ms)", show_header=True, header_style="bold magenta")
+        table.add_column("GPU", style="cyan")
+        table.add_column("Name")
+        table.add_column("Auslastung", justify="right")
+        table.add_column("Ø / Max", justify="right", style="dim")
+        table.add_column("Speicher", justify="right")
+        table.add_column("Temp", justify="right")
+        table.add_column("Leistung", justify="right")
+        for s in sampler.snapshot():
+            history = [h["utilization.gpu"] for h in sampler.history(s["index"]) if h.get("utilization.gpu") is not None]
+            avg_max = f"{sum(history) / len(history):.0f}% / {max(history)}%" if history else "-"
+            table.add_row(
+                str(s["index"]), s["name"],
+                f"{s['utilization.gpu']}%" if s.get("utilization.gpu") is not None else "-",
+                avg_max,
+                f"{s['memory.used']} / {s['memory.total']} MiB",
+                f"{s['temperature.gpu']} °C" if s.get("temperature.gpu") is not None else "-",
+                f"{s['power.draw']} W" if s.get("power.draw") is not None else "-",
+            )
+        return table
+
+    ticks = 0
+    live = None
     try:
-        # lspci | grep -i nvidia
-        result = subprocess.run("lspci | grep -i nvidia", shell=True, capture_output=True, text=True)
-        if result.returncode == 0 and result.stdout.strip():
-            print_success(" NVIDIA GPU erkannt!")
-            print(result.stdout)
-        else:
-            print_error(" Keine NVIDIA GPU erkannt.")
-            print("Bitte Proxmox VM Konfiguration prüfen.")
+        if output == "live":
+            from rich.live import Live
+            from dockervm_cli.utils import console
+            live = Live(render(), console=console, refresh_per_second=4)
+            live.start()
+        while count == 0 or ticks < count:
+            time.sleep(interval / 1000.0)
+            if sampler.error or not sampler.running:
+                break
+            ticks += 1
+            if output == "live":
+                live.update(render())
+            elif output == "prometheus":
+                print("\n".join(prometheus_lines(sampler.snapshot())) + "\n", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if live:
+            live.stop()
+        sampler.stop()
+
+    if sampler.error:
+        print_error(f"GPU Telemetrie fehlgeschlagen: {sampler.error}")
+        raise typer.Exit(code=1)
+
+@app.command("containers")
+def containers(
+    watch: Annotated[bool, typer.Option("--watch", "-w", help="Fortlaufend aktualisieren (Strg+C zum Beenden)")] = False,
+    interval: Annotated[int, typer.Option("--interval", "-i", help="Aktualisierungsintervall in Millisekunden")] = 2000,
+    nvidia_smi: Annotated[Optional[str], typer.Option("--nvidia-smi", help="Pfad zu nvidia-smi")] = None,
+):
+    """Zeigt GPU Speicher und Auslastung pro Container und Compose-Projekt."""
+    from rich.table import Table
+    from rich.console import Group
+    from dockervm_cli import docker_api
+    from dockervm_cli.gpu_telemetry import GpuSampler, attribute_processes
+    from dockervm_cli.utils import console
+
+    sampler = GpuSampler(interval_ms=interval, binary=nvidia_smi, track_processes=True).start()
+
+    def render():
+        gpu_index = {s["uuid"]: str(s["index"]) for s in sampler.snapshot()}
+        try:
+            running = docker_api.list_containers()
+        except docker_api.DockerAPIError as e:
+            print_error(str(e))
+            running = []
+        rows = attribute_processes(sampler.processes(), running)
+
+        table = Table(title="GPU Nutzung pro Container", show_header=True, header_style="bold magenta")
+        table.add_column("Container", style="cyan")
+        table.add_column("Projekt")
+        table.add_column("Service")
+        table.add_column("GPU", justify="right")
+        table.add_column("Speicher", justify="right")
+        table.add_column("SM", justify="right")
+        table.add_column("PIDs", style="dim")
+        projects = {}
+        for row in rows:
+            table.add_row(
+                row["name"], row["project"] or "-", row["service"] or "-",
+                ",".join(gpu_index.get(u, u[:12]) for u in row["gpus"]),
+                f"{row['memory']} MiB",
+                f"{row['sm']}%" if row["sm"] is not None else "-",
+                " ".join(str(p) for p in row["pids"]),
+            )
+            if row["project"]:
+                total = projects.setdefault(row["project"], {"containers": 0, "memory": 0, "sm": 0})
+                total["containers"] += 1
+                total["memory"] += row["memory"]
+                total["sm"] += row["sm"] or 0
+
+        if not rows:
+            return "[dim]Keine GPU-Prozesse gefunden.[/dim]"
+        if not projects:
+            return table
+
+        summary = Table(title="Pro Compose-Projekt", show_header=True, header_style="bold magenta")
+        summary.add_column("Projekt", style="cyan")
+        summary.add_column("Container", justify="right")
+        summary.add_column("Speicher", justify="right")
+        summary.add_column("SM", justify="right")
+        for name, total in sorted(projects.items(), key=lambda p: p[1]["memory"], reverse=True):
+            summary.add_row(name, str(total["containers"]), f"{total['memory']} MiB", f"{total['sm']}%")
+        return Group(table, summary)
+
+    try:
+        sampler.wait_processes()
+        if sampler.error:
+            print_error(f"GPU Telemetrie fehlgeschlagen: {sampler.error}")
             raise typer.Exit(code=1)
+
+        if not watch:
+            console.print(render())
+            return
+
+        from rich.live import Live
+        with Live(render(), console=console, refresh_per_second=2) as live:
+            while sampler.running:
+                time.sleep(interval / 1000.0)
+                live.update(render())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+
+@app.command("assign")
+def assign(
+    project: Annotated[Optional[str], typer.Argument(help="Compose-Projekt (Name oder Verzeichnis)")] = None,
+    service: Annotated[Optional[str], typer.Argument(help="Service im Compose-Projekt")] = None,
+    gpu: Annotated[Optional[str], typer.Option("--gpu", help="GPU Index oder UUID statt automatischer Wahl")] = None,
+    release: Annotated[bool, typer.Option("--release", help="Zuweisung aufheben (wieder alle GPUs)")] = False,
+    show: Annotated[bool, typer.Option("--list", "-l", help="Zuweisungen und aktuelle GPU Last anzeigen")] = False,
+    up: Annotated[bool, typer.Option("--up", help="Service danach mit 'compose up -d' neu erstellen")] = False,
+    nvidia_smi: Annotated[Optional[str], typer.Option("--nvidia-smi", help="Pfad zu nvidia-smi")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Compose-Datei notfalls ohne Rückfrage komplett neu schreiben")] = False,
+):
+    """Weist einem Compose-Service eine feste GPU zu (standardmäßig die am wenigsten ausgelastete)."""
+    from rich.table import Table
+    from dockervm_cli import stacks, gpu_assign
+    from dockervm_cli.utils import console, get_docker_compose_cmd, DVM_BASE_PATH
+
+    try:
+        assignments = gpu_assign.load_assignments()
+    except gpu_assign.AssignmentError as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
+
+    if show:
+        try:
+            gpus = gpu_assign.gpu_load(binary=nvidia_smi)
+        except Exception as e:
+            print_error(f"GPU Last konnte nicht ermittelt werden: {e}")
+            gpus = []
+        by_uuid = {g["uuid"]: g for g in gpus}
+
+        table = Table(title="GPU Zuweisungen", show_header=True, header_style="bold magenta")
+        table.add_column("GPU", style="cyan")
+        table.add_column("Auslastung", justify="right")
+        table.add_column("Speicher", justify="right")
+        table.add_column("Services")
+        for uuid in list(by_uuid) + sorted({a["gpu"] for a in assignments.values()} - set(by_uuid)):
+            g = by_uuid.get(uuid)
+            services = [f"{a['project']}/{a['service']}" for a in assignments.values() if a["gpu"] == uuid]
+            table.add_row(
+                f"{g['index']}: {g['name']}" if g else f"[red]{uuid} (nicht gefunden)[/red]",
+                f"{g['util']:.0f}%" if g else "-",
+                f"{g['memory_used']} / {g['memory_total']} MiB" if g else "-",
+                ", ".join(services) or "[dim]-[/dim]",
+            )
+        console.print(table)
+        return
+
+    # 1. Projekt und Service bestimmen
+    projects = stacks.find_compose_projects(DVM_BASE_PATH)
+    if project:
+        match = [p for p in projects if p["name"] == project or p["dir"] == os.path.abspath(project)]
+        if not match and os.path.isdir(project):
+            match = stacks.find_compose_projects(project, max_depth=0)
+        if not match:
+            print_error(f"Compose-Projekt '{project}' nicht gefunden.")
+            raise typer.Exit(code=1)
+        selected = match[0]
+    else:
+        if not projects:
+            print_error(f"Keine Compose-Projekte unter {DVM_BASE_PATH} gefunden.")
+            raise typer.Exit(code=1)
+        choice = prompts.select(None, "Compose-Projekt wählen:", [p["dir"] for p in projects], "PROJECT")
+        selected = next(p for p in projects if p["dir"] == choice)
+
+    try:
+        compose = gpu_assign.load_compose(selected["file"])
     except Exception as e:
-        print_error(f" Fehler beim Prüfen der GPU: {e}")
+        print_error(f"{selected['file']} konnte nicht gelesen werden: {e}")
+        raise typer.Exit(code=1)
+    services = list((compose.get("services") or {}).keys())
+    if service is None:
+        if not services:
+            raise typer.Exit()
+        service = prompts.select(None, "Service wählen:", services, "SERVICE")
+    if service not in services:
+        print_error(f"Service '{service}' nicht in {selected['file']} gefunden.")
+        raise typer.Exit(code=1)
+
+    key = gpu_assign.assignment_key(selected["dir"], service)
+
+    # 2. GPU wählen (bzw. freigeben)
+    if release:
+        target = None
+        assignments.pop(key, None)
+    else:
+        try:
+            gpus = gpu_assign.gpu_load(binary=nvidia_smi)
+        except Exception as e:
+            print_error(f"GPU Last konnte nicht ermittelt werden: {e}")
+            raise typer.Exit(code=1)
+        if not gpus:
+            print_error("Keine GPU gefunden.")
+            raise typer.Exit(code=1)
+        if gpu:
+            target = next((g for g in gpus if gpu in (str(g["index"]), g["uuid"])), None)
+            if not target:
+                print_error(f"GPU '{gpu}' nicht gefunden.")
+                raise typer.Exit(code=1)
+        else:
+            target = gpu_assign.pick_gpu(gpus, assignments, exclude_key=key)
+        console.print(f"[blue]GPU {target['index']} ({target['name']}): {target['util']:.0f}% Auslastung, "
+                      f"{target['memory_used']} / {target['memory_total']} MiB belegt[/blue]")
+        assignments[key] = {"gpu": target["uuid"], "project": selected["name"], "service": service,
+                            "file": selected["file"], "assigned_at": int(time.time())}
+
+    # 3. Compose-Datei und Zuweisungen schreiben
+    notes = gpu_assign.set_gpu_reservation(compose, service, target["uuid"] if target else None)
+    content, targeted = gpu_assign.render_compose(selected["file"], compose, service)
+    if not targeted:
+        console.print(f"[yellow]Der Service '{service}' lässt sich nicht gezielt bearbeiten (Flow-Style oder Anker). "
+                      f"{selected['file']} müsste komplett neu geschrieben werden: Kommentare gehen verloren, "
+                      f"Anker und Merge-Keys werden aufgelöst (Sicherung: .bak).[/yellow]")
+        if not prompts.confirm("Compose-Datei trotzdem neu schreiben?", yes=yes, default=False):
+            raise typer.Exit(code=1)
+    if not gpu_assign.save_compose(selected["file"], content) or not gpu_assign.save_assignments(assignments):
         raise typer.Exit(code=1)
+    for note in notes:
+        console.print(f"[yellow]Hinweis: {note}[/yellow]")
+
+    if target:
+        print_success(f"{selected['name']}/{service} nutzt jetzt GPU {target['index']} ({target['uuid']}).")
+    else:
+        print_success(f"Zuweisung für {selected['name']}/{service} aufgehoben (alle GPUs).")
+
+    if up:
+        run_command(f"cd {selected['dir']} && sudo {get_docker_compose_cmd()} up -d {service}", desc=f"Erstelle {service} neu")
+    else:
+        console.print(f"[dim]Wirksam nach: cd {selected['dir']} && docker compose up -d {service}[/dim]")
 
 @app.command("install-driver")
-def install_driver(url: Optional[str] = typer.Option(None, help="Benutzerdefinierte URL für den Treiber-Download")):
+def install_driver(
+    url: Annotated[Optional[str], typer.Option(help="Benutzerdefinierte URL für den Treiber-Download")] = None,
+    sha256: Annotated[Optional[str], typer.Option("--sha256", help="Erwartete SHA-256 Prüfsumme des .run Installers")] = None,
+    reboot: Annotated[Optional[bool], typer.Option("--reboot/--no-reboot", help="Nach der Installation neu starten")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Standard-URL ohne Rückfrage verwenden")] = False,
+):
     """Installiert NVIDIA Treiber und Abhängigkeiten."""
+    # Der Installer liegt erst nach dem Download im Cache vor
+    plan.unsupported("dvm gpu install-driver")
     
     default_url = "https://uk.download.nvidia.com/XFree86/Linux-x86_64/580.119.02/NVIDIA-Linux-x86_64-580.119.02.run"
 
-    if url is None:
-        # Interaktive Abfrage mit Default-Wert
-        url = questionary.text(
-            "Bitte NVIDIA Treiber Download-Link eingeben:",
-            default=default_url
-        ).ask()
+    # Interaktive Abfrage mit Default-Wert
+    url = prompts.text(url, "Bitte NVIDIA Treiber Download-Link eingeben:", "--url", default=default_url, yes=yes)
         
     if not url:
         print_error("Keine URL angegeben.")
         raise typer.Exit(code=1)
 
+    gpus = _preflight()
+    if all(g["driver"] == "nvidia" for g in gpus):
+        print_status("Der NVIDIA Treiber ist bereits aktiv, die Installation ersetzt ihn.")
+
     print_status("Installiere Abhängigkeiten...")
-    if not run_command("apt install -y make gcc build-essential dkms"):
+    if not apt_install(["make", "gcc", "build-essential", "dkms"]):
          print_error("Fehler beim Installieren der Abhängigkeiten.")
          raise typer.Exit(code=1)
+
+    # nvtop ist optional und fehlt in manchen Paketquellen, das bricht die Installation nicht ab
+    print_status("Installiere nvtop...")
+    if not apt_install(["nvtop"]):
+        print_status("nvtop konnte nicht installiert werden, die Treiber-Installation wird fortgesetzt.")
     
     filename = url.split("/")[-1]
     if not filename:
         filename = "nvidia-driver.run"
 
+    # Download landet im inhaltsadressierten Cache (/var/cache/dvm/downloads) und
+    # wird bei einer Neuinstallation (z.B. nach Kernel-Wechsel) direkt wiederverwendet.
     print_status(f"Lade NVIDIA Treiber herunter ({filename})...")
-    if not run_command(f"wget -O {filename} {url}"):
+    installer = download.fetch(url, sha256=sha256, filename=filename)
+    if not installer:
         print_error("Fehler beim Herunterladen des Treibers.")
         raise typer.Exit(code=1)
     
-    run_command(f"chmod +x {filename}")
+    # Der Cache gehört dem Benutzer: root führt nur eine eigene, direkt davor geprüfte Kopie aus
+    staged = download.stage_for_root(installer)
+    if not staged:
+        raise typer.Exit(code=1)
 
     print_status("Installiere NVIDIA Treiber (dies kann eine Weile dauern)...")
     try:
         # --dkms sorgt für automatische Updates bei Kernel-Updates
-        subprocess.run([f"./{filename}", "--dkms"], check=True)
-    except subprocess.CalledProcessError:
+        installed = run_command(f"sudo {shlex.quote(staged)} --dkms")
+    finally:
+        download.discard_staged(staged)
+    if not installed:
         print_error("Treiber-Installation fehlgeschlagen.")
         raise typer.Exit(code=1)
 
-    print_status("Installiere nvtop...")
-    run_command("apt install -y nvtop")
-    
     print_success("Treiber-Installation abgeschlossen!")
     print("")
     print_error("WICHTIG: Ein Systemneustart ist ZWINGEND erforderlich, bevor die GPU genutzt werden kann.")
     
-    if questionary.confirm("Möchtest du das System jetzt neu starten?", default=False).ask():
+    # --yes startet nicht ungefragt neu, dafür gibt es --reboot
+    if reboot is None and yes:
+        reboot = False
+    if prompts.confirm("Möchtest du das System jetzt neu starten?", default=False, value=reboot, option="--reboot/--no-reboot"):
         print_status("System wird neu gestartet...")
         run_command("reboot")
     else:
@@ -82,23 +431,20 @@ def install_driver(url: Optional[str] = typer.Option(None, help="Benutzerdefinie
 @app.command("setup-docker")
 def setup_docker():
     """Konfiguriert Docker für die Nutzung der NVIDIA GPU."""
+    _preflight(require_driver=True)
     print_status("Richte NVIDIA Container Toolkit ein...")
 
     # Repository hinzufügen
     print_status("Füge NVIDIA Container Toolkit Repository hinzu...")
-    cmd1 = "curl -fsSL https://nvidia.github.io/libnvidia-container/gpgkey | sudo gpg --dearmor -o /usr/share/keyrings/nvidia-container-toolkit.gpg"
+    cmd1 = "curl -fsSL https://nvidia.github.io/libnvidia-container/gpgkey | sudo gpg --dearmor --yes -o /usr/share/keyrings/nvidia-container-toolkit.gpg"
     cmd2 = "curl -fsSL https://nvidia.github.io/libnvidia-container/stable/deb/nvidia-container-toolkit.list | sed 's#deb https://#deb [signed-by=/usr/share/keyrings/nvidia-container-toolkit.gpg] https://#g' | sudo tee /etc/apt/sources.list.d/nvidia-container-toolkit.list"
     
-    try:
-        subprocess.run(cmd1, shell=True, check=True)
-        subprocess.run(cmd2, shell=True, check=True)
-    except subprocess.CalledProcessError:
+    if not run_command(cmd1) or not run_command(cmd2):
         print_error("Fehler beim Hinzufügen des NVIDIA Repositories.")
         raise typer.Exit(code=1)
 
     print_status("Aktualisiere apt und installiere nvidia-container-toolkit...")
-    run_command("apt update")
-    if not run_command("apt install -y nvidia-container-toolkit"):
+    if not apt_install(["nvidia-container-toolkit"]):
         print_error("Fehler beim Installieren von nvidia-container-toolkit.")
         raise typer.Exit(code=1)
 
@@ -110,6 +456,10 @@ def setup_docker():
     print_status("Starte Docker neu...")
     run_command("systemctl restart docker")
 
+    if plan.recording():
+        print_status("GPU Test mit Docker Container entfällt beim Aufzeichnen.")
+        return
+
     print_status("Teste GPU Durchreichung mit Docker Container...")
     try:
         subprocess.run(["docker", "run", "--rm", "--gpus", "all", "nvidia/cuda:12.3.0-base-ubuntu22.04", "nvidia-smi"], check=True)
@@ -117,37 +467,123 @@ def setup_docker():
     except subprocess.CalledProcessError:
         print_error("Docker GPU Test fehlgeschlagen.")
 
+PERSISTENCED_UNIT = "/etc/systemd/system/nvidia-persistenced.service"
+PERSISTENCED_DROPIN = "/etc/systemd/system/nvidia-persistenced.service.d/dvm.conf"
+GPU_INIT_UNIT = "/etc/systemd/system/dvm-nvidia-init.service"
+
+def _systemd_unit_exists(unit: str) -> bool:
+    result = subprocess.run(["systemctl", "cat", unit], capture_output=True, text=True)
+    return result.returncode == 0
+
+def _persistenced_unit() -> str:
+    """Unit für nvidia-persistenced (der .run Installer liefert nur das Binary, keine Unit)."""
+    return """[Unit]
+Description=NVIDIA Persistence Daemon (dvm)
+After=systemd-modules-load.service
+Before=docker.service containerd.service
+
+[Service]
+Type=forking
+ExecStart=/usr/bin/nvidia-persistenced --user root
+ExecStopPost=/bin/rm -rf /var/run/nvidia-persistenced
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+def _gpu_init_unit(legacy_pm: bool, app_clocks: str = None, power_limit: int = None) -> str:
+    """Oneshot Unit, die die GPU vor dem Start von Docker initialisiert."""
+    commands = []
+    if legacy_pm:
+        commands.append("/usr/bin/nvidia-smi -pm 1")
+    if app_clocks:
+        commands.append(f"/usr/bin/nvidia-smi -ac {app_clocks}")
+    if power_limit:
+        commands.append(f"/usr/bin/nvidia-smi -pl {power_limit}")
+    exec_lines = "\n".join(f"ExecStart={c}" for c in commands)
+    return f"""[Unit]
+Description=dvm: NVIDIA GPU initialisieren (Persistence, Clocks, Power Limit)
+After=systemd-modules-load.service nvidia-persistenced.service
+Before=docker.service containerd.service
+
+[Service]
+Type=oneshot
+RemainAfterExit=yes
+{exec_lines}
+
+[Install]
+WantedBy=multi-user.target
+"""
+
 @app.command("setup-persistence")
-def setup_persistence():
-    """Aktiviert den NVIDIA Persistence Modus via Cron."""
-    print_status("Richte Persistence Modus Cronjob ein...")
-    
-    cron_cmd = "@reboot sleep 30 && /usr/bin/nvidia-smi -pm 1 >> /var/log/nvidia-persistence.log 2>&1"
-    
-    # Prüfen ob bereits vorhanden
-    try:
-        current_crontab = subprocess.check_output("crontab -l", shell=True, text=True).strip()
-    except subprocess.CalledProcessError:
-        current_crontab = ""
-    
-    if cron_cmd in current_crontab:
-        print_status("Persistence Cronjob existiert bereits.")
+def setup_persistence(
+    app_clocks: Annotated[Optional[str], typer.Option("--app-clocks", help="Application Clocks 'SPEICHER,GRAFIK' in MHz (nvidia-smi -ac)")] = None,
+    power_limit: Annotated[Optional[int], typer.Option("--power-limit", help="Power Limit in Watt (nvidia-smi -pl)")] = None,
+    disable: Annotated[bool, typer.Option("--disable", help="Persistence Units entfernen")] = False,
+):
+    """Aktiviert den NVIDIA Persistence Modus als systemd Dienst vor dem Docker Start."""
+    import re
+    from dockervm_cli import scheduler
+    from dockervm_cli.utils import write_root_file
+
+    # Alten '@reboot sleep 30 && nvidia-smi -pm 1' Cronjob früherer Versionen entfernen
+    scheduler.apply({"gpu-persistence": None})
+
+    if disable:
+        for unit in (GPU_INIT_UNIT, PERSISTENCED_UNIT):
+            name = os.path.basename(unit)
+            if os.path.exists(unit):
+                run_command(f"sudo systemctl disable --now {name}", desc=f"Deaktiviere {name}", check=False)
+                run_command(f"sudo rm -f {unit}", check=False)
+        run_command(f"sudo rm -f {PERSISTENCED_DROPIN}", check=False)
+        run_command("sudo systemctl daemon-reload", desc="Lade systemd daemon neu", check=False)
+        print_success("Persistence Units entfernt.")
+        return
+
+    if app_clocks and not re.fullmatch(r"\d+,\d+", app_clocks):
+        print_error("--app-clocks erwartet 'SPEICHER,GRAFIK' in MHz, z.B. 9501,1695 (siehe 'nvidia-smi -q -d SUPPORTED_CLOCKS').")
+        raise typer.Exit(code=1)
+
+    # 1. Bevorzugt nvidia-persistenced (von NVIDIA empfohlen), sonst Legacy 'nvidia-smi -pm 1'
+    use_persistenced = False
+    if _systemd_unit_exists("nvidia-persistenced.service"):
+        # Unit aus dem Distributionspaket: nur die Reihenfolge vor Docker ergänzen
+        if not os.path.exists(PERSISTENCED_UNIT):
+            write_root_file(PERSISTENCED_DROPIN, "[Unit]\nBefore=docker.service containerd.service\n", desc="Ordne nvidia-persistenced vor Docker ein")
+        use_persistenced = True
+    elif os.path.exists("/usr/bin/nvidia-persistenced"):
+        if not write_root_file(PERSISTENCED_UNIT, _persistenced_unit(), desc="Erstelle nvidia-persistenced.service"):
+            raise typer.Exit(code=1)
+        use_persistenced = True
+
+    if use_persistenced:
+        run_command("sudo systemctl daemon-reload", desc="Lade systemd daemon neu", check=False)
+        if not run_command("sudo systemctl enable --now nvidia-persistenced.service", desc="Aktiviere nvidia-persistenced"):
+            raise typer.Exit(code=1)
     else:
-        new_crontab = f"{current_crontab}\n{cron_cmd}\n"
-        try:
-            process = subprocess.Popen("crontab -", shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            stdout, stderr = process.communicate(input=new_crontab)
-            if process.returncode == 0:
-                print_success("Persistence Cronjob hinzugefügt.")
-            else:
-                print_error(f"Fehler beim Hinzufügen des Cronjobs: {stderr}")
-                raise typer.Exit(code=1)
-        except Exception as e:
-            print_error(f"Fehler beim Aktualisieren der Crontab: {e}")
+        print_status("nvidia-persistenced nicht gefunden, nutze 'nvidia-smi -pm 1'.")
+
+    # 2. Oneshot Unit für Legacy Persistence Mode, Clocks und Power Limit
+    if not use_persistenced or app_clocks or power_limit:
+        unit = _gpu_init_unit(not use_persistenced, app_clocks, power_limit)
+        if not write_root_file(GPU_INIT_UNIT, unit, desc="Erstelle dvm-nvidia-init.service"):
+            raise typer.Exit(code=1)
+        run_command("sudo systemctl daemon-reload", desc="Lade systemd daemon neu", check=False)
+        if not run_command("sudo systemctl enable dvm-nvidia-init.service", desc="Aktiviere dvm-nvidia-init"):
             raise typer.Exit(code=1)
+        # Sofort anwenden (restart, damit geänderte Clocks/Limits greifen)
+        run_command("sudo systemctl restart dvm-nvidia-init.service", desc="Initialisiere GPU", check=False)
+    elif os.path.exists(GPU_INIT_UNIT):
+        run_command("sudo systemctl disable dvm-nvidia-init.service", check=False)
+        run_command(f"sudo rm -f {GPU_INIT_UNIT}", check=False)
+        run_command("sudo systemctl daemon-reload", desc="Lade systemd daemon neu", check=False)
+
+    print_success("Persistence Modus aktiv. Die GPU wird beim Booten vor Docker initialisiert.")
 
 @app.command("toggle-hold")
-def toggle_update_hold():
+def toggle_update_hold(
+    hold: Annotated[Optional[bool], typer.Option("--hold/--unhold", help="Pakete sperren bzw. entsperren (ohne Auswahl)")] = None,
+):
     """Sperrt oder entsperrt NVIDIA Treiber für alle APT Updates (apt-mark hold/unhold)."""
     print_status("Prüfe aktuellen Hold-Status der NVIDIA Pakete...")
     
@@ -181,10 +617,10 @@ def toggle_update_hold():
     
     if currently_held:
         print_status(f"Es sind aktuell [yellow]{len(currently_held)}[/yellow] NVIDIA Pakete gesperrt (Hold).")
-        action = questionary.select(
-            "Was möchtest du tun?",
-            choices=["Nichts ändern", "Sperre aufheben (Bereit für Updates)"]
-        ).ask()
+        if hold is None:
+            action = prompts.select(None, "Was möchtest du tun?", ["Nichts ändern", "Sperre aufheben (Bereit für Updates)"], "--hold/--unhold")
+        else:
+            action = "Nichts ändern" if hold else "Sperre aufheben (Bereit für Updates)"
         
         if action == "Sperre aufheben (Bereit für Updates)":
             cmd = f"apt-mark unhold {' '.join(currently_held)}"
@@ -194,10 +630,10 @@ def toggle_update_hold():
                 print_error("Fehler beim Aufheben der Sperre.")
     else:
         print_status(f"Es wurden [blue]{len(nvidia_packages)}[/blue] NVIDIA Pakete gefunden. Diese sind [bold green]NICHT gesperrt[/bold green] und werden bei 'apt upgrade' aktualisiert.")
-        action = questionary.select(
-            "Was möchtest du tun?",
-            choices=["Sperren (generell bei allen Updates ausschließen)", "Nichts ändern"]
-        ).ask()
+        if hold is None:
+            action = prompts.select(None, "Was möchtest du tun?", ["Sperren (generell bei allen Updates ausschließen)", "Nichts ändern"], "--hold/--unhold")
+        else:
+            action = "Sperren (generell bei allen Updates ausschließen)" if hold else "Nichts ändern"
         
         if action == "Sperren (generell bei allen Updates ausschließen)":
             cmd = f"apt-mark hold {' '.join(nvidia_packages)}"
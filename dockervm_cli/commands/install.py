@@ -1,6 +1,10 @@
 
+import shlex
 import typer
-from dockervm_cli.utils import run_command, console, get_docker_compose_cmd, get_host_ip, DVM_BASE_PATH
+from typing import Annotated, List, Optional
+from dockervm_cli import plan, ports, prompts
+from dockervm_cli.apt import apt_install
+from dockervm_cli.utils import run_command, console, print_error, print_success, get_docker_compose_cmd, get_host_ip, write_root_file, read_daemon_json, update_daemon_json, DVM_BASE_PATH
 
 app = typer.Typer(help="Anwendungen und Dienste installieren.")
 
@@ -11,42 +15,54 @@ def install_docker():
     """
     console.print("[bold green]Installiere Docker...[/bold green]")
     
+    if not apt_install(["ca-certificates", "curl", "gnupg", "lsb-release"], desc="Installiere Voraussetzungen"):
+        console.print("[bold red]Fehler bei der Installation von Docker.[/bold red]")
+        raise typer.Exit(code=1)
+    
     commands = [
-        "sudo apt update",
-        "sudo apt install -y ca-certificates curl gnupg lsb-release",
         "sudo mkdir -p /etc/apt/keyrings",
         "curl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo gpg --dearmor --yes -o /etc/apt/keyrings/docker.gpg",
         'echo "deb [arch=$(dpkg --print-architecture) signed-by=/etc/apt/keyrings/docker.gpg] https://download.docker.com/linux/ubuntu $(lsb_release -cs) stable" | sudo tee /etc/apt/sources.list.d/docker.list > /dev/null',
-        "sudo apt update",
-        "sudo apt install -y docker-ce docker-ce-cli containerd.io docker-buildx-plugin docker-compose-plugin",
-        "sudo usermod -aG docker $USER"
     ]
     
     for cmd in commands:
         if not run_command(cmd, desc=f"Führe aus: {cmd[:40]}..."):
             console.print("[bold red]Fehler bei der Installation von Docker.[/bold red]")
             raise typer.Exit(code=1)
+    
+    # docker.list ist neu/geändert -> apt_install aktualisiert die Listen automatisch
+    docker_packages = ["docker-ce", "docker-ce-cli", "containerd.io", "docker-buildx-plugin", "docker-compose-plugin"]
+    if not apt_install(docker_packages, desc="Installiere Docker Pakete") or \
+       not run_command("sudo usermod -aG docker $USER", desc="Füge Benutzer zur docker Gruppe hinzu"):
+        console.print("[bold red]Fehler bei der Installation von Docker.[/bold red]")
+        raise typer.Exit(code=1)
 
     console.print("[bold green]Docker erfolgreich installiert![/bold green]")
 
 @app.command("dockhand")
-def install_dockhand():
+def install_dockhand(
+    pg_user: Annotated[Optional[str], typer.Option("--pg-user", help="Postgres Benutzer (Standard: dockhand)")] = None,
+    pg_password: Annotated[Optional[str], typer.Option("--pg-password", envvar="DVM_PG_PASSWORD", help="Postgres Passwort (besser über DVM_PG_PASSWORD)")] = None,
+    pg_db: Annotated[Optional[str], typer.Option("--pg-db", help="Postgres Datenbankname (Standard: dockhand)")] = None,
+    base_volume_path: Annotated[Optional[str], typer.Option("--volume-path", help="Basis-Pfad für Volumes")] = None,
+    gui_port: Annotated[Optional[str], typer.Option("--port", help="GUI Port für Dockhand (Standard: 3000)")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage installieren (Standardwerte verwenden)")] = False,
+):
     """
     Installiert Dockhand (Alternative zu Portainer) mit Postgres.
     """
-    import questionary
     import os
     
     console.print("[bold blue]Dockhand Installation[/bold blue]")
     
-    if not questionary.confirm("Möchtest du Dockhand und Postgres installieren?").ask():
+    if not prompts.confirm("Möchtest du Dockhand und Postgres installieren?", yes=yes):
         raise typer.Exit()
         
     # Postgres Configuration
     console.print("\n[yellow]Konfiguriere Postgres Datenbank-Zugangsdaten:[/yellow]")
-    pg_user = questionary.text("Postgres Benutzer:", default="dockhand").ask()
-    pg_password = questionary.password("Postgres Passwort:").ask()
-    pg_db = questionary.text("Postgres Datenbankname:", default="dockhand").ask()
+    pg_user = prompts.text(pg_user, "Postgres Benutzer:", "--pg-user", default="dockhand", yes=yes)
+    pg_password = prompts.password(pg_password, "Postgres Passwort:", "--pg-password", yes=yes)
+    pg_db = prompts.text(pg_db, "Postgres Datenbankname:", "--pg-db", default="dockhand", yes=yes)
     
     if not pg_password:
         console.print("[red]Passwort darf nicht leer sein![/red]")
@@ -54,11 +70,24 @@ def install_dockhand():
 
     # General Configuration
     console.print("\n[yellow]Allgemeine Konfiguration:[/yellow]")
-    base_volume_path = questionary.text("Basis-Pfad für Volumes:", default=DVM_BASE_PATH).ask()
-    gui_port = questionary.text("GUI Port für Dockhand:", default="3000").ask()
-        
-    # Prepare directory
+    base_volume_path = prompts.text(base_volume_path, "Basis-Pfad für Volumes:", "--volume-path", default=DVM_BASE_PATH, yes=yes)
     install_dir = f"{base_volume_path}/dockhand"
+
+    # Belegte Ports vorab prüfen, statt erst beim 'compose up' zu scheitern
+    port_index = ports.build_index()
+    default_port = ports.free_port(port_index, 3000, project_dir=install_dir)
+    if gui_port is None and default_port != 3000:
+        console.print(f"[yellow]Port 3000 ist belegt ({ports.conflict_lines(ports.check([(3000, 'tcp')], install_dir, port_index))[0]}), verwende {default_port}.[/yellow]")
+    gui_port = prompts.text(gui_port, "GUI Port für Dockhand:", "--port", default=str(default_port), yes=yes)
+    if not gui_port.isdigit() or not 1 <= int(gui_port) <= 65535:
+        print_error(f"Ungültiger Port: {gui_port}")
+        raise typer.Exit(code=1)
+    taken = ports.check([(int(gui_port), "tcp")], install_dir, port_index)
+    if taken:
+        print_error(f"Port belegt - {ports.conflict_lines(taken)[0]}. Freier Port: {ports.free_port(port_index, int(gui_port), project_dir=install_dir)}")
+        raise typer.Exit(code=1)
+
+    # Prepare directory
     run_command(f"sudo mkdir -p {install_dir}", desc=f"Erstelle Installationsverzeichnis: {install_dir}")
     
     # Docker Compose Content
@@ -90,14 +119,10 @@ def install_dockhand():
 """
     
     # Write docker-compose.yml
-    try:
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yml", delete=False) as f:
-            f.write(compose_content)
-            tmp_compose = f.name
-        run_command(f"sudo mv {tmp_compose} {install_dir}/docker-compose.yml", desc="Schreibe docker-compose.yml")
-    except Exception as e:
-        console.print(f"[bold red]Fehler beim Schreiben der Konfiguration: {e}[/bold red]")
+    # Enthält das Postgres Passwort, daher nur für den aufrufenden Benutzer (und root) lesbar
+    if not write_root_file(f"{install_dir}/docker-compose.yml", compose_content, desc="Schreibe docker-compose.yml", mode="600",
+                           owner=f"{os.getuid()}:{os.getgid()}"):
+        console.print("[bold red]Fehler beim Schreiben der Konfiguration.[/bold red]")
         raise typer.Exit(code=1)
         
     # Start Dockhand
@@ -131,12 +156,16 @@ def install_lazydocker():
 
 
 @app.command("zsh")
-def install_zsh():
+def install_zsh(
+    oh_my_zsh: Annotated[Optional[bool], typer.Option("--oh-my-zsh/--no-oh-my-zsh", help="Oh My Zsh installieren")] = None,
+    zshrc: Annotated[Optional[bool], typer.Option("--zshrc/--no-zshrc", help=".zshrc anpassen (Theme & Plugins)")] = None,
+    default_shell: Annotated[Optional[bool], typer.Option("--default-shell/--no-default-shell", help="ZSH als Standard-Shell setzen")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Alle Fragen mit Ja beantworten")] = False,
+):
     """
     Installiert ZSH, Oh My Zsh, Powerlevel10k und nützliche Plugins.
     Folgt dem Guide: Setup Zsh on Ubuntu (How and Why).
     """
-    import questionary
     import os
     import re
     
@@ -145,13 +174,13 @@ def install_zsh():
     # 1. System Update & Install Packages
     # Added dconf-cli as requested
     console.print("[blue]1. Aktualisiere System und installiere Pakete...[/blue]")
-    if not run_command("sudo apt update && sudo apt install -y zsh git curl fonts-powerline dconf-cli", desc="Installiere ZSH, Git, Fonts, dconf-cli"):
+    if not apt_install(["zsh", "git", "curl", "fonts-powerline", "dconf-cli"], desc="Installiere ZSH, Git, Fonts, dconf-cli"):
         raise typer.Exit(code=1)
         
     console.print("[green]Pakete installiert.[/green]")
     
     # 2. Install Oh My Zsh
-    if questionary.confirm("Möchtest du 'Oh My Zsh' installieren? (Erforderlich für Setup)", default=True).ask():
+    if prompts.confirm("Möchtest du 'Oh My Zsh' installieren? (Erforderlich für Setup)", yes=yes, default=True, value=oh_my_zsh, option="--oh-my-zsh/--no-oh-my-zsh"):
         # Check if already installed
         if os.path.exists(os.path.expanduser("~/.oh-my-zsh")):
              console.print("[yellow]Oh My Zsh ist bereits installiert.[/yellow]")
@@ -188,7 +217,7 @@ def install_zsh():
 
     # 5. Configure .zshrc
     console.print("[blue]5. Konfiguriere .zshrc...[/blue]")
-    if questionary.confirm("Soll ich die .zshrc automatisch anpassen (Theme & Plugins)?", default=True).ask():
+    if prompts.confirm("Soll ich die .zshrc automatisch anpassen (Theme & Plugins)?", yes=yes, default=True, value=zshrc, option="--zshrc/--no-zshrc"):
         zshrc_path = os.path.expanduser("~/.zshrc")
         try:
             with open(zshrc_path, "r") as f:
@@ -219,7 +248,7 @@ def install_zsh():
             console.print(f"[red]Fehler beim Bearbeiten der .zshrc: {e}[/red]")
 
     # 6. Set Default Shell
-    if questionary.confirm("Möchtest du ZSH als Standard-Shell setzen?", default=True).ask():
+    if prompts.confirm("Möchtest du ZSH als Standard-Shell setzen?", yes=yes, default=True, value=default_shell, option="--default-shell/--no-default-shell"):
         user = os.environ.get("USER")
         zsh_path = "/usr/bin/zsh"
         
@@ -239,148 +268,278 @@ def install_zsh():
 
 
 @app.command("container")
-def install_container():
+def install_container(
+    template: Annotated[Optional[str], typer.Option("--template", help="Name des Templates, z.B. docmost (Liste: dvm install templates)")] = None,
+    values: Annotated[Optional[List[str]], typer.Option("--set", help="Wert für eine Template-Variable (KEY=VALUE, mehrfach möglich)")] = None,
+    install_dir: Annotated[Optional[str], typer.Option("--install-dir", help="Installationsverzeichnis (Standard laut Template, meist <Basispfad>/<template>)")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Template-Standardwerte übernehmen und vorhandenes Verzeichnis überschreiben")] = False,
+):
     """
     Installiert einen Container aus einem Template (z.B. Unifi Controller).
     """
-    import questionary
     import os
-    import sys
-    import shutil
-    
+    import questionary
+    from dockervm_cli import catalog, compose_templates
+
     console.print("[bold blue]Container Installation aus Template[/bold blue]")
-    
-    # 1. Find Templates
-    # Resolve relative to the package location (works from any CWD)
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    templates_dir = os.path.join(base_dir, "templates")
-    
-    if not os.path.isdir(templates_dir):
-        console.print(f"[bold red]Template-Verzeichnis nicht gefunden: {templates_dir}[/bold red]")
-        raise typer.Exit(code=1)
-            
-    # List subdirectories
-    templates = [d for d in os.listdir(templates_dir) if os.path.isdir(os.path.join(templates_dir, d))]
-    
+
+    refreshed = catalog.refresh_if_stale()
+    if refreshed and refreshed.get("error"):
+        console.print(f"[yellow]Template-Katalog nicht aktualisiert ({refreshed['error']}), verwende lokalen Stand.[/yellow]")
+    elif refreshed and refreshed["status"] == "offline":
+        console.print("[yellow]Template-Katalog nicht erreichbar, verwende lokalen Stand.[/yellow]")
+
+    templates = compose_templates.list_templates()
     if not templates:
         console.print("[yellow]Keine Templates gefunden.[/yellow]")
         raise typer.Exit()
-        
-    # 2. Select Template
-    selected_template = questionary.select(
-        "Wähle einen Dienst zum Installieren:",
-        choices=templates
-    ).ask()
-    
-    template_path = os.path.join(templates_dir, selected_template)
-    env_path = os.path.join(template_path, ".env")
-    compose_path = os.path.join(template_path, "docker-compose.yml")
-    
-    if not os.path.exists(compose_path):
-        console.print(f"[red]Fehler: docker-compose.yml fehlt im Template {selected_template}[/red]")
+
+    choices = [questionary.Choice(f"{t['title']} - {t['description']}" if t["description"] else t["title"], value=t["name"]) for t in templates]
+    selected = compose_templates.get_template(
+        prompts.select(template, "Wähle einen Dienst zum Installieren:", choices, "--template", yes=yes)
+    )
+
+    overrides = {}
+    for item in values or []:
+        key, sep, value = item.partition("=")
+        if not sep:
+            print_error(f"Ungültiger Wert für --set: {item} (erwartet KEY=VALUE)")
+            raise typer.Exit(code=1)
+        overrides[key.strip()] = value
+
+    known = {var["name"] for var in selected["variables"]}
+    unknown = [key for key in overrides if key not in known]
+    if unknown:
+        console.print(f"[yellow]Unbekannte Variablen ignoriert: {', '.join(unknown)}[/yellow]")
+
+    # Belegte Ports einmal erfassen; Standardwerte von Port-Variablen weichen auf freie Ports aus
+    port_index = ports.build_index() if selected["ports"] else {}
+    try:
+        project_dir = install_dir or compose_templates.expand(selected["install_dir"], compose_templates.base_context(selected))
+    except compose_templates.TemplateError:
+        project_dir = None
+    port_vars = {str(p["port"])[1:-1]: p.get("protocol", "tcp") for p in selected["ports"] if str(p["port"]).startswith("{")}
+
+    def ask(var, default):
+        label = f"{var['name']} ({var['description']}):" if var.get("description") else f"{var['name']}:"
+        if var["name"] in port_vars and default is not None:
+            free = ports.free_port(port_index, int(default), port_vars[var["name"]], project_dir=project_dir)
+            if free != int(default):
+                console.print(f"[yellow]Port {default} ist belegt, verwende {free} für {var['name']}.[/yellow]")
+                default = free
+        if var["type"] == "secret":
+            # Erzeugte Secrets nicht anzeigen; eigene Werte nur per --set
+            if default is not None:
+                return default
+            return prompts.password(None, label, f"--set {var['name']}=...", yes=yes)
+        return prompts.text(None, label, f"--set {var['name']}=...", default=None if default is None else str(default), yes=yes,
+                            required=var.get("required", var["type"] != "string"))
+
+    # Bei einer erneuten Installation gelten die Werte der vorhandenen .env als Standard,
+    # sonst passen z.B. neu erzeugte Datenbank-Passwörter nicht mehr zu den bestehenden Daten
+    previous = compose_templates.read_env(project_dir) if project_dir else {}
+    if previous:
+        console.print(f"[dim]Vorhandene Konfiguration aus {project_dir}/.env wird übernommen.[/dim]")
+    if selected["variables"]:
+        console.print(f"\n[yellow]Konfiguration für {selected['title']}:[/yellow]")
+    try:
+        variables = compose_templates.resolve(selected, {k: v for k, v in overrides.items() if k in known}, ask=ask,
+                                              previous=previous)
+        layout = compose_templates.resolve_layout(selected, variables)
+    except compose_templates.TemplateError as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
+
+    install_dir = prompts.text(install_dir, "Installationsverzeichnis:", "--install-dir", default=layout["install_dir"], yes=yes)
+    if os.path.normpath(install_dir) != os.path.normpath(project_dir or ""):
+        # Anderes Verzeichnis gewählt: dessen vorhandene Secrets behalten
+        existing = compose_templates.read_env(install_dir)
+        variables.update({var["name"]: existing[var["name"]] for var in selected["variables"]
+                          if var["type"] == "secret" and existing.get(var["name"]) and var["name"] not in overrides})
+        previous = {**existing, **previous}
+    generated = [var["name"] for var in selected["variables"]
+                 if var.get("generate") and var["name"] not in overrides and not previous.get(var["name"])]
+
+    taken = ports.check([(p["port"], p["protocol"]) for p in layout["ports"]], install_dir, port_index)
+    if taken:
+        print_error("Benötigte Ports sind bereits belegt:")
+        for line in ports.conflict_lines(taken):
+            console.print(f"  {line}")
+        busy = {port for port, _, _ in taken}
+        hints = [f"--set {name}={ports.free_port(port_index, int(variables[name]), protocol, project_dir=install_dir)}"
+                 for name, protocol in port_vars.items() if int(variables[name]) in busy]
+        if hints:
+            console.print(f"[dim]Freie Ports z.B. mit: {' '.join(hints)}[/dim]")
         raise typer.Exit(code=1)
 
-    # 3. Parse .env and Prompt User
-    user_env_values = {}
-    
-    if os.path.exists(env_path):
-        console.print(f"\n[yellow]Konfiguration für {selected_template}:[/yellow]")
-        with open(env_path, "r") as f:
-            lines = f.readlines()
-            
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            
-            if "=" in line:
-                key, default_value = line.split("=", 1)
-                key = key.strip()
-                default_value = default_value.strip()
-                
-                # Ask user
-                value = questionary.text(f"{key}:", default=default_value).ask()
-                user_env_values[key] = value
-                
-    # 4. Installation Directory
-    default_install_dir = f"{DVM_BASE_PATH}/{selected_template}"
-    install_dir = questionary.text("Installationsverzeichnis:", default=default_install_dir).ask()
-    
     if os.path.exists(install_dir):
-        if not questionary.confirm(f"Verzeichnis {install_dir} existiert bereits. Überschreiben?", default=False).ask():
+        if not prompts.confirm(f"Verzeichnis {install_dir} existiert bereits. Überschreiben?", yes=yes, default=False):
             console.print("[yellow]Abbruch.[/yellow]")
             raise typer.Exit()
-            
-    # 5. Deploy
-    console.print(f"\n[blue]Installiere {selected_template} nach {install_dir}...[/blue]")
-    run_command(f"sudo mkdir -p {install_dir}", desc="Erstelle Verzeichnis")
-    
-    # Copy docker-compose.yml
-    # We use sudo cp via utils.run_command or just python shutil if we have permissions?
-    # Better use sudo for /mnt/volumes
-    
-    # Use tempfile for CWD-independent tmp file handling
+
+    console.print(f"\n[blue]Installiere {selected['title']} nach {install_dir}...[/blue]")
+    dirs = " ".join(shlex.quote(os.path.join(install_dir, volume)) for volume in selected["volumes"])
+    if not run_command(f"sudo mkdir -p {shlex.quote(install_dir)} {dirs}".rstrip(), desc="Erstelle Verzeichnisse"):
+        raise typer.Exit(code=1)
+
+    # Secrets: nur für den aufrufenden Benutzer lesbar, damit u.a. der Port-Index die Variablen auflösen kann
+    if variables and not write_root_file(f"{install_dir}/.env", compose_templates.render_env(variables), desc="Schreibe .env Konfiguration",
+                                         mode="600", owner=f"{os.getuid()}:{os.getgid()}"):
+        raise typer.Exit(code=1)
+    for file in selected["files"]:
+        try:
+            content = compose_templates.read_file(selected, file)
+        except (compose_templates.TemplateError, OSError) as e:
+            print_error(str(e))
+            raise typer.Exit(code=1)
+        if not write_root_file(f"{install_dir}/{file}", content, desc=f"Kopiere {file}", mode="644"):
+            raise typer.Exit(code=1)
+
+    compose_cmd = get_docker_compose_cmd()
+    if not run_command(f"cd {shlex.quote(install_dir)} && sudo {compose_cmd} up -d", desc="Starte Container"):
+        print_error("Fehler beim Starten des Containers.")
+        raise typer.Exit(code=1)
+
+    console.print(f"[bold green]{selected['title']} erfolgreich installiert![/bold green]")
+    if generated:
+        console.print(f"[dim]Erzeugte Secrets ({', '.join(generated)}) stehen in {install_dir}/.env.[/dim]")
+    if layout["url"]:
+        console.print(f"Zugriff unter: [link]{layout['url']}[/link]")
+    if layout["ports"]:
+        console.print("[dim]Ports: " + ", ".join(f"{p['port']}/{p['protocol']}" for p in layout["ports"]) + "[/dim]")
+
+
+@app.command("templates")
+def list_container_templates(
+    rebuild_index: Annotated[bool, typer.Option("--rebuild-index", help="templates/index.json aus den template.json Manifesten neu erzeugen (für Template-Autoren)")] = False,
+):
+    """
+    Listet die Container-Templates mit ihren Variablen und Ports.
+    """
+    from rich.table import Table
+    from dockervm_cli import compose_templates
+
+    if rebuild_index:
+        try:
+            compose_templates.write_index(compose_templates.build_index())
+        except (compose_templates.TemplateError, OSError) as e:
+            print_error(f"Index konnte nicht erzeugt werden: {e}")
+            raise typer.Exit(code=1)
+        console.print(f"[green]{compose_templates.INDEX_FILE} aktualisiert.[/green]")
+
+    for t in compose_templates.list_templates():
+        origin = " - Katalog" if t.get("source") == "catalog" else ""
+        table = Table(title=f"{t['title']} ({t['name']}{origin})", caption=t["description"] or None, show_header=True, header_style="bold magenta")
+        table.add_column("Variable", style="cyan")
+        table.add_column("Typ")
+        table.add_column("Standard")
+        table.add_column("Beschreibung")
+        for var in t["variables"]:
+            default = "(wird erzeugt)" if var.get("generate") else str(var.get("default", ""))
+            table.add_row(var["name"], var["type"], default, var.get("description", ""))
+        console.print(table)
+        if t["ports"]:
+            console.print("[dim]Ports: " + ", ".join(f"{p['port']}/{p.get('protocol', 'tcp')}" for p in t["ports"]) + "[/dim]")
+        console.print()
+
+
+@app.command("template-sync")
+def sync_template_catalog(
+    source: Annotated[Optional[str], typer.Option("--source", help="Katalog-Quelle: https://server/pfad oder git+https://.../repo.git (wird gespeichert, auch über DVM_TEMPLATE_CATALOG)")] = None,
+    allowed_signers: Annotated[Optional[str], typer.Option("--allowed-signers", help="allowed_signers Datei mit den SSH-Schlüsseln, die den Katalog signieren dürfen (wird gespeichert)")] = None,
+    verify: Annotated[bool, typer.Option("--verify/--no-verify", help="Signatur von catalog.json prüfen (--no-verify gilt nur für diesen Aufruf)")] = True,
+    force: Annotated[bool, typer.Option("--force", help="Alle Dateien neu laden, auch wenn sie unverändert sind")] = False,
+):
+    """
+    Synchronisiert Container-Templates aus einem signierten Katalog in den lokalen Cache.
+    """
+    import os
+    from dockervm_cli import catalog
+
+    if not verify:
+        console.print("[yellow]Signaturprüfung deaktiviert - nur für vertrauenswürdige Quellen verwenden.[/yellow]")
     try:
-        import tempfile
-        
-        # Write new .env
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".env", delete=False) as f:
-            for k, v in user_env_values.items():
-                f.write(f"{k}={v}\n")
-            tmp_env = f.name
-        
-        run_command(f"sudo mv {tmp_env} {install_dir}/.env", desc="Schreibe .env Konfiguration")
-        
-        # Copy docker-compose.yml
-        with open(compose_path, "r") as f:
-            compose_content = f.read()
-            
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yml", delete=False) as f:
-            f.write(compose_content)
-            tmp_compose = f.name
-            
-        run_command(f"sudo mv {tmp_compose} {install_dir}/docker-compose.yml", desc="Kopiere docker-compose.yml")
-        
-        # Start container
-        compose_cmd = get_docker_compose_cmd()
-        if run_command(f"cd {install_dir} && sudo {compose_cmd} up -d", desc="Starte Container"):
-            host_ip = get_host_ip()
-            console.print(f"[bold green]{selected_template} erfolgreich installiert![/bold green]")
-            console.print(f"Zugriff unter: [link]http://{host_ip}[/link] (Port siehe Template)")
-        else:
-            console.print(f"[bold red]Fehler beim Starten des Containers.[/bold red]")
-            
-    except Exception as e:
-        console.print(f"[bold red]Systemfehler: {e}[/bold red]")
+        result = catalog.sync(source=source, allowed_signers=allowed_signers and os.path.abspath(allowed_signers), verify=verify, force=force)
+    except catalog.CatalogError as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
+
+    if result["status"] == "offline":
+        console.print(f"[yellow]Katalog nicht erreichbar, verwende lokalen Stand ({result['templates']} Templates).[/yellow]")
+    elif result["status"] == "unchanged":
+        print_success(f"Katalog unverändert ({result['templates']} Templates).")
+    else:
+        for rel in result["downloaded"]:
+            console.print(f"[dim]  geladen: {rel}[/dim]")
+        for rel in result["removed"]:
+            console.print(f"[dim]  entfernt: {rel}[/dim]")
+        print_success(f"Katalog aktualisiert: {len(result['downloaded'])} Datei(en) geladen, {result['templates']} Templates.")
+
+
+@app.command("template-catalog")
+def write_template_catalog(
+    directory: Annotated[str, typer.Argument(help="Ordner mit einem Unterordner je Template (Wurzel der Katalog-Quelle)")],
+    sign_key: Annotated[Optional[str], typer.Option("--sign-key", help="Privater SSH-Schlüssel zum Signieren (erzeugt catalog.json.sig)")] = None,
+):
+    """
+    Erzeugt catalog.json (SHA-256 je Datei) für eine eigene Katalog-Quelle und signiert sie optional.
+    """
+    import os
+    import subprocess
+    from dockervm_cli import catalog
+
+    try:
+        path = catalog.write_catalog(directory)
+    except (catalog.CatalogError, OSError) as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
+    print_success(f"{path} geschrieben.")
+
+    if sign_key:
+        # ssh-keygen fragt sonst nach, ob eine vorhandene Signatur überschrieben werden soll
+        if os.path.exists(f"{path}.sig"):
+            os.remove(f"{path}.sig")
+        result = subprocess.run(["ssh-keygen", "-Y", "sign", "-f", sign_key, "-n", catalog.NAMESPACE, path], capture_output=True, text=True)
+        if result.returncode != 0:
+            print_error(f"Signieren fehlgeschlagen: {result.stderr.strip()}")
+            raise typer.Exit(code=1)
+        print_success(f"{path}.sig geschrieben.")
+
+
+# Katalog-Template für 'dvm install dns-server'; fehlt es, wird aus dem Repository geladen
+DNS_SERVER_TEMPLATE = "dns-server"
+DNS_SERVER_URL = "https://raw.githubusercontent.com/D4rk-Sh4dw/dns-server/main"
+DNS_SERVER_FILES = ("docker-compose.yml", "config/adguard/AdGuardHome.yaml")
 
 
 @app.command("dns-server")
-def install_dns_server():
+def install_dns_server(
+    install_dir: Annotated[Optional[str], typer.Option("--install-dir", help="Installationsverzeichnis (Standard: <Basispfad>/dns-server)")] = None,
+    disable_resolved: Annotated[Optional[bool], typer.Option("--disable-resolved/--keep-resolved", help="systemd-resolved deaktivieren, um Port 53 freizugeben")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage installieren (Standardwerte verwenden)")] = False,
+):
     """
     Installiert den Unified DNS Server (AdGuard + Technitium Dashboard).
     """
-    import questionary
     import os
     import subprocess
-    import tempfile
+    from dockervm_cli import catalog, compose_templates
     
     console.print("[bold blue]DNS Server Installation[/bold blue]")
     
-    BASE_URL = "https://raw.githubusercontent.com/D4rk-Sh4dw/dns-server/main"
-    
-    if not questionary.confirm("Möchtest du den DNS Server installieren?").ask():
+    if not prompts.confirm("Möchtest du den DNS Server installieren?", yes=yes):
         raise typer.Exit()
     
     # 1. Choose install path
     default_dir = f"{DVM_BASE_PATH}/dns-server"
-    install_dir = questionary.text("Installationsverzeichnis:", default=default_dir).ask()
+    install_dir = prompts.text(install_dir, "Installationsverzeichnis:", "--install-dir", default=default_dir, yes=yes)
     
     if not install_dir:
         console.print("[red]Pfad darf nicht leer sein![/red]")
         raise typer.Exit(code=1)
     
     if os.path.exists(install_dir):
-        if not questionary.confirm(f"Verzeichnis {install_dir} existiert bereits. Überschreiben?", default=False).ask():
+        if not prompts.confirm(f"Verzeichnis {install_dir} existiert bereits. Überschreiben?", yes=yes, default=False):
             console.print("[yellow]Abbruch.[/yellow]")
             raise typer.Exit()
     
@@ -388,54 +547,86 @@ def install_dns_server():
     run_command(f"sudo mkdir -p {install_dir}/config/adguard", desc="Erstelle Verzeichnisstruktur")
     run_command(f"sudo mkdir -p {install_dir}/data", desc="Erstelle Datenverzeichnis")
     
-    # 3. Fix Port 53 (systemd-resolved)
+    # 3. Dateien holen (solange die DNS Auflösung des Hosts noch unverändert ist): bevorzugt
+    #    aus dem Template-Katalog (signiert, SHA-256 geprüft, offline aus dem lokalen Stand)
+    refreshed = catalog.refresh_if_stale()
+    if refreshed and refreshed.get("error"):
+        console.print(f"[yellow]Template-Katalog nicht aktualisiert ({refreshed['error']}), verwende lokalen Stand.[/yellow]")
+    try:
+        template = compose_templates.get_template(DNS_SERVER_TEMPLATE)
+    except compose_templates.TemplateError:
+        template = None
+
+    if template:
+        console.print(f"\n[blue]Übernehme Konfigurationsdateien aus dem Template '{DNS_SERVER_TEMPLATE}'...[/blue]")
+        for file in template["files"]:
+            try:
+                content = compose_templates.read_file(template, file)
+            except (compose_templates.TemplateError, OSError) as e:
+                print_error(f"Template-Datei {file} konnte nicht gelesen werden: {e}")
+                raise typer.Exit(code=1)
+            if not write_root_file(f"{install_dir}/{file}", content, desc=f"Schreibe {file}", mode="644"):
+                raise typer.Exit(code=1)
+    else:
+        # Ohne Katalog-Eintrag: Dateien wie bisher direkt aus dem dns-server Repository laden
+        console.print("\n[blue]Lade Konfigurationsdateien herunter...[/blue]")
+        console.print(f"[dim]Kein Template '{DNS_SERVER_TEMPLATE}' im Katalog (dvm install template-sync), lade von GitHub.[/dim]")
+        for file in DNS_SERVER_FILES:
+            if not run_command(
+                f"sudo wget -O {install_dir}/{file} '{DNS_SERVER_URL}/{file}'",
+                desc=f"Lade {file}"
+            ):
+                console.print("[bold red]Download fehlgeschlagen. Bitte Internetverbindung/DNS pruefen.[/bold red]")
+                raise typer.Exit(code=1)
+    
+    # 4. Port 53 (systemd-resolved)
     console.print("\n[yellow]Pruefe Port 53 (systemd-resolved)...[/yellow]")
     
     result = subprocess.run(
         ["systemctl", "is-active", "--quiet", "systemd-resolved"],
         capture_output=True
     )
-    
-    if result.returncode == 0:
-        if questionary.confirm(
+    resolved_active = result.returncode == 0
+    stop_resolved = False
+    if resolved_active:
+        stop_resolved = prompts.confirm(
             "systemd-resolved ist aktiv und blockiert Port 53. Soll es deaktiviert werden? (Empfohlen)",
-            default=True
-        ).ask():
-            run_command("sudo systemctl stop systemd-resolved", desc="Stoppe systemd-resolved")
-            run_command("sudo systemctl disable systemd-resolved", desc="Deaktiviere systemd-resolved")
-            run_command("sudo rm -f /etc/resolv.conf", desc="Entferne alte resolv.conf")
-            
-            # Write resolv.conf via tempfile (reliable across all shells)
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".conf", delete=False) as f:
-                f.write("nameserver 1.1.1.1\nnameserver 8.8.8.8\n")
-                tmp_resolv = f.name
-            run_command(f"sudo mv {tmp_resolv} /etc/resolv.conf", desc="Setze DNS Server (1.1.1.1, 8.8.8.8)")
-            
-            # Verify DNS works
-            if not run_command("ping -c 1 -W 3 github.com", desc="Pruefe DNS Aufloesung", check=False):
-                console.print("[yellow]DNS scheint noch nicht zu funktionieren. Bitte /etc/resolv.conf pruefen.[/yellow]")
-        else:
+            yes=yes, default=True, value=disable_resolved
+        )
+        if not stop_resolved:
             console.print("[yellow]Port 53 koennte blockiert sein. DNS Server startet ggf. nicht.[/yellow]")
     else:
         console.print("[green]systemd-resolved ist nicht aktiv - Port 53 ist frei.[/green]")
     
-    # 4. Download files
-    console.print("\n[blue]Lade Konfigurationsdateien herunter...[/blue]")
-    if not run_command(
-        f"sudo wget -O {install_dir}/docker-compose.yml '{BASE_URL}/docker-compose.yml'",
-        desc="Lade docker-compose.yml"
-    ):
-        console.print("[bold red]Download fehlgeschlagen. Bitte Internetverbindung/DNS pruefen.[/bold red]")
-        raise typer.Exit(code=1)
-    
-    if not run_command(
-        f"sudo wget -O {install_dir}/config/adguard/AdGuardHome.yaml '{BASE_URL}/config/adguard/AdGuardHome.yaml'",
-        desc="Lade AdGuard Home Konfiguration"
-    ):
-        console.print("[bold red]Download fehlgeschlagen.[/bold red]")
-        raise typer.Exit(code=1)
-    
-    # 5. Start containers
+    # 5. Alle Ports der Compose-Datei prüfen, bevor systemd-resolved angefasst wird;
+    #    Port 53 von systemd-resolved zählt nur, wenn es aktiv bleibt
+    if not plan.recording():
+        required = [(port, protocol) for _, port, protocol, _ in ports.compose_file_ports(f"{install_dir}/docker-compose.yml")]
+        taken = []
+        for port, protocol, found in ports.check(required, install_dir):
+            if stop_resolved and port == 53:
+                found = [e for e in found if not (e["source"] == "host" and (
+                    e["owner"].startswith("systemd-resolve") or e["address"] in ("127.0.0.53", "127.0.0.54")))]
+            if found:
+                taken.append((port, protocol, found))
+        if taken:
+            print_error("Benötigte Ports sind bereits belegt:")
+            for line in ports.conflict_lines(taken):
+                console.print(f"  {line}")
+            raise typer.Exit(code=1)
+
+    if stop_resolved:
+        run_command("sudo systemctl stop systemd-resolved", desc="Stoppe systemd-resolved")
+        run_command("sudo systemctl disable systemd-resolved", desc="Deaktiviere systemd-resolved")
+        run_command("sudo rm -f /etc/resolv.conf", desc="Entferne alte resolv.conf")
+        
+        write_root_file("/etc/resolv.conf", "nameserver 1.1.1.1\nnameserver 8.8.8.8\n", desc="Setze DNS Server (1.1.1.1, 8.8.8.8)", mode="644")
+        
+        # Verify DNS works
+        if not run_command("ping -c 1 -W 3 github.com", desc="Pruefe DNS Aufloesung", check=False):
+            console.print("[yellow]DNS scheint noch nicht zu funktionieren. Bitte /etc/resolv.conf pruefen.[/yellow]")
+
+    # 6. Start containers
     console.print("\n[bold blue]Starte DNS Server...[/bold blue]")
     compose_cmd = get_docker_compose_cmd()
     if run_command(f"cd {install_dir} && sudo {compose_cmd} up -d", desc=f"Fuehre {compose_cmd} up aus"):
@@ -448,6 +639,220 @@ def install_dns_server():
         raise typer.Exit(code=1)
 
 
+@app.command("registry-mirror")
+def install_registry_mirror(
+    mode: Annotated[Optional[str], typer.Option(help="'server' (Cache auf diesem Host) oder 'client' (nur daemon.json setzen)")] = None,
+    mirror_url: Annotated[Optional[str], typer.Option("--mirror-url", help="URL des Mirrors im Client-Modus (z.B. http://10.0.0.5:5000)")] = None,
+    port: Annotated[int, typer.Option(help="Port des Registry-Mirrors im Server-Modus")] = 5000,
+    restart: Annotated[Optional[bool], typer.Option("--restart/--no-restart", help="Docker danach neu starten")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage (Docker wird neu gestartet)")] = False,
+):
+    """
+    Installiert einen lokalen Docker Hub Pull-Through-Cache (registry:2) und trägt ihn als Mirror ein.
+    """
+    import questionary
+
+    console.print("[bold blue]Registry Mirror (Pull-Through-Cache)[/bold blue]")
+
+    mode = prompts.select(
+        mode,
+        "Was soll eingerichtet werden?",
+        [
+            questionary.Choice("Server: Cache auf diesem Host betreiben und nutzen", value="server"),
+            questionary.Choice("Client: Bestehenden Cache im LAN nutzen", value="client"),
+        ],
+        "--mode",
+    )
+
+    if mode == "server":
+        install_dir = f"{DVM_BASE_PATH}/registry-mirror"
+        run_command(f"sudo mkdir -p {install_dir}/data", desc=f"Erstelle Installationsverzeichnis: {install_dir}")
+
+        compose_content = f"""services:
+  registry-mirror:
+    image: registry:2
+    environment:
+      REGISTRY_PROXY_REMOTEURL: https://registry-1.docker.io
+      REGISTRY_STORAGE_DELETE_ENABLED: "true"
+    ports:
+      - {port}:5000
+    volumes:
+      - {install_dir}/data:/var/lib/registry
+    restart: always
+"""
+        if not write_root_file(f"{install_dir}/docker-compose.yml", compose_content, desc="Schreibe docker-compose.yml"):
+            raise typer.Exit(code=1)
+
+        compose_cmd = get_docker_compose_cmd()
+        if not run_command(f"cd {install_dir} && sudo {compose_cmd} up -d", desc="Starte Registry Mirror"):
+            console.print("[bold red]Fehler beim Starten des Registry Mirrors.[/bold red]")
+            raise typer.Exit(code=1)
+
+        # Der lokale Daemon spricht den Cache direkt an, andere VMs über die Host-IP
+        mirror_url = f"http://127.0.0.1:{port}"
+        console.print(f"[dim]Andere VMs nutzen: dvm install registry-mirror --mode client --mirror-url http://{get_host_ip()}:{port}[/dim]")
+    elif mode == "client":
+        mirror_url = prompts.text(mirror_url, "URL des Registry Mirrors (z.B. http://192.168.178.10:5000):", "--mirror-url")
+        if not mirror_url:
+            console.print("[red]URL darf nicht leer sein![/red]")
+            raise typer.Exit(code=1)
+    else:
+        raise typer.Exit()
+
+    # registry-mirrors (und für http:// insecure-registries) in daemon.json ergänzen
+    updates = {"registry-mirrors": [mirror_url]}
+    if mirror_url.startswith("http://"):
+        updates["insecure-registries"] = [mirror_url.split("://", 1)[1].rstrip("/")]
+    if not update_daemon_json(updates):
+        console.print("[bold red]Fehler beim Speichern der daemon.json.[/bold red]")
+        raise typer.Exit(code=1)
+
+    console.print("[yellow]Docker muss neu gestartet werden, damit der Mirror aktiv wird (Container werden kurz unterbrochen).[/yellow]")
+    if prompts.confirm("Docker jetzt neu starten?", yes=yes, default=True, value=restart, option="--restart/--no-restart"):
+        run_command("sudo systemctl restart docker", desc="Starte Docker neu")
+
+    console.print(f"[bold green]Registry Mirror eingerichtet: {mirror_url}[/bold green]")
+    console.print("Messen mit: [bold cyan]dvm install registry-mirror-bench[/bold cyan]")
+
+
+@app.command("registry-mirror-bench")
+def benchmark_registry_mirror(
+    images: Annotated[Optional[List[str]], typer.Argument(help="Images für den Test (Standard: postgres:16-alpine, fnsys/dockhand:latest)")] = None,
+):
+    """
+    Vergleicht Pull-Zeiten ohne (kalt) und mit (warm) gefülltem Registry Mirror.
+    """
+    import subprocess
+    import time
+    from rich.table import Table
+
+    plan.unsupported("dvm install registry-mirror-bench")
+    images = images or ["postgres:16-alpine", "fnsys/dockhand:latest"]
+
+    mirrors = read_daemon_json().get("registry-mirrors", [])
+    if not mirrors:
+        console.print("[yellow]Kein Registry Mirror in /etc/docker/daemon.json eingetragen. Beide Pulls gehen direkt zum Docker Hub.[/yellow]")
+    else:
+        console.print(f"[dim]Aktive Mirrors: {', '.join(mirrors)}[/dim]")
+
+    def timed_pull(image):
+        start = time.perf_counter()
+        result = subprocess.run(["sudo", "docker", "pull", "-q", image], capture_output=True, text=True)
+        return time.perf_counter() - start if result.returncode == 0 else None
+
+    table = Table(title="Registry Mirror Benchmark", show_header=True, header_style="bold magenta")
+    table.add_column("Image", style="cyan")
+    table.add_column("Kalt", justify="right")
+    table.add_column("Warm", justify="right")
+    table.add_column("Faktor", justify="right", style="green")
+
+    for image in images:
+        console.print(f"[blue]Messe {image}...[/blue]")
+        # Image muss lokal fehlen, sonst misst der Pull nur den Digest-Vergleich
+        rm = subprocess.run(["sudo", "docker", "image", "rm", image], capture_output=True, text=True)
+        if rm.returncode != 0 and "No such image" not in rm.stderr:
+            console.print(f"[yellow]{image} wird von einem Container verwendet und kann nicht entfernt werden - übersprungen.[/yellow]")
+            continue
+
+        cold = timed_pull(image)
+        subprocess.run(["sudo", "docker", "image", "rm", image], capture_output=True)
+        warm = timed_pull(image)
+
+        if cold is None or warm is None:
+            table.add_row(image, "Fehler" if cold is None else f"{cold:.1f}s", "Fehler" if warm is None else f"{warm:.1f}s", "-")
+        else:
+            table.add_row(image, f"{cold:.1f}s", f"{warm:.1f}s", f"{cold / warm:.1f}x" if warm > 0 else "-")
+
+    console.print(table)
+    console.print("[dim]Hinweis: 'Kalt' ist nur dann wirklich kalt, wenn der Mirror das Image vorher noch nicht gecacht hatte.[/dim]")
+
+
+@app.command("apt-cache")
+def install_apt_cache(
+    mode: Annotated[Optional[str], typer.Option(help="'server' (Cache auf diesem Host), 'client' (Cache im LAN nutzen) oder 'disable'")] = None,
+    proxy_url: Annotated[Optional[str], typer.Option("--proxy-url", help="URL des APT-Caches im Client-Modus (z.B. http://10.0.0.5:3142)")] = None,
+    port: Annotated[int, typer.Option(help="Port des APT-Caches im Server-Modus")] = 3142,
+):
+    """
+    Richtet einen APT Caching-Proxy (apt-cacher-ng) ein oder konfiguriert apt für dessen Nutzung.
+    """
+    import questionary
+
+    console.print("[bold blue]APT Caching-Proxy (apt-cacher-ng)[/bold blue]")
+
+    proxy_conf = "/etc/apt/apt.conf.d/01dvm-proxy"
+    detect_script = "/usr/local/bin/dvm-apt-proxy-detect"
+
+    mode = prompts.select(
+        mode,
+        "Was soll eingerichtet werden?",
+        [
+            questionary.Choice("Server: Cache auf diesem Host betreiben und nutzen", value="server"),
+            questionary.Choice("Client: Bestehenden Cache im LAN nutzen", value="client"),
+            questionary.Choice("Deaktivieren: apt wieder direkt ins Internet", value="disable"),
+        ],
+        "--mode",
+    )
+
+    if mode == "disable":
+        run_command(f"sudo rm -f {proxy_conf} {detect_script}", desc="Entferne APT Proxy Konfiguration")
+        console.print("[bold green]APT nutzt wieder direkte Verbindungen.[/bold green]")
+        return
+
+    if mode == "server":
+        install_dir = f"{DVM_BASE_PATH}/apt-cache"
+        run_command(f"sudo mkdir -p {install_dir}/cache", desc=f"Erstelle Installationsverzeichnis: {install_dir}")
+
+        compose_content = f"""services:
+  apt-cacher-ng:
+    image: sameersbn/apt-cacher-ng:latest
+    ports:
+      - {port}:3142
+    volumes:
+      - {install_dir}/cache:/var/cache/apt-cacher-ng
+    restart: always
+"""
+        if not write_root_file(f"{install_dir}/docker-compose.yml", compose_content, desc="Schreibe docker-compose.yml"):
+            raise typer.Exit(code=1)
+
+        compose_cmd = get_docker_compose_cmd()
+        if not run_command(f"cd {install_dir} && sudo {compose_cmd} up -d", desc="Starte apt-cacher-ng"):
+            console.print("[bold red]Fehler beim Starten des APT-Caches.[/bold red]")
+            raise typer.Exit(code=1)
+
+        proxy_url = f"http://127.0.0.1:{port}"
+        console.print(f"[dim]Andere VMs nutzen: dvm install apt-cache --mode client --proxy-url http://{get_host_ip()}:{port}[/dim]")
+    elif mode == "client":
+        proxy_url = prompts.text(proxy_url, "URL des APT-Caches (z.B. http://192.168.178.10:3142):", "--proxy-url")
+        if not proxy_url:
+            console.print("[red]URL darf nicht leer sein![/red]")
+            raise typer.Exit(code=1)
+    else:
+        raise typer.Exit()
+
+    # Proxy nur nutzen, wenn er erreichbar ist - sonst würden apt-Aufrufe bei
+    # ausgefallenem Cache hängen bzw. fehlschlagen.
+    host_port = proxy_url.split("://", 1)[-1].rstrip("/")
+    proxy_host, _, proxy_port = host_port.partition(":")
+    detect_content = f"""#!/bin/bash
+# Erstellt von dvm install apt-cache
+if timeout 1 bash -c "</dev/tcp/{proxy_host}/{proxy_port or 3142}" 2>/dev/null; then
+    echo "{proxy_url}"
+else
+    echo "DIRECT"
+fi
+"""
+    if not write_root_file(detect_script, detect_content, desc="Schreibe Proxy-Erkennungsskript", mode="755"):
+        raise typer.Exit(code=1)
+
+    # HTTPS-Quellen (z.B. Docker, NVIDIA) kann apt-cacher-ng nicht cachen -> direkt
+    conf_content = f'Acquire::http::Proxy-Auto-Detect "{detect_script}";\nAcquire::https::Proxy "DIRECT";\n'
+    if not write_root_file(proxy_conf, conf_content, desc="Schreibe APT Proxy Konfiguration", mode="644"):
+        raise typer.Exit(code=1)
+
+    console.print(f"[bold green]APT nutzt jetzt den Cache unter {proxy_url} (Fallback: direkt).[/bold green]")
+
+
 @app.command("gdu")
 def install_gdu():
     """
@@ -455,7 +860,7 @@ def install_gdu():
     """
     console.print("[bold blue]Installiere gdu...[/bold blue]")
     
-    if run_command("sudo apt update && sudo apt install -y gdu", desc="Installiere gdu"):
+    if apt_install(["gdu"], desc="Installiere gdu"):
         console.print("[bold green]gdu erfolgreich installiert![/bold green]")
         console.print("Starte es mit dem Befehl: [bold cyan]gdu[/bold cyan]")
     else:
@@ -463,22 +868,24 @@ def install_gdu():
         raise typer.Exit(code=1)
 
 @app.command("netbird")
-def install_netbird():
+def install_netbird(
+    setup_key: Annotated[Optional[str], typer.Option("--setup-key", envvar="DVM_NETBIRD_SETUP_KEY", help="Setup Key für die automatische Anmeldung")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage installieren (Standardwerte verwenden)")] = False,
+):
     """
     Installiert den Netbird VPN Client.
     """
-    import questionary
-    
     console.print("[bold blue]Installiere Netbird...[/bold blue]")
     
-    if not questionary.confirm("Möchtest du Netbird installieren?").ask():
+    if not prompts.confirm("Möchtest du Netbird installieren?", yes=yes):
         raise typer.Exit()
         
     cmd = "curl -fsSL https://pkgs.netbird.io/install.sh | sh"
     if run_command(cmd, desc="Führe Netbird Installationsskript aus"):
         console.print("[bold green]Netbird erfolgreich installiert![/bold green]")
         
-        setup_key = questionary.text("Setup Key (optional, leer lassen für manuellen/interaktiven Login):").ask()
+        setup_key = prompts.text(setup_key, "Setup Key (optional, leer lassen für manuellen/interaktiven Login):", "--setup-key",
+                                 yes=yes, required=False)
         
         if setup_key:
             if run_command(f"sudo netbird up --setup-key {setup_key}", desc="Verbinde Netbird mit Setup Key"):
@@ -1,40 +1,73 @@
 
 import typer
 import questionary
+from typing import Annotated, List, Optional
+from dockervm_cli import prompts
 from dockervm_cli.utils import run_command, console, print_header
 
 app = typer.Typer(help="Netzwerkeinstellungen konfigurieren.")
 
 @app.command("ip")
-def configure_static_ip():
+def configure_static_ip(
+    ip_address: Annotated[Optional[str], typer.Option("--ip", help="IP Adresse mit Präfix, z.B. 192.168.178.200/24")] = None,
+    gateway: Annotated[Optional[str], typer.Option("--gateway", help="Gateway, z.B. 192.168.178.1")] = None,
+    dns: Annotated[Optional[str], typer.Option("--dns", help="DNS Server (kommagetrennt)")] = None,
+    interface: Annotated[Optional[str], typer.Option("--interface", help="Netzwerk-Interface (Standard: Interface mit der Default-Route)")] = None,
+    timeout: Annotated[int, typer.Option("--timeout", help="Sekunden für die Verbindungsprüfung, danach automatische Wiederherstellung")] = 30,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage anwenden")] = False,
+):
     """
-    Konfiguriert eine statische IP via Netplan (Interaktiv).
+    Konfiguriert eine statische IP via Netplan (Interaktiv oder per Optionen).
     """
-    
+    from dockervm_cli import netinfo, netplan, plan
+    from dockervm_cli.utils import print_error
+
     console.print("[bold blue]Konfiguration Statische IP (Netplan)[/bold blue]")
-    
-    # 1. Ask for details
-    ip_address = questionary.text("IP Adresse (z.B. 192.168.178.200/24):").ask()
-    gateway = questionary.text("Gateway (z.B. 192.168.178.1):").ask()
-    dns = questionary.text("DNS Server (kommagetrennt, z.B. 1.1.1.1,8.8.8.8):").ask()
+    # Ob die neue Konfiguration behalten wird, entscheiden erst die Prüfungen nach dem Anwenden
+    plan.unsupported("network ip")
+
+    # 1. Interface ermitteln (Default-Route statt fest "eth0")
+    interfaces = netinfo.discover()
+    usable = netinfo.candidates(interfaces)
+    if interface is not None and interface not in {i["name"] for i in interfaces}:
+        print_error(f"Interface {interface} existiert nicht (vorhanden: {', '.join(i['name'] for i in usable) or '-'}).")
+        raise typer.Exit(code=1)
+    if not usable and interface is None:
+        print_error("Kein passendes Netzwerk-Interface gefunden, bitte mit --interface angeben.")
+        raise typer.Exit(code=1)
+
+    def _label(i):
+        details = ", ".join(filter(None, [", ".join(i["addresses"]), i["operstate"], i["mac"], "Default-Route" if i["default"] else ""]))
+        return f"{i['name']} ({details})"
+
+    if interface is None:
+        default = netinfo.default_interface(usable) or usable[0]
+        interface = prompts.select(None, "Netzwerk-Interface:", [questionary.Choice(_label(i), value=i["name"]) for i in usable],
+                                   "--interface", default=default["name"], yes=yes)
+    current = next(i for i in interfaces if i["name"] == interface)
+
+    # 2. Ask for details (nur fehlende Werte, vorbelegt mit der aktuellen Konfiguration)
+    current_dns = netinfo.current_nameservers()
+    ip_address = prompts.text(ip_address, "IP Adresse (z.B. 192.168.178.200/24):", "--ip",
+                              default=current["addresses"][0] if current["addresses"] else None, yes=yes)
+    gateway = prompts.text(gateway, "Gateway (z.B. 192.168.178.1):", "--gateway", default=current["gateway"], yes=yes)
+    dns = prompts.text(dns, "DNS Server (kommagetrennt, z.B. 1.1.1.1,8.8.8.8):", "--dns",
+                       default=",".join(current_dns) if current_dns else None, yes=yes)
     
     if not ip_address or not gateway or not dns:
         console.print("[red]Alle Felder müssen ausgefüllt werden![/red]")
         raise typer.Exit(code=1)
-        
-    dns_list = [d.strip() for d in dns.split(",")]
+
+    dns_list = [d.strip() for d in dns.split(",") if d.strip()]
+    try:
+        # Normalisiert, z.B. 192.168.1.5/255.255.255.0 -> 192.168.1.5/24 (so steht es auch in 'ip addr')
+        ip_address = str(netinfo.validate(ip_address, gateway, dns_list))
+    except netinfo.NetConfigError as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
     dns_formatted = str(dns_list).replace("'", '"')
     
-    # 2. Backup existing netplan
-    console.print("[blue]Erstelle Backup der bestehenden Netplan Konfiguration...[/blue]")
-    run_command("sudo mkdir -p /etc/netplan/backup", desc="Erstelle Backup Verzeichnis")
-    run_command("sudo cp /etc/netplan/*.yaml /etc/netplan/backup/", desc="Kopiere YAML Dateien")
-    
     # 3. Create new config
-    # Note: We hardcode 'eth0' here for simplicity based on the old script, 
-    # but a robust solution would list interfaces.
-    interface = "eth0" 
-    
     netplan_content = f"""network:
   version: 2
   ethernets:
@@ -50,103 +83,113 @@ def configure_static_ip():
     
     console.print(f"\n[cyan]Vorschau der neuen Konfiguration:[/cyan]\n{netplan_content}")
     
-    if questionary.confirm("Möchtest du diese Konfiguration anwenden?").ask():
-        try:
-            with open("01-netcfg.yaml", "w") as f:
-                f.write(netplan_content)
-            
-            # Move and Apply
-            run_command("sudo rm -f /etc/netplan/*.yaml", desc="Entferne alte Konfigurationen")
-            run_command(f"sudo mv 01-netcfg.yaml /etc/netplan/01-netcfg.yaml", desc="Schreibe neue Konfiguration")
-            run_command("sudo chmod 600 /etc/netplan/01-netcfg.yaml", desc="Setze Berechtigungen")
-            
-            if run_command("sudo netplan apply", desc="Wende Netplan an"):
-                console.print("[bold green]Netzwerk erfolgreich konfiguriert![/bold green]")
-            else:
-                console.print("[bold red]Fehler beim Anwenden von Netplan. Stelle Backup wieder her...[/bold red]")
-                run_command("sudo cp /etc/netplan/backup/*.yaml /etc/netplan/", desc="Stelle Backup wieder her")
-                run_command("sudo netplan apply", desc="Wende Backup an")
-        except Exception as e:
-            console.print(f"[bold red]Fehler: {e}[/bold red]")
-    else:
+    if not prompts.confirm("Möchtest du diese Konfiguration anwenden?", yes=yes):
         console.print("[yellow]Abgebrochen.[/yellow]")
+        return
+
+    # 4. Apply with automatic rollback (wie 'netplan try', bestätigt durch eigene Prüfungen)
+    console.print(f"[blue]Wende Konfiguration an und prüfe Verbindung (max. {timeout}s)...[/blue]")
+    result = netplan.safe_apply(netplan_content, interface, ip_address, gateway, dns_list, timeout=timeout)
+    if not result["armed"]:
+        console.print("[yellow]Automatische Wiederherstellung per systemd Timer nicht verfügbar - nur Rückfall durch dvm selbst.[/yellow]")
+
+    labels = {"address": f"Adresse {ip_address} auf {interface}", "gateway": f"Gateway {gateway} erreichbar", "dns": f"DNS Auflösung über {', '.join(dns_list)}"}
+    for name, (ok, attempts, seconds) in result["probes"].items():
+        mark = "[green]✔[/green]" if ok else "[red]✘[/red]"
+        console.print(f"  {mark} {labels[name]} [dim]({attempts} Versuch(e), {seconds:.1f}s)[/dim]")
+
+    if result["ok"]:
+        console.print("[bold green]Netzwerk erfolgreich konfiguriert![/bold green]")
+        console.print(f"[dim]Backup: {result['backup']}[/dim]")
+        return
+    if result["error"]:
+        print_error(result["error"])
+    if result["rolled_back"]:
+        print_error(f"Neue Konfiguration verworfen, vorherige Konfiguration aus {result['backup']} wiederhergestellt.")
+    else:
+        print_error(f"Wiederherstellung fehlgeschlagen! Backup liegt unter {result['backup']} (der systemd Timer versucht es erneut).")
+    raise typer.Exit(code=1)
 
 @app.command("ipvlan")
-def configure_ipvlan():
+def configure_ipvlan(
+    subnet: Annotated[Optional[str], typer.Option("--subnet", help="Subnetz, z.B. 192.168.178.0/24")] = None,
+    gateway: Annotated[Optional[str], typer.Option("--gateway", help="Gateway, z.B. 192.168.178.1")] = None,
+    parent: Annotated[Optional[str], typer.Option("--parent", help="Parent Interface (Standard: eth0)")] = None,
+    net_name: Annotated[Optional[str], typer.Option("--name", help="Netzwerkname (Standard: ipvlan_network)")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage erstellen")] = False,
+):
     """
     Richtet ein Docker IPVLAN Netzwerk ein.
     """
     
     console.print("[bold blue]IPVLAN Einrichtung[/bold blue]")
     
-    subnet = questionary.text("Subnetz (z.B. 192.168.178.0/24):").ask()
-    gateway = questionary.text("Gateway (z.B. 192.168.178.1):").ask()
-    parent = questionary.text("Parent Interface (z.B. eth0):", default="eth0").ask()
-    net_name = questionary.text("Netzwerkname:", default="ipvlan_network").ask()
+    subnet = prompts.text(subnet, "Subnetz (z.B. 192.168.178.0/24):", "--subnet", yes=yes)
+    gateway = prompts.text(gateway, "Gateway (z.B. 192.168.178.1):", "--gateway", yes=yes)
+    parent = prompts.text(parent, "Parent Interface (z.B. eth0):", "--parent", default="eth0", yes=yes)
+    net_name = prompts.text(net_name, "Netzwerkname:", "--name", default="ipvlan_network", yes=yes)
     
     cmd = f"docker network create -d ipvlan --subnet={subnet} --gateway={gateway} -o parent={parent} {net_name}"
     
     console.print(f"\n[cyan]Befehl:[/cyan] {cmd}")
     
-    if questionary.confirm("Soll das Netzwerk erstellt werden?").ask():
+    if prompts.confirm("Soll das Netzwerk erstellt werden?", yes=yes):
         if run_command(cmd, desc=f"Erstelle Docker Netzwerk '{net_name}'"):
             console.print(f"[bold green]IPVLAN Netzwerk '{net_name}' erstellt![/bold green]")
         else:
             console.print("[bold red]Fehler beim Erstellen des Netzwerks.[/bold red]")
 
 @app.command("create")
-def create_network():
+def create_network(
+    net_name: Annotated[Optional[str], typer.Option("--name", help="Netzwerkname")] = None,
+    driver: Annotated[Optional[str], typer.Option("--driver", help="bridge, overlay oder macvlan")] = None,
+    subnet: Annotated[Optional[str], typer.Option("--subnet", help="Subnetz, z.B. 172.20.0.0/16")] = None,
+    gateway: Annotated[Optional[str], typer.Option("--gateway", help="Gateway, z.B. 172.20.0.1")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage erstellen (Standard-Treiber: bridge)")] = False,
+):
     """
     Erstellt ein Docker Netzwerk (für external: true in docker-compose).
     """
-    import subprocess
-    
     console.print("[bold blue]Docker Netzwerk erstellen[/bold blue]")
     
-    # Show existing networks
-    console.print("\n[yellow]Bestehende Docker Netzwerke:[/yellow]")
-    run_command("sudo docker network ls --format 'table {{.Name}}\t{{.Driver}}\t{{.Scope}}'", desc="Lade Netzwerke")
-    
-    console.print("")
-    
     # Predefined or custom network name
     PREDEFINED_NETWORKS = [
         "nginx-proxy-network",
     ]
     
-    choices = [questionary.Choice(name, value=name) for name in PREDEFINED_NETWORKS]
-    choices.append(questionary.Choice("Eigenen Namen eingeben...", value="__custom__"))
-    
-    net_name = questionary.select(
-        "Netzwerk auswählen:",
-        choices=choices
-    ).ask()
-    
-    if net_name == "__custom__":
-        net_name = questionary.text("Netzwerkname:").ask()
+    if net_name is None:
+        # Show existing networks
+        console.print("\n[yellow]Bestehende Docker Netzwerke:[/yellow]")
+        run_command("sudo docker network ls --format 'table {{.Name}}\t{{.Driver}}\t{{.Scope}}'", desc="Lade Netzwerke")
+        console.print("")
+
+        choices = [questionary.Choice(name, value=name) for name in PREDEFINED_NETWORKS]
+        choices.append(questionary.Choice("Eigenen Namen eingeben...", value="__custom__"))
+        net_name = prompts.select(None, "Netzwerk auswählen:", choices, "--name", yes=yes)
+        if net_name == "__custom__":
+            net_name = prompts.text(None, "Netzwerkname:", "--name")
     
     if not net_name:
         console.print("[red]Name darf nicht leer sein![/red]")
         raise typer.Exit(code=1)
     
     # Driver selection
-    driver = questionary.select(
+    driver = prompts.select(
+        driver,
         "Netzwerk-Treiber:",
-        choices=[
+        [
             questionary.Choice("bridge (Standard, für Container auf dem gleichen Host)", value="bridge"),
             questionary.Choice("overlay (Für Docker Swarm / Multi-Host)", value="overlay"),
             questionary.Choice("macvlan (Container bekommt eigene MAC-Adresse)", value="macvlan"),
-        ]
-    ).ask()
+        ],
+        "--driver", default="bridge" if yes else None, yes=yes
+    )
     
-    # Optional: Subnet & Gateway
-    configure_subnet = questionary.confirm("Möchtest du Subnetz und Gateway konfigurieren?", default=False).ask()
-    
-    subnet = None
-    gateway = None
-    if configure_subnet:
-        subnet = questionary.text("Subnetz (z.B. 172.20.0.0/16):").ask()
-        gateway = questionary.text("Gateway (z.B. 172.20.0.1):").ask()
+    # Optional: Subnet & Gateway (nur fragen, wenn keines per Option übergeben wurde)
+    if subnet is None and gateway is None and not yes:
+        if prompts.confirm("Möchtest du Subnetz und Gateway konfigurieren?", default=False):
+            subnet = prompts.text(None, "Subnetz (z.B. 172.20.0.0/16):", "--subnet")
+            gateway = prompts.text(None, "Gateway (z.B. 172.20.0.1):", "--gateway")
     
     # Build command
     cmd = f"sudo docker network create -d {driver}"
@@ -158,7 +201,7 @@ def create_network():
     
     console.print(f"\n[cyan]Befehl:[/cyan] {cmd}")
     
-    if questionary.confirm("Soll das Netzwerk erstellt werden?").ask():
+    if prompts.confirm("Soll das Netzwerk erstellt werden?", yes=yes):
         if run_command(cmd, desc=f"Erstelle Netzwerk '{net_name}'"):
             console.print(f"[bold green]Netzwerk '{net_name}' erfolgreich erstellt![/bold green]")
             console.print(f"\n[yellow]Verwende es in docker-compose.yml:[/yellow]")
@@ -179,3 +222,49 @@ def list_networks():
     """
     console.print("[bold blue]Docker Netzwerke[/bold blue]\n")
     run_command("sudo docker network ls --format 'table {{.Name}}\t{{.Driver}}\t{{.Scope}}'", desc="Lade Netzwerke")
+
+
+@app.command("ports")
+def list_ports(
+    check_ports: Annotated[Optional[List[str]], typer.Option("--check", help="Nur diese Ports prüfen, z.B. 53/udp oder 8080 (mehrfach möglich, Exit-Code 1 bei Konflikt)")] = None,
+    processes: Annotated[bool, typer.Option("--processes/--no-processes", help="Prozesse zu lauschenden Sockets ermitteln (braucht root für fremde Prozesse)")] = True,
+):
+    """
+    Zeigt belegte Ports: lauschende Sockets, veröffentlichte Container-Ports und Ports aus Compose-Dateien.
+    """
+    from rich.table import Table
+    from dockervm_cli import ports
+    from dockervm_cli.utils import print_error, print_success
+
+    index = ports.build_index(owners=processes and not check_ports)
+
+    if check_ports:
+        wanted = []
+        for item in check_ports:
+            port, _, protocol = item.partition("/")
+            if not port.isdigit() or protocol not in ("", "tcp", "udp"):
+                print_error(f"Ungültiger Port: {item} (erwartet z.B. 8080 oder 53/udp)")
+                raise typer.Exit(code=1)
+            wanted.append((int(port), protocol or "tcp"))
+        taken = ports.check(wanted, index=index)
+        for line in ports.conflict_lines(taken):
+            console.print(f"[red]belegt[/red] {line}")
+        busy = {(port, protocol) for port, protocol, _ in taken}
+        for port, protocol in wanted:
+            if (port, protocol) not in busy:
+                print_success(f"{port}/{protocol} ist frei.")
+        if taken:
+            raise typer.Exit(code=1)
+        return
+
+    table = Table(title="Belegte Ports", show_header=True, header_style="bold magenta")
+    table.add_column("Port", justify="right", style="cyan")
+    table.add_column("Proto")
+    table.add_column("Adresse")
+    table.add_column("Quelle")
+    table.add_column("Belegt durch")
+    labels = {"host": "Socket", "container": "Container", "compose": "Compose-Datei"}
+    for (port, protocol), entries in sorted(index.items()):
+        for entry in entries:
+            table.add_row(str(port), protocol, entry["address"] or "*", labels[entry["source"]], entry.get("owner") or "-")
+    console.print(table)
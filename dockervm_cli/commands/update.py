@@ -2,12 +2,48 @@ import typer
 import os
 import sys
 import subprocess
-from dockervm_cli.utils import run_command, console, get_docker_compose_cmd, DVM_BASE_PATH
+from typing import Annotated, List, Optional
+from dockervm_cli import cache, prompts
+from dockervm_cli.apt import apt_install, apt_update
+from dockervm_cli.utils import run_command, console, get_docker_compose_cmd, write_root_file, DVM_BASE_PATH
 
 app = typer.Typer(help="System- und Anwendungs-Updates verwalten.")
 
+# Vorauswahl der Blacklist (NVIDIA Treiber und CUDA), wenn ohne Dialog konfiguriert wird
+DEFAULT_BLACKLIST = ["nvidia-driver", "libnvidia-.*", "cuda", "libcuda.*"]
+
+BLACKLIST_FILE = "/etc/apt/apt.conf.d/51unattended-upgrades-blacklist"
+
+
+def blacklisted_packages(patterns: list, installed_packages: list) -> list:
+    """
+    Installierte Pakete, auf die eines der Blacklist-Muster passt (re.match), in dpkg-Reihenfolge.
+    Alle gültigen Muster werden zu einem Ausdruck zusammengefasst, damit jedes Paket nur
+    einmal geprüft wird statt einmal pro Muster.
+    """
+    import re
+
+    valid = []
+    for pattern in patterns:
+        try:
+            re.compile(pattern)
+            valid.append(pattern)
+        except re.error as regex_err:
+            console.print(f"[red]Ungültiges Regex-Muster '{pattern}': {regex_err}[/red]")
+    if not valid:
+        return []
+    try:
+        regexes = [re.compile("|".join(f"(?:{p})" for p in valid))]
+    except re.error:
+        # z.B. Rückverweise, die in der Kombination auf eine andere Gruppe zeigen würden
+        regexes = [re.compile(p) for p in valid]
+    return list(dict.fromkeys(pkg for pkg in installed_packages if any(r.match(pkg) for r in regexes)))
+
 @app.command("system")
-def update_system():
+def update_system(
+    refresh: Annotated[bool, typer.Option("--refresh", help="Paketlisten immer neu laden, auch wenn sie noch frisch sind")] = False,
+    ignore_blacklist: Annotated[Optional[bool], typer.Option("--ignore-blacklist/--respect-blacklist", help="Pakete der Blacklist trotzdem aktualisieren")] = None,
+):
     """
     Aktualisiert Ubuntu Systempakete und Kernel.
     Entspricht apt update && apt upgrade.
@@ -17,7 +53,7 @@ def update_system():
     console.print("[bold green]Starte System-Update...[/bold green]")
     
     # Apply Blacklist Holds from Unattended-Upgrades Config
-    blacklist_file = "/etc/apt/apt.conf.d/51unattended-upgrades-blacklist"
+    blacklist_file = BLACKLIST_FILE
     console.print(f"[dim]Prüfe Blacklist-Datei: {blacklist_file}[/dim]")
     
     if os.path.exists(blacklist_file):
@@ -40,23 +76,11 @@ def update_system():
                 installed_packages = result.stdout.splitlines()
                 console.print(f"[dim]Installierte Pakete: {len(installed_packages)}[/dim]")
                 
-                packages_to_hold = []
-                for pattern in matches:
-                    try:
-                        regex = re.compile(pattern)
-                        for pkg in installed_packages:
-                            if regex.match(pkg):
-                                packages_to_hold.append(pkg)
-                    except re.error as regex_err:
-                        console.print(f"[red]Ungültiges Regex-Muster '{pattern}': {regex_err}[/red]")
-                
+                packages_to_hold = blacklisted_packages(matches, installed_packages)
                 if packages_to_hold:
-                    # Deduplicate
-                    packages_to_hold = list(set(packages_to_hold))
-                    
                     console.print(f"[yellow]Folgende Pakete auf der Blacklist wurden gefunden:[/yellow] {', '.join(packages_to_hold)}")
-                    import questionary
-                    if questionary.confirm("Möchtest du diese Pakete trotzdem aktualisieren? (Blacklist ignorieren)", default=False).ask():
+                    if prompts.confirm("Möchtest du diese Pakete trotzdem aktualisieren? (Blacklist ignorieren)", default=False, value=ignore_blacklist,
+                                       option="--ignore-blacklist/--respect-blacklist"):
                         console.print("[red]Entferne Hold für Update...[/red]")
                         unhold_cmd = f"sudo apt-mark unhold {' '.join(packages_to_hold)}"
                         run_command(unhold_cmd, desc="Entferne Hold Status")
@@ -80,8 +104,8 @@ def update_system():
     run_command("sudo apt clean -y", desc="Bereinige apt Cache")
     run_command("sudo apt autoremove -y", desc="Entferne ungenutzte Pakete")
     
-    # 2. Update
-    if not run_command("sudo apt update -y", desc="Aktualisiere Paketlisten"):
+    # 2. Update (nur wenn Quellen geändert oder Listen veraltet sind)
+    if not apt_update(force=refresh):
         raise typer.Exit(code=1)
     
     # 3. Upgrade
@@ -92,11 +116,14 @@ def update_system():
 
 
 @app.command("self")
-def update_self():
+def update_self(
+    force: Annotated[bool, typer.Option("--force", help="Immer vollständig neu installieren, auch ohne Änderungen")] = False,
+):
     """
     Aktualisiert das dvm CLI Tool selbst via Git und reinstalliert es.
     """
     import os
+    import time
     
     # Read repo path saved during setup.sh installation
     repo_path_file = "/etc/dvm/repo_path"
@@ -113,77 +140,125 @@ def update_self():
     
     console.print(f"[bold blue]Aktualisiere dvm CLI... ({repo_dir})[/bold blue]")
     
+    phases = []
+    
+    def git(*args):
+        result = subprocess.run(["git", "-C", repo_dir, *args], capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ""
+    
+    def print_phases():
+        console.print("[dim]Dauer: " + ", ".join(f"{name} {secs:.1f}s" for name, secs in phases) + "[/dim]")
+    
+    # 1. Lokalen HEAD mit origin/main vergleichen (ohne fetch, nur ls-remote)
+    t = time.perf_counter()
+    local_head = git("rev-parse", "HEAD")
+    remote_head = git("ls-remote", "origin", "refs/heads/main").split("\t")[0]
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    phases.append(("Remote prüfen", time.perf_counter() - t))
+    
+    if not force and local_head and remote_head == local_head and not dirty:
+        console.print(f"[bold green]dvm ist bereits aktuell ({local_head[:7]}). Nichts zu tun.[/bold green]")
+        print_phases()
+        return
+    
+    t = time.perf_counter()
     update_cmd = f"cd {repo_dir} && git fetch origin && git reset --hard origin/main && git clean -fd"
-    if run_command(update_cmd, desc="Ziehe neueste Änderungen von Git (Erzwinge Sync mit main)"):
-        # Use sys.executable to ensure we use the same python environment as the running script
-        python_exe = sys.executable
+    if not run_command(update_cmd, desc="Ziehe neueste Änderungen von Git (Erzwinge Sync mit main)"):
+        console.print("[bold red]Fehler beim Git Pull.[/bold red]")
+        raise typer.Exit(code=1)
+    new_head = git("rev-parse", "HEAD")
+    phases.append(("Git Sync", time.perf_counter() - t))
+    
+    # Abhängigkeiten nur neu auflösen, wenn sich requirements.txt oder setup.py geändert haben
+    deps_changed = force or not local_head or bool(
+        git("diff", "--name-only", local_head, new_head, "--", "requirements.txt", "setup.py")
+    )
+    if local_head and new_head:
+        console.print(f"[dim]{local_head[:7]} -> {new_head[:7]} (Abhängigkeiten {'geändert' if deps_changed else 'unverändert'})[/dim]")
+    
+    # Use sys.executable to ensure we use the same python environment as the running script
+    python_exe = sys.executable
+    
+    t = time.perf_counter()
+    # Find a mount with sufficient free space for pip's temp files.
+    # This is needed when /tmp (on root FS) is full.
+    pip_env = os.environ.copy()
+    try:
+        df_result = subprocess.run(
+            ["df", "-x", "tmpfs", "-x", "devtmpfs", "-x", "overlay", "-x", "squashfs", "--output=avail,target", "-B1"],
+            capture_output=True, text=True
+        )
+        best_mount = None
+        best_avail = 0
+        for line in df_result.stdout.strip().splitlines()[1:]:
+            parts = line.split()
+            if len(parts) >= 2:
+                try:
+                    avail = int(parts[0])
+                    mount = parts[1]
+                    if mount == "/" :
+                        continue  # skip root if it's full
+                    if avail > best_avail:
+                        best_avail = avail
+                        best_mount = mount
+                except ValueError:
+                    pass
         
-        # Find a mount with sufficient free space for pip's temp files.
-        # This is needed when /tmp (on root FS) is full.
-        pip_env = os.environ.copy()
+        # Only redirect TMPDIR if we found a better location with >500MB free
+        if best_mount and best_avail > 500 * 1024 * 1024:
+            tmp_dir = os.path.join(best_mount, ".pip_tmp")
+            os.makedirs(tmp_dir, exist_ok=True)
+            pip_env["TMPDIR"] = tmp_dir
+            console.print(f"[dim]Verwende temporäres Verzeichnis auf {best_mount} (TMPDIR={tmp_dir})[/dim]")
+    except Exception as e:
+        console.print(f"[dim]TMPDIR-Erkennung fehlgeschlagen, verwende Standard: {e}[/dim]")
+    
+    # Ensure uv is installed (aus /var/cache/dvm/bin, falls schon einmal geladen)
+    if not cache.ensure_uv():
+        raise typer.Exit(code=1)
+    phases.append(("Vorbereitung", time.perf_counter() - t))
+    
+    t = time.perf_counter()
+    if deps_changed:
+        install_args = f"--python {python_exe} --reinstall ."
+    else:
+        # Nur das dvm Paket selbst neu installieren, Abhängigkeiten bleiben unangetastet
+        install_args = f"--python {python_exe} --no-deps --reinstall-package dockervm ."
+    returncode = cache.uv_pip_install(repo_dir, install_args, env=pip_env)
+    phases.append(("Installation", time.perf_counter() - t))
+    
+    # Cleanup temp dir if we created one
+    if "TMPDIR" in pip_env:
         try:
-            df_result = subprocess.run(
-                ["df", "-x", "tmpfs", "-x", "devtmpfs", "-x", "overlay", "-x", "squashfs", "--output=avail,target", "-B1"],
-                capture_output=True, text=True
-            )
-            best_mount = None
-            best_avail = 0
-            for line in df_result.stdout.strip().splitlines()[1:]:
-                parts = line.split()
-                if len(parts) >= 2:
-                    try:
-                        avail = int(parts[0])
-                        mount = parts[1]
-                        if mount == "/" :
-                            continue  # skip root if it's full
-                        if avail > best_avail:
-                            best_avail = avail
-                            best_mount = mount
-                    except ValueError:
-                        pass
-            
-            # Only redirect TMPDIR if we found a better location with >500MB free
-            if best_mount and best_avail > 500 * 1024 * 1024:
-                tmp_dir = os.path.join(best_mount, ".pip_tmp")
-                os.makedirs(tmp_dir, exist_ok=True)
-                pip_env["TMPDIR"] = tmp_dir
-                console.print(f"[dim]Verwende temporäres Verzeichnis auf {best_mount} (TMPDIR={tmp_dir})[/dim]")
-        except Exception as e:
-            console.print(f"[dim]TMPDIR-Erkennung fehlgeschlagen, verwende Standard: {e}[/dim]")
-        
-        # Ensure uv is installed
-        if subprocess.run("command -v uv", shell=True, capture_output=True).returncode != 0:
-            console.print("[dim]Installiere uv (Fast Python Package Installer)...[/dim]")
-            subprocess.run("curl -LsSf https://astral.sh/uv/install.sh | sudo env CARGO_DIST_FORCE_INSTALL_DIR=/usr/local/bin sh", shell=True, check=True)
-
-        install_cmd = f"cd {repo_dir} && uv pip install --python {python_exe} --reinstall ."
-        result = subprocess.run(install_cmd, shell=True, env=pip_env)
-        
-        # Cleanup temp dir if we created one
-        if "TMPDIR" in pip_env:
-            try:
-                import shutil
-                shutil.rmtree(pip_env["TMPDIR"], ignore_errors=True)
-            except Exception:
-                pass
-        
-        if result.returncode == 0:
-            console.print("[bold green]Update erfolgreich! Bitte starten Sie das CLI neu.[/bold green]")
-        else:
-            console.print("[bold red]Fehler bei der Installation des Updates.[/bold red]")
-            raise typer.Exit(code=1)
+            import shutil
+            shutil.rmtree(pip_env["TMPDIR"], ignore_errors=True)
+        except Exception:
+            pass
+    
+    print_phases()
+    if returncode == 0:
+        console.print("[bold green]Update erfolgreich! Bitte starten Sie das CLI neu.[/bold green]")
     else:
-        console.print("[bold red]Fehler beim Git Pull.[/bold red]")
+        console.print("[bold red]Fehler bei der Installation des Updates.[/bold red]")
         raise typer.Exit(code=1)
 
 
 @app.command("cron")
-def configure_self_cron():
+def configure_self_cron(
+    backend: Annotated[str, typer.Option("--backend", help="cron oder systemd (Timer mit RandomizedDelaySec)")] = "cron",
+    random_delay: Annotated[int, typer.Option("--random-delay", help="Maximale zufällige Verzögerung in Minuten (verteilt Flotten-Updates)")] = 15,
+    frequency: Annotated[Optional[str], typer.Option("--frequency", help="daily, weekly oder off")] = None,
+):
     """
-    Konfiguriert einen Cron-Job für automatische Self-Updates.
+    Konfiguriert einen Cron-Job (oder systemd Timer) für automatische Self-Updates.
     """
     import questionary
     import getpass
+    from dockervm_cli import scheduler
+
+    if backend not in ("cron", "systemd"):
+        console.print(f"[bold red]Unbekanntes Backend: {backend} (erlaubt: cron, systemd)[/bold red]")
+        raise typer.Exit(code=1)
     
     console.print("[bold blue]Konfiguration automatischer Self-Updates (Cron)[/bold blue]")
     
@@ -204,68 +279,39 @@ def configure_self_cron():
     log_file = f"/home/{user}/dvm_update.log" if user != "root" else "/var/log/dvm_update.log"
     
     # 1. Frequency
-    frequency = questionary.select(
+    frequency = prompts.select(
+        frequency,
         "Wie oft sollen Updates geprüft werden?",
-        choices=[
-            "Täglich (um 04:00 Uhr)",
-            "Wöchentlich (Sonntags um 04:00 Uhr)",
-            "Deaktivieren (Cron entfernen)"
-        ]
-    ).ask()
-    
+        [
+            questionary.Choice("Täglich (um 04:00 Uhr)", value="daily"),
+            questionary.Choice("Wöchentlich (Sonntags um 04:00 Uhr)", value="weekly"),
+            questionary.Choice("Deaktivieren (Cron entfernen)", value="off"),
+        ],
+        "--frequency",
+    )
+
     cron_cmd = f"{dvm_path} update self >> {log_file} 2>&1"
-    
-    # 2. Manage Crontab
-    try:
-        # Get current crontab
-        result = subprocess.run("crontab -l", shell=True, capture_output=True, text=True)
-        current_crontab = result.stdout.strip().splitlines()
-        
-        # Filter out existing dvm update jobs
-        new_crontab = [line for line in current_crontab if "dvm update self" not in line]
-        
-        if frequency == "Deaktivieren (Cron entfernen)":
-            if len(new_crontab) < len(current_crontab):
-                console.print("[yellow]Bestehender Cron-Job entfernt.[/yellow]")
-            else:
-                console.print("[dim]Kein bestehender Cron-Job gefunden.[/dim]")
-        else:
-            # Add new job
-            if frequency == "Täglich (um 04:00 Uhr)":
-                schedule = "0 4 * * *"
-            else: # Weekly
-                schedule = "0 4 * * 0"
-                
-            job = f"{schedule} {cron_cmd}"
-            new_crontab.append(job)
-            new_crontab.append("") # Ensure newline at end
-            
-            console.print(f"[green]Füge Cron-Job hinzu:[/green] {job}")
-            console.print(f"[dim]Log-Datei: {log_file}[/dim]")
-            
-        # Write back
-        new_crontab_str = "\n".join(new_crontab) + "\n"
-        
-        # Use subprocess to write to crontab via stdin
-        run_result = subprocess.run(
-            "crontab -", 
-            input=new_crontab_str, 
-            shell=True, 
-            text=True, 
-            capture_output=True
-        )
-        
-        if run_result.returncode == 0:
-            console.print("[bold green]Crontab erfolgreich aktualisiert![/bold green]")
-        else:
-            console.print(f"[bold red]Fehler beim Schreiben der Crontab: {run_result.stderr}[/bold red]")
-            
-    except Exception as e:
-        console.print(f"[bold red]Fehler bei der Cron-Konfiguration: {e}[/bold red]")
+
+    # 2. Job setzen bzw. entfernen (eine Crontab-Schreiboperation)
+    if frequency == "off":
+        entry = None
+    else:
+        schedule = "0 4 * * *" if frequency == "daily" else "0 4 * * 0"
+        entry = scheduler.job("self-update", schedule, cron_cmd, backend=backend, random_delay=random_delay * 60,
+                              description="dvm Self-Update")
+        console.print(f"[dim]Log-Datei: {log_file}[/dim]")
+
+    if scheduler.apply({"self-update": entry}):
+        console.print("[bold green]Zeitplan erfolgreich aktualisiert![/bold green]")
+    else:
+        console.print("[bold red]Fehler bei der Cron-Konfiguration.[/bold red]")
 
 
 @app.command("auto")
-def configure_unattended():
+def configure_unattended(
+    blacklist: Annotated[Optional[List[str]], typer.Option("--blacklist", help="Regex für die Blacklist (mehrfach möglich, ersetzt die Auswahl)")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfragen (Standard-Blacklist: NVIDIA Treiber und CUDA)")] = False,
+):
     """
     Aktiviert automatische Sicherheitsupdates mittels unattended-upgrades (Empfohlen).
     """
@@ -278,96 +324,93 @@ def configure_unattended():
     # Auto-Upgrade Config
     config_content = 'APT::Periodic::Update-Package-Lists "1";\nAPT::Periodic::Unattended-Upgrade "1";\n'
     
-    # Blacklist Config Prompt
-    console.print("\\n[bold yellow]Paket Blacklist Konfiguration[/bold yellow]")
-    console.print("Du kannst verhindern, dass bestimmte Pakete automatisch aktualisiert werden, um die Stabilität zu gewährleisten.")
-    
-    common_packages = [
-        questionary.Choice("NVIDIA Treiber (nvidia-driver, libnvidia-.*)", checked=True),
-        questionary.Choice("CUDA Toolkit (cuda, libcuda.*)", checked=True),
-        questionary.Choice("Docker Engine (docker-ce, docker-ce-cli)", checked=False),
-        questionary.Choice("Containerd (containerd.io)", checked=False),
-    ]
-    
-    selected = questionary.checkbox(
-        "Wähle Pakete für die Blacklist:",
-        choices=common_packages
-    ).ask()
-    
-    blacklist_regex = []
-    if "NVIDIA Treiber (nvidia-driver, libnvidia-.*)" in selected:
-        blacklist_regex.append('"nvidia-driver";')
-        blacklist_regex.append('"libnvidia-.*";')
-    if "CUDA Toolkit (cuda, libcuda.*)" in selected:
-        blacklist_regex.append('"cuda";')
-        blacklist_regex.append('"libcuda.*";')
-    if "Docker Engine (docker-ce, docker-ce-cli)" in selected:
-        blacklist_regex.append('"docker-ce";')
-        blacklist_regex.append('"docker-ce-cli";')
-
-    if "Containerd (containerd.io)" in selected:
-        blacklist_regex.append('"containerd.io";')
+    if blacklist is not None or yes or not prompts.interactive():
+        # Ohne Rückfragen: angegebene Muster, sonst die Vorauswahl des Dialogs
+        blacklist_regex = [f'"{pattern}";' for pattern in (blacklist or DEFAULT_BLACKLIST)]
+    else:
+        # Blacklist Config Prompt
+        console.print("\\n[bold yellow]Paket Blacklist Konfiguration[/bold yellow]")
+        console.print("Du kannst verhindern, dass bestimmte Pakete automatisch aktualisiert werden, um die Stabilität zu gewährleisten.")
+    
+        common_packages = [
+            questionary.Choice("NVIDIA Treiber (nvidia-driver, libnvidia-.*)", checked=True),
+            questionary.Choice("CUDA Toolkit (cuda, libcuda.*)", checked=True),
+            questionary.Choice("Docker Engine (docker-ce, docker-ce-cli)", checked=False),
+            questionary.Choice("Containerd (containerd.io)", checked=False),
+        ]
+    
+        selected = questionary.checkbox(
+            "Wähle Pakete für die Blacklist:",
+            choices=common_packages
+        ).ask()
+    
+        blacklist_regex = []
+        if "NVIDIA Treiber (nvidia-driver, libnvidia-.*)" in selected:
+            blacklist_regex.append('"nvidia-driver";')
+            blacklist_regex.append('"libnvidia-.*";')
+        if "CUDA Toolkit (cuda, libcuda.*)" in selected:
+            blacklist_regex.append('"cuda";')
+            blacklist_regex.append('"libcuda.*";')
+        if "Docker Engine (docker-ce, docker-ce-cli)" in selected:
+            blacklist_regex.append('"docker-ce";')
+            blacklist_regex.append('"docker-ce-cli";')
+
+        if "Containerd (containerd.io)" in selected:
+            blacklist_regex.append('"containerd.io";')
         
-    # Custom Regex Input
-    custom = questionary.text("Gib eigene Regex für die Blacklist ein (kommagetrennt, leer lassen zum Überspringen):").ask()
-    if custom:
-        for item in custom.split(","):
-            clean_item = item.strip()
-            if clean_item:
-                blacklist_regex.append(f'"{clean_item}";')
-
-    # Package Search
-    if questionary.confirm("Möchtest du nach installierten Paketen für die Blacklist suchen?").ask():
-        console.print("[blue]Lade installierte Pakete...[/blue]")
-        try:
-            # Get list of installed packages
-            # dpkg-query doesn't use apt config, so it should be safe even if config is broken
-            result = subprocess.run("dpkg-query -f '${Package}\\n' -W", shell=True, capture_output=True, text=True)
-            installed_packages = result.stdout.splitlines()
+        # Custom Regex Input
+        custom = questionary.text("Gib eigene Regex für die Blacklist ein (kommagetrennt, leer lassen zum Überspringen):").ask()
+        if custom:
+            for item in custom.split(","):
+                clean_item = item.strip()
+                if clean_item:
+                    blacklist_regex.append(f'"{clean_item}";')
+
+        # Package Search
+        if questionary.confirm("Möchtest du nach installierten Paketen für die Blacklist suchen?").ask():
+            console.print("[blue]Lade installierte Pakete...[/blue]")
+            try:
+                # Get list of installed packages
+                # dpkg-query doesn't use apt config, so it should be safe even if config is broken
+                result = subprocess.run("dpkg-query -f '${Package}\\n' -W", shell=True, capture_output=True, text=True)
+                installed_packages = result.stdout.splitlines()
             
-            while True:
-                pkg = questionary.autocomplete(
-                    "Tippe zum Suchen eines Pakets (TAB zum Vervollständigen):",
-                    choices=installed_packages
-                ).ask()
+                while True:
+                    pkg = questionary.autocomplete(
+                        "Tippe zum Suchen eines Pakets (TAB zum Vervollständigen):",
+                        choices=installed_packages
+                    ).ask()
                 
-                if pkg:
-                    console.print(f"[green]{pkg} zur Blacklist hinzugefügt.[/green]")
-                    blacklist_regex.append(f'"{pkg}";')
+                    if pkg:
+                        console.print(f"[green]{pkg} zur Blacklist hinzugefügt.[/green]")
+                        blacklist_regex.append(f'"{pkg}";')
                 
-                if not questionary.confirm("Nach einem weiteren Paket suchen?").ask():
-                    break
-        except Exception as e:
-            console.print(f"[bold red]Fehler beim Abrufen der Pakete: {e}[/bold red]")
+                    if not questionary.confirm("Nach einem weiteren Paket suchen?").ask():
+                        break
+            except Exception as e:
+                console.print(f"[bold red]Fehler beim Abrufen der Pakete: {e}[/bold red]")
     
     # 2. Write Configurations
     console.print("[blue]Schreibe Konfigurationen...[/blue]")
     try:
-        import tempfile
         # Write 20auto-upgrades
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".conf", delete=False) as f:
-            f.write(config_content)
-            tmp_auto = f.name
-        run_command(f"sudo mv {tmp_auto} /etc/apt/apt.conf.d/20auto-upgrades", desc="Schreibe Auto-Upgrade Config")
+        write_root_file("/etc/apt/apt.conf.d/20auto-upgrades", config_content, desc="Schreibe Auto-Upgrade Config", mode="644")
         
         # Write Blacklist
         if blacklist_regex:
             blacklist_content = 'Unattended-Upgrade::Package-Blacklist {\n' + '\n    '.join(blacklist_regex) + '\n};\n'
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".conf", delete=False) as f:
-                f.write(blacklist_content)
-                tmp_blacklist = f.name
-            run_command(f"sudo mv {tmp_blacklist} /etc/apt/apt.conf.d/51unattended-upgrades-blacklist", desc="Schreibe Blacklist Config")
+            write_root_file(BLACKLIST_FILE, blacklist_content, desc="Schreibe Blacklist Config", mode="644")
         else:
             # Ensure file is empty/removed if no blacklist
-            if os.path.exists("/etc/apt/apt.conf.d/51unattended-upgrades-blacklist"):
-                 run_command("sudo rm /etc/apt/apt.conf.d/51unattended-upgrades-blacklist", desc="Entferne leere Blacklist")
+            if os.path.exists(BLACKLIST_FILE):
+                 run_command(f"sudo rm {BLACKLIST_FILE}", desc="Entferne leere Blacklist")
         
     except Exception as e:
          console.print(f"[bold red]Fehler beim Schreiben der Konfigurationen: {e}[/bold red]")
          return # Stop if we can't write config
 
     # 3. Install Package (NOW it should be safe to run apt)
-    if run_command("sudo apt install -y unattended-upgrades", desc="Installiere unattended-upgrades"):
+    if apt_install(["unattended-upgrades"], desc="Installiere unattended-upgrades"):
         # Ensure service is running
         run_command("sudo systemctl enable --now unattended-upgrades", desc="Starte unattended-upgrades Service")
         console.print("[bold green]Unattended Upgrades erfolgreich aktiviert und konfiguriert![/bold green]")
@@ -377,20 +420,23 @@ def configure_unattended():
 
 
 @app.command("blacklist")
-def configure_blacklist():
+def configure_blacklist(
+    add: Annotated[Optional[List[str]], typer.Option("--add", help="Regex zur Blacklist hinzufügen (mehrfach möglich)")] = None,
+    remove: Annotated[Optional[List[str]], typer.Option("--remove", help="Regex aus der Blacklist entfernen (mehrfach möglich)")] = None,
+):
     """
     Konfiguriert gezielt Ausnahmen (Blacklist) für System-Updates, ohne Auto-Updates zwingend nutzen zu müssen.
+    Mit --add/--remove wird die bestehende Blacklist ohne Rückfragen angepasst.
     """
     import questionary
     import os
     import subprocess
-    import tempfile
     import re
     
     console.print("[bold blue]Paket Blacklist Konfiguration[/bold blue]")
     console.print("Hier kannst du verhindern, dass bestimmte Pakete bei 'dvm update system' automatisch aktualisiert werden.")
     
-    blacklist_file = "/etc/apt/apt.conf.d/51unattended-upgrades-blacklist"
+    blacklist_file = BLACKLIST_FILE
     existing_regexes = []
     
     # Read existing blacklist
@@ -408,81 +454,84 @@ def configure_blacklist():
         except Exception as e:
             console.print(f"[yellow]Konnte existierende Blacklist nicht lesen: {e}[/yellow]")
 
-    common_packages = [
-        questionary.Choice("NVIDIA Treiber (nvidia-driver, libnvidia-.*)", checked=True if ("nvidia-driver" in existing_regexes) else False),
-        questionary.Choice("CUDA Toolkit (cuda, libcuda.*)", checked=True if ("cuda" in existing_regexes) else False),
-        questionary.Choice("Docker Engine (docker-ce, docker-ce-cli)", checked=True if ("docker-ce" in existing_regexes) else False),
-        questionary.Choice("Containerd (containerd.io)", checked=True if ("containerd.io" in existing_regexes) else False),
-    ]
-    
-    # Add other existing regexes that are not part of common packages as choices
-    common_regexes_check = ["nvidia-driver", "libnvidia-.*", "cuda", "libcuda.*", "docker-ce", "docker-ce-cli", "containerd.io"]
-    custom_existing_choices = []
-    for r in existing_regexes:
-        if r not in common_regexes_check:
-             # Pre-check existing custom entries so the user can uncheck them to remove
-             custom_existing_choices.append(questionary.Choice(f"⭐ Eigener Eintrag: {r}", checked=True))
+    if add or remove or not prompts.interactive():
+        blacklist_regex = [f'"{r}";' for r in existing_regexes + (add or []) if r not in (remove or [])]
+    else:
+        common_packages = [
+            questionary.Choice("NVIDIA Treiber (nvidia-driver, libnvidia-.*)", checked=True if ("nvidia-driver" in existing_regexes) else False),
+            questionary.Choice("CUDA Toolkit (cuda, libcuda.*)", checked=True if ("cuda" in existing_regexes) else False),
+            questionary.Choice("Docker Engine (docker-ce, docker-ce-cli)", checked=True if ("docker-ce" in existing_regexes) else False),
+            questionary.Choice("Containerd (containerd.io)", checked=True if ("containerd.io" in existing_regexes) else False),
+        ]
+    
+        # Add other existing regexes that are not part of common packages as choices
+        common_regexes_check = ["nvidia-driver", "libnvidia-.*", "cuda", "libcuda.*", "docker-ce", "docker-ce-cli", "containerd.io"]
+        custom_existing_choices = []
+        for r in existing_regexes:
+            if r not in common_regexes_check:
+                 # Pre-check existing custom entries so the user can uncheck them to remove
+                 custom_existing_choices.append(questionary.Choice(f"⭐ Eigener Eintrag: {r}", checked=True))
              
-    all_choices = common_packages + custom_existing_choices
+        all_choices = common_packages + custom_existing_choices
     
-    selected = questionary.checkbox(
-        "Aktiviere Pakete für die Blacklist (Ausgewählte = Blockiert):",
-        choices=all_choices
-    ).ask()
+        selected = questionary.checkbox(
+            "Aktiviere Pakete für die Blacklist (Ausgewählte = Blockiert):",
+            choices=all_choices
+        ).ask()
     
-    if selected is None:
-        console.print("[yellow]Abgebrochen.[/yellow]")
-        return
+        if selected is None:
+            console.print("[yellow]Abgebrochen.[/yellow]")
+            return
         
-    blacklist_regex = []
-    if "NVIDIA Treiber (nvidia-driver, libnvidia-.*)" in selected:
-        blacklist_regex.append('"nvidia-driver";')
-        blacklist_regex.append('"libnvidia-.*";')
-    if "CUDA Toolkit (cuda, libcuda.*)" in selected:
-        blacklist_regex.append('"cuda";')
-        blacklist_regex.append('"libcuda.*";')
-    if "Docker Engine (docker-ce, docker-ce-cli)" in selected:
-        blacklist_regex.append('"docker-ce";')
-        blacklist_regex.append('"docker-ce-cli";')
-
-    if "Containerd (containerd.io)" in selected:
-        blacklist_regex.append('"containerd.io";')
+        blacklist_regex = []
+        if "NVIDIA Treiber (nvidia-driver, libnvidia-.*)" in selected:
+            blacklist_regex.append('"nvidia-driver";')
+            blacklist_regex.append('"libnvidia-.*";')
+        if "CUDA Toolkit (cuda, libcuda.*)" in selected:
+            blacklist_regex.append('"cuda";')
+            blacklist_regex.append('"libcuda.*";')
+        if "Docker Engine (docker-ce, docker-ce-cli)" in selected:
+            blacklist_regex.append('"docker-ce";')
+            blacklist_regex.append('"docker-ce-cli";')
+
+        if "Containerd (containerd.io)" in selected:
+            blacklist_regex.append('"containerd.io";')
         
-    # Re-add selected custom entries
-    for choice in selected:
-         if choice.startswith("⭐ Eigener Eintrag: "):
-              entry = choice.replace("⭐ Eigener Eintrag: ", "").strip()
-              blacklist_regex.append(f'"{entry}";')
+        # Re-add selected custom entries
+        for choice in selected:
+             if choice.startswith("⭐ Eigener Eintrag: "):
+                  entry = choice.replace("⭐ Eigener Eintrag: ", "").strip()
+                  blacklist_regex.append(f'"{entry}";')
         
-    # Custom Regex Input (for new ones)
-    custom = questionary.text("Gib NEUE eigene Regex für die Blacklist ein (kommagetrennt, leer lassen zum Überspringen):").ask()
-    if custom:
-        for item in custom.split(","):
-            clean_item = item.strip()
-            if clean_item:
-                blacklist_regex.append(f'"{clean_item}";')
-
-    # Package Search (for new ones)
-    if questionary.confirm("Möchtest du in den installierten Paketen suchen, um weitere Pakete hinzuzufügen?").ask():
-        console.print("[blue]Lade installierte Pakete...[/blue]")
-        try:
-            result = subprocess.run("dpkg-query -f '${Package}\\n' -W", shell=True, capture_output=True, text=True)
-            installed_packages = result.stdout.splitlines()
+        # Custom Regex Input (for new ones)
+        custom = questionary.text("Gib NEUE eigene Regex für die Blacklist ein (kommagetrennt, leer lassen zum Überspringen):").ask()
+        if custom:
+            for item in custom.split(","):
+                clean_item = item.strip()
+                if clean_item:
+                    blacklist_regex.append(f'"{clean_item}";')
+
+        # Package Search (for new ones)
+        if questionary.confirm("Möchtest du in den installierten Paketen suchen, um weitere Pakete hinzuzufügen?").ask():
+            console.print("[blue]Lade installierte Pakete...[/blue]")
+            try:
+                result = subprocess.run("dpkg-query -f '${Package}\\n' -W", shell=True, capture_output=True, text=True)
+                installed_packages = result.stdout.splitlines()
             
-            while True:
-                pkg = questionary.autocomplete(
-                    "Tippe zum Suchen eines Pakets (TAB zum Vervollständigen):",
-                    choices=installed_packages
-                ).ask()
+                while True:
+                    pkg = questionary.autocomplete(
+                        "Tippe zum Suchen eines Pakets (TAB zum Vervollständigen):",
+                        choices=installed_packages
+                    ).ask()
                 
-                if pkg:
-                    console.print(f"[green]{pkg} zur Blacklist hinzugefügt.[/green]")
-                    blacklist_regex.append(f'"{pkg}";')
+                    if pkg:
+                        console.print(f"[green]{pkg} zur Blacklist hinzugefügt.[/green]")
+                        blacklist_regex.append(f'"{pkg}";')
                 
-                if not questionary.confirm("Nach einem weiteren Paket suchen?").ask():
-                    break
-        except Exception as e:
-            console.print(f"[bold red]Fehler beim Abrufen der Pakete: {e}[/bold red]")
+                    if not questionary.confirm("Nach einem weiteren Paket suchen?").ask():
+                        break
+            except Exception as e:
+                console.print(f"[bold red]Fehler beim Abrufen der Pakete: {e}[/bold red]")
             
     # Deduplicate before writing
     blacklist_regex = list(set(blacklist_regex))
@@ -492,14 +541,11 @@ def configure_blacklist():
     try:
         if blacklist_regex:
             blacklist_content = 'Unattended-Upgrade::Package-Blacklist {\n' + '\n    '.join(blacklist_regex) + '\n};\n'
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".conf", delete=False) as f:
-                f.write(blacklist_content)
-                tmp_blacklist = f.name
-            run_command(f"sudo mv {tmp_blacklist} /etc/apt/apt.conf.d/51unattended-upgrades-blacklist", desc="Schreibe Blacklist Config")
+            write_root_file(BLACKLIST_FILE, blacklist_content, desc="Schreibe Blacklist Config", mode="644")
             console.print("[bold green]Blacklist erfolgreich aktualisiert![/bold green]")
         else:
-            if os.path.exists("/etc/apt/apt.conf.d/51unattended-upgrades-blacklist"):
-                 run_command("sudo rm /etc/apt/apt.conf.d/51unattended-upgrades-blacklist", desc="Entferne leere Blacklist")
+            if os.path.exists(BLACKLIST_FILE):
+                 run_command(f"sudo rm {BLACKLIST_FILE}", desc="Entferne leere Blacklist")
                  console.print("[bold green]Blacklist geleert und entfernt![/bold green]")
             else:
                  console.print("[yellow]Keine Pakete ausgewählt, Blacklist bleibt leer.[/yellow]")
@@ -534,28 +580,186 @@ def update_dockhand():
         raise typer.Exit(code=1)
 
 
+@app.command("stacks")
+def update_stacks(
+    parallel: Annotated[int, typer.Option("--parallel", "-j", help="Anzahl paralleler Registry-Abfragen und Pulls")] = 4,
+    check_only: Annotated[bool, typer.Option("--check", help="Nur auf neue Images prüfen, nichts aktualisieren")] = False,
+    pull_unknown: Annotated[bool, typer.Option("--pull-unknown", help="Images, deren Registry-Stand sich nicht prüfen lässt, trotzdem pullen")] = False,
+):
+    """
+    Aktualisiert alle Compose-Stacks unter dem Basispfad (nur geänderte Images).
+    """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from rich.table import Table
+    from dockervm_cli import plan, stacks
+
+    console.print(f"[bold blue]Suche Compose-Stacks unter {DVM_BASE_PATH}...[/bold blue]")
+    projects = stacks.find_compose_projects(DVM_BASE_PATH)
+    if not projects:
+        console.print("[yellow]Keine Compose-Stacks gefunden.[/yellow]")
+        raise typer.Exit()
+
+    compose_cmd = get_docker_compose_cmd()
+    parallel = max(1, parallel)
+
+    # 1. Services und Images aller Stacks ermitteln
+    report = {}
+    for project in projects:
+        report[project["dir"]] = {"project": project, "services": {}, "changed": [], "unknown": [], "error": None,
+                                  "check": 0.0, "pull": 0.0, "up": 0.0}
+        try:
+            report[project["dir"]]["services"] = stacks.get_compose_services(project, compose_cmd)
+        except Exception as e:
+            report[project["dir"]]["error"] = f"config: {e}"
+
+    # 2. Digests vergleichen (jedes Image nur einmal, parallel)
+    images = sorted({img for r in report.values() for img in r["services"].values()})
+    console.print(f"[blue]Prüfe {len(images)} Images in {len(projects)} Stacks gegen die Registry...[/blue]")
+    image_state = {}
+    image_time = {}
+
+    def _check(image):
+        start = time.perf_counter()
+        state = stacks.check_image(image)
+        return image, state, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        for image, state, duration in pool.map(_check, images):
+            image_state[image] = state
+            image_time[image] = duration
+            if state != "current":
+                console.print(f"[dim]  {image}: {state}[/dim]")
+
+    for r in report.values():
+        r["check"] = sum(image_time[img] for img in set(r["services"].values()))
+        # 'unknown' (buildx fehlt, Registry nicht erreichbar, Rate-Limit) wird nur mit --pull-unknown gepullt
+        pending = ("outdated", "missing", "unknown") if pull_unknown else ("outdated", "missing")
+        r["changed"] = sorted(svc for svc, img in r["services"].items() if image_state[img] in pending)
+        r["unknown"] = sorted(svc for svc, img in r["services"].items() if image_state[img] == "unknown" and svc not in r["changed"])
+
+    # 3. Nur betroffene Stacks pullen und betroffene Services neu erstellen
+    def _update(r):
+        project = r["project"]
+        services = " ".join(r["changed"])
+        start = time.perf_counter()
+        pull = subprocess.run(
+            f"sudo {compose_cmd} -f {project['file']} pull -q {services}",
+            shell=True, capture_output=True, text=True, cwd=project["dir"]
+        )
+        r["pull"] = time.perf_counter() - start
+        if pull.returncode != 0:
+            r["error"] = f"pull: {pull.stderr.strip()[-200:]}"
+            return r
+        start = time.perf_counter()
+        up = subprocess.run(
+            f"sudo {compose_cmd} -f {project['file']} up -d --no-deps {services}",
+            shell=True, capture_output=True, text=True, cwd=project["dir"]
+        )
+        r["up"] = time.perf_counter() - start
+        if up.returncode != 0:
+            r["error"] = f"up: {up.stderr.strip()[-200:]}"
+        return r
+
+    to_update = [r for r in report.values() if r["changed"] and not r["error"]]
+    if to_update and not check_only and plan.recording():
+        # Im Plan nacheinander als einzelne Schritte, die parallelen Läufe unten geben nur Zusammenfassungen aus
+        for r in to_update:
+            project, services = r["project"], " ".join(r["changed"])
+            run_command(f"cd {project['dir']} && sudo {compose_cmd} -f {project['file']} pull -q {services}",
+                        desc=f"Ziehe Images für {project['name']}")
+            run_command(f"cd {project['dir']} && sudo {compose_cmd} -f {project['file']} up -d --no-deps {services}",
+                        desc=f"Erstelle {services} in {project['name']} neu")
+    elif to_update and not check_only:
+        console.print(f"[blue]Aktualisiere {len(to_update)} Stacks...[/blue]")
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            for r in pool.map(_update, to_update):
+                if r["error"]:
+                    console.print(f"[red]  {r['project']['name']}: {r['error']}[/red]")
+                else:
+                    console.print(f"[green]  {r['project']['name']}: {', '.join(r['changed'])} aktualisiert[/green]")
+
+    # 4. Zusammenfassung
+    table = Table(title="Stack Update Zusammenfassung", show_header=True, header_style="bold magenta")
+    table.add_column("Stack", style="cyan")
+    table.add_column("Services")
+    table.add_column("Geändert", style="yellow")
+    table.add_column("Ungeprüft", style="dim")
+    table.add_column("Prüfen", justify="right")
+    table.add_column("Pull", justify="right")
+    table.add_column("Up", justify="right")
+    table.add_column("Status")
+
+    failed = False
+    for r in report.values():
+        if r["error"]:
+            status = f"[red]Fehler ({r['error'][:60]})[/red]"
+            failed = True
+        elif not r["changed"] and r["unknown"]:
+            status = "[yellow]Übersprungen[/yellow]"
+        elif not r["changed"]:
+            status = "[green]Aktuell[/green]"
+        elif check_only:
+            status = "[yellow]Update verfügbar[/yellow]"
+        elif plan.recording():
+            status = "[yellow]Geplant[/yellow]"
+        else:
+            status = "[green]Aktualisiert[/green]"
+        table.add_row(
+            r["project"]["name"],
+            str(len(r["services"])),
+            ", ".join(r["changed"]) or "-",
+            ", ".join(r["unknown"]) or "-",
+            f"{r['check']:.1f}s",
+            f"{r['pull']:.1f}s" if r["pull"] else "-",
+            f"{r['up']:.1f}s" if r["up"] else "-",
+            status,
+        )
+    console.print(table)
+
+    unchecked = sorted({r["services"][svc] for r in report.values() for svc in r["unknown"]})
+    if unchecked:
+        console.print(f"[yellow]{len(unchecked)} Images ließen sich nicht gegen die Registry prüfen (buildx fehlt, Registry nicht "
+                      f"erreichbar oder Rate-Limit) und wurden übersprungen: {', '.join(unchecked)}[/yellow]")
+        console.print("[dim]Mit --pull-unknown werden sie trotzdem gepullt.[/dim]")
+
+    if failed:
+        raise typer.Exit(code=1)
+
+
 @app.command("mail")
-def configure_mail():
+def configure_mail(
+    smtp_host: Annotated[Optional[str], typer.Option("--smtp-host", help="SMTP Server, z.B. smtp.gmail.com")] = None,
+    smtp_port: Annotated[Optional[str], typer.Option("--smtp-port", help="SMTP Port (Standard: 587)")] = None,
+    smtp_user: Annotated[Optional[str], typer.Option("--smtp-user", help="SMTP Benutzer / E-Mail")] = None,
+    smtp_pass: Annotated[Optional[str], typer.Option("--smtp-password", envvar="DVM_SMTP_PASSWORD", help="SMTP Passwort (besser über DVM_SMTP_PASSWORD)")] = None,
+    from_addr: Annotated[Optional[str], typer.Option("--from", help="Absender E-Mail (Standard: SMTP Benutzer)")] = None,
+    vm_name: Annotated[Optional[str], typer.Option("--vm-name", help="Eigener Name dieser VM für den Betreff")] = None,
+    recipient: Annotated[Optional[str], typer.Option("--to", help="Empfänger E-Mail (Standard: Absender)")] = None,
+    only_on_error: Annotated[Optional[bool], typer.Option("--only-on-error/--always", help="Nur bei Fehlern benachrichtigen")] = None,
+    send_test: Annotated[Optional[bool], typer.Option("--test/--no-test", help="Test-E-Mail senden")] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Standardwerte ohne Rückfrage verwenden")] = False,
+):
     """
     Konfiguriert E-Mail-Benachrichtigungen (via msmtp SMTP-Relay).
     """
-    import questionary
-    
+
     console.print("[bold blue]Konfiguration E-Mail Benachrichtigungen (SMTP)[/bold blue]")
     
     # 1. Install Dependencies
-    if not run_command("sudo apt install -y msmtp msmtp-mta bsd-mailx", desc="Installiere Mail-Tools (msmtp, bsd-mailx)"):
+    if not apt_install(["msmtp", "msmtp-mta", "bsd-mailx"], desc="Installiere Mail-Tools (msmtp, bsd-mailx)"):
         console.print("[bold red]Fehler bei der Installation der Abhängigkeiten.[/bold red]")
         raise typer.Exit(code=1)
         
     # 2. SMTP Configuration
     console.print("\\n[yellow]SMTP Server Daten:[/yellow]")
-    smtp_host = questionary.text("SMTP Server (z.B. smtp.gmail.com):").ask()
-    smtp_port = questionary.text("SMTP Port:", default="587").ask()
-    smtp_user = questionary.text("SMTP Benutzer / E-Mail:").ask()
-    smtp_pass = questionary.password("SMTP Passwort:").ask()
-    from_addr = questionary.text("Absender E-Mail:", default=smtp_user).ask()
-    vm_name = questionary.text("Optional: Eigener Name für diese VM (für E-Mail Betreff, z.B. 'Docker-Node-1'):").ask()
+    smtp_host = prompts.text(smtp_host, "SMTP Server (z.B. smtp.gmail.com):", "--smtp-host", yes=yes)
+    smtp_port = prompts.text(smtp_port, "SMTP Port:", "--smtp-port", default="587", yes=yes)
+    smtp_user = prompts.text(smtp_user, "SMTP Benutzer / E-Mail:", "--smtp-user", yes=yes)
+    smtp_pass = prompts.password(smtp_pass, "SMTP Passwort:", "--smtp-password", yes=yes)
+    from_addr = prompts.text(from_addr, "Absender E-Mail:", "--from", default=smtp_user, yes=yes)
+    vm_name = prompts.text(vm_name, "Optional: Eigener Name für diese VM (für E-Mail Betreff, z.B. 'Docker-Node-1'):", "--vm-name",
+                           yes=yes, required=False)
     
     if not smtp_host or not smtp_user or not smtp_pass:
         console.print("[red]Alle Felder sind erforderlich![/red]")
@@ -579,21 +783,11 @@ password       {smtp_pass}
     
     # Write msmtprc
     try:
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".conf", delete=False) as f:
-            f.write(msmtp_config)
-            tmp_msmtp = f.name
-            
-        run_command(f"sudo mv {tmp_msmtp} /etc/msmtprc", desc="Schreibe SMTP Konfiguration")
-        run_command("sudo chmod 600 /etc/msmtprc", desc="Setze Berechtigungen (600)")
+        write_root_file("/etc/msmtprc", msmtp_config, desc="Schreibe SMTP Konfiguration", mode="600")
         run_command("sudo ln -sf /usr/bin/msmtp /usr/sbin/sendmail", desc="Verlinke sendmail zu msmtp")
         
         # Create log file and ensure permissions so regular users can send mail via msmtp
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".log", delete=False) as f:
-            f.write("")
-            tmp_log = f.name
-        run_command(f"sudo mv {tmp_log} /var/log/msmtp.log", desc="Erstelle Log-Datei")
-        run_command("sudo chmod 666 /var/log/msmtp.log", desc="Setze Rechte für Log-Datei")
+        write_root_file("/var/log/msmtp.log", "", desc="Erstelle Log-Datei", mode="666")
         
         # Disable AppArmor profile for msmtp which blocks writing to /var/log on Ubuntu
         if os.path.exists("/etc/apparmor.d/usr.bin.msmtp"):
@@ -605,8 +799,8 @@ password       {smtp_pass}
         
     # 3. Notification Preferences
     console.print("\\n[yellow]Benachrichtigungs-Einstellungen:[/yellow]")
-    recipient = questionary.text("Empfänger E-Mail:", default=from_addr).ask()
-    only_on_error = questionary.confirm("Nur bei Fehlern benachrichtigen?", default=True).ask()
+    recipient = prompts.text(recipient, "Empfänger E-Mail:", "--to", default=from_addr, yes=yes)
+    only_on_error = prompts.confirm("Nur bei Fehlern benachrichtigen?", yes=yes, default=True, value=only_on_error, option="--only-on-error/--always")
     
     apt_conf_content = f'Unattended-Upgrade::Mail "{recipient}";\n'
     if vm_name:
@@ -624,17 +818,14 @@ password       {smtp_pass}
         apt_conf_content += 'Unattended-Upgrade::MailOnlyOnError "false";\n'
         
     try:
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".conf", delete=False) as f:
-            f.write(apt_conf_content)
-            tmp_email = f.name
-        run_command(f"sudo mv {tmp_email} /etc/apt/apt.conf.d/51unattended-upgrades-email", desc="Aktiviere Unattended-Upgrades Benachrichtigung")
+        write_root_file("/etc/apt/apt.conf.d/51unattended-upgrades-email", apt_conf_content, desc="Aktiviere Unattended-Upgrades Benachrichtigung", mode="644")
     except Exception as e:
          console.print(f"[bold red]Fehler: {e}[/bold red]")
          
     console.print("[bold green]Konfiguration abgeschlossen![/bold green]")
     
     # 4. Test Email
-    if questionary.confirm("Test-E-Mail senden?").ask():
+    if prompts.confirm("Test-E-Mail senden?", yes=yes, value=send_test, option="--test/--no-test"):
         console.print(f"[blue]Sende Test-E-Mail an {recipient}...[/blue]")
         subject_name = f" [{vm_name}]" if vm_name else ""
         
@@ -645,16 +836,12 @@ Subject: DockerVM SMTP Test{subject_name}
 Dies ist eine Test-Nachricht von DockerVM{subject_name}.
 """
         try:
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".eml", delete=False) as f:
-                f.write(email_content)
-                tmp_email_file = f.name
-                
-            test_cmd = f"cat {tmp_email_file} | sendmail -t"
+            import shlex
+            test_cmd = f"printf '%s' {shlex.quote(email_content)} | sendmail -t"
             if run_command(test_cmd, desc="Sende E-Mail"):
                 console.print("[bold green]E-Mail gesendet! Bitte Posteingang (und Spam-Ordner) prüfen.[/bold green]")
             else:
                 console.print("[bold red]Fehler beim Senden. Bitte Serverdaten prüfen.[/bold red]")
-                
-            run_command(f"rm {tmp_email_file}", desc="Entferne temporäre E-Mail Datei", check=False)
+
         except Exception as e:
             console.print(f"[bold red]Fehler beim Erstellen der Test-E-Mail: {e}[/bold red]")
@@ -0,0 +1,297 @@
+import os
+import re
+import json
+import hashlib
+import functools
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+INDEX_FILE = os.path.join(TEMPLATES_DIR, "index.json")
+MANIFEST = "template.json"
+INDEX_VERSION = 1
+
+TYPES = ("string", "int", "port", "bool", "secret", "path", "url")
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+class TemplateError(Exception):
+    pass
+
+
+# --- Index ----------------------------------------------------------------------
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _legacy_manifest(name: str, path: str) -> dict:
+    """Templates ohne template.json: alle Variablen der .env als Strings mit deren Werten als Default."""
+    variables = []
+    env_path = os.path.join(path, ".env")
+    if os.path.exists(env_path):
+        with open(env_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#") or "=" not in line:
+                    continue
+                key, value = line.split("=", 1)
+                variables.append({"name": key.strip(), "type": "string", "default": value.strip()})
+    return {"title": name, "variables": variables}
+
+
+def read_manifest(name: str, path: str) -> dict:
+    manifest_path = os.path.join(path, MANIFEST)
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except ValueError as e:
+            raise TemplateError(f"{manifest_path} ist kein gültiges JSON: {e}")
+    else:
+        manifest = _legacy_manifest(name, path)
+
+    manifest = {
+        "name": name,
+        "title": manifest.get("title") or name,
+        "description": manifest.get("description", ""),
+        "install_dir": manifest.get("install_dir") or "{base_path}/{name}",
+        "url": manifest.get("url"),
+        "variables": manifest.get("variables") or [],
+        "ports": manifest.get("ports") or [],
+        "volumes": manifest.get("volumes") or [],
+        "files": manifest.get("files") or ["docker-compose.yml"],
+    }
+    names = set()
+    for var in manifest["variables"]:
+        if not var.get("name") or var["name"] in names:
+            raise TemplateError(f"Template {name}: Variable ohne Namen oder doppelt: {var}")
+        if var.setdefault("type", "string") not in TYPES:
+            raise TemplateError(f"Template {name}: unbekannter Typ '{var['type']}' für {var['name']} (erlaubt: {', '.join(TYPES)})")
+        names.add(var["name"])
+    for volume in manifest["volumes"]:
+        if os.path.isabs(volume) or ".." in volume.split("/"):
+            raise TemplateError(f"Template {name}: Volume '{volume}' muss relativ zum Installationsverzeichnis sein.")
+    for file in manifest["files"]:
+        if os.path.isabs(file) or ".." in file.split("/"):
+            raise TemplateError(f"Template {name}: Datei '{file}' muss relativ zum Template-Verzeichnis sein.")
+        if not os.path.isfile(os.path.join(path, file)):
+            raise TemplateError(f"Template {name}: Datei {file} fehlt.")
+    manifest["hashes"] = {file: _file_hash(os.path.join(path, file)) for file in manifest["files"]}
+    return manifest
+
+
+def build_index(templates_dir: str = TEMPLATES_DIR) -> dict:
+    """Liest alle Template-Verzeichnisse samt Manifest ein (für 'dvm install templates --rebuild-index')."""
+    templates = {}
+    for name in sorted(os.listdir(templates_dir)):
+        path = os.path.join(templates_dir, name)
+        if os.path.isdir(path) and not name.startswith((".", "_")):
+            templates[name] = read_manifest(name, path)
+    return {"version": INDEX_VERSION, "templates": templates}
+
+
+def write_index(index: dict, path: str = INDEX_FILE):
+    with open(path, "w") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    load_index.cache_clear()
+
+
+def _bundled_index() -> dict:
+    try:
+        with open(INDEX_FILE, "r") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    except (OSError, ValueError):
+        pass
+    return build_index()
+
+
+@functools.lru_cache(maxsize=None)
+def load_index() -> dict:
+    """
+    Liefert den mitgelieferten, vorab erzeugten Index (templates/index.json) ergänzt um die Templates
+    des zuletzt synchronisierten Katalogs ('dvm install template-sync'), die gleichnamige ersetzen.
+    Fehlt der mitgelieferte Index (z.B. in einem Entwicklungs-Checkout), wird er einmalig aus den Verzeichnissen gebaut.
+    """
+    from dockervm_cli import catalog
+
+    index = _bundled_index()
+    templates = {name: {**t, "source": "bundled"} for name, t in index["templates"].items()}
+    templates.update({name: {**t, "source": "catalog"} for name, t in catalog.cached_templates().items()})
+    return {**index, "templates": dict(sorted(templates.items()))}
+
+
+def list_templates() -> list:
+    return list(load_index()["templates"].values())
+
+
+def get_template(name: str) -> dict:
+    templates = load_index()["templates"]
+    if name not in templates:
+        raise TemplateError(f"Unbekanntes Template: {name} (verfügbar: {', '.join(templates) or '-'})")
+    return templates[name]
+
+
+def template_path(template: dict, file: str) -> str:
+    return os.path.join(template.get("dir") or os.path.join(TEMPLATES_DIR, template["name"]), file)
+
+
+def read_file(template: dict, file: str) -> str:
+    """Liest eine Template-Datei; bei Katalog-Templates wird der SHA-256 aus dem Index geprüft."""
+    with open(template_path(template, file), "rb") as f:
+        content = f.read()
+    if template.get("source") == "catalog" and hashlib.sha256(content).hexdigest() != template["hashes"].get(file):
+        raise TemplateError(f"{file} im Template {template['name']} wurde seit der Synchronisierung verändert (dvm install template-sync --force).")
+    return content.decode()
+
+
+# --- Werte ----------------------------------------------------------------------
+
+def expand(text: str, context: dict) -> str:
+    """Ersetzt {platzhalter} durch Werte aus context; Funktionen werden erst bei Bedarf aufgerufen."""
+    def _sub(match):
+        key = match.group(1)
+        if key not in context:
+            raise TemplateError(f"Unbekannter Platzhalter {{{key}}} in '{text}'")
+        value = context[key]
+        return str(value() if callable(value) else value)
+    return _PLACEHOLDER.sub(_sub, text)
+
+
+def base_context(template: dict) -> dict:
+    from dockervm_cli.utils import DVM_BASE_PATH, get_host_ip
+    return {"base_path": DVM_BASE_PATH, "name": template["name"], "host_ip": functools.lru_cache()(get_host_ip)}
+
+
+def default_value(var: dict, context: dict):
+    """Default einer Variable mit aufgelösten Platzhaltern; generierte Secrets werden hier erzeugt."""
+    if var.get("generate") and var["type"] == "secret":
+        import secrets
+        return secrets.token_urlsafe(int(var.get("length", 32)))
+    default = var.get("default")
+    if isinstance(default, str):
+        return expand(default, context)
+    return default
+
+
+def coerce(var: dict, value) -> str:
+    """Prüft einen Wert gegen den Typ der Variable und liefert ihn als String für die .env."""
+    kind, name = var["type"], var["name"]
+    text = str(value).strip() if not isinstance(value, bool) else ("true" if value else "false")
+    if kind in ("int", "port"):
+        try:
+            number = int(text)
+        except ValueError:
+            raise TemplateError(f"{name}: '{text}' ist keine Zahl.")
+        if kind == "port" and not 1 <= number <= 65535:
+            raise TemplateError(f"{name}: Port {number} liegt nicht zwischen 1 und 65535.")
+        if kind == "int" and ("min" in var and number < var["min"] or "max" in var and number > var["max"]):
+            raise TemplateError(f"{name}: {number} liegt nicht zwischen {var.get('min', '-')} und {var.get('max', '-')}.")
+        return str(number)
+    if kind == "bool":
+        if text.lower() in ("1", "true", "yes", "ja", "on"):
+            return "true"
+        if text.lower() in ("0", "false", "no", "nein", "off"):
+            return "false"
+        raise TemplateError(f"{name}: '{text}' ist kein Wahrheitswert (true/false).")
+    if kind == "path" and not text.startswith("/"):
+        raise TemplateError(f"{name}: '{text}' ist kein absoluter Pfad.")
+    if kind == "url" and not re.match(r"^https?://[^\s/]+", text):
+        raise TemplateError(f"{name}: '{text}' ist keine http(s) URL.")
+    if kind == "secret" and not text:
+        raise TemplateError(f"{name}: darf nicht leer sein.")
+    if var.get("choices") and text not in [str(c) for c in var["choices"]]:
+        raise TemplateError(f"{name}: '{text}' ist nicht erlaubt ({', '.join(str(c) for c in var['choices'])}).")
+    return text
+
+
+def resolve(template: dict, values: dict, ask=None, previous: dict = None) -> dict:
+    """
+    Bestimmt alle Variablen in Manifest-Reihenfolge. Übergebene values haben Vorrang,
+    sonst wird ask(var, default) gefragt (ohne ask gilt der Default). Defaults dürfen auf
+    zuvor bestimmte Variablen verweisen, z.B. "http://{host_ip}:{PORT}".
+    previous (die .env einer bestehenden Installation) ersetzt die Defaults, damit eine
+    erneute Installation z.B. Datenbank-Passwörter nicht neu erzeugt.
+    Raises TemplateError bei ungültigen Werten oder fehlenden Pflichtwerten.
+    """
+    context = base_context(template)
+    previous = previous or {}
+    result = {}
+    for var in template["variables"]:
+        name = var["name"]
+        if name in values:
+            value = values[name]
+        else:
+            default = previous[name] if previous.get(name) else default_value(var, context)
+            value = ask(var, default) if ask else default
+        if value is None or value == "":
+            if var.get("required", var["type"] != "string"):
+                raise TemplateError(f"{name}: kein Wert angegeben (--set {name}=...).")
+            value = ""
+        result[name] = coerce(var, value) if value != "" else ""
+        context[name] = result[name]
+    return result
+
+
+def resolve_layout(template: dict, variables: dict) -> dict:
+    """Installationsverzeichnis, URL und Ports mit eingesetzten Variablen."""
+    context = {**base_context(template), **variables}
+    ports = []
+    for port in template["ports"]:
+        number = expand(str(port["port"]), context)
+        ports.append({**port, "port": int(number), "protocol": port.get("protocol", "tcp")})
+    return {
+        "install_dir": expand(template["install_dir"], context),
+        "url": expand(template["url"], context) if template.get("url") else None,
+        "ports": ports,
+    }
+
+
+def parse_env(text: str) -> dict:
+    """Liest eine .env wie render_env() sie schreibt (auch mit einfachen bzw. doppelten Anführungszeichen)."""
+    values = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = (part.strip() for part in line.split("=", 1))
+        if len(value) >= 2 and value[0] == value[-1] == "'":
+            value = value[1:-1]
+        elif len(value) >= 2 and value[0] == value[-1] == '"':
+            value = re.sub(r"\\(.)", r"\1", value[1:-1]).replace("$$", "$")
+        values[key] = value
+    return values
+
+
+def read_env(install_dir: str) -> dict:
+    """Werte der .env einer bestehenden Installation ({} ohne .env). Ältere Installationen sind nur für root lesbar."""
+    import subprocess
+    path = os.path.join(install_dir, ".env")
+    try:
+        with open(path, "r") as f:
+            return parse_env(f.read())
+    except FileNotFoundError:
+        return {}
+    except PermissionError:
+        result = subprocess.run(["sudo", "cat", path], capture_output=True, text=True)
+        return parse_env(result.stdout) if result.returncode == 0 else {}
+
+
+def render_env(variables: dict) -> str:
+    """Schreibt die Variablen als .env; Werte mit Leer- oder Sonderzeichen werden für Compose gequotet."""
+    lines = []
+    for key, value in variables.items():
+        if value and re.search(r"[\s#\"'$\\]", value):
+            # In einfachen Anführungszeichen interpoliert Compose nichts
+            if "'" not in value:
+                value = f"'{value}'"
+            else:
+                value = '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("$", "$$") + '"'
+        lines.append(f"{key}={value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,71 @@
+import os
+import json
+import socket
+import http.client
+import urllib.parse
+
+DOCKER_SOCKET = "/var/run/docker.sock"
+
+COMPOSE_PROJECT_LABEL = "com.docker.compose.project"
+COMPOSE_SERVICE_LABEL = "com.docker.compose.service"
+
+
+class DockerAPIError(Exception):
+    pass
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = 10):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def socket_path() -> str:
+    """Pfad zum Docker Socket; unix:// Werte aus DOCKER_HOST werden berücksichtigt."""
+    host = os.environ.get("DOCKER_HOST", "")
+    if host.startswith("unix://"):
+        return host[len("unix://"):]
+    return DOCKER_SOCKET
+
+
+def get(path: str, params: dict = None, timeout: float = 10):
+    """
+    GET gegen die Docker Engine API über den Unix Socket.
+    Erspart pro Abfrage einen 'docker' CLI Prozess. Returns das geparste JSON.
+    """
+    if params:
+        path = f"{path}?{urllib.parse.urlencode(params)}"
+    conn = _UnixHTTPConnection(socket_path(), timeout=timeout)
+    try:
+        conn.request("GET", path, headers={"Host": "docker"})
+        response = conn.getresponse()
+        body = response.read()
+    except PermissionError:
+        raise DockerAPIError(f"Keine Berechtigung für {socket_path()} (mit sudo oder als Mitglied der Gruppe 'docker' ausführen).")
+    except OSError as e:
+        raise DockerAPIError(f"Docker Engine nicht erreichbar ({socket_path()}): {e}")
+    finally:
+        conn.close()
+
+    if response.status >= 400:
+        raise DockerAPIError(f"Docker API {path}: HTTP {response.status} {body.decode(errors='replace').strip()}")
+    return json.loads(body) if body else None
+
+
+def list_containers(all: bool = False, filters: dict = None) -> list:
+    """Entspricht 'docker ps' (/containers/json)."""
+    params = {"all": "1" if all else "0"}
+    if filters:
+        params["filters"] = json.dumps(filters)
+    return get("/containers/json", params)
+
+
+def container_name(container: dict) -> str:
+    names = container.get("Names") or []
+    return names[0].lstrip("/") if names else container.get("Id", "")[:12]
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import urllib.request
+import urllib.error
+from dockervm_cli import cache, runlog
+from dockervm_cli.utils import console, print_error, ensure_cache_dir
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def downloads_dir() -> str:
+    """
+    Cache-Verzeichnis für große Downloads. Kann per DVM_DOWNLOAD_CACHE auf einen
+    gemeinsamen Speicher (z.B. NFS unter dem Basispfad) zeigen, damit mehrere VMs
+    denselben Download nutzen.
+    """
+    custom = os.environ.get("DVM_DOWNLOAD_CACHE")
+    if custom:
+        os.makedirs(custom, exist_ok=True)
+        return custom
+    return ensure_cache_dir("downloads")
+
+
+def _index_path() -> str:
+    return os.path.join(downloads_dir(), "index.json")
+
+
+def load_index() -> dict:
+    try:
+        with open(_index_path(), "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_index(index: dict):
+    tmp = _index_path() + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=4)
+    os.replace(tmp, _index_path())
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _blob_path(sha256: str, filename: str) -> str:
+    return os.path.join(downloads_dir(), "sha256", sha256, filename)
+
+
+def _download(url: str, part_path: str) -> bool:
+    """Lädt url nach part_path und setzt einen abgebrochenen Download per HTTP Range fort."""
+    from rich.progress import Progress, BarColumn, DownloadColumn, TransferSpeedColumn, TimeRemainingColumn
+
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    request = urllib.request.Request(url, headers={"User-Agent": "dvm"})
+    if offset:
+        request.add_header("Range", f"bytes={offset}-")
+
+    try:
+        response = urllib.request.urlopen(request, timeout=30)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and offset:
+            # Range nicht erfüllbar: Teil-Datei ist bereits vollständig
+            return True
+        print_error(f"Download fehlgeschlagen: HTTP {e.code}")
+        return False
+    except Exception as e:
+        print_error(f"Download fehlgeschlagen: {e}")
+        return False
+
+    with response:
+        if offset and response.status == 206:
+            console.print(f"[dim]Setze Download bei {offset / 1024**2:.1f} MB fort...[/dim]")
+            mode = "ab"
+        else:
+            # Server unterstützt keine Ranges -> von vorne
+            offset = 0
+            mode = "wb"
+
+        length = response.headers.get("Content-Length")
+        total = offset + int(length) if length else None
+
+        with Progress("[progress.description]{task.description}", BarColumn(), DownloadColumn(),
+                      TransferSpeedColumn(), TimeRemainingColumn(), console=console) as progress:
+            task = progress.add_task(os.path.basename(url), total=total, completed=offset)
+            try:
+                with open(part_path, mode) as f:
+                    for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                        f.write(chunk)
+                        progress.update(task, advance=len(chunk))
+            except Exception as e:
+                print_error(f"Download unterbrochen ({e}). Ein erneuter Aufruf setzt ihn fort.")
+                return False
+    return True
+
+
+def fetch(url: str, sha256: str = None, filename: str = None) -> str:
+    """
+    Liefert den lokalen Pfad zu url aus dem inhaltsadressierten Cache und lädt
+    die Datei nur bei Bedarf (fortsetzbar) herunter.
+    Ohne sha256 wird der beim ersten Download ermittelte Hash verwendet (Trust on first use).
+    Returns den Pfad oder None bei Fehlern/Prüfsummenfehler.
+    """
+    filename = filename or url.rstrip("/").split("/")[-1] or "download.bin"
+    index = load_index()
+    expected = (sha256 or index.get(url, {}).get("sha256") or "").lower() or None
+
+    # 1. Cache-Treffer: Datei mit passendem Hash existiert bereits
+    if expected:
+        blob = _blob_path(expected, filename)
+        if os.path.exists(blob):
+            console.print(f"[dim]Verwende {filename} aus dem Cache, prüfe SHA-256...[/dim]")
+            if sha256_file(blob) == expected:
+                cache.record("downloads", hit=True)
+                runlog.event("download", url=url, cached=True, bytes=0, duration=0.0)
+                return blob
+            console.print("[yellow]Prüfsumme der gecachten Datei stimmt nicht, lade neu...[/yellow]")
+            os.remove(blob)
+
+    cache.record("downloads", hit=False)
+
+    # 2. (Fortgesetzter) Download in eine Teil-Datei
+    partial_dir = os.path.join(downloads_dir(), "partial")
+    os.makedirs(partial_dir, exist_ok=True)
+    part_path = os.path.join(partial_dir, hashlib.sha256(url.encode()).hexdigest()[:16] + ".part")
+    start = time.perf_counter()
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    ok = _download(url, part_path)
+    runlog.event("download", url=url, cached=False, exit_code=0 if ok else 1,
+                 bytes=(os.path.getsize(part_path) - offset) if os.path.exists(part_path) else 0,
+                 duration=round(time.perf_counter() - start, 4))
+    if not ok:
+        return None
+
+    # 3. Prüfen und in den Cache übernehmen
+    actual = sha256_file(part_path)
+    if expected and actual != expected:
+        print_error(f"SHA-256 stimmt nicht überein!\n  erwartet: {expected}\n  erhalten: {actual}")
+        os.remove(part_path)
+        return None
+
+    blob = _blob_path(actual, filename)
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    shutil.move(part_path, blob)
+
+    index[url] = {"sha256": actual, "filename": filename, "size": os.path.getsize(blob)}
+    _save_index(index)
+    console.print(f"[dim]SHA-256: {actual}[/dim]")
+    return blob
+
+
+def stage_for_root(path: str) -> str:
+    """
+    Kopiert eine Datei aus dem (vom Benutzer beschreibbaren) Download-Cache in ein nur für
+    root zugängliches Verzeichnis und prüft den SHA-256 der Kopie unmittelbar vor der
+    Ausführung als root. Der erwartete Hash ist die Cache-Adresse (sha256/<hash>/<datei>).
+    Returns den Pfad der Kopie oder None; aufräumen mit discard_staged().
+    """
+    import subprocess
+    expected = os.path.basename(os.path.dirname(path))
+    result = subprocess.run(["sudo", "mktemp", "-d", "/tmp/dvm-exec.XXXXXX"], capture_output=True, text=True)
+    if result.returncode != 0:
+        print_error(f"Verzeichnis für {os.path.basename(path)} konnte nicht angelegt werden: {result.stderr.strip()}")
+        return None
+    staged = os.path.join(result.stdout.strip(), os.path.basename(path))
+    copied = subprocess.run(["sudo", "install", "-m", "700", "-o", "root", "-g", "root", path, staged], capture_output=True, text=True)
+    digest = subprocess.run(["sudo", "sha256sum", staged], capture_output=True, text=True)
+    actual = digest.stdout.split()[0] if digest.returncode == 0 and digest.stdout else ""
+    if copied.returncode != 0 or actual != expected:
+        print_error(f"SHA-256 von {os.path.basename(path)} stimmt vor der Ausführung nicht überein!\n"
+                    f"  erwartet: {expected}\n  erhalten: {actual or copied.stderr.strip()}")
+        discard_staged(staged)
+        return None
+    return staged
+
+
+def discard_staged(staged: str):
+    import subprocess
+    subprocess.run(["sudo", "rm", "-rf", os.path.dirname(staged)], capture_output=True)
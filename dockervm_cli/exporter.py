@@ -0,0 +1,282 @@
+import os
+import time
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dockervm_cli.utils import DVM_BASE_PATH
+
+DEFAULT_PORT = 9477
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metric(name: str, help_text: str, samples: list, kind: str = "gauge") -> list:
+    """
+    Formatiert eine Metrik im Prometheus Text-Format.
+    samples ist eine Liste von (labels-dict, wert).
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_str = ",".join(f'{k}="{escape_label(v)}"' for k, v in labels.items())
+        lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+    return lines
+
+
+class Collector:
+    """
+    Liefert die Zeilen eines Teilbereichs und hält sie für ttl Sekunden vor.
+    Sehr günstige Collector werden beim Scrape aktualisiert, sobald sie veraltet sind.
+    Teure Collector (background=True) laufen in einem eigenen Thread; ein Scrape
+    liest dann nur den letzten Stand und wartet nie auf die Messung.
+    """
+
+    def __init__(self, name: str, func, ttl: float, background: bool = False):
+        self.name = name
+        self.func = func
+        self.ttl = ttl
+        self.background = background
+        self.lines = []
+        self.updated_at = 0.0
+        self.duration = 0.0
+        self.error = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        start = time.perf_counter()
+        try:
+            lines = self.func()
+            error = None
+        except Exception as e:
+            lines, error = None, str(e)
+        with self._lock:
+            if lines is not None:
+                self.lines = lines
+                self.updated_at = time.time()
+            self.error = error
+            self.duration = time.perf_counter() - start
+
+    def collect(self) -> list:
+        if not self.background and time.time() - self.updated_at >= self.ttl:
+            self.refresh()
+        with self._lock:
+            return list(self.lines)
+
+    def start_background(self, stop: threading.Event):
+        def _loop():
+            while not stop.is_set():
+                self.refresh()
+                stop.wait(self.ttl)
+        threading.Thread(target=_loop, name=f"collector-{self.name}", daemon=True).start()
+
+
+# --- Collector-Funktionen -------------------------------------------------------
+
+def collect_filesystems(paths: list = None) -> list:
+    """Belegung des Basispfads (und /) über statvfs - ohne df Prozess."""
+    paths = paths or [DVM_BASE_PATH, "/"]
+    size, avail = [], []
+    seen = set()
+    for path in paths:
+        try:
+            st = os.statvfs(path)
+        except OSError:
+            continue
+        # Liegen beide Pfade auf demselben Dateisystem, nur einmal melden
+        key = (st.f_fsid, st.f_blocks)
+        if key in seen:
+            continue
+        seen.add(key)
+        size.append(({"path": path}, st.f_blocks * st.f_frsize))
+        avail.append(({"path": path}, st.f_bavail * st.f_frsize))
+    return (metric("dvm_filesystem_size_bytes", "Größe des Dateisystems in Bytes", size)
+            + metric("dvm_filesystem_avail_bytes", "Für Benutzer verfügbarer Platz in Bytes", avail))
+
+
+def collect_packages() -> list:
+    """Installierte und gehaltene Pakete direkt aus /var/lib/dpkg/status."""
+    from dockervm_cli.host_state import read_dpkg_status
+    from dockervm_cli import apt
+
+    packages = read_dpkg_status()
+    installed = sum(1 for p in packages.values() if p["installed"])
+    held = sorted(name for name, p in packages.items() if p["hold"])
+    lines = metric("dvm_packages_installed", "Anzahl installierter Pakete", [({}, installed)])
+    lines += metric("dvm_packages_held", "Gehaltene Pakete (apt-mark hold)", [({"package": name}, 1) for name in held])
+    last_update = apt.last_update_time(apt.load_state())
+    if last_update:
+        lines += metric("dvm_apt_lists_age_seconds", "Alter der APT Paketlisten in Sekunden", [({}, int(time.time() - last_update))])
+    return lines
+
+
+def collect_apt_upgrades() -> list:
+    """
+    Ausstehende Upgrades per Simulation ('apt-get -s dist-upgrade', keine Sperre, keine Downloads).
+    Dauert je nach System Sekunden und läuft daher im Hintergrund.
+    """
+    result = subprocess.run(
+        ["apt-get", "-s", "-o", "Debug::NoLocking=1", "dist-upgrade"],
+        capture_output=True, text=True, env={**os.environ, "LC_ALL": "C"}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "apt-get -s fehlgeschlagen")
+    pending = [line for line in result.stdout.splitlines() if line.startswith("Inst ")]
+    security = [line for line in pending if "-security" in line]
+    return metric("dvm_apt_upgrades_pending", "Ausstehende Paket-Upgrades", [
+        ({"origin": "all"}, len(pending)),
+        ({"origin": "security"}, len(security)),
+    ])
+
+
+def collect_containers() -> list:
+    """Container pro Zustand und laufende Container pro Compose-Projekt (eine Engine API Anfrage)."""
+    from dockervm_cli import docker_api
+
+    containers = docker_api.list_containers(all=True)
+    states, projects = {}, {}
+    for c in containers:
+        states[c.get("State", "unknown")] = states.get(c.get("State", "unknown"), 0) + 1
+        project = (c.get("Labels") or {}).get(docker_api.COMPOSE_PROJECT_LABEL)
+        if project:
+            running, total = projects.get(project, (0, 0))
+            projects[project] = (running + (c.get("State") == "running"), total + 1)
+    lines = metric("dvm_containers", "Container nach Zustand", [({"state": s}, n) for s, n in sorted(states.items())])
+    lines += metric("dvm_stack_containers_running", "Laufende Container pro Compose-Projekt",
+                    [({"project": p}, r) for p, (r, _) in sorted(projects.items())])
+    lines += metric("dvm_stack_containers", "Container pro Compose-Projekt",
+                    [({"project": p}, t) for p, (_, t) in sorted(projects.items())])
+    return lines
+
+
+def collect_stack_images() -> list:
+    """
+    Vergleicht die Images aller Compose-Stacks mit der Registry (wie 'dvm update stacks --check').
+    Braucht Netzwerkzugriff und läuft daher selten und im Hintergrund.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from dockervm_cli import stacks
+    from dockervm_cli.utils import get_docker_compose_cmd
+
+    compose_cmd = get_docker_compose_cmd()
+    services = []
+    for project in stacks.find_compose_projects():
+        try:
+            for service, image in stacks.get_compose_services(project, compose_cmd).items():
+                services.append((project["name"], service, image))
+        except Exception:
+            continue
+
+    images = sorted({image for _, _, image in services})
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        status = dict(zip(images, pool.map(stacks.check_image, images)))
+
+    return metric("dvm_stack_image_outdated", "1, wenn in der Registry ein neueres Image vorliegt", [
+        ({"project": project, "service": service, "image": image}, 1 if status[image] == "outdated" else 0)
+        for project, service, image in services if status[image] in ("current", "outdated")
+    ])
+
+
+def collect_schedule() -> list:
+    """Von dvm verwaltete Zeitpläne (Cron-Einträge und systemd Timer)."""
+    from dockervm_cli import scheduler
+
+    jobs = scheduler.installed_jobs()
+    return metric("dvm_scheduled_job", "Von dvm verwalteter Zeitplan", [
+        ({"tag": tag, "backend": value.split(":", 1)[0]}, 1) for tag, value in sorted(jobs.items())
+    ])
+
+
+def gpu_collector(stop: threading.Event, interval_ms: int = 5000):
+    """
+    GPU Metriken aus einem dauerhaft laufenden Telemetrie-Sampler.
+    Returns None, wenn keine NVIDIA GPU mit aktivem Treiber vorhanden ist.
+    """
+    from dockervm_cli import pci
+    from dockervm_cli.gpu_telemetry import GpuSampler, prometheus_lines
+
+    if not any(d["driver"] == "nvidia" for d in pci.nvidia_devices(gpus_only=True)):
+        return None
+    sampler = GpuSampler(interval_ms=interval_ms, buffer_size=10).start()
+    threading.Thread(target=lambda: (stop.wait(), sampler.stop()), daemon=True).start()
+
+    def _collect():
+        if sampler.error:
+            raise RuntimeError(sampler.error)
+        return prometheus_lines(sampler.snapshot())
+    # Der Sampler misst selbst im Hintergrund, der Scrape liest nur den Ringpuffer
+    return Collector("gpu", _collect, ttl=0)
+
+
+# Name -> (Funktion, TTL in Sekunden, im Hintergrund).
+# Synchron nur, was garantiert im Mikrosekundenbereich bleibt; alles mit Prozessen,
+# Sockets oder größeren Dateien (dpkg status) wird im Hintergrund aktualisiert.
+COLLECTORS = {
+    "filesystem": (collect_filesystems, 15, False),
+    "containers": (collect_containers, 15, True),
+    "packages": (collect_packages, 120, True),
+    "schedule": (collect_schedule, 300, True),
+    "apt_upgrades": (collect_apt_upgrades, 1800, True),
+    "stack_images": (collect_stack_images, 6 * 3600, True),
+}
+
+
+class Exporter:
+    def __init__(self, disabled: list = None, gpu_interval_ms: int = 5000):
+        disabled = set(disabled or [])
+        self.stop = threading.Event()
+        self.collectors = [Collector(name, func, ttl, background)
+                           for name, (func, ttl, background) in COLLECTORS.items() if name not in disabled]
+        if "gpu" not in disabled:
+            gpu = gpu_collector(self.stop, gpu_interval_ms)
+            if gpu:
+                self.collectors.append(gpu)
+
+    def start(self):
+        for collector in self.collectors:
+            if collector.background:
+                collector.start_background(self.stop)
+        return self
+
+    def render(self) -> str:
+        lines = []
+        for collector in self.collectors:
+            lines += collector.collect()
+        now = time.time()
+        lines += metric("dvm_exporter_collector_up", "1, wenn die letzte Messung erfolgreich war",
+                        [({"collector": c.name}, 0 if c.error else 1) for c in self.collectors])
+        lines += metric("dvm_exporter_collector_duration_seconds", "Dauer der letzten Messung",
+                        [({"collector": c.name}, round(c.duration, 4)) for c in self.collectors])
+        lines += metric("dvm_exporter_collector_age_seconds", "Alter der gelieferten Werte",
+                        [({"collector": c.name}, round(now - c.updated_at, 1)) for c in self.collectors if c.updated_at])
+        return "\n".join(lines) + "\n"
+
+    def serve(self, address: str = "0.0.0.0", port: int = DEFAULT_PORT):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] == "/metrics":
+                    body, status, content_type = exporter.render().encode(), 200, CONTENT_TYPE
+                elif self.path == "/":
+                    body, status, content_type = b'<a href="/metrics">/metrics</a>\n', 200, "text/html"
+                else:
+                    body, status, content_type = b"Not Found\n", 404, "text/plain"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((address, port), Handler)
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        finally:
+            self.stop.set()
+            server.server_close()
@@ -0,0 +1,162 @@
+import os
+import time
+import shlex
+import fnmatch
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Sockets der SSH ControlMaster Verbindungen (pro Benutzer, daher nicht im globalen Cache)
+CONTROL_DIR = os.path.expanduser("~/.ssh/dvm-control")
+
+# Wie lange eine Master-Verbindung nach dem letzten Befehl offen bleibt (Sekunden)
+CONTROL_PERSIST = 120
+
+# ssh meldet Verbindungsfehler (Host nicht erreichbar, Schlüssel abgelehnt) mit 255
+SSH_ERROR = 255
+
+
+class InventoryError(Exception):
+    pass
+
+
+def ssh_binary(override: str = None) -> str:
+    """ssh Binary; DVM_SSH erlaubt z.B. einen lokalen Stand-in zum Testen."""
+    return override or os.environ.get("DVM_SSH") or "ssh"
+
+
+def load_inventory(path: str) -> list:
+    """
+    Lädt eine inventory.yaml:
+
+        defaults: {user: admin, port: 22}
+        hosts:
+          - docker-01
+          - {name: gpu-01, host: 10.0.0.11, groups: [gpu]}
+
+    Returns eine Liste von Dicts mit name, host, user, port, identity_file, groups und dvm.
+    """
+    import yaml
+    try:
+        with open(path, "r") as f:
+            data = yaml.safe_load(f) or {}
+    except OSError as e:
+        raise InventoryError(f"{path} konnte nicht gelesen werden: {e}")
+    except yaml.YAMLError as e:
+        raise InventoryError(f"{path} ist kein gültiges YAML: {e}")
+
+    defaults = data.get("defaults") or {}
+    entries = data.get("hosts") or []
+    if isinstance(entries, dict):
+        entries = [{"name": name, **(entry or {})} for name, entry in entries.items()]
+
+    hosts, seen = [], set()
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        name = entry.get("name") or entry.get("host")
+        if not name:
+            raise InventoryError(f"Host ohne 'name': {entry}")
+        if name in seen:
+            raise InventoryError(f"Host '{name}' ist doppelt eingetragen.")
+        seen.add(name)
+        merged = {**defaults, **entry}
+        hosts.append({
+            "name": name,
+            "host": merged.get("host") or name,
+            "user": merged.get("user"),
+            "port": merged.get("port"),
+            "identity_file": merged.get("identity_file"),
+            "groups": list(merged.get("groups") or []),
+            "dvm": merged.get("dvm") or "dvm",
+        })
+    if not hosts:
+        raise InventoryError(f"{path} enthält keine Hosts.")
+    return hosts
+
+
+def select_hosts(hosts: list, patterns: list) -> list:
+    """Filtert nach Namen oder Gruppen (Shell-Muster, z.B. 'gpu-*' oder 'gpu')."""
+    if not patterns:
+        return hosts
+    return [h for h in hosts
+            if any(fnmatch.fnmatch(h["name"], p) or any(fnmatch.fnmatch(g, p) for g in h["groups"]) for p in patterns)]
+
+
+def ssh_command(host: dict, remote: str, ssh: str = None, connect_timeout: int = 10) -> list:
+    """
+    ssh Aufruf mit Connection-Pooling: ControlMaster=auto öffnet pro Host eine Master-Verbindung,
+    die für weitere Aufrufe (auch folgende 'dvm fleet run') wiederverwendet wird.
+    BatchMode verhindert Passwortabfragen, die einen parallelen Lauf blockieren würden.
+    """
+    cmd = [
+        ssh_binary(ssh),
+        "-o", "BatchMode=yes",
+        "-o", f"ConnectTimeout={connect_timeout}",
+        "-o", "ControlMaster=auto",
+        "-o", f"ControlPath={CONTROL_DIR}/%C",
+        "-o", f"ControlPersist={CONTROL_PERSIST}",
+    ]
+    if host.get("port"):
+        cmd += ["-p", str(host["port"])]
+    if host.get("identity_file"):
+        cmd += ["-i", os.path.expanduser(host["identity_file"])]
+    target = f"{host['user']}@{host['host']}" if host.get("user") else host["host"]
+    return cmd + [target, remote]
+
+
+def remote_command(host: dict, args: list) -> str:
+    """Der dvm Aufruf auf dem Zielhost (ohne Terminal fragt dvm nicht nach, siehe --yes)."""
+    return shlex.join([host["dvm"], *args])
+
+
+def run_host(host: dict, args: list, on_line=None, ssh: str = None, timeout: int = 0) -> dict:
+    """
+    Führt einen dvm Befehl auf einem Host aus und reicht jede Ausgabezeile an on_line(host, line) weiter.
+    Returns ein Dict mit name, exit_code, duration, last_line und timed_out.
+    """
+    start = time.perf_counter()
+    last_line = ""
+    timed_out = threading.Event()
+    try:
+        proc = subprocess.Popen(
+            ssh_command(host, remote_command(host, args), ssh=ssh),
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, errors="replace", bufsize=1,
+        )
+    except OSError as e:
+        return {"name": host["name"], "exit_code": SSH_ERROR, "duration": 0.0, "last_line": str(e), "timed_out": False}
+
+    timer = None
+    if timeout:
+        def _kill():
+            timed_out.set()
+            proc.kill()
+        timer = threading.Timer(timeout, _kill)
+        timer.start()
+    try:
+        for line in proc.stdout:
+            line = line.rstrip("\n")
+            if line.strip():
+                last_line = line
+            if on_line:
+                on_line(host, line)
+        exit_code = proc.wait()
+    finally:
+        if timer:
+            timer.cancel()
+
+    return {
+        "name": host["name"],
+        "exit_code": exit_code,
+        "duration": time.perf_counter() - start,
+        "last_line": last_line,
+        "timed_out": timed_out.is_set(),
+    }
+
+
+def run(hosts: list, args: list, concurrency: int = 10, on_line=None, ssh: str = None, timeout: int = 0) -> list:
+    """Verteilt den Befehl auf alle Hosts (höchstens concurrency gleichzeitig). Ergebnisse in Inventar-Reihenfolge."""
+    os.makedirs(CONTROL_DIR, mode=0o700, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return list(pool.map(lambda h: run_host(h, args, on_line=on_line, ssh=ssh, timeout=timeout), hosts))
@@ -0,0 +1,230 @@
+import os
+import re
+import copy
+import json
+import time
+from dockervm_cli.utils import run_command, write_root_file
+
+# Welche GPU (UUID) welchem Compose-Service zugewiesen ist
+STATE_FILE = "/etc/dvm/gpu_assignments.json"
+
+# Gewichtung bereits zugewiesener (evtl. noch nicht gestarteter) Services bei der Platzierung
+ASSIGNMENT_WEIGHT = 0.25
+
+
+class AssignmentError(Exception):
+    pass
+
+
+def load_assignments() -> dict:
+    """
+    Returns {"<projektpfad>:<service>": {"gpu": uuid, ...}}; ohne Datei ein leeres Dict.
+    Raises AssignmentError, wenn die Datei nicht lesbar oder kein gültiges JSON ist - sonst
+    würde das nächste Speichern die bisherigen Zuweisungen überschreiben.
+    """
+    try:
+        with open(STATE_FILE, "r") as f:
+            assignments = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except OSError as e:
+        raise AssignmentError(f"{STATE_FILE} konnte nicht gelesen werden: {e}")
+    except ValueError as e:
+        raise AssignmentError(f"{STATE_FILE} ist kein gültiges JSON: {e}")
+    if not isinstance(assignments, dict):
+        raise AssignmentError(f"{STATE_FILE} enthält keine Zuweisungen (erwartet ein JSON-Objekt).")
+    return assignments
+
+
+def save_assignments(assignments: dict) -> bool:
+    return write_root_file(STATE_FILE, json.dumps(assignments, indent=4) + "\n", desc="Speichere GPU Zuweisungen",
+                           mode="644", owner="root:root")
+
+
+def assignment_key(project_dir: str, service: str) -> str:
+    return f"{os.path.abspath(project_dir)}:{service}"
+
+
+def gpu_load(sample_seconds: float = 2.0, binary: str = None) -> list:
+    """
+    Misst die aktuelle Last aller GPUs über den Telemetrie-Sampler.
+    Die Auslastung wird über sample_seconds gemittelt, damit kurze Spitzen die Platzierung nicht verfälschen.
+    Returns eine Liste von Dicts mit index, uuid, name, util, memory_used, memory_total.
+    """
+    from dockervm_cli.gpu_telemetry import GpuSampler
+
+    sampler = GpuSampler(interval_ms=500, binary=binary).start()
+    try:
+        time.sleep(sample_seconds)
+    finally:
+        sampler.stop()
+    if sampler.error:
+        raise RuntimeError(sampler.error)
+
+    gpus = []
+    for latest in sampler.snapshot():
+        history = [s["utilization.gpu"] for s in sampler.history(latest["index"]) if s.get("utilization.gpu") is not None]
+        gpus.append({
+            "index": latest["index"],
+            "uuid": latest["uuid"],
+            "name": latest["name"],
+            "util": sum(history) / len(history) if history else 0,
+            "memory_used": latest.get("memory.used") or 0,
+            "memory_total": latest.get("memory.total") or 0,
+        })
+    return gpus
+
+
+def gpu_score(gpu: dict, assigned: int) -> float:
+    """Je kleiner, desto weniger ausgelastet: Rechenlast + Speicherbelegung + bereits zugewiesene Services."""
+    memory = gpu["memory_used"] / gpu["memory_total"] if gpu["memory_total"] else 0
+    return gpu["util"] / 100 + memory + ASSIGNMENT_WEIGHT * assigned
+
+
+def pick_gpu(gpus: list, assignments: dict, exclude_key: str = None) -> dict:
+    """Wählt die am wenigsten ausgelastete GPU. Die eigene bisherige Zuweisung (exclude_key) zählt nicht mit."""
+    counts = {}
+    for key, entry in assignments.items():
+        if key != exclude_key:
+            counts[entry["gpu"]] = counts.get(entry["gpu"], 0) + 1
+    return min(gpus, key=lambda g: (gpu_score(g, counts.get(g["uuid"], 0)), g["index"]), default=None)
+
+
+def load_compose(path: str) -> dict:
+    import yaml
+    with open(path, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+_CONTENT_LINE = re.compile(r"^(\s*)[^\s#]")
+# Anker, Aliase und Merge-Keys: solche Blöcke werden nicht textuell ersetzt
+_ANCHORS = re.compile(r"(^|[\s\[{,:-])[&*][\w-]|<<\s*:")
+
+
+def _indent(line: str) -> int:
+    match = _CONTENT_LINE.match(line)
+    return len(match.group(1)) if match else None
+
+
+def _block_end(lines: list, start: int, indent: int) -> int:
+    """Index nach der letzten Inhaltszeile des Blocks, der in Zeile start beginnt (tiefer eingerückt als indent)."""
+    end = start + 1
+    for i in range(start + 1, len(lines)):
+        current = _indent(lines[i])
+        if current is None:
+            continue
+        if current <= indent:
+            break
+        end = i + 1
+    return end
+
+
+def _find_key(lines: list, start: int, end: int, indent: int, key: str) -> int:
+    pattern = re.compile(rf"^ {{{indent}}}(['\"]?){re.escape(key)}\1\s*:(\s|$)")
+    return next((i for i in range(start, end) if pattern.match(lines[i])), None)
+
+
+def edit_service_text(text: str, service: str, values: dict, remove: list = ()) -> str:
+    """
+    Ersetzt nur die Schlüssel values (z.B. deploy) und entfernt remove (z.B. gpus) im Block
+    eines Services; Kommentare, Anker und Formatierung der übrigen Datei bleiben erhalten.
+    Returns den neuen Text oder None, wenn sich der Block nicht sicher textuell bearbeiten lässt
+    (Service in Flow-Style oder mit Anker, Anker oder Aliase in den ersetzten Schlüsseln).
+    """
+    import yaml
+
+    lines = text.splitlines(keepends=True)
+    root = _find_key(lines, 0, len(lines), 0, "services")
+    if root is None or lines[root].split(":", 1)[1].split("#")[0].strip():
+        return None
+    services_end = _block_end(lines, root, 0)
+    service_indent = next((_indent(line) for line in lines[root + 1:services_end] if _indent(line) is not None), None)
+    if not service_indent:
+        return None
+    line_no = _find_key(lines, root + 1, services_end, service_indent, service)
+    if line_no is None or lines[line_no].split(":", 1)[1].split("#")[0].strip():
+        return None
+    end = _block_end(lines, line_no, service_indent)
+    child = next((_indent(line) for line in lines[line_no + 1:end] if _indent(line) is not None), service_indent + 2)
+
+    blocks = {}
+    for key in list(remove) + list(values):
+        start = _find_key(lines, line_no + 1, end, child, key)
+        if start is not None:
+            block_end = _block_end(lines, start, child)
+            if any(_ANCHORS.search(line.split("#")[0]) for line in lines[start:block_end]):
+                return None
+            blocks[key] = (start, block_end)
+
+    newline = "\r\n" if lines[line_no].endswith("\r\n") else "\n"
+    def _render(key, value):
+        dumped = yaml.safe_dump({key: value}, sort_keys=False, default_flow_style=False, allow_unicode=True)
+        return [" " * child + line + newline for line in dumped.splitlines()]
+
+    result = lines[:end]
+    if result and not result[-1].endswith("\n"):
+        result[-1] += newline
+    appended = [line for key, value in values.items() if key not in blocks for line in _render(key, value)]
+    result += appended + lines[end:]
+    # Von hinten ersetzen, damit die Zeilennummern davor gültig bleiben
+    for key, (start, block_end) in sorted(blocks.items(), key=lambda item: item[1][0], reverse=True):
+        result[start:block_end] = _render(key, values[key]) if key in values else []
+    return "".join(result)
+
+
+def render_compose(path: str, compose: dict, service: str) -> tuple:
+    """
+    Neuer Inhalt der Compose-Datei nach set_gpu_reservation(). Returns (Inhalt, gezielt):
+    gezielt=False bedeutet, dass die ganze Datei neu geschrieben wird (Kommentare und Anker gehen verloren).
+    """
+    import yaml
+    with open(path, "r") as f:
+        text = f.read()
+    svc = compose["services"][service]
+    content = edit_service_text(text, service, {"deploy": svc["deploy"]}, remove=["gpus"])
+    if content is not None:
+        return content, True
+    return yaml.safe_dump(compose, sort_keys=False, default_flow_style=False, allow_unicode=True), False
+
+
+def save_compose(path: str, content: str) -> bool:
+    """Schreibt die Compose-Datei zurück und legt vorher eine Sicherung (<datei>.bak) an."""
+    stat = os.stat(path)
+    run_command(f"sudo cp -p {path} {path}.bak", check=False)
+    return write_root_file(path, content, desc=f"Schreibe {os.path.basename(path)} (Sicherung: .bak)",
+                           mode=oct(stat.st_mode & 0o7777)[2:], owner=f"{stat.st_uid}:{stat.st_gid}")
+
+
+def _is_nvidia_device(device: dict) -> bool:
+    return device.get("driver") == "nvidia" or "gpu" in (device.get("capabilities") or [])
+
+
+def set_gpu_reservation(compose: dict, service: str, gpu_uuid: str = None) -> list:
+    """
+    Setzt die GPU-Reservierung eines Services:
+    deploy.resources.reservations.devices = [{driver: nvidia, device_ids: [uuid], capabilities: [gpu]}].
+    Ohne gpu_uuid (Freigabe) wird wieder 'count: all' eingetragen, wie bei '--gpus all'.
+    Pauschale Freigaben (gpus: all) werden entfernt. Returns Hinweise für den Benutzer.
+    """
+    notes = []
+    # Kopie, damit über Anker geteilte Blöcke anderer Services unverändert bleiben; leere Services sind None
+    svc = compose["services"][service] = copy.deepcopy(compose["services"][service] or {})
+
+    if "gpus" in svc:
+        svc.pop("gpus")
+        notes.append("'gpus:' wurde durch eine Geräte-Reservierung ersetzt.")
+
+    environment = svc.get("environment") or {}
+    items = environment.items() if isinstance(environment, dict) else ((e.split("=", 1) + [""])[:2] for e in environment)
+    for key, value in items:
+        if key == "NVIDIA_VISIBLE_DEVICES" and value in ("all", ""):
+            notes.append("NVIDIA_VISIBLE_DEVICES ist gesetzt und kann die Reservierung überschreiben (runtime: nvidia).")
+
+    reservations = svc.setdefault("deploy", {}).setdefault("resources", {}).setdefault("reservations", {})
+    devices = [d for d in reservations.get("devices") or [] if not _is_nvidia_device(d)]
+    if gpu_uuid:
+        devices.append({"driver": "nvidia", "device_ids": [gpu_uuid], "capabilities": ["gpu"]})
+    else:
+        devices.append({"driver": "nvidia", "count": "all", "capabilities": ["gpu"]})
+    reservations["devices"] = devices
+    return notes
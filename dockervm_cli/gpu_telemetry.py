@@ -0,0 +1,351 @@
+import os
+import re
+import time
+import threading
+import subprocess
+from collections import deque
+
+# Felder für 'nvidia-smi --query-gpu' (Reihenfolge = Spalten der CSV-Ausgabe)
+GPU_FIELDS = [
+    "index", "uuid", "name",
+    "utilization.gpu", "utilization.memory",
+    "memory.used", "memory.total",
+    "temperature.gpu", "power.draw", "power.limit",
+]
+
+# Feld -> (Prometheus Metrikname, Hilfetext)
+PROMETHEUS_METRICS = {
+    "utilization.gpu": ("dvm_gpu_utilization_percent", "GPU Auslastung in Prozent"),
+    "utilization.memory": ("dvm_gpu_memory_utilization_percent", "Speicher-Controller Auslastung in Prozent"),
+    "memory.used": ("dvm_gpu_memory_used_mib", "Belegter GPU Speicher in MiB"),
+    "memory.total": ("dvm_gpu_memory_total_mib", "Gesamter GPU Speicher in MiB"),
+    "temperature.gpu": ("dvm_gpu_temperature_celsius", "GPU Temperatur in Grad Celsius"),
+    "power.draw": ("dvm_gpu_power_draw_watts", "Aktuelle Leistungsaufnahme in Watt"),
+    "power.limit": ("dvm_gpu_power_limit_watts", "Eingestelltes Power Limit in Watt"),
+}
+
+
+# Wartezeit auf den Exit-Code nach EOF und Pause vor dem Neustart eines beendeten Streams (Sekunden)
+EXIT_TIMEOUT = 5
+RECONNECT_DELAY = 1.0
+
+
+def nvidia_smi_binary() -> str:
+    """nvidia-smi Pfad; per DVM_NVIDIA_SMI überschreibbar (z.B. für einen Fake-Emitter in Tests)."""
+    return os.environ.get("DVM_NVIDIA_SMI", "nvidia-smi")
+
+
+def _to_number(value: str):
+    value = value.strip()
+    if not value or value.startswith("[") or value in ("N/A", "Not Supported"):
+        return None
+    try:
+        return float(value) if "." in value else int(value)
+    except ValueError:
+        return value
+
+
+def parse_sample(line: str, fields: list = None) -> dict:
+    """
+    Parst eine CSV-Zeile von 'nvidia-smi --format=csv,noheader,nounits'.
+    Returns ein Dict {feld: wert} oder None bei unvollständigen Zeilen.
+    """
+    fields = fields or GPU_FIELDS
+    parts = [p.strip() for p in line.rstrip("\n").split(",")]
+    if len(parts) != len(fields):
+        return None
+    sample = {"time": time.time()}
+    for field, value in zip(fields, parts):
+        sample[field] = value if field in ("uuid", "name") else _to_number(value)
+    return sample
+
+
+# Felder für 'nvidia-smi --query-compute-apps'
+PROCESS_FIELDS = ["pid", "gpu_uuid", "used_memory"]
+
+# Container-ID in /proc/<pid>/cgroup, z.B. "0::/system.slice/docker-<id>.scope" (cgroup v2)
+# oder "12:memory:/docker/<id>" (cgroup v1)
+_CONTAINER_ID = re.compile(r"(?:docker[-/]|/)([0-9a-f]{64})(?:\.scope)?$")
+
+
+def query_compute_apps(binary: str = None) -> list:
+    """GPU-Prozesse (pid, gpu_uuid, used_memory in MiB) über einen einzigen nvidia-smi Aufruf."""
+    result = subprocess.run(
+        [binary or nvidia_smi_binary(), f"--query-compute-apps={','.join(PROCESS_FIELDS)}", "--format=csv,noheader,nounits"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return []
+    apps = []
+    for line in result.stdout.splitlines():
+        parts = [p.strip() for p in line.split(",")]
+        if len(parts) != len(PROCESS_FIELDS) or not parts[0].isdigit():
+            continue
+        apps.append({"pid": int(parts[0]), "gpu_uuid": parts[1], "used_memory": _to_number(parts[2]) or 0})
+    return apps
+
+
+def query_process_utilization(binary: str = None) -> dict:
+    """SM-Auslastung pro PID aus einem einzelnen 'nvidia-smi pmon -c 1 -s u'. Returns {pid: prozent}."""
+    result = subprocess.run([binary or nvidia_smi_binary(), "pmon", "-c", "1", "-s", "u"], capture_output=True, text=True)
+    if result.returncode != 0:
+        return {}
+    utilization = {}
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        # gpu pid type sm mem enc dec ... command
+        if line.lstrip().startswith("#") or len(parts) < 4 or not parts[1].isdigit():
+            continue
+        sm = _to_number(parts[3]) if parts[3] != "-" else None
+        utilization[int(parts[1])] = max(utilization.get(int(parts[1])) or 0, sm or 0)
+    return utilization
+
+
+def container_id_for_pid(pid: int, proc_root: str = "/proc") -> str:
+    """Ermittelt die Docker Container-ID eines Prozesses über seine cgroup. None für Host-Prozesse."""
+    try:
+        with open(os.path.join(proc_root, str(pid), "cgroup"), "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        match = _CONTAINER_ID.search(line.split(":", 2)[-1])
+        if match:
+            return match.group(1)
+    return None
+
+
+class GpuSampler:
+    """
+    Liest GPU-Telemetrie kontinuierlich in einen Ringpuffer fester Größe.
+    Nutzt NVML (pynvml), falls installiert, sonst einen einzigen langlebigen
+    'nvidia-smi --loop-ms' Prozess, dessen Ausgabe zeilenweise geparst wird.
+    Endet der Stream mit Code 0, wird neu verbunden; ein Fehlercode landet in error.
+    """
+
+    def __init__(self, interval_ms: int = 1000, buffer_size: int = 600, binary: str = None, use_nvml: bool = True,
+                 track_processes: bool = False):
+        self.interval_ms = max(100, interval_ms)
+        self.samples = deque(maxlen=buffer_size)
+        self.latest = {}
+        self.binary = binary or nvidia_smi_binary()
+        self.use_nvml = use_nvml and binary is None
+        self.backend = None
+        self.error = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._process = None
+        self._thread = None
+        self.track_processes = track_processes
+        self._processes = []
+        self._processes_ready = threading.Event()
+        self.reconnects = 0
+
+    def on_sample(self, callback):
+        """Registriert eine Funktion, die für jedes neue Sample aufgerufen wird."""
+        self._callbacks.append(callback)
+
+    def _add(self, sample: dict):
+        with self._lock:
+            self.samples.append(sample)
+            self.latest[sample["index"]] = sample
+        for callback in self._callbacks:
+            callback(sample)
+
+    def start(self):
+        if self.track_processes:
+            threading.Thread(target=self._process_loop, daemon=True).start()
+        if self.use_nvml and self._start_nvml():
+            return self
+        self._start_nvidia_smi()
+        return self
+
+    def _process_loop(self):
+        # Eine Abfrage pro Intervall für alle GPU-Prozesse, unabhängig von der Anzahl der Container
+        while not self._stop.is_set():
+            apps = query_compute_apps(self.binary)
+            utilization = query_process_utilization(self.binary) if apps else {}
+            for app in apps:
+                app["sm"] = utilization.get(app["pid"])
+            with self._lock:
+                self._processes = apps
+            self._processes_ready.set()
+            self._stop.wait(max(self.interval_ms, 1000) / 1000.0)
+
+    def wait_processes(self, timeout: float = 5) -> bool:
+        """Wartet auf die erste Prozessabfrage."""
+        return self._processes_ready.wait(timeout)
+
+    def processes(self) -> list:
+        """Zuletzt ermittelte GPU-Prozesse (nur mit track_processes=True)."""
+        with self._lock:
+            return list(self._processes)
+
+    def _start_nvml(self) -> bool:
+        try:
+            import pynvml
+            pynvml.nvmlInit()
+        except Exception:
+            return False
+        self.backend = "nvml"
+        self._thread = threading.Thread(target=self._nvml_loop, args=(pynvml,), daemon=True)
+        self._thread.start()
+        return True
+
+    def _nvml_loop(self, pynvml):
+        handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
+        while not self._stop.is_set():
+            for index, handle in enumerate(handles):
+                try:
+                    util = pynvml.nvmlDeviceGetUtilizationRates(handle)
+                    mem = pynvml.nvmlDeviceGetMemoryInfo(handle)
+                    name = pynvml.nvmlDeviceGetName(handle)
+                    uuid = pynvml.nvmlDeviceGetUUID(handle)
+                    self._add({
+                        "time": time.time(),
+                        "index": index,
+                        "uuid": uuid.decode() if isinstance(uuid, bytes) else uuid,
+                        "name": name.decode() if isinstance(name, bytes) else name,
+                        "utilization.gpu": util.gpu,
+                        "utilization.memory": util.memory,
+                        "memory.used": mem.used // (1024 * 1024),
+                        "memory.total": mem.total // (1024 * 1024),
+                        "temperature.gpu": pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU),
+                        "power.draw": pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0,
+                        "power.limit": pynvml.nvmlDeviceGetEnforcedPowerLimit(handle) / 1000.0,
+                    })
+                except Exception as e:
+                    self.error = str(e)
+            self._stop.wait(self.interval_ms / 1000.0)
+        pynvml.nvmlShutdown()
+
+    def _start_nvidia_smi(self):
+        self.backend = "nvidia-smi"
+        if not self._spawn():
+            return
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _spawn(self) -> bool:
+        cmd = [
+            self.binary,
+            f"--query-gpu={','.join(GPU_FIELDS)}",
+            "--format=csv,noheader,nounits",
+            f"--loop-ms={self.interval_ms}",
+        ]
+        try:
+            self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
+        except OSError as e:
+            self.error = str(e)
+            return False
+        return True
+
+    def _read_stream(self) -> bool:
+        """Parst die Ausgabe des laufenden Prozesses bis EOF. Returns True, wenn mindestens ein Sample kam."""
+        received = False
+        for line in self._process.stdout:
+            if self._stop.is_set():
+                break
+            sample = parse_sample(line)
+            if sample is not None:
+                self._add(sample)
+                received = True
+        return received
+
+    def _read_loop(self):
+        while True:
+            received = self._read_stream()
+            if self._stop.is_set():
+                return
+            # Bei EOF auf stdout ist der Prozess oft noch nicht beendet - auf den Exit-Code warten
+            try:
+                code = self._process.wait(timeout=EXIT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                code = self._process.wait()
+            if code != 0:
+                self.error = (self._process.stderr.read() or "").strip() or f"{self.binary} beendet (Code {code})"
+                return
+            if not received:
+                self.error = f"{self.binary} beendet ohne Ausgabe"
+                return
+            # Stream regulär beendet (z.B. nach Neuladen des Treibers): neu verbinden
+            if self._stop.wait(RECONNECT_DELAY) or not self._spawn():
+                return
+            self.reconnects += 1
+            if self._stop.is_set():
+                self._process.terminate()
+                return
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self._stop.set()
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+    def snapshot(self) -> list:
+        """Letztes Sample pro GPU, sortiert nach Index."""
+        with self._lock:
+            return [self.latest[i] for i in sorted(self.latest)]
+
+    def history(self, index=None) -> list:
+        with self._lock:
+            return [s for s in self.samples if index is None or s["index"] == index]
+
+
+def prometheus_lines(snapshot: list) -> list:
+    """Formatiert einen Snapshot im Prometheus Text-Format."""
+    from dockervm_cli.exporter import escape_label
+
+    lines = []
+    for field, (metric, help_text) in PROMETHEUS_METRICS.items():
+        values = [s for s in snapshot if s.get(field) is not None]
+        if not values:
+            continue
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for s in values:
+            labels = f'gpu="{s["index"]}",uuid="{escape_label(s["uuid"])}",name="{escape_label(s["name"])}"'
+            lines.append(f"{metric}{{{labels}}} {s[field]}")
+    return lines
+
+
+def attribute_processes(processes: list, containers: list, proc_root: str = "/proc") -> list:
+    """
+    Ordnet GPU-Prozesse über /proc/<pid>/cgroup den Containern aus der Engine API zu.
+    Returns eine Zeile pro Container (Host-Prozesse gesammelt unter id=None) mit
+    Speicher (MiB), summierter SM-Auslastung, GPUs und PIDs.
+    """
+    from dockervm_cli.docker_api import container_name, COMPOSE_PROJECT_LABEL, COMPOSE_SERVICE_LABEL
+
+    by_id = {c["Id"]: c for c in containers}
+    rows = {}
+    for proc in processes:
+        container_id = container_id_for_pid(proc["pid"], proc_root)
+        container = by_id.get(container_id, {})
+        labels = container.get("Labels") or {}
+        row = rows.setdefault(container_id, {
+            "id": container_id,
+            "name": container_name(container) if container else (container_id[:12] if container_id else "(Host)"),
+            "project": labels.get(COMPOSE_PROJECT_LABEL, ""),
+            "service": labels.get(COMPOSE_SERVICE_LABEL, ""),
+            "gpus": [],
+            "pids": [],
+            "memory": 0,
+            "sm": None,
+        })
+        row["pids"].append(proc["pid"])
+        row["memory"] += proc.get("used_memory") or 0
+        if proc.get("sm") is not None:
+            row["sm"] = (row["sm"] or 0) + proc["sm"]
+        if proc["gpu_uuid"] not in row["gpus"]:
+            row["gpus"].append(proc["gpu_uuid"])
+    return sorted(rows.values(), key=lambda r: r["memory"], reverse=True)
@@ -0,0 +1,435 @@
+import os
+import re
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dockervm_cli import scheduler
+from dockervm_cli.utils import run_command, write_root_file, get_docker_compose_cmd
+
+DPKG_STATUS = "/var/lib/dpkg/status"
+
+# Standard-Mountoptionen wie bei 'dvm disk mount', 'mount-nfs' und 'mount-cifs'
+DEFAULT_MOUNT_OPTIONS = {
+    "nfs": "x-systemd.automount,_netdev,nofail",
+    "cifs": "uid=1000,gid=1000,x-systemd.automount,_netdev,nofail",
+}
+MOUNT_PACKAGES = {"nfs": "nfs-common", "cifs": "cifs-utils", "xfs": "xfsprogs", "btrfs": "btrfs-progs"}
+
+
+class HostFileError(Exception):
+    pass
+
+
+# --- Host-Datei ---------------------------------------------------------------
+
+# Abschnitt -> erwarteter Typ (fehlende oder leere Abschnitte sind erlaubt)
+_SECTIONS = {"mounts": list, "networks": list, "packages": dict, "cron": dict, "stacks": list}
+_TYPE_NAMES = {list: "eine Liste", dict: "ein Mapping", str: "ein Text"}
+
+
+def _check_type(value, kind: type, what: str, optional: bool = True):
+    if not (optional and value is None) and not isinstance(value, kind):
+        raise HostFileError(f"{what} muss {_TYPE_NAMES[kind]} sein, nicht {type(value).__name__}.")
+
+
+def load_host_file(path: str) -> dict:
+    """
+    Lädt und prüft eine host.yaml. Alle Abschnitte sind optional:
+    mounts, networks, packages (install/hold), cron und stacks.
+    """
+    import yaml
+    try:
+        with open(path, "r") as f:
+            spec = yaml.safe_load(f) or {}
+    except OSError as e:
+        raise HostFileError(f"{path} konnte nicht gelesen werden: {e}")
+    except yaml.YAMLError as e:
+        raise HostFileError(f"{path} ist kein gültiges YAML: {e}")
+
+    if not isinstance(spec, dict):
+        raise HostFileError(f"{path} muss ein Mapping mit den Abschnitten mounts, networks, packages, cron und stacks sein.")
+    unknown = set(spec) - set(_SECTIONS)
+    if unknown:
+        raise HostFileError(f"Unbekannte Abschnitte: {', '.join(sorted(unknown))}")
+    for section, kind in _SECTIONS.items():
+        _check_type(spec.get(section), kind, f"Abschnitt '{section}'")
+    for section in ("mounts", "networks", "stacks"):
+        for entry in spec.get(section) or []:
+            _check_type(entry, dict, f"Eintrag in '{section}' ({entry!r})", optional=False)
+    for tag, entry in (spec.get("cron") or {}).items():
+        _check_type(entry, dict, f"Cron-Job '{tag}'")
+        for key in ("schedule", "command"):
+            _check_type((entry or {}).get(key), str, f"'{key}' von Cron-Job '{tag}'")
+    for key in ("install", "hold"):
+        _check_type((spec.get("packages") or {}).get(key), list, f"'packages.{key}'")
+
+    base = os.path.dirname(os.path.abspath(path))
+    for m in spec.get("mounts") or []:
+        for key in ("source", "target", "type"):
+            if not m.get(key):
+                raise HostFileError(f"Mount ohne '{key}': {m}")
+        if m["type"] == "cifs" and not m.get("credentials"):
+            raise HostFileError(f"CIFS Mount {m['target']} benötigt 'credentials' (Pfad zur Anmeldedaten-Datei).")
+    for n in spec.get("networks") or []:
+        if not n.get("name"):
+            raise HostFileError(f"Netzwerk ohne 'name': {n}")
+    for tag, entry in (spec.get("cron") or {}).items():
+        if entry is not None and not (entry.get("schedule") and entry.get("command")):
+            raise HostFileError(f"Cron-Job '{tag}' benötigt 'schedule' und 'command' (oder null zum Entfernen).")
+        if entry is not None and entry.get("backend") == "systemd":
+            try:
+                scheduler.cron_to_oncalendar(entry["schedule"])
+            except scheduler.ScheduleError as e:
+                raise HostFileError(f"Cron-Job '{tag}': {e}")
+    for s in spec.get("stacks") or []:
+        if not s.get("path"):
+            raise HostFileError(f"Stack ohne 'path': {s}")
+        _check_type(s["path"], str, f"'path' von Stack {s}")
+        # Relative Pfade beziehen sich auf die host.yaml
+        s["path"] = os.path.join(base, s["path"])
+    return spec
+
+
+# --- Fakten -------------------------------------------------------------------
+
+def _read(path: str) -> str:
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def read_fstab() -> dict:
+    """Returns {mountpoint: [quelle, ziel, typ, optionen, dump, pass]}."""
+    entries = {}
+    for line in _read("/etc/fstab").splitlines():
+        fields = line.split()
+        if len(fields) >= 4 and not fields[0].startswith("#"):
+            entries[fields[1]] = fields
+    return entries
+
+
+def read_active_mounts() -> set:
+    """Aktive Mountpoints (inkl. systemd Automounts) aus /proc/mounts."""
+    return {line.split()[1] for line in _read("/proc/mounts").splitlines() if len(line.split()) > 1}
+
+
+def read_dpkg_status() -> dict:
+    """
+    Liest /var/lib/dpkg/status direkt (kein dpkg-query/apt-mark Prozess).
+    Returns {paket: {"installed": bool, "hold": bool}}.
+    """
+    packages = {}
+    name = None
+    for line in _read(DPKG_STATUS).splitlines():
+        if line.startswith("Package: "):
+            name = line[len("Package: "):].strip()
+        elif line.startswith("Status: ") and name:
+            want, _, state = (line[len("Status: "):].split() + ["", "", ""])[:3]
+            packages[name] = {"installed": state == "installed", "hold": want == "hold"}
+    return packages
+
+
+def read_docker() -> dict:
+    """Netzwerke und Compose-Container aus der Engine API (zwei Anfragen)."""
+    from dockervm_cli import docker_api
+    networks = {n["Name"]: n for n in docker_api.get("/networks")}
+    containers = docker_api.list_containers(all=True, filters={"label": [docker_api.COMPOSE_PROJECT_LABEL]})
+    return {"networks": networks, "containers": containers}
+
+
+def stack_location(stack: dict) -> tuple:
+    """Returns (Verzeichnis, -f Argument, Projektname) eines Stacks aus der host.yaml."""
+    path = stack["path"]
+    directory = path if os.path.isdir(path) else os.path.dirname(path)
+    file_arg = "" if os.path.isdir(path) else f" -f {path}"
+    return directory, file_arg, stack.get("project") or compose_project_name(directory)
+
+
+def read_config_hashes(stacks: list) -> dict:
+    """
+    Soll-Konfiguration der Stacks als {projekt: {service: hash}} über 'docker compose config --hash'.
+    Derselbe Hash steht im Label com.docker.compose.config-hash der Container. Stacks, deren
+    Hash sich nicht ermitteln lässt (alte Compose-Version, ungültige Datei), fehlen im Ergebnis.
+    """
+    hashes = {}
+    for stack in stacks:
+        if stack.get("state", "up") == "down":
+            continue
+        directory, file_arg, project = stack_location(stack)
+        result = subprocess.run(f"cd {directory} && sudo {get_docker_compose_cmd()}{file_arg} config --hash '*'",
+                                shell=True, capture_output=True, text=True)
+        services = dict(line.split(None, 1) for line in result.stdout.splitlines() if len(line.split()) == 2)
+        if result.returncode == 0 and services:
+            hashes[project] = services
+    return hashes
+
+
+def read_schedule() -> dict:
+    _, owned = scheduler.parse_crontab(scheduler.read_crontab())
+    return owned
+
+
+def gather_facts(spec: dict) -> dict:
+    """Sammelt nur die Fakten, die für die Abschnitte der host.yaml nötig sind (parallel)."""
+    probes = {}
+    if spec.get("mounts"):
+        probes["fstab"] = read_fstab
+        probes["active_mounts"] = read_active_mounts
+    if spec.get("packages") or spec.get("mounts"):
+        probes["dpkg"] = read_dpkg_status
+    if spec.get("cron"):
+        probes["cron"] = read_schedule
+    if spec.get("networks") or spec.get("stacks"):
+        probes["docker"] = read_docker
+    if spec.get("stacks"):
+        probes["config_hashes"] = lambda: read_config_hashes(spec["stacks"])
+
+    facts, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, len(probes))) as pool:
+        futures = {key: pool.submit(func) for key, func in probes.items()}
+        for key, future in futures.items():
+            try:
+                facts[key] = future.result()
+            except Exception as e:
+                errors[key] = str(e)
+    facts["errors"] = errors
+    return facts
+
+
+# --- Diff ---------------------------------------------------------------------
+
+def _sh(command: str) -> tuple:
+    """Führt einen Befehl mit erfasster Ausgabe aus (parallel laufende Schritte mischen sonst ihre Ausgaben)."""
+    result = subprocess.run(command, shell=True, capture_output=True, text=True, executable="/bin/bash")
+    output = (result.stderr or result.stdout).strip()
+    return result.returncode == 0, output[-300:]
+
+
+def _step(phase: int, area: str, name: str, action: str, run) -> dict:
+    """
+    Ein Schritt des Plans. Phase 0: Pakete, fstab, Zeitpläne; Phase 1: Mounts, Netzwerke, Holds;
+    Phase 2: Stacks. Schritte derselben Phase sind unabhängig voneinander.
+    """
+    return {"phase": phase, "area": area, "name": name, "action": action, "run": run}
+
+
+def mount_options(mount: dict) -> str:
+    options = mount.get("options") or DEFAULT_MOUNT_OPTIONS.get(mount["type"], "defaults")
+    if mount["type"] == "cifs" and "credentials=" not in options:
+        options = f"credentials={mount['credentials']},{options}"
+    return options
+
+
+def fstab_line(mount: dict) -> list:
+    local = mount["type"] not in ("nfs", "cifs")
+    return [mount["source"], mount["target"], mount["type"], mount_options(mount), "0", "2" if local else "0"]
+
+
+def diff_packages(spec: dict, facts: dict) -> list:
+    wanted = list((spec.get("packages") or {}).get("install") or [])
+    for m in spec.get("mounts") or []:
+        pkg = MOUNT_PACKAGES.get(m["type"])
+        if pkg and pkg not in wanted:
+            wanted.append(pkg)
+    holds = (spec.get("packages") or {}).get("hold") or []
+    dpkg = facts.get("dpkg", {})
+
+    steps = []
+    missing = [p for p in wanted if not dpkg.get(p, {}).get("installed")]
+    if missing:
+        def _install():
+            from dockervm_cli.apt import apt_install
+            return apt_install(missing), ""
+        steps.append(_step(0, "Pakete", " ".join(missing), "installieren", _install))
+
+    to_hold = [p for p in holds if not dpkg.get(p, {}).get("hold")]
+    if to_hold:
+        # Nach der Installation, damit frisch installierte Pakete ebenfalls gesperrt werden
+        steps.append(_step(1, "Pakete", " ".join(to_hold), "hold setzen",
+                           lambda: _sh(f"sudo apt-mark hold {' '.join(to_hold)}")))
+    return steps
+
+
+def diff_mounts(spec: dict, facts: dict) -> list:
+    fstab = facts.get("fstab", {})
+    active = facts.get("active_mounts", set())
+    steps = []
+    changed = {}
+    for m in spec.get("mounts") or []:
+        line = fstab_line(m)
+        current = fstab.get(m["target"])
+        if current is None or current[:4] != line[:4]:
+            changed[m["target"]] = line
+        if m["target"] in active:
+            # Geänderte Optionen eines aktiven Mounts greifen beim nächsten Einhängen
+            continue
+        target = m["target"]
+        steps.append(_step(1, "Mounts", target, "einhängen",
+                           lambda target=target: _sh(f"sudo mkdir -p {target} && sudo mount {target}")))
+
+    if changed:
+        def _write_fstab():
+            lines = []
+            for raw in _read("/etc/fstab").splitlines():
+                fields = raw.split()
+                if len(fields) >= 2 and not fields[0].startswith("#") and fields[1] in changed:
+                    continue
+                lines.append(raw)
+            lines += [" ".join(line) for line in changed.values()]
+            run_command("sudo cp /etc/fstab /etc/fstab.backup", check=False)
+            ok = write_root_file("/etc/fstab", "\n".join(lines) + "\n", mode="644")
+            run_command("sudo systemctl daemon-reload", check=False)
+            return ok, ""
+        steps.append(_step(0, "Mounts", "/etc/fstab", f"{len(changed)} Einträge schreiben", _write_fstab))
+    return steps
+
+
+def diff_cron(spec: dict, facts: dict) -> list:
+    owned = facts.get("cron", {})
+    changes = {}
+    for tag, entry in (spec.get("cron") or {}).items():
+        if entry is None:
+            if tag in owned or scheduler.timer_installed(tag):
+                changes[tag] = None
+            continue
+        job = scheduler.job(tag, entry["schedule"], entry["command"], backend=entry.get("backend", "cron"),
+                            random_delay=int(entry.get("random_delay", 0)) * 60)
+        if job["backend"] == "systemd":
+            service, timer = scheduler.render_timer(job)
+            unit = os.path.join(scheduler.SYSTEMD_DIR, scheduler.unit_name(tag))
+            if tag in owned or _read(f"{unit}.service") != service or _read(f"{unit}.timer") != timer:
+                changes[tag] = job
+        else:
+            schedule = scheduler.jitter_schedule(job["schedule"], scheduler.host_offset(tag, job["random_delay"]))
+            if owned.get(tag) != f"{schedule} {job['command']}" or scheduler.timer_installed(tag):
+                changes[tag] = job
+    if not changes:
+        return []
+    # Alle Änderungen in einem Schreibvorgang
+    return [_step(0, "Zeitpläne", ", ".join(changes), "anwenden", lambda: (scheduler.apply(changes), ""))]
+
+
+def diff_networks(spec: dict, facts: dict) -> list:
+    current = facts.get("docker", {}).get("networks", {})
+    steps = []
+    for n in spec.get("networks") or []:
+        name = n["name"]
+        if name in current:
+            continue
+        cmd = f"sudo docker network create -d {n.get('driver', 'bridge')}"
+        if n.get("subnet"):
+            cmd += f" --subnet={n['subnet']}"
+        if n.get("gateway"):
+            cmd += f" --gateway={n['gateway']}"
+        if n.get("parent"):
+            cmd += f" -o parent={n['parent']}"
+        cmd += f" {name}"
+        steps.append(_step(1, "Netzwerke", name, "erstellen", lambda cmd=cmd: _sh(cmd)))
+    return steps
+
+
+def network_drift(spec: dict, facts: dict) -> list:
+    """Bestehende Netzwerke mit abweichender Konfiguration (werden nicht automatisch neu erstellt)."""
+    current = facts.get("docker", {}).get("networks", {})
+    drift = []
+    for n in spec.get("networks") or []:
+        net = current.get(n["name"])
+        if not net:
+            continue
+        ipam = ((net.get("IPAM") or {}).get("Config") or [{}])[0]
+        if net.get("Driver") != n.get("driver", "bridge") \
+                or (n.get("subnet") and ipam.get("Subnet") != n["subnet"]) \
+                or (n.get("gateway") and ipam.get("Gateway") != n["gateway"]):
+            drift.append(n["name"])
+    return drift
+
+
+def compose_project_name(path: str) -> str:
+    """Standard-Projektname von docker compose (Verzeichnisname, normalisiert)."""
+    return re.sub(r"[^a-z0-9_-]", "", os.path.basename(os.path.normpath(path)).lower())
+
+
+def config_drift(expected: dict, containers: list) -> list:
+    """Services, deren Container fehlen oder mit einer anderen Konfiguration (Image, Ports, ...) laufen."""
+    current = {}
+    for c in containers:
+        labels = c.get("Labels") or {}
+        if labels.get("com.docker.compose.oneoff") != "True":
+            current.setdefault(labels.get("com.docker.compose.service"), set()).add(labels.get("com.docker.compose.config-hash"))
+    return sorted(service for service, digest in expected.items() if current.get(service) != {digest})
+
+
+def diff_stacks(spec: dict, facts: dict) -> list:
+    containers = facts.get("docker", {}).get("containers", [])
+    hashes = facts.get("config_hashes", {})
+    by_project = {}
+    for c in containers:
+        project = (c.get("Labels") or {}).get("com.docker.compose.project")
+        by_project.setdefault(project, []).append(c)
+
+    steps = []
+    for s in spec.get("stacks") or []:
+        directory, file_arg, project = stack_location(s)
+        existing = by_project.get(project, [])
+        state = s.get("state", "up")
+
+        def _compose(args, directory=directory, file_arg=file_arg):
+            return _sh(f"cd {directory} && sudo {get_docker_compose_cmd()}{file_arg} {args}")
+
+        if state == "down":
+            if existing:
+                steps.append(_step(2, "Stacks", project, "stoppen", lambda c=_compose: c("down")))
+            continue
+        # Einmalige Container (z.B. Init-Jobs), die erfolgreich beendet wurden, zählen als in Ordnung
+        healthy = [c for c in existing if c.get("State") == "running" or "Exited (0)" in (c.get("Status") or "")]
+        if not existing or len(healthy) < len(existing):
+            steps.append(_step(2, "Stacks", project, "starten", lambda c=_compose: c("up -d")))
+            continue
+        # Geänderte Compose-Datei (neues Image-Tag, zusätzlicher Service, ...): Container neu erstellen
+        drift = config_drift(hashes[project], existing) if project in hashes else []
+        if drift:
+            steps.append(_step(2, "Stacks", f"{project} ({', '.join(drift)})", "aktualisieren", lambda c=_compose: c("up -d")))
+    return steps
+
+
+def plan(spec: dict, facts: dict) -> list:
+    """Berechnet die minimal nötigen Schritte, um den Host in den Zustand der host.yaml zu bringen."""
+    steps = []
+    steps += diff_packages(spec, facts)
+    steps += diff_cron(spec, facts)
+    steps += diff_mounts(spec, facts)
+    if "docker" in facts:
+        steps += diff_networks(spec, facts)
+        steps += diff_stacks(spec, facts)
+    return sorted(steps, key=lambda s: s["phase"])
+
+
+# --- Anwenden -----------------------------------------------------------------
+
+def execute(steps: list, parallel: int = 4) -> list:
+    """
+    Führt die Schritte phasenweise aus; innerhalb einer Phase parallel.
+    Schlägt ein Schritt fehl, werden spätere Phasen nicht mehr gestartet.
+    """
+    results = []
+
+    def _run(step):
+        start = time.perf_counter()
+        try:
+            ok, message = step["run"]()
+        except Exception as e:
+            ok, message = False, str(e)
+        return {**step, "ok": ok, "message": message, "duration": time.perf_counter() - start}
+
+    for phase in sorted({s["phase"] for s in steps}):
+        batch = [s for s in steps if s["phase"] == phase]
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            phase_results = list(pool.map(_run, batch))
+        results += phase_results
+        if not all(r["ok"] for r in phase_results):
+            results += [{**s, "ok": None, "message": "übersprungen", "duration": 0.0}
+                        for s in steps if s["phase"] > phase]
+            break
+    return results
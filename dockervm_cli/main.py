@@ -1,9 +1,9 @@
 
 import typer
-from typing import Optional
+from typing import Annotated, List, Optional
 from dockervm_cli.utils import console
 
-from dockervm_cli.commands import update, install, network, gpu, disk
+from dockervm_cli.commands import update, install, network, gpu, disk, cache, fleet
 
 app = typer.Typer(
     name="dvm",
@@ -17,6 +17,8 @@ app.add_typer(install.app, name="install")
 app.add_typer(network.app, name="network")
 app.add_typer(gpu.app, name="gpu")
 app.add_typer(disk.app, name="disk")
+app.add_typer(cache.app, name="cache")
+app.add_typer(fleet.app, name="fleet")
 
 @app.command("commands")
 def list_commands():
@@ -39,6 +41,7 @@ def list_commands():
     table.add_row("", "dvm update mail", "E-Mail Benachrichtigungen konfigurieren (SMTP)")
     table.add_row("", "dvm update cron", "Automatische Self-Updates konfigurieren (Cron)")
     table.add_row("", "dvm update dockhand", "Dockhand Container aktualisieren")
+    table.add_row("", "dvm update stacks", "Alle Compose-Stacks aktualisieren (nur geänderte Images)")
     table.add_section()
     
     # Installation
@@ -46,8 +49,13 @@ def list_commands():
     table.add_row("", "dvm install lazydocker", "Lazydocker (Terminal UI) installieren")
     table.add_row("", "dvm install zsh", "ZSH & Oh My Zsh installieren")
     table.add_row("", "dvm install container", "Container aus Template installieren (z.B. Unifi)")
+    table.add_row("", "dvm install templates", "Container-Templates mit Variablen anzeigen")
+    table.add_row("", "dvm install template-sync", "Templates aus einem signierten Katalog synchronisieren")
     table.add_row("", "dvm install dns-server", "DNS Server installieren (AdGuard + Technitium)")
     table.add_row("", "dvm install netbird", "Netbird VPN Client installieren")
+    table.add_row("", "dvm install registry-mirror", "Lokalen Docker Hub Pull-Through-Cache einrichten (Server/Client)")
+    table.add_row("", "dvm install registry-mirror-bench", "Pull-Zeiten kalt/warm über den Registry Mirror messen")
+    table.add_row("", "dvm install apt-cache", "APT Caching-Proxy (apt-cacher-ng) einrichten (Server/Client)")
     table.add_section()
     
     # Network
@@ -55,13 +63,17 @@ def list_commands():
     table.add_row("", "dvm network ipvlan", "IPVLAN Docker Netzwerk einrichten")
     table.add_row("", "dvm network create", "Docker Netzwerk erstellen (für external: true)")
     table.add_row("", "dvm network list", "Alle Docker Netzwerke anzeigen")
+    table.add_row("", "dvm network ports", "Belegte Ports (Sockets, Container, Compose-Dateien) anzeigen")
     table.add_section()
 
     # GPU
     table.add_row("GPU", "dvm gpu check", "NVIDIA GPU Erkennung prüfen")
+    table.add_row("", "dvm gpu monitor", "GPU Telemetrie live / JSON / Prometheus")
+    table.add_row("", "dvm gpu containers", "GPU Speicher/Auslastung pro Container")
+    table.add_row("", "dvm gpu assign", "Compose-Service fest einer GPU zuweisen")
     table.add_row("", "dvm gpu install-driver", "NVIDIA Treiber installieren")
     table.add_row("", "dvm gpu setup-docker", "Docker für GPU konfigurieren")
-    table.add_row("", "dvm gpu setup-persistence", "GPU Persistence Mode (Autostart) aktivieren")
+    table.add_row("", "dvm gpu setup-persistence", "GPU Persistence Mode (systemd, vor Docker) aktivieren")
     table.add_row("", "dvm gpu toggle-hold", "NVIDIA Treiber Updates sperren/entsperren (Hold)")
     table.add_section()
     
@@ -79,16 +91,378 @@ def list_commands():
     
     # Misc
     table.add_row("Sonstiges", "dvm update self", "Dieses CLI-Tool aktualisieren")
+    table.add_row("", "dvm cache status", "Lokalen Cache (Wheels, uv, Downloads) und Trefferquote anzeigen")
+    table.add_row("", "dvm cache clear", "Lokalen Cache leeren")
+    table.add_row("", "dvm apply host.yaml", "Host deklarativ einrichten (nur geänderte Schritte)")
+    table.add_row("", "dvm --plan plan.json <befehl>", "Änderungen eines Befehls nur als Plan aufzeichnen")
+    table.add_row("", "dvm apply-plan plan.json", "Gespeicherten Plan ausführen (z.B. auf identischen VMs)")
+    table.add_row("", "dvm exporter", "Prometheus Metriken (Platz, Pakete, Stacks, GPU) unter /metrics")
+    table.add_row("", "dvm fleet run -- <befehl>", "dvm Befehl parallel auf allen Hosts eines Inventars ausführen (SSH)")
+    table.add_row("", "dvm bench", "Laufzeit der wichtigsten Abläufe offline messen (Regressionstest)")
     table.add_row("", "dvm commands", "Diese Liste anzeigen")
     
     console.print(table)
 
 
+@app.command("apply")
+def apply_host(
+    file: Annotated[str, typer.Argument(help="Pfad zur Host-Beschreibung (YAML)")] = "host.yaml",
+    check_only: Annotated[bool, typer.Option("--check", help="Nur Unterschiede anzeigen, nichts ändern")] = False,
+    parallel: Annotated[int, typer.Option("--parallel", "-j", help="Anzahl parallel ausgeführter Schritte pro Phase")] = 4,
+):
+    """
+    Bringt den Host in den Zustand aus host.yaml (Mounts, Netzwerke, Pakete, Cron, Stacks).
+    """
+    import time
+    from rich.table import Table
+    from dockervm_cli import host_state
+    from dockervm_cli.utils import print_error, print_success
+
+    start = time.perf_counter()
+    try:
+        spec = host_state.load_host_file(file)
+    except host_state.HostFileError as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
+
+    facts = host_state.gather_facts(spec)
+    for key, error in facts["errors"].items():
+        print_error(f"Fakten '{key}' konnten nicht ermittelt werden: {error}")
+    steps = host_state.plan(spec, facts)
+    for name in host_state.network_drift(spec, facts):
+        console.print(f"[yellow]Netzwerk '{name}' existiert mit abweichender Konfiguration (wird nicht neu erstellt).[/yellow]")
+
+    if not steps:
+        print_success(f"Keine Änderungen - der Host entspricht {file} ({time.perf_counter() - start:.2f}s).")
+        if facts["errors"]:
+            raise typer.Exit(code=1)
+        return
+
+    table = Table(title=f"Änderungen ({file})", show_header=True, header_style="bold magenta")
+    table.add_column("Phase", justify="right", style="dim")
+    table.add_column("Bereich", style="cyan")
+    table.add_column("Objekt")
+    table.add_column("Aktion", style="yellow")
+    for step in steps:
+        table.add_row(str(step["phase"] + 1), step["area"], step["name"], step["action"])
+    console.print(table)
+
+    if check_only:
+        raise typer.Exit(code=2)
+
+    results = host_state.execute(steps, parallel=parallel)
+
+    summary = Table(title="Ergebnis", show_header=True, header_style="bold magenta")
+    summary.add_column("Bereich", style="cyan")
+    summary.add_column("Objekt")
+    summary.add_column("Aktion")
+    summary.add_column("Dauer", justify="right")
+    summary.add_column("Status")
+    for r in results:
+        if r["ok"] is None:
+            status = "[dim]übersprungen[/dim]"
+        elif r["ok"]:
+            status = "[green]OK[/green]"
+        else:
+            status = f"[red]Fehler {r['message'][:80]}[/red]"
+        summary.add_row(r["area"], r["name"], r["action"], f"{r['duration']:.1f}s", status)
+    console.print(summary)
+    console.print(f"[dim]Gesamtdauer: {time.perf_counter() - start:.1f}s[/dim]")
+
+    if not all(r["ok"] for r in results) or facts["errors"]:
+        raise typer.Exit(code=1)
+
+
+@app.command("exporter")
+def run_exporter(
+    address: Annotated[str, typer.Option("--address", help="Adresse, auf der gelauscht wird")] = "0.0.0.0",
+    port: Annotated[int, typer.Option("--port", "-p", help="HTTP Port für /metrics")] = 9477,
+    disable: Annotated[Optional[List[str]], typer.Option("--disable", help="Collector abschalten (filesystem, containers, packages, schedule, apt_upgrades, stack_images, gpu)")] = None,
+    once: Annotated[bool, typer.Option("--once", help="Metriken einmal ausgeben und beenden (z.B. für den node_exporter Textfile Collector)")] = False,
+    install: Annotated[bool, typer.Option("--install", help="Als systemd Dienst (dvm-exporter.service) einrichten")] = False,
+):
+    """
+    Stellt Host- und dvm-Zustand als Prometheus Metriken unter /metrics bereit.
+    """
+    import shutil
+    from dockervm_cli import exporter
+    from dockervm_cli.utils import print_error, print_success, run_command, write_root_file
+
+    unknown = set(disable or []) - set(exporter.COLLECTORS) - {"gpu"}
+    if unknown:
+        print_error(f"Unbekannte Collector: {', '.join(sorted(unknown))}")
+        raise typer.Exit(code=1)
+
+    if install:
+        dvm_path = shutil.which("dvm") or "/usr/local/bin/dvm"
+        flags = "".join(f" --disable {name}" for name in disable or [])
+        unit = f"""[Unit]
+Description=dvm Prometheus Exporter
+After=network-online.target docker.service
+Wants=network-online.target
+
+[Service]
+ExecStart={dvm_path} exporter --address {address} --port {port}{flags}
+Restart=on-failure
+Nice=10
+
+[Install]
+WantedBy=multi-user.target
+"""
+        if not write_root_file("/etc/systemd/system/dvm-exporter.service", unit, desc="Erstelle dvm-exporter.service"):
+            raise typer.Exit(code=1)
+        run_command("sudo systemctl daemon-reload", check=False)
+        if not run_command("sudo systemctl enable --now dvm-exporter.service", desc="Aktiviere dvm-exporter.service"):
+            raise typer.Exit(code=1)
+        print_success(f"Exporter läuft unter http://{address}:{port}/metrics")
+        return
+
+    instance = exporter.Exporter(disabled=disable)
+    if once:
+        # Ohne Hintergrund-Threads: alle Collector einmal direkt messen
+        for collector in instance.collectors:
+            collector.refresh()
+        print(instance.render(), end="")
+        instance.stop.set()
+        return
+
+    console.print(f"[bold blue]dvm Exporter[/bold blue] auf http://{address}:{port}/metrics "
+                  f"[dim]({', '.join(c.name for c in instance.collectors)})[/dim]")
+    try:
+        instance.start().serve(address, port)
+    except OSError as e:
+        print_error(f"Port {port} kann nicht geöffnet werden: {e}")
+        raise typer.Exit(code=1)
+    except KeyboardInterrupt:
+        pass
+
+
+@app.command("bench")
+def run_bench(
+    only: Annotated[Optional[List[str]], typer.Option("--only", help="Nur Benchmarks, deren Name das Muster enthält (mehrfach möglich)")] = None,
+    scale: Annotated[float, typer.Option("--scale", help="Faktor für die Größe der Testdaten (1 = typische VM)")] = 1.0,
+    repeat: Annotated[int, typer.Option("--repeat", "-r", help="Messungen pro Benchmark")] = 10,
+    save: Annotated[Optional[str], typer.Option("--save", help="Ergebnisse als Baseline (JSON) speichern")] = None,
+    baseline: Annotated[Optional[str], typer.Option("--baseline", help="Mit einer gespeicherten Baseline vergleichen")] = None,
+    tolerance: Annotated[int, typer.Option("--tolerance", help="Erlaubte Verlangsamung gegenüber der Baseline in Prozent")] = 25,
+):
+    """
+    Misst die wichtigsten Abläufe offline gegen Fake-Binaries und ein Test-Dateisystem.
+    """
+    from rich.table import Table
+    from dockervm_cli import bench
+    from dockervm_cli.utils import print_error, print_success
+
+    names = [n for n in bench.BENCHMARKS if not only or any(pattern in n for pattern in only)]
+    if not names:
+        print_error(f"Kein Benchmark passt zu {', '.join(only)} (verfügbar: {', '.join(bench.BENCHMARKS)}).")
+        raise typer.Exit(code=1)
+
+    reference = None
+    if baseline:
+        try:
+            reference = bench.load_baseline(baseline)
+        except (OSError, ValueError) as e:
+            print_error(f"Baseline {baseline} konnte nicht gelesen werden: {e}")
+            raise typer.Exit(code=1)
+        if reference.get("scale") != scale:
+            print_error(f"Die Baseline wurde mit --scale {reference.get('scale')} gemessen, nicht mit {scale}.")
+            raise typer.Exit(code=1)
+
+    results = {}
+    with console.status("[bold blue]Messe...[/bold blue]") as status:
+        for name in names:
+            status.update(f"[bold blue]Messe {name}...[/bold blue]")
+            results[name] = bench.run_benchmark(name, scale=scale, repeat=repeat)
+    factors = bench.compare(results, reference) if reference else {}
+
+    table = Table(title=f"Benchmarks (scale {scale:g}, {repeat} Messungen)", show_header=True, header_style="bold magenta")
+    table.add_column("Benchmark", style="cyan", no_wrap=True)
+    table.add_column("Daten")
+    table.add_column("Bestzeit", justify="right")
+    table.add_column("Median", justify="right")
+    table.add_column("Aufrufe", justify="right")
+    if reference:
+        table.add_column("vs. Baseline", justify="right")
+
+    failed, regressions = [], []
+    for name, r in results.items():
+        if r["error"]:
+            failed.append(name)
+            row = [name, bench.BENCHMARKS[name][0], "[red]Fehler[/red]", "", "", r["error"]]
+            table.add_row(*row[:6 if reference else 5])
+            continue
+        row = [name, bench.BENCHMARKS[name][0], f"{r['best'] * 1000:.2f} ms", f"{r['median'] * 1000:.2f} ms", str(r["calls"])]
+        if reference:
+            factor = factors.get(name)
+            if factor is None:
+                row.append("[dim]neu[/dim]")
+            elif factor > 1 + tolerance / 100:
+                regressions.append(name)
+                row.append(f"[red]{(factor - 1) * 100:+.0f}%[/red]")
+            else:
+                row.append(f"[green]{(factor - 1) * 100:+.0f}%[/green]")
+        table.add_row(*row)
+    console.print(table)
+    for name in failed:
+        print_error(f"{name}: {results[name]['error']}")
+
+    if save:
+        bench.save_baseline(save, results, scale)
+        print_success(f"Baseline gespeichert: {save}")
+    if regressions:
+        print_error(f"Langsamer als die Baseline (+{tolerance}%): {', '.join(regressions)}")
+    if failed or regressions:
+        raise typer.Exit(code=1)
+
+
+def _print_plan(plan_data: dict, title: str):
+    from rich.table import Table
+    from rich.markup import escape
+    from dockervm_cli import plan
+
+    table = Table(title=title, show_header=True, header_style="bold magenta")
+    table.add_column("#", justify="right", style="dim")
+    table.add_column("Art", style="cyan")
+    table.add_column("Schritt")
+    table.add_column("Beschreibung", style="dim")
+    for i, step in enumerate(plan_data["steps"]):
+        kind = "Datei" if step["type"] == "write" else "Befehl"
+        table.add_row(str(i + 1), kind, escape(plan.describe(step)), escape(step.get("desc") or ""))
+    console.print(table)
+
+
+@app.command("apply-plan")
+def apply_plan(
+    file: Annotated[str, typer.Argument(help="Mit 'dvm --plan <datei> ...' erstellter Plan")],
+    start_at: Annotated[int, typer.Option("--from", help="Erst ab diesem Schritt ausführen (z.B. nach einem Fehler)")] = 1,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Ohne Rückfrage ausführen")] = False,
+):
+    """
+    Führt einen gespeicherten Plan aus - ohne erneute Abfragen oder Rückfragen pro Schritt.
+    """
+    import time
+    from dockervm_cli import plan, prompts
+    from dockervm_cli.utils import print_error, print_success
+
+    try:
+        plan_data = plan.load(file)
+    except plan.PlanError as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
+    if not 1 <= start_at <= max(1, len(plan_data["steps"])):
+        print_error(f"--from muss zwischen 1 und {len(plan_data['steps'])} liegen.")
+        raise typer.Exit(code=1)
+
+    _print_plan(plan_data, f"{plan_data.get('command', 'dvm')} (erstellt auf {plan_data.get('host', '?')}, {plan_data.get('created', '?')})")
+    if not plan_data["steps"]:
+        print_success("Der Plan enthält keine Schritte.")
+        return
+    if not prompts.confirm(f"{len(plan_data['steps']) - start_at + 1} Schritte ausführen?", yes=yes, default=False):
+        console.print("[yellow]Abgebrochen.[/yellow]")
+        raise typer.Exit()
+
+    start = time.perf_counter()
+    total = len(plan_data["steps"])
+    results = plan.apply(
+        plan_data, start_at=start_at - 1,
+        on_step=lambda i, step: console.print(f"[dim]Schritt {i + 1}/{total}[/dim]"),
+    )
+    failed = [r for r in results if not r["ok"]]
+    done = len(results) == total - start_at + 1
+    if failed and not done:
+        step = failed[-1]["index"] + 1
+        print_error(f"Plan bei Schritt {step} abgebrochen. Fortsetzen mit: dvm apply-plan {file} --from {step}")
+        raise typer.Exit(code=1)
+    if failed:
+        print_error(f"{len(failed)} Schritt(e) ohne Prüfung fehlgeschlagen: {', '.join(str(r['index'] + 1) for r in failed)}")
+    print_success(f"Plan ausgeführt: {len(results)} Schritte in {time.perf_counter() - start:.1f}s.")
+
+
+def _exit_code(error) -> int:
+    """Exit-Code des laufenden Befehls aus der gerade behandelten Ausnahme (in Close-Callbacks)."""
+    if error is None:
+        return 0
+    if hasattr(error, "exit_code"):
+        # typer.Exit sowie Benutzungsfehler (Exit-Code 2)
+        return error.exit_code
+    if isinstance(error, SystemExit):
+        return error.code if isinstance(error.code, int) else 1
+    return 1
+
+
+def _command_name(ctx: typer.Context) -> list:
+    """Befehlsname ohne Optionswerte: Unterbefehl plus ggf. Befehl der Gruppe (z.B. "update system")."""
+    import sys
+
+    command = [ctx.invoked_subcommand]
+    if hasattr(ctx.command.get_command(ctx, ctx.invoked_subcommand), "list_commands") and ctx.invoked_subcommand in sys.argv:
+        rest = sys.argv[sys.argv.index(ctx.invoked_subcommand) + 1:]
+        command += [a for a in rest if not a.startswith("-")][:1]
+    return command
+
+
+def _record_plan(ctx: typer.Context, path: str):
+    import sys
+    from dockervm_cli import plan, runlog
+    from dockervm_cli.utils import print_error, print_success
+
+    if ctx.invoked_subcommand == "apply-plan":
+        print_error("--plan kann nicht mit apply-plan kombiniert werden.")
+        raise typer.Exit(code=1)
+    command = " ".join(["dvm", *_command_name(ctx)])
+    # Die Argumente bleiben im Klartext: der Plan enthält ohnehin die geschriebenen Dateien
+    args = sys.argv[1:]
+    if "--plan" in args:
+        i = args.index("--plan")
+        args = args[:i] + args[i + 2:]
+    plan.start(command, [a for a in args if not a.startswith("--plan=")])
+    console.print(f"[bold yellow]Plan-Modus:[/bold yellow] Änderungen werden nur aufgezeichnet ({path}).")
+
+    def _finish():
+        code = _exit_code(sys.exc_info()[1])
+        plan_data = plan.stop()
+        if code != 0:
+            print_error(f"Befehl mit Exit-Code {code} beendet - kein Plan gespeichert.")
+            return
+        _print_plan(plan_data, f"Plan: {command}")
+        try:
+            plan.save(plan_data, path)
+        except OSError as e:
+            print_error(f"Plan konnte nicht gespeichert werden: {e}")
+            return
+        print_success(f"Plan mit {len(plan_data['steps'])} Schritten gespeichert. Ausführen mit: dvm apply-plan {path}")
+    ctx.call_on_close(_finish)
+
+
+def _enable_run_log(ctx: typer.Context, path: str):
+    import sys
+    from dockervm_cli import runlog
+    from dockervm_cli.utils import print_error
+
+    if not runlog.enable(path, command=_command_name(ctx)):
+        print_error(f"Protokoll {path} ist nicht beschreibbar, es wird ohne JSON-Log fortgesetzt.")
+        return
+
+    def _finish():
+        # Läuft beim Schließen des Kontexts, auch wenn der Befehl mit typer.Exit oder einem Fehler endet
+        runlog.finish(_exit_code(sys.exc_info()[1]))
+    ctx.call_on_close(_finish)
+
+
 @app.callback(invoke_without_command=True)
 def main(
     ctx: typer.Context,
     version: Optional[bool] = typer.Option(
         None, "--version", "-v", help="Zeige die Anwendungsversion und beende."
+    ),
+    log_json: Optional[str] = typer.Option(
+        None, "--log-json", envvar="DVM_RUN_LOG",
+        help="Schritte und Laufzeiten als JSON-Lines protokollieren ('1' = /var/log/dvm/run.jsonl)."
+    ),
+    plan_file: Optional[str] = typer.Option(
+        None, "--plan",
+        help="Nichts ändern, sondern alle Befehle und Dateiänderungen als Plan speichern (siehe apply-plan)."
     )
 ):
     """
@@ -97,6 +471,11 @@ def main(
     if version:
         console.print("DockerVM CLI Version: [bold cyan]0.2.0[/bold cyan] (Befehl: dvm)")
         raise typer.Exit()
+
+    if log_json and ctx.invoked_subcommand:
+        _enable_run_log(ctx, log_json)
+    if plan_file and ctx.invoked_subcommand:
+        _record_plan(ctx, plan_file)
     
     if ctx.invoked_subcommand is None:
         import questionary
@@ -118,6 +497,7 @@ def main(
                     "E-Mail Benachrichtigungen konfigurieren",
                     "Automatische Self-Updates (Cron)",
                     "Dockhand aktualisieren",
+                    "Alle Compose-Stacks aktualisieren",
                     Separator(),
                     Separator("--- Installation ---"),
                     "Dockhand installieren",
@@ -126,6 +506,8 @@ def main(
                     "Container aus Template installieren",
                     "DNS Server installieren",
                     "Netbird VPN Client installieren",
+                    "Registry Mirror (Pull-Through-Cache) einrichten",
+                    "APT Caching-Proxy einrichten",
                     Separator(),
                     Separator("--- Netzwerk ---"),
                     "Netzwerk konfigurieren (Statische IP)",
@@ -135,6 +517,7 @@ def main(
                     Separator(),
                     Separator("--- GPU ---"),
                     "GPU prüfen",
+                    "GPU Monitor (live)",
                     "NVIDIA Treiber installieren",
                     "Docker GPU Setup",
                     "GPU Persistence aktivieren",
@@ -169,6 +552,8 @@ def main(
                 update.configure_self_cron()
             elif choice == "Dockhand aktualisieren":
                 update.update_dockhand()
+            elif choice == "Alle Compose-Stacks aktualisieren":
+                update.update_stacks()
             elif choice == "Dockhand installieren":
                 install.install_dockhand()
             elif choice == "Lazydocker installieren":
@@ -181,6 +566,10 @@ def main(
                 install.install_dns_server()
             elif choice == "Netbird VPN Client installieren":
                 install.install_netbird()
+            elif choice == "Registry Mirror (Pull-Through-Cache) einrichten":
+                install.install_registry_mirror()
+            elif choice == "APT Caching-Proxy einrichten":
+                install.install_apt_cache()
             elif choice == "Netzwerk konfigurieren (Statische IP)":
                 network.configure_static_ip()
             elif choice == "IPVLAN konfigurieren":
@@ -191,6 +580,8 @@ def main(
                 network.list_networks()
             elif choice == "GPU prüfen":
                 gpu.check()
+            elif choice == "GPU Monitor (live)":
+                gpu.monitor()
             elif choice == "NVIDIA Treiber installieren":
                 gpu.install_driver()
             elif choice == "Docker GPU Setup":
@@ -0,0 +1,153 @@
+import os
+import json
+import ipaddress
+import subprocess
+
+SYS_CLASS_NET = "/sys/class/net"
+PROC_ROUTE = "/proc/net/route"
+RESOLV_CONF = "/etc/resolv.conf"
+# Bei systemd-resolved steht in /etc/resolv.conf nur der lokale Stub (127.0.0.53)
+RESOLVED_UPSTREAM = "/run/systemd/resolve/resolv.conf"
+
+# Von Docker, libvirt & Co. angelegte Interfaces kommen für die Host-IP nicht in Frage
+VIRTUAL_PREFIXES = ("lo", "docker", "br-", "veth", "virbr", "vnet", "tun", "tap", "wg", "cni", "flannel", "cali", "ifb")
+
+
+class NetConfigError(Exception):
+    pass
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def sysfs_interfaces(sys_class_net: str = SYS_CLASS_NET) -> dict:
+    """Interfaces aus /sys/class/net mit operstate, MAC und ob ein Gerät (NIC) dahintersteht."""
+    result = {}
+    try:
+        names = sorted(os.listdir(sys_class_net))
+    except OSError:
+        return result
+    for name in names:
+        path = os.path.join(sys_class_net, name)
+        result[name] = {
+            "name": name,
+            "operstate": _read(os.path.join(path, "operstate")) or "unknown",
+            "mac": _read(os.path.join(path, "address")),
+            "physical": os.path.exists(os.path.join(path, "device")),
+            "virtual": name.startswith(VIRTUAL_PREFIXES) or os.path.isdir(os.path.join(path, "bridge")),
+            "addresses": [],
+            "gateway": None,
+            "default": False,
+        }
+    return result
+
+
+def _ip_json(*args) -> list:
+    try:
+        result = subprocess.run(["ip", "-j", *args], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        return json.loads(result.stdout or "[]")
+    except ValueError:
+        return None
+
+
+def _proc_default_routes(path: str = PROC_ROUTE) -> list:
+    """Fallback ohne iproute2: IPv4 Default-Routen aus /proc/net/route."""
+    routes = []
+    try:
+        with open(path, "r") as f:
+            next(f, None)
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 8 and fields[1] == "00000000" and fields[7] == "00000000":
+                    gateway = ipaddress.IPv4Address(bytes.fromhex(fields[2])[::-1])
+                    routes.append({"dev": fields[0], "gateway": str(gateway), "metric": int(fields[6])})
+    except (OSError, ValueError):
+        pass
+    return routes
+
+
+def discover() -> list:
+    """
+    Momentaufnahme aller Interfaces: sysfs-Daten plus IPv4 Adressen und Default-Route
+    (ein 'ip -j addr' und ein 'ip -j route' Aufruf). Returns eine Liste, das Interface
+    mit der Default-Route (niedrigste Metrik) ist mit default=True markiert.
+    """
+    interfaces = sysfs_interfaces()
+
+    for link in _ip_json("-4", "addr", "show") or []:
+        entry = interfaces.get(link.get("ifname"))
+        if entry is not None:
+            entry["addresses"] = [f"{a['local']}/{a['prefixlen']}" for a in link.get("addr_info", [])
+                                  if a.get("family") == "inet" and a.get("scope", "global") == "global"]
+
+    routes = _ip_json("-4", "route", "show", "default")
+    if routes is None:
+        routes = _proc_default_routes()
+    routes = sorted((r for r in routes if r.get("gateway") and r.get("dev") in interfaces), key=lambda r: r.get("metric", 0))
+    for route in routes:
+        entry = interfaces[route["dev"]]
+        entry["gateway"] = entry["gateway"] or route["gateway"]
+    if routes:
+        interfaces[routes[0]["dev"]]["default"] = True
+    return list(interfaces.values())
+
+
+def candidates(interfaces: list) -> list:
+    """Interfaces, die für eine statische Host-IP in Frage kommen (Default-Route zuerst)."""
+    usable = [i for i in interfaces if i["default"] or (not i["virtual"] and (i["physical"] or i["addresses"]))]
+    return sorted(usable, key=lambda i: (not i["default"], not i["physical"], i["name"]))
+
+
+def default_interface(interfaces: list) -> dict:
+    return next((i for i in interfaces if i["default"]), None)
+
+
+def current_nameservers() -> list:
+    """DNS Server des Hosts; bei systemd-resolved die tatsächlich genutzten Upstream-Server."""
+    for path in (RESOLV_CONF, RESOLVED_UPSTREAM):
+        servers = [line.split()[1] for line in _read(path).splitlines()
+                   if line.startswith("nameserver") and len(line.split()) > 1]
+        servers = [s for s in servers if not s.startswith("127.")]
+        if servers:
+            return servers
+    return []
+
+
+def validate(ip_address: str, gateway: str, dns: list = None) -> ipaddress.IPv4Interface:
+    """
+    Prüft IP mit Präfix, Gateway und DNS Server, bevor etwas geschrieben wird.
+    Raises NetConfigError mit verständlicher Meldung.
+    """
+    try:
+        interface = ipaddress.ip_interface(ip_address)
+    except ValueError:
+        raise NetConfigError(f"'{ip_address}' ist keine gültige IP Adresse mit Präfix (z.B. 192.168.178.200/24).")
+    if "/" not in ip_address:
+        raise NetConfigError(f"'{ip_address}' fehlt das Präfix (z.B. /24).")
+    network = interface.network
+    if interface.version == 4 and network.prefixlen < 31 and interface.ip in (network.network_address, network.broadcast_address):
+        raise NetConfigError(f"{interface.ip} ist die Netz- bzw. Broadcast-Adresse von {network}.")
+    try:
+        gw = ipaddress.ip_address(gateway)
+    except ValueError:
+        raise NetConfigError(f"'{gateway}' ist keine gültige Gateway-Adresse.")
+    if gw not in network:
+        raise NetConfigError(f"Gateway {gw} liegt nicht im Subnetz {network} - der Host wäre danach nicht erreichbar.")
+    if gw == interface.ip:
+        raise NetConfigError(f"Gateway und IP Adresse sind identisch ({gw}).")
+    for server in dns or []:
+        try:
+            ipaddress.ip_address(server)
+        except ValueError:
+            raise NetConfigError(f"'{server}' ist keine gültige DNS Server Adresse.")
+    return interface
@@ -0,0 +1,185 @@
+import os
+import time
+import glob
+import shlex
+import signal
+import socket
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dockervm_cli.utils import run_command, write_root_file
+
+NETPLAN_DIR = "/etc/netplan"
+BACKUP_ROOT = "/etc/netplan/backup"
+CONFIG_FILE = "01-netcfg.yaml"
+PROC_ARP = "/proc/net/arp"
+
+# Totmannschalter: dieser systemd Timer stellt das Backup wieder her, falls dvm
+# während der Prüfung abbricht (z.B. weil die SSH-Sitzung durch die neue IP getrennt wird)
+ROLLBACK_UNIT = "dvm-netplan-rollback"
+ROLLBACK_GRACE = 30
+
+DEFAULT_TIMEOUT = 30
+DNS_PROBE_NAME = "github.com"
+
+
+def backup() -> str:
+    """Sichert die aktuellen Netplan Dateien in ein eigenes Verzeichnis je Lauf. Returns das Verzeichnis."""
+    target = os.path.join(BACKUP_ROOT, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    run_command(f"sudo mkdir -p {target}", desc="Erstelle Backup Verzeichnis")
+    run_command(f"sudo cp -a {NETPLAN_DIR}/*.yaml {target}/", desc="Kopiere YAML Dateien", check=False)
+    return target
+
+
+def restore_script(backup_dir: str) -> str:
+    return (f"rm -f {NETPLAN_DIR}/*.yaml; cp -a {shlex.quote(backup_dir)}/*.yaml {NETPLAN_DIR}/ 2>/dev/null; "
+            f"netplan apply")
+
+
+def arm_rollback(backup_dir: str, seconds: int) -> bool:
+    """Plant die Wiederherstellung in seconds Sekunden über einen transienten systemd Timer."""
+    subprocess.run(["sudo", "systemctl", "stop", f"{ROLLBACK_UNIT}.timer", f"{ROLLBACK_UNIT}.service"], capture_output=True)
+    subprocess.run(["sudo", "systemctl", "reset-failed", f"{ROLLBACK_UNIT}.service"], capture_output=True)
+    return run_command(
+        f"sudo systemd-run --quiet --unit={ROLLBACK_UNIT} --on-active={seconds}s --timer-property=AccuracySec=1s "
+        f"/bin/sh -c {shlex.quote(restore_script(backup_dir))}",
+        desc=f"Plane automatische Wiederherstellung in {seconds}s", check=True,
+    )
+
+
+def disarm_rollback():
+    subprocess.run(["sudo", "systemctl", "stop", f"{ROLLBACK_UNIT}.timer"], capture_output=True)
+
+
+def rollback(backup_dir: str) -> bool:
+    disarm_rollback()
+    result = subprocess.run(["sudo", "/bin/sh", "-c", restore_script(backup_dir)], capture_output=True, text=True)
+    return result.returncode == 0
+
+
+# --- Prüfungen ------------------------------------------------------------------
+
+def dns_query(server: str, name: str = DNS_PROBE_NAME, timeout: float = 1.0) -> bool:
+    """Fragt den A-Record von name direkt beim Server ab (ohne dig/resolver). True bei Antwort mit Einträgen."""
+    query_id = os.getpid() & 0xFFFF
+    qname = b"".join(bytes([len(part)]) + part.encode() for part in name.rstrip(".").split(".")) + b"\0"
+    packet = struct.pack(">HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + qname + struct.pack(">HH", 1, 1)
+    family = socket.AF_INET6 if ":" in server else socket.AF_INET
+    try:
+        with socket.socket(family, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(timeout)
+            sock.sendto(packet, (server, 53))
+            data, _ = sock.recvfrom(4096)
+    except OSError:
+        return False
+    if len(data) < 12:
+        return False
+    response_id, flags, _, answers = struct.unpack(">HHHH", data[:8])
+    return response_id == query_id and flags & 0x000F == 0 and answers > 0
+
+
+def _arp_resolved(address: str) -> bool:
+    """Fallback ohne ping: Gateway steht mit vollständigem Eintrag (Flag 0x2) in der ARP-Tabelle."""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b"", (address, 9))
+    except OSError:
+        return False
+    time.sleep(0.2)
+    try:
+        with open(PROC_ARP, "r") as f:
+            return any(line.split()[0] == address and int(line.split()[2], 16) & 0x2 for line in list(f)[1:])
+    except (OSError, IndexError, ValueError):
+        return False
+
+
+def _until(deadline: float, check, interval: float = 0.5):
+    """Wiederholt check() bis zum Erfolg oder Ablauf der Frist. Returns (ok, Versuche, Sekunden)."""
+    start, attempts = time.monotonic(), 0
+    while True:
+        attempts += 1
+        if check():
+            return True, attempts, time.monotonic() - start
+        if time.monotonic() + interval >= deadline:
+            return False, attempts, time.monotonic() - start
+        time.sleep(interval)
+
+
+def probe_address(interface: str, address: str, deadline: float) -> tuple:
+    from dockervm_cli import netinfo
+
+    def _check():
+        return any(address in i["addresses"] for i in netinfo.discover() if i["name"] == interface)
+    return _until(deadline, _check)
+
+
+def probe_gateway(gateway: str, deadline: float) -> tuple:
+    def _check():
+        try:
+            return subprocess.run(["ping", "-c", "1", "-W", "1", gateway], capture_output=True).returncode == 0
+        except FileNotFoundError:
+            return _arp_resolved(gateway)
+    return _until(deadline, _check)
+
+
+def probe_dns(servers: list, deadline: float) -> tuple:
+    return _until(deadline, lambda: any(dns_query(server) for server in servers))
+
+
+def run_probes(interface: str, address: str, gateway: str, dns: list, timeout: int = DEFAULT_TIMEOUT) -> dict:
+    """
+    Prüft Adresse, Gateway und DNS gleichzeitig bis zur gemeinsamen Frist.
+    Returns {name: (ok, Versuche, Sekunden)}.
+    """
+    deadline = time.monotonic() + timeout
+    probes = {
+        "address": lambda: probe_address(interface, address, deadline),
+        "gateway": lambda: probe_gateway(gateway, deadline),
+        "dns": lambda: probe_dns(dns, deadline),
+    }
+    with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+        futures = {name: pool.submit(func) for name, func in probes.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+# --- Transaktion ----------------------------------------------------------------
+
+def safe_apply(content: str, interface: str, address: str, gateway: str, dns: list,
+               timeout: int = DEFAULT_TIMEOUT) -> dict:
+    """
+    Wendet eine Netplan Konfiguration an wie 'netplan try', bestätigt sie aber selbst:
+    1. Backup und Totmannschalter (systemd Timer, Frist + ROLLBACK_GRACE),
+    2. alte Dateien ersetzen und 'netplan apply',
+    3. Adresse, Gateway und DNS gleichzeitig prüfen,
+    4. bei Erfolg Timer stoppen, sonst sofort das Backup wiederherstellen.
+    Zwischen apply und Entscheidung gibt es keine Ausgabe, damit eine getrennte
+    SSH-Sitzung (SIGHUP, geschlossenes Terminal) die Prüfung nicht abbricht.
+    Returns ein Dict mit ok, probes, rolled_back, backup, armed und error.
+    """
+    result = {"ok": False, "probes": {}, "rolled_back": False, "backup": backup(), "armed": False, "error": None}
+    result["armed"] = arm_rollback(result["backup"], timeout + ROLLBACK_GRACE)
+
+    others = [path for path in glob.glob(os.path.join(NETPLAN_DIR, "*.yaml")) if os.path.basename(path) != CONFIG_FILE]
+    if others and not run_command(f"sudo rm -f {' '.join(shlex.quote(p) for p in others)}", desc="Entferne alte Konfigurationen"):
+        result["error"] = "Alte Konfigurationen konnten nicht entfernt werden."
+    elif not write_root_file(os.path.join(NETPLAN_DIR, CONFIG_FILE), content, desc="Schreibe neue Konfiguration", mode="600"):
+        result["error"] = "Neue Konfiguration konnte nicht geschrieben werden."
+    if result["error"]:
+        result["rolled_back"] = rollback(result["backup"])
+        return result
+
+    previous = signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    try:
+        applied = subprocess.run(["sudo", "netplan", "apply"], capture_output=True, text=True)
+        if applied.returncode != 0:
+            result["error"] = f"netplan apply fehlgeschlagen: {applied.stderr.strip()}"
+        else:
+            result["probes"] = run_probes(interface, address, gateway, dns, timeout)
+            result["ok"] = all(ok for ok, _, _ in result["probes"].values())
+        if result["ok"]:
+            disarm_rollback()
+        else:
+            result["rolled_back"] = rollback(result["backup"])
+    finally:
+        signal.signal(signal.SIGHUP, previous)
+    return result
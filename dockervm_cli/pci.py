@@ -0,0 +1,100 @@
+import os
+
+SYSFS_PCI_DEVICES = "/sys/bus/pci/devices"
+
+NVIDIA_VENDOR = "0x10de"
+
+# PCI Klassen (obere 16 Bit von 'class'), die für GPUs relevant sind
+PCI_CLASSES = {
+    "0x0300": "VGA",
+    "0x0302": "3D Controller",
+    "0x0403": "Audio",
+    "0x0c03": "USB",
+    "0x0c80": "Serial Bus",
+}
+GPU_CLASSES = ("0x0300", "0x0302")
+
+PCI_IDS_FILES = ["/usr/share/misc/pci.ids", "/usr/share/hwdata/pci.ids"]
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def _link_name(path: str) -> str:
+    try:
+        return os.path.basename(os.readlink(path))
+    except OSError:
+        return ""
+
+
+def scan_devices(root: str = SYSFS_PCI_DEVICES, vendor: str = None) -> list:
+    """
+    Liest das PCI Inventar direkt aus sysfs (ohne lspci/Subprozess).
+    Returns eine Liste von Dicts mit address, vendor, device, class, class_name,
+    driver (z.B. nvidia, vfio-pci, nouveau oder None) und iommu_group.
+    """
+    devices = []
+    try:
+        addresses = sorted(os.listdir(root))
+    except OSError:
+        return devices
+
+    for address in addresses:
+        path = os.path.join(root, address)
+        dev_vendor = _read(os.path.join(path, "vendor")).lower()
+        if vendor and dev_vendor != vendor:
+            continue
+        pci_class = _read(os.path.join(path, "class")).lower()[:6]
+        devices.append({
+            "address": address,
+            "vendor": dev_vendor,
+            "device": _read(os.path.join(path, "device")).lower(),
+            "class": pci_class,
+            "class_name": PCI_CLASSES.get(pci_class, pci_class),
+            "driver": _link_name(os.path.join(path, "driver")) or None,
+            "iommu_group": _link_name(os.path.join(path, "iommu_group")) or None,
+        })
+    return devices
+
+
+def nvidia_devices(root: str = SYSFS_PCI_DEVICES, gpus_only: bool = False) -> list:
+    """Alle NVIDIA PCI Funktionen (Vendor 0x10de); mit gpus_only nur VGA/3D Controller."""
+    devices = scan_devices(root, vendor=NVIDIA_VENDOR)
+    if gpus_only:
+        devices = [d for d in devices if d["class"] in GPU_CLASSES]
+    return devices
+
+
+def device_names(devices: list) -> dict:
+    """
+    Optional: Gerätenamen aus der pci.ids Datenbank (falls vorhanden).
+    Liest nur die Blöcke der benötigten Hersteller. Returns {(vendor, device): name}.
+    """
+    wanted = {(d["vendor"][2:], d["device"][2:]) for d in devices}
+    vendors = {v for v, _ in wanted}
+    names = {}
+    path = next((p for p in PCI_IDS_FILES if os.path.exists(p)), None)
+    if not path or not wanted:
+        return names
+
+    current = None
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            if not line.startswith("\t"):
+                if line.startswith("C "):
+                    break  # Ab hier folgen nur noch Geräteklassen
+                current = line[:4].lower()
+                if current not in vendors:
+                    current = None
+            elif current and not line.startswith("\t\t"):
+                device_id = line[1:5].lower()
+                if (current, device_id) in wanted:
+                    names[(f"0x{current}", f"0x{device_id}")] = line[5:].strip()
+    return names
@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import socket
+
+PLAN_VERSION = 1
+
+# Während der Aufzeichnung (dvm --plan) sammeln run_command und write_root_file hier ihre Schritte,
+# statt sie auszuführen. Lesende Abfragen (lsblk, docker info, ...) laufen weiterhin normal.
+_plan = None
+
+
+class PlanError(Exception):
+    pass
+
+
+def recording() -> bool:
+    return _plan is not None
+
+
+def start(command: str, args: list):
+    global _plan
+    _plan = {
+        "version": PLAN_VERSION,
+        "command": command,
+        "args": args,
+        "host": socket.gethostname(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "steps": [],
+    }
+
+
+def stop() -> dict:
+    """Beendet die Aufzeichnung und liefert den Plan."""
+    global _plan
+    plan, _plan = _plan, None
+    return plan
+
+
+def add_command(command: str, desc: str = None, check: bool = True):
+    _plan["steps"].append({"type": "command", "command": command, "desc": desc, "check": check})
+
+
+def add_write(path: str, content: str, desc: str = None, mode: str = None, owner: str = None):
+    _plan["steps"].append({"type": "write", "path": path, "content": content, "desc": desc, "mode": mode, "owner": owner})
+
+
+def unsupported(command: str):
+    """Für Befehle, deren Änderungen von Zwischenergebnissen abhängen (z.B. growpart) und sich daher nicht vorab planen lassen."""
+    if not recording():
+        return
+    import typer
+    from dockervm_cli.utils import print_error
+    print_error(f"'{command}' kann nicht als Plan aufgezeichnet werden, bitte ohne --plan ausführen.")
+    raise typer.Exit(code=1)
+
+
+def describe(step: dict) -> str:
+    if step["type"] == "write":
+        mode = f", Modus {step['mode']}" if step.get("mode") else ""
+        owner = f", Besitzer {step['owner']}" if step.get("owner") else ""
+        return f"{step['path']} schreiben ({len(step['content'].encode())} Bytes{mode}{owner})"
+    return step["command"]
+
+
+def save(plan: dict, path: str):
+    """Speichert den Plan nur für den Besitzer lesbar - Dateiinhalte können Passwörter enthalten."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def load(path: str) -> dict:
+    try:
+        with open(path, "r") as f:
+            plan = json.load(f)
+    except OSError as e:
+        raise PlanError(f"{path} konnte nicht gelesen werden: {e}")
+    except ValueError as e:
+        raise PlanError(f"{path} ist kein gültiges JSON: {e}")
+
+    if not isinstance(plan, dict) or plan.get("version") != PLAN_VERSION:
+        raise PlanError(f"{path} ist kein dvm Plan (Version {PLAN_VERSION}).")
+    for i, step in enumerate(plan.get("steps") or []):
+        required = {"command": ("command",), "write": ("path", "content")}.get(step.get("type"))
+        if required is None or any(not isinstance(step.get(key), str) for key in required):
+            raise PlanError(f"Schritt {i + 1} in {path} ist ungültig: {step}")
+    return plan
+
+
+def apply(plan: dict, start_at: int = 0, on_step=None) -> list:
+    """
+    Führt die Schritte ab start_at der Reihe nach aus (ohne erneute Abfragen oder Rückfragen).
+    Bricht beim ersten fehlgeschlagenen Schritt ab, außer er wurde mit check=False aufgezeichnet.
+    Returns eine Liste von Dicts mit index, ok und duration.
+    """
+    from dockervm_cli.utils import run_command, write_root_file
+
+    results = []
+    for index, step in enumerate(plan["steps"][start_at:], start=start_at):
+        if on_step:
+            on_step(index, step)
+        start = time.perf_counter()
+        if step["type"] == "write":
+            ok = write_root_file(step["path"], step["content"], desc=step.get("desc"), mode=step.get("mode"),
+                                owner=step.get("owner"))
+            required = True
+        else:
+            ok = run_command(step["command"], desc=step.get("desc"), check=step.get("check", True))
+            required = step.get("check", True)
+        results.append({"index": index, "ok": ok, "duration": time.perf_counter() - start})
+        if not ok and required:
+            break
+    return results
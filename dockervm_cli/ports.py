@@ -0,0 +1,289 @@
+import os
+import re
+import socket
+from dockervm_cli.utils import DVM_BASE_PATH
+
+PROC_NET = "/proc/net"
+
+# Socket-Zustände in /proc/net/*: 0A = TCP LISTEN, 07 = UDP gebunden (TCP_CLOSE)
+_BOUND_STATE = {"tcp": "0A", "udp": "07"}
+
+_WILDCARDS = {"0.0.0.0", "::", ""}
+
+
+def _decode_address(hex_addr: str) -> str:
+    """Wandelt '0100007F' bzw. eine 32-stellige IPv6 Adresse aus /proc/net in Textform um."""
+    raw = bytes.fromhex(hex_addr)
+    if len(raw) == 4:
+        return socket.inet_ntop(socket.AF_INET, raw[::-1])
+    # IPv6: vier 32-Bit Wörter in Host-Byte-Reihenfolge (little endian)
+    words = b"".join(raw[i:i + 4][::-1] for i in range(0, 16, 4))
+    address = socket.inet_ntop(socket.AF_INET6, words)
+    return address[7:] if address.startswith("::ffff:") and "." in address else address
+
+
+def listening_sockets(proc_net: str = PROC_NET) -> list:
+    """
+    Alle lauschenden TCP- und gebundenen UDP-Sockets aus /proc/net/{tcp,tcp6,udp,udp6}.
+    Returns eine Liste von Dicts mit port, protocol, address und inode.
+    """
+    sockets = []
+    for name in ("tcp", "tcp6", "udp", "udp6"):
+        protocol = name[:3]
+        try:
+            with open(os.path.join(proc_net, name), "r") as f:
+                next(f, None)
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 10 or fields[3] != _BOUND_STATE[protocol]:
+                        continue
+                    address, _, port = fields[1].partition(":")
+                    sockets.append({
+                        "port": int(port, 16),
+                        "protocol": protocol,
+                        "address": _decode_address(address),
+                        "inode": fields[9],
+                    })
+        except OSError:
+            continue
+    return sockets
+
+
+def socket_owners(inodes: set) -> dict:
+    """
+    Ordnet Socket-Inodes Prozessen zu (inode -> Prozessname) über /proc/<pid>/fd.
+    Fremde Prozesse sind nur mit root-Rechten sichtbar; fehlende Einträge bleiben leer.
+    """
+    owners = {}
+    if not inodes:
+        return owners
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                target = os.readlink(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            if target.startswith("socket:[") and target[8:-1] in inodes:
+                try:
+                    with open(f"/proc/{pid}/comm", "r") as f:
+                        owners[target[8:-1]] = f"{f.read().strip()} ({pid})"
+                except OSError:
+                    owners[target[8:-1]] = pid
+        if len(owners) == len(inodes):
+            break
+    return owners
+
+
+def published_ports() -> list:
+    """Veröffentlichte Ports laufender Container aus der Engine API (ohne docker CLI)."""
+    from dockervm_cli import docker_api
+
+    entries = []
+    for container in docker_api.list_containers():
+        labels = container.get("Labels") or {}
+        for port in container.get("Ports") or []:
+            if not port.get("PublicPort"):
+                continue
+            entries.append({
+                "port": port["PublicPort"],
+                "protocol": port.get("Type", "tcp"),
+                "address": port.get("IP", ""),
+                "source": "container",
+                "owner": docker_api.container_name(container),
+                "project": labels.get(docker_api.COMPOSE_PROJECT_LABEL),
+            })
+    return entries
+
+
+# --- Compose-Dateien ------------------------------------------------------------
+
+_VARIABLE = re.compile(r"\$\{(\w+)(?::?[-?]([^}]*))?\}|\$(\w+)")
+
+
+def _read_env(path: str) -> dict:
+    values = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#") and "=" in line:
+                    key, value = line.split("=", 1)
+                    values[key.strip()] = value.strip().strip("'\"")
+    except OSError:
+        pass
+    return values
+
+
+def _interpolate(text: str, env: dict) -> str:
+    """Einfache Compose-Interpolation: ${VAR}, ${VAR:-default} und $VAR."""
+    def _sub(match):
+        name = match.group(1) or match.group(3)
+        return env.get(name) or match.group(2) or ""
+    return _VARIABLE.sub(_sub, text.replace("$$", "\0")).replace("\0", "$")
+
+
+def parse_port_spec(spec, env: dict = None) -> list:
+    """
+    Host-Ports eines Compose 'ports' Eintrags (Kurzform wie "127.0.0.1:8080:80/udp",
+    Bereiche wie "3000-3002:3000-3002" oder Langform als Dict).
+    Einträge ohne Host-Port (zufälliger Port) liefern eine leere Liste.
+    Returns eine Liste von (port, protocol, address).
+    """
+    env = env or {}
+    if isinstance(spec, dict):
+        published = _interpolate(str(spec.get("published", "")), env)
+        protocol = spec.get("protocol", "tcp")
+        address = spec.get("host_ip", "")
+    else:
+        text, _, protocol = _interpolate(str(spec), env).partition("/")
+        protocol = protocol or "tcp"
+        parts = text.rsplit(":", 1)
+        if len(parts) == 1:
+            return []
+        host = parts[0]
+        # IPv6 Adressen stehen in eckigen Klammern, z.B. "[::1]:8080"
+        if host.startswith("["):
+            address, _, published = host[1:].partition("]:")
+        else:
+            address, _, published = host.rpartition(":")
+    if not published:
+        return []
+    start, _, end = published.partition("-")
+    try:
+        ports = range(int(start), int(end or start) + 1)
+    except ValueError:
+        return []
+    return [(port, protocol, address) for port in ports]
+
+
+def compose_file_ports(path: str) -> list:
+    """
+    Host-Ports einer Compose-Datei; Variablen werden aus der .env daneben aufgelöst.
+    Returns eine Liste von (service, port, protocol, address).
+    """
+    import yaml
+
+    env = {**_read_env(os.path.join(os.path.dirname(path), ".env")), **os.environ}
+    try:
+        with open(path, "r") as f:
+            config = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return []
+    return [(service_name, port, protocol, address)
+            for service_name, service in (config.get("services") or {}).items()
+            for spec in (service or {}).get("ports") or []
+            for port, protocol, address in parse_port_spec(spec, env)]
+
+
+def compose_ports(base_path: str = None) -> list:
+    """Von Compose-Dateien unter dem Basispfad deklarierte Host-Ports (auch für gestoppte Stacks)."""
+    from dockervm_cli import stacks
+
+    entries = []
+    for project in stacks.find_compose_projects(base_path or DVM_BASE_PATH):
+        for service_name, port, protocol, address in compose_file_ports(project["file"]):
+            entries.append({
+                "port": port, "protocol": protocol, "address": address, "source": "compose",
+                "owner": f"{project['name']}/{service_name}", "project": project["name"], "dir": project["dir"],
+            })
+    return entries
+
+
+# --- Index ----------------------------------------------------------------------
+
+def build_index(base_path: str = None, owners: bool = False) -> dict:
+    """
+    Belegte Ports des Hosts: (port, protocol) -> Liste von Einträgen mit source
+    ("host", "container" oder "compose"), owner und address.
+    Host-Sockets eines Ports, den ein Container veröffentlicht, gehören zu diesem
+    Container (docker-proxy) und werden nicht doppelt geführt.
+    """
+    from dockervm_cli import docker_api
+
+    index = {}
+    try:
+        containers = published_ports()
+    except docker_api.DockerAPIError:
+        containers = []
+    for entry in containers + compose_ports(base_path):
+        index.setdefault((entry["port"], entry["protocol"]), []).append(entry)
+
+    sockets = [s for s in listening_sockets() if not any(e["source"] == "container" for e in index.get((s["port"], s["protocol"]), []))]
+    names = socket_owners({s["inode"] for s in sockets}) if owners else {}
+    for s in sockets:
+        index.setdefault((s["port"], s["protocol"]), []).append({
+            "port": s["port"], "protocol": s["protocol"], "address": s["address"],
+            "source": "host", "owner": names.get(s["inode"], ""), "inode": s["inode"],
+        })
+    return index
+
+
+def _overlaps(a: str, b: str) -> bool:
+    return a in _WILDCARDS or b in _WILDCARDS or a == b
+
+
+def conflicts(index: dict, port: int, protocol: str = "tcp", address: str = "", project_dir: str = None) -> list:
+    """
+    Einträge, die port/protocol bereits belegen. Einträge des eigenen Projekts
+    (Compose-Datei in project_dir bzw. gleichnamiges Compose-Projekt) zählen nicht,
+    damit eine erneute Installation nicht an sich selbst scheitert.
+    """
+    project = os.path.basename(project_dir.rstrip("/")) if project_dir else None
+    found = []
+    for entry in index.get((int(port), protocol), []):
+        if project_dir and (entry.get("dir") == project_dir.rstrip("/") or
+                            (entry["source"] == "container" and entry.get("project") == project)):
+            continue
+        if _overlaps(entry["address"], address):
+            found.append(entry)
+    return found
+
+
+def free_port(index: dict, start: int, protocol: str = "tcp", project_dir: str = None, taken: set = None) -> int:
+    """Erster freier Port ab start (z.B. als Vorschlag statt eines belegten Standardports)."""
+    for port in range(int(start), 65536):
+        if port not in (taken or set()) and not conflicts(index, port, protocol, project_dir=project_dir):
+            return port
+    return None
+
+
+def describe(entry: dict) -> str:
+    source = {"host": "Prozess", "container": "Container", "compose": "Compose"}[entry["source"]]
+    owner = entry.get("owner") or "unbekannt"
+    address = f" auf {entry['address']}" if entry.get("address") not in _WILDCARDS else ""
+    return f"{source} {owner}{address}"
+
+
+def check(ports: list, project_dir: str = None, index: dict = None) -> list:
+    """
+    Prüft mehrere (port, protocol) Paare auf einmal.
+    Returns eine Liste von (port, protocol, [Einträge]) für alle belegten Ports.
+    """
+    index = index if index is not None else build_index()
+    result = []
+    for port, protocol in ports:
+        found = conflicts(index, port, protocol, project_dir=project_dir)
+        if found:
+            result.append((port, protocol, found))
+    # Prozessnamen nur für die tatsächlich belegten Ports ermitteln
+    unnamed = [e for _, _, found in result for e in found if e["source"] == "host" and not e["owner"]]
+    names = socket_owners({e["inode"] for e in unnamed})
+    for entry in unnamed:
+        entry["owner"] = names.get(entry["inode"], "")
+    return result
+
+
+def conflict_lines(result: list) -> list:
+    """Lesbare Zeilen für das Ergebnis von check(), z.B. '53/udp: Prozess systemd-resolve (612) auf 127.0.0.53'."""
+    lines = []
+    for port, protocol, found in result:
+        holders = list(dict.fromkeys(describe(entry) for entry in found))
+        lines.append(f"{port}/{protocol}: {', '.join(holders)}")
+    return lines
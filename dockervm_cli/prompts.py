@@ -0,0 +1,77 @@
+import sys
+import typer
+import questionary
+from dockervm_cli.utils import print_error
+
+
+def interactive() -> bool:
+    """True, wenn Rückfragen möglich sind (Terminal an stdin)."""
+    return sys.stdin.isatty()
+
+
+def _missing(message: str, option: str, what: str = "Wert"):
+    print_error(f"{what} fehlt: {message.rstrip(':')} (Option {option})")
+    raise typer.Exit(code=1)
+
+
+def text(value, message: str, option: str, default: str = None, yes: bool = False, required: bool = True):
+    """
+    Liefert value, falls per Option übergeben; sonst wird gefragt.
+    Mit --yes (oder ohne Terminal) wird der Default verwendet, fehlt auch dieser, bricht der Befehl ab.
+    """
+    if value is not None:
+        return value
+    if yes or not interactive():
+        if default is not None or not required:
+            return default
+        _missing(message, option)
+    answer = questionary.text(message, default=default or "").ask()
+    if answer is None:
+        raise typer.Exit()
+    return answer
+
+
+def password(value, message: str, option: str, yes: bool = False):
+    if value is not None:
+        return value
+    if yes or not interactive():
+        _missing(message, option)
+    answer = questionary.password(message).ask()
+    if answer is None:
+        raise typer.Exit()
+    return answer
+
+
+def select(value, message: str, choices: list, option: str, default=None, yes: bool = False):
+    """
+    Wie text(), aber mit Auswahlliste. choices sind Strings oder questionary.Choice;
+    ein übergebener Wert muss einem Choice-Wert entsprechen.
+    """
+    values = [c.value if isinstance(c, questionary.Choice) else c for c in choices]
+    if value is not None:
+        if value not in values:
+            print_error(f"Ungültiger Wert für {option}: {value} (erlaubt: {', '.join(str(v) for v in values)})")
+            raise typer.Exit(code=1)
+        return value
+    if yes or not interactive():
+        if default is not None:
+            return default
+        _missing(message, option)
+    answer = questionary.select(message, choices=choices, default=default).ask()
+    if answer is None:
+        raise typer.Exit()
+    return answer
+
+
+def confirm(message: str, yes: bool = False, default: bool = True, value: bool = None, option: str = "--yes") -> bool:
+    """
+    Bestätigung: value (z.B. aus --restart/--no-restart) hat Vorrang, --yes beantwortet mit Ja.
+    Ohne Terminal wird nichts angenommen: fehlen beide, bricht der Befehl mit Hinweis auf option ab.
+    """
+    if value is not None:
+        return value
+    if yes:
+        return True
+    if not interactive():
+        _missing(message, option, what="Bestätigung")
+    return bool(questionary.confirm(message, default=default).ask())
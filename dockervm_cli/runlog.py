@@ -0,0 +1,147 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import queue
+import socket
+import logging
+import resource
+import logging.handlers
+
+# Standardziel, wenn DVM_RUN_LOG bzw. --log-json ohne eigenen Pfad ("1") gesetzt ist
+DEFAULT_LOG = "/var/log/dvm/run.jsonl"
+FALLBACK_LOG = os.path.expanduser("~/.local/state/dvm/run.jsonl")
+
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+
+# Werte dieser Optionen landen nicht im Log
+_SECRET = re.compile(r"(--[\w-]*(?:password|passwd|secret|token|setup-key)[= ]+)(\S+)", re.IGNORECASE)
+
+_logger = logging.getLogger("dvm.run")
+_logger.propagate = False
+_listener = None
+_context = {}
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.event, ensure_ascii=False, default=str)
+
+
+def redact(text: str) -> str:
+    return _SECRET.sub(r"\1***", text)
+
+
+def redact_args(argv: list) -> list:
+    """Wie redact(), aber für getrennte Argumente ('--password', 'geheim')."""
+    args, hide_next = [], False
+    for arg in argv:
+        if hide_next:
+            args.append("***")
+            hide_next = False
+            continue
+        args.append(redact(arg))
+        hide_next = arg.startswith("--") and "=" not in arg and bool(_SECRET.match(arg + " x"))
+    return args
+
+
+def enabled() -> bool:
+    return _listener is not None
+
+
+def _writable_path(path: str) -> str:
+    if path in ("1", "true", "yes"):
+        path = DEFAULT_LOG
+    for candidate in (path, FALLBACK_LOG) if path == DEFAULT_LOG else (path,):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(candidate)), exist_ok=True)
+            with open(candidate, "a"):
+                pass
+            return candidate
+        except OSError:
+            continue
+    return None
+
+
+def enable(path: str, command: list = None, argv: list = None) -> str:
+    """
+    Aktiviert das JSON-Lines Protokoll. Die Aufrufer legen Einträge nur in eine Queue;
+    ein Hintergrund-Thread schreibt sie in eine rotierende Datei (10 MB, 5 Generationen).
+    Returns den tatsächlich genutzten Pfad oder None.
+    """
+    global _listener
+    if _listener is not None:
+        return _context.get("log")
+    target = _writable_path(path)
+    if not target:
+        return None
+
+    handler = logging.handlers.RotatingFileHandler(target, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT)
+    handler.setFormatter(_JsonFormatter())
+    records = queue.SimpleQueue()
+    _logger.addHandler(logging.handlers.QueueHandler(records))
+    _logger.setLevel(logging.INFO)
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+
+    args = redact_args(argv if argv is not None else sys.argv[1:])
+    _context.update({
+        "log": target,
+        "run_id": uuid.uuid4().hex[:12],
+        "host": socket.gethostname(),
+        "command": " ".join(["dvm", *(command or [])]),
+        "args": args,
+        "started": time.perf_counter(),
+    })
+    return target
+
+
+def event(kind: str, **fields):
+    """Schreibt einen Eintrag (nicht blockierend); ohne aktiviertes Protokoll ein No-op."""
+    if _listener is None:
+        return
+    record = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "type": kind,
+        "host": _context["host"],
+        "run_id": _context["run_id"],
+        **fields,
+    }
+    _logger.info(kind, extra={"event": record})
+
+
+def child_usage() -> tuple:
+    """Blockweise gelesene/geschriebene Bytes aller beendeten Kindprozesse (kumuliert)."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_inblock * 512, usage.ru_oublock * 512
+
+
+def step(command: str, desc: str, duration: float, exit_code: int, usage_before: tuple):
+    """
+    Eintrag für einen run_command Schritt. Die I/O-Bytes stammen aus getrusage und zählen
+    alle Unterprozesse; bei parallel laufenden Schritten sind sie daher nur ein Näherungswert.
+    """
+    read_after, written_after = child_usage()
+    event(
+        "step",
+        command=redact(command),
+        desc=desc,
+        duration=round(duration, 4),
+        exit_code=exit_code,
+        bytes_read=read_after - usage_before[0],
+        bytes_written=written_after - usage_before[1],
+    )
+
+
+def finish(exit_code: int):
+    """Abschlusseintrag für den gesamten dvm Aufruf; leert die Queue vor dem Prozessende."""
+    global _listener
+    if _listener is None:
+        return
+    event("command", command=_context["command"], args=_context["args"],
+          duration=round(time.perf_counter() - _context["started"], 4), exit_code=exit_code)
+    _listener.stop()
+    _listener = None
@@ -0,0 +1,345 @@
+import os
+import re
+import socket
+import shlex
+import hashlib
+import subprocess
+from dockervm_cli.utils import run_command, console, print_error, write_root_file
+
+# Markierung in der Zeile vor einem dvm-eigenen Crontab Eintrag: '# dvm:<tag> <prüfsumme der zeile>'
+TAG_MARKER = "# dvm:"
+
+SYSTEMD_DIR = "/etc/systemd/system"
+
+# Befehle, wie sie ältere dvm Versionen (ohne Markierung) geschrieben haben; verglichen wird
+# der komplette Befehl nach dem Zeitplan, nicht ein Teilstring der Zeile
+LEGACY_MATCHERS = {
+    "self-update": re.compile(r"(\S*/)?dvm update self( >> \S+ 2>&1)?"),
+    "docker-prune": re.compile(r"docker image prune -a -f( >> \S*/dvm_docker_prune\.log 2>&1)?"),
+    "gpu-persistence": re.compile(r"sleep 30 && (\S*/)?nvidia-smi -pm 1( >> \S+ 2>&1)?"),
+}
+
+_WEEKDAYS = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+_ALIASES = {"@hourly": "0 * * * *", "@daily": "0 0 * * *", "@midnight": "0 0 * * *", "@weekly": "0 0 * * 0",
+            "@monthly": "0 0 1 * *", "@yearly": "0 0 1 1 *", "@annually": "0 0 1 1 *"}
+# Wertebereiche der Cron-Felder Minute, Stunde, Tag, Monat, Wochentag (7 = Sonntag)
+_FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+class ScheduleError(Exception):
+    pass
+
+
+def job(tag: str, schedule: str, command: str, backend: str = "cron", random_delay: int = 0, description: str = None,
+        user: str = None) -> dict:
+    """
+    Beschreibt einen geplanten dvm Job.
+    schedule ist ein Cron-Ausdruck ('0 4 * * *' oder '@reboot'), random_delay die maximale
+    Streuung in Sekunden, damit nicht alle VMs einer Flotte gleichzeitig starten.
+    user ist der Benutzer, unter dem der Job läuft (Standard: Besitzer der Crontab, also der aufrufende Benutzer).
+    """
+    return {
+        "tag": tag,
+        "schedule": schedule,
+        "command": command,
+        "backend": backend,
+        "random_delay": random_delay,
+        "description": description or f"dvm {tag}",
+        "user": user or crontab_user(),
+    }
+
+
+def crontab_user() -> str:
+    """Benutzer, dessen Crontab 'crontab -l' liest und schreibt."""
+    import pwd
+    return pwd.getpwuid(os.getuid()).pw_name
+
+
+def default_backend() -> str:
+    """systemd Timer, sofern systemd läuft, sonst cron."""
+    return "systemd" if os.path.isdir("/run/systemd/system") else "cron"
+
+
+# --- Crontab ---------------------------------------------------------------
+
+def read_crontab() -> list:
+    result = subprocess.run(["crontab", "-l"], capture_output=True, text=True)
+    return result.stdout.splitlines() if result.returncode == 0 else []
+
+
+def split_cron_line(line: str) -> tuple:
+    """Returns (Zeitplan, Befehl) einer Crontab Zeile bzw. None für Kommentare, Leerzeilen und Variablen."""
+    text = line.strip()
+    if not text or text.startswith("#"):
+        return None
+    fields = text.split(None, 1 if text.startswith("@") else 5)
+    if len(fields) != (2 if text.startswith("@") else 6) or "=" in fields[0]:
+        return None
+    return " ".join(fields[:-1]), fields[-1]
+
+
+def line_checksum(line: str) -> str:
+    return hashlib.sha256(line.strip().encode()).hexdigest()[:12]
+
+
+def legacy_tag(line: str) -> str:
+    """Tag eines dvm Eintrags ohne Markierung (ältere Versionen), sonst None."""
+    parsed = split_cron_line(line)
+    if not parsed:
+        return None
+    return next((tag for tag, pattern in LEGACY_MATCHERS.items() if pattern.fullmatch(parsed[1])), None)
+
+
+def parse_crontab(lines: list) -> tuple:
+    """
+    Trennt die Crontab in fremde Zeilen und dvm-eigene Einträge.
+    Returns (andere Zeilen, {tag: Eintrag}). Die Zeile nach einer Markierung gehört nur dann
+    zu dvm, wenn ihre Prüfsumme passt oder sie dem bekannten Befehl des Tags entspricht;
+    sonst wurde der Eintrag von Hand gelöscht und die verwaiste Markierung fällt weg.
+    Alte Einträge ohne Markierung werden über LEGACY_MATCHERS ihrem Tag zugeordnet und so
+    beim nächsten Schreiben migriert.
+    """
+    other, owned = [], {}
+    pending = None
+    for line in lines:
+        if line.startswith(TAG_MARKER):
+            pending = (line[len(TAG_MARKER):].split() + [None])[:2]
+            continue
+        if pending:
+            tag, checksum = pending
+            pending = None
+            if split_cron_line(line) and (checksum == line_checksum(line) or legacy_tag(line) == tag):
+                owned[tag] = line
+                continue
+        legacy = legacy_tag(line)
+        if legacy:
+            owned.setdefault(legacy, line)
+        else:
+            other.append(line)
+    return other, owned
+
+
+def render_crontab(other: list, owned: dict) -> str:
+    lines = list(other)
+    while lines and not lines[-1].strip():
+        lines.pop()
+    for tag in sorted(owned):
+        lines.append(f"{TAG_MARKER}{tag} {line_checksum(owned[tag])}")
+        lines.append(owned[tag])
+    return "\n".join(lines) + "\n"
+
+
+def write_crontab(content: str) -> bool:
+    """'crontab -' ersetzt die Crontab in einem Schritt."""
+    from dockervm_cli import plan
+    if plan.recording():
+        plan.add_command(f"printf '%s' {shlex.quote(content)} | crontab -", "Schreibe Crontab")
+        return True
+    result = subprocess.run(["crontab", "-"], input=content, capture_output=True, text=True)
+    if result.returncode != 0:
+        print_error(f"Fehler beim Schreiben der Crontab: {result.stderr.strip()}")
+        return False
+    return True
+
+
+def host_offset(tag: str, max_seconds: int) -> int:
+    """Stabile, pro Host unterschiedliche Verschiebung (cron kennt kein RandomizedDelaySec)."""
+    if max_seconds < 60:
+        return 0
+    digest = hashlib.sha256(f"{socket.gethostname()}:{tag}".encode()).hexdigest()
+    return int(digest, 16) % (max_seconds // 60) * 60
+
+
+def jitter_schedule(schedule: str, offset_seconds: int) -> str:
+    """Verschiebt 'M H ...' um offset_seconds; andere Ausdrücke bleiben unverändert."""
+    fields = schedule.split()
+    if offset_seconds <= 0 or len(fields) != 5 or not (fields[0].isdigit() and fields[1].isdigit()):
+        return schedule
+    start, offset = int(fields[1]) * 60 + int(fields[0]), offset_seconds // 60
+    total = start + offset
+    if total >= 24 * 60:
+        # Tägliche Jobs laufen dann früh am Morgen; an Tage gebundene Jobs werden stattdessen
+        # vorgezogen, damit sich weder der Tag ändert noch alle späten Jobs auf 23:59 fallen
+        total = total % (24 * 60) if fields[2:] == ["*", "*", "*"] else max(start - offset, 0)
+    fields[0], fields[1] = str(total % 60), str(total // 60)
+    return " ".join(fields)
+
+
+# --- systemd Timer ----------------------------------------------------------
+
+def unit_name(tag: str) -> str:
+    return f"dvm-{tag}"
+
+
+def _cron_values(field: str, low: int, high: int) -> list:
+    """Alle Werte eines Cron-Felds mit Listen, Bereichen und Schritten ('1-5', '*/15', '0-30/10')."""
+    values = set()
+    for item in field.split(","):
+        part, _, step = item.partition("/")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, _, end = part.partition("-")
+        else:
+            start, end = part, (high if step else part)
+        try:
+            start, end, step = int(start), int(end), int(step or 1)
+        except ValueError:
+            raise ScheduleError(f"'{item}' wird nicht unterstützt (nur Zahlen, Bereiche, Listen und Schritte).")
+        if not low <= start <= end <= high or step < 1:
+            raise ScheduleError(f"'{item}' liegt nicht zwischen {low} und {high}.")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+def _calendar_field(field: str, low: int, high: int) -> str:
+    """Cron-Feld als OnCalendar-Komponente: '*', Schritt 'a/n', Bereich 'a..b' oder Liste."""
+    if field == "*":
+        return "*"
+    values = _cron_values(field, low, high)
+    part, _, step = field.partition("/")
+    if "," not in field and step and (part == "*" or part.isdigit()):
+        return f"{low if part == '*' else int(part)}/{int(step)}"
+    if "," not in field and not step and "-" in part:
+        start, _, end = part.partition("-")
+        return f"{int(start)}..{int(end)}"
+    return ",".join(str(v) for v in values)
+
+
+def cron_to_oncalendar(schedule: str) -> str:
+    """
+    Übersetzt Cron-Ausdrücke ('M H DOM MON DOW' mit Listen, Bereichen, Schritten und
+    Wochentag 0/7 = Sonntag) in systemd OnCalendar. '@reboot' ergibt None (wird als OnBootSec abgebildet).
+    Raises ScheduleError für Ausdrücke ohne Entsprechung (z.B. Namen wie 'mon' oder
+    Tag und Wochentag gleichzeitig, die cron mit ODER, systemd mit UND verknüpft).
+    """
+    schedule = _ALIASES.get(schedule, schedule)
+    if schedule == "@reboot":
+        return None
+    fields = schedule.split()
+    if len(fields) != 5:
+        raise ScheduleError(f"'{schedule}' ist kein Cron-Ausdruck mit 5 Feldern.")
+    minute, hour, dom, month, dow = fields
+    if dom != "*" and dow != "*":
+        raise ScheduleError(f"'{schedule}': Tag und Wochentag gleichzeitig lassen sich nicht als systemd Timer abbilden.")
+    try:
+        parts = [_calendar_field(field, *_FIELD_RANGES[i]) for i, field in enumerate(fields[:4])]
+        weekday = ""
+        if dow != "*":
+            days = sorted({d % 7 for d in _cron_values(dow, *_FIELD_RANGES[4])}, key=lambda d: (d - 1) % 7)
+            weekday = ",".join(_WEEKDAYS[d] for d in days) + " "
+    except ScheduleError as e:
+        raise ScheduleError(f"'{schedule}': {e}")
+    minute, hour, dom, month = parts
+    return f"{weekday}*-{month}-{dom} {hour}:{minute}:00"
+
+
+def render_timer(entry: dict) -> tuple:
+    """
+    Returns (service Unit, timer Unit) für einen Job. Der Dienst läuft als entry["user"] (mit dessen
+    primärer Gruppe), wie der Job in dessen Crontab - nicht als root.
+    """
+    import pwd
+    import grp
+    # systemd Quoting: \ und " escapen, % (Specifier) und $ (Variablen) verdoppeln
+    command = entry["command"].replace("\\", "\\\\").replace('"', '\\"').replace("%", "%%").replace("$", "$$")
+    user = entry.get("user") or crontab_user()
+    try:
+        group = grp.getgrgid(pwd.getpwnam(user).pw_gid).gr_name
+    except KeyError:
+        raise ScheduleError(f"Benutzer '{user}' existiert nicht.")
+    service = f"""[Unit]
+Description={entry['description']}
+
+[Service]
+Type=oneshot
+User={user}
+Group={group}
+ExecStart=/bin/sh -c "{command}"
+"""
+    calendar = cron_to_oncalendar(entry["schedule"])
+    trigger = f"OnCalendar={calendar}\nPersistent=true" if calendar else "OnBootSec=1min"
+    delay = f"\nRandomizedDelaySec={entry['random_delay']}" if entry.get("random_delay") else ""
+    timer = f"""[Unit]
+Description={entry['description']} (Timer)
+
+[Timer]
+{trigger}{delay}
+
+[Install]
+WantedBy=timers.target
+"""
+    return service, timer
+
+
+def timer_installed(tag: str) -> bool:
+    return os.path.exists(os.path.join(SYSTEMD_DIR, f"{unit_name(tag)}.timer"))
+
+
+def _install_timer(entry: dict) -> bool:
+    name = unit_name(entry["tag"])
+    service, timer = render_timer(entry)
+    if not (write_root_file(os.path.join(SYSTEMD_DIR, f"{name}.service"), service)
+            and write_root_file(os.path.join(SYSTEMD_DIR, f"{name}.timer"), timer)):
+        return False
+    run_command("sudo systemctl daemon-reload", check=False)
+    return run_command(f"sudo systemctl enable --now {name}.timer", desc=f"Aktiviere Timer {name}")
+
+
+def _remove_timer(tag: str):
+    name = unit_name(tag)
+    run_command(f"sudo systemctl disable --now {name}.timer", check=False)
+    run_command(f"sudo rm -f {SYSTEMD_DIR}/{name}.timer {SYSTEMD_DIR}/{name}.service", check=False)
+    run_command("sudo systemctl daemon-reload", check=False)
+
+
+# --- Anwenden ---------------------------------------------------------------
+
+def apply(changes: dict) -> bool:
+    """
+    Wendet mehrere Änderungen auf einmal an: {tag: job(...)} setzt bzw. ersetzt einen Job,
+    {tag: None} entfernt ihn. Die Crontab wird genau einmal gelesen und höchstens einmal
+    geschrieben; ein Job existiert danach nur noch im gewählten Backend.
+    """
+    lines = read_crontab()
+    other, owned = parse_crontab(lines)
+    ok = True
+
+    for tag, entry in changes.items():
+        if entry and entry["backend"] == "systemd":
+            try:
+                cron_to_oncalendar(entry["schedule"])
+            except ScheduleError as e:
+                print_error(f"{tag}: {e} Der Job bleibt in der Crontab.")
+                entry = {**entry, "backend": "cron"}
+        owned.pop(tag, None)
+        if timer_installed(tag) and (entry is None or entry["backend"] != "systemd"):
+            _remove_timer(tag)
+
+        if entry is None:
+            continue
+        if entry["backend"] == "systemd":
+            ok = _install_timer(entry) and ok
+            console.print(f"[green]Timer {unit_name(tag)}.timer:[/green] {cron_to_oncalendar(entry['schedule']) or 'beim Booten'}"
+                          + (f" (+ bis zu {entry['random_delay'] // 60} min Streuung)" if entry.get("random_delay") else ""))
+        else:
+            schedule = jitter_schedule(entry["schedule"], host_offset(tag, entry.get("random_delay", 0)))
+            owned[tag] = f"{schedule} {entry['command']}"
+            console.print(f"[green]Cron-Job {tag}:[/green] {owned[tag]}")
+
+    content = render_crontab(other, owned)
+    # Unveränderte Crontab nicht neu schreiben; migrierte Alt-Einträge erhalten dabei ihre Markierung
+    if (owned or lines) and content != "\n".join(lines) + "\n":
+        ok = write_crontab(content) and ok
+    return ok
+
+
+def installed_jobs() -> dict:
+    """Returns {tag: 'cron: <zeile>' | 'systemd'} für alle dvm Jobs."""
+    _, owned = parse_crontab(read_crontab())
+    jobs = {tag: f"cron: {line}" for tag, line in owned.items()}
+    if os.path.isdir(SYSTEMD_DIR):
+        for name in os.listdir(SYSTEMD_DIR):
+            if name.startswith("dvm-") and name.endswith(".timer"):
+                jobs[name[len("dvm-"):-len(".timer")]] = "systemd"
+    return jobs
@@ -0,0 +1,112 @@
+import os
+import json
+import subprocess
+from dockervm_cli.utils import DVM_BASE_PATH
+
+# Dateinamen, die docker compose standardmäßig als Projektdatei erkennt
+COMPOSE_FILENAMES = ("compose.yaml", "compose.yml", "docker-compose.yaml", "docker-compose.yml")
+
+# Verzeichnisse, die niemals Compose-Projekte enthalten, aber sehr groß sein können
+SKIP_DIRS = {"docker_data", "postgres_data", "db_data", "redis_data", "data", "config", ".git", "node_modules"}
+
+
+def find_compose_projects(base_path: str = None, max_depth: int = 2) -> list:
+    """
+    Sucht unter base_path nach Verzeichnissen mit einer Compose-Datei.
+    Die Suche ist in der Tiefe begrenzt, damit große Datenverzeichnisse
+    (z.B. Docker data-root oder Datenbank-Volumes) nicht durchlaufen werden.
+    Returns eine Liste von Dicts mit 'name', 'dir' und 'file'.
+    """
+    base_path = (base_path or DVM_BASE_PATH).rstrip("/") or "/"
+    projects = []
+    if not os.path.isdir(base_path):
+        return projects
+
+    base_depth = base_path.count(os.sep)
+    for root, dirs, files in os.walk(base_path):
+        depth = root.count(os.sep) - base_depth
+        compose_file = next((f for f in COMPOSE_FILENAMES if f in files), None)
+        if compose_file:
+            projects.append({
+                "name": os.path.basename(root),
+                "dir": root,
+                "file": os.path.join(root, compose_file),
+            })
+            # Unterhalb eines Projekts liegen nur noch dessen Daten
+            dirs[:] = []
+            continue
+        if depth >= max_depth:
+            dirs[:] = []
+        else:
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith("."))
+
+    return sorted(projects, key=lambda p: p["dir"])
+
+
+def get_compose_services(project: dict, compose_cmd: str) -> dict:
+    """
+    Liest die aufgelöste Compose-Konfiguration (inkl. .env) eines Projekts.
+    Returns ein Dict {service: image} für alle Services mit Registry-Image.
+    Services mit eigenem 'build' werden übersprungen, da sie nicht gepullt werden.
+    """
+    result = subprocess.run(
+        f"sudo {compose_cmd} -f {project['file']} config --format json",
+        shell=True, capture_output=True, text=True, cwd=project["dir"]
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "compose config fehlgeschlagen")
+
+    config = json.loads(result.stdout)
+    services = {}
+    for name, service in (config.get("services") or {}).items():
+        image = service.get("image")
+        if image and "build" not in service:
+            services[name] = image
+    return services
+
+
+def get_local_digests(image: str) -> set:
+    """Returns die lokal bekannten Repo-Digests (sha256:...) eines Images."""
+    result = subprocess.run(
+        ["sudo", "docker", "image", "inspect", "--format", "{{json .RepoDigests}}", image],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return set()
+    try:
+        repo_digests = json.loads(result.stdout.strip()) or []
+    except ValueError:
+        return set()
+    return {d.split("@", 1)[1] for d in repo_digests if "@" in d}
+
+
+def get_remote_digest(image: str):
+    """
+    Fragt den Manifest-Digest eines Images direkt bei der Registry ab, ohne es zu pullen.
+    Returns den Digest (sha256:...) oder None, falls die Registry nicht erreichbar ist.
+    """
+    result = subprocess.run(
+        ["sudo", "docker", "buildx", "imagetools", "inspect", "--format", "{{json .Manifest}}", image],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+    try:
+        return json.loads(result.stdout.strip()).get("digest")
+    except (ValueError, AttributeError):
+        return None
+
+
+def check_image(image: str) -> str:
+    """
+    Vergleicht lokalen und entfernten Digest eines Images.
+    Returns 'current', 'outdated', 'missing' (lokal nicht vorhanden) oder 'unknown'
+    (Registry nicht abfragbar, z.B. ohne buildx oder bei Rate-Limit).
+    """
+    local = get_local_digests(image)
+    if not local:
+        return "missing"
+    remote = get_remote_digest(image)
+    if remote is None:
+        return "unknown"
+    return "current" if remote in local else "outdated"
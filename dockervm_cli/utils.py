@@ -1,6 +1,7 @@
 
 import subprocess
 import sys
+import time
 import tempfile
 from rich.console import Console
 from rich.panel import Panel
@@ -15,15 +16,28 @@ try:
 except Exception:
     DVM_BASE_PATH = "/mnt/volumes"
 
+# Lokaler Cache für Zustände und Downloads (apt, Wheels, Treiber, ...)
+DVM_CACHE_DIR = "/var/cache/dvm"
+
 def run_command(command: str, desc: str = None, error_msg: str = None, check: bool = True) -> bool:
     """
     Runs a shell command and handles output/errors nicely with Rich.
     """
+    from dockervm_cli import plan, runlog
+
+    if plan.recording():
+        plan.add_command(command, desc, check)
+        console.print(f"[dim]📝 Geplant: {desc or command}[/dim]")
+        return True
+
     if desc:
         console.print(f"[bold blue]ℹ️  {desc}...[/bold blue]")
 
+    start = time.perf_counter()
+    usage = runlog.child_usage() if runlog.enabled() else None
+    exit_code = None
     try:
-        subprocess.run(
+        result = subprocess.run(
             command,
             shell=True,
             check=check,
@@ -31,15 +45,20 @@ def run_command(command: str, desc: str = None, error_msg: str = None, check: bo
             stdout=sys.stdout,
             stderr=sys.stderr
         )
+        exit_code = result.returncode
         if desc:
             console.print(f"[bold green]✔️  {desc} abgeschlossen.[/bold green]")
         return True
-    except subprocess.CalledProcessError:
+    except subprocess.CalledProcessError as e:
+        exit_code = e.returncode
         if error_msg:
             print_error(error_msg)
         else:
             print_error(f"Befehl fehlgeschlagen: {command}")
         return False
+    finally:
+        if usage is not None:
+            runlog.step(command, desc, time.perf_counter() - start, exit_code, usage)
 
 def print_status(msg: str, nl: bool = True):
     console.print(f"[bold blue]ℹ️  {msg}[/bold blue]", end="\n" if nl else "")
@@ -107,5 +126,104 @@ def get_host_ip() -> str:
     
     return "<deine-ip>"
 
+def _owned_by_root(path: str) -> bool:
+    try:
+        return os.stat(path).st_uid == 0
+    except OSError:
+        return False
+
+def ensure_cache_dir(subdir: str = "", root_owned: bool = False) -> str:
+    """
+    Ensures that the dvm cache directory (or a subdirectory) exists. Subdirectories are
+    writable for the current user; root_owned ones hold files that root executes (e.g. the
+    uv binary) and are only written via sudo, so no user process can swap them. The cache
+    root itself is never given to the user. Returns the absolute path.
+    """
+    path = os.path.join(DVM_CACHE_DIR, subdir) if subdir else DVM_CACHE_DIR
+    if root_owned:
+        # Im Benutzerbesitz könnte das Verzeichnis (oder über die Wurzel dessen Name) ausgetauscht werden
+        if not _owned_by_root(DVM_CACHE_DIR):
+            subprocess.run(["sudo", "mkdir", "-p", DVM_CACHE_DIR], capture_output=True)
+            subprocess.run(["sudo", "chown", "root:root", DVM_CACHE_DIR], capture_output=True)
+            subprocess.run(["sudo", "chmod", "755", DVM_CACHE_DIR], capture_output=True)
+        if not _owned_by_root(path):
+            # Vom Benutzer beschreibbare Altbestände verwerfen statt sie zu übernehmen
+            subprocess.run(["sudo", "rm", "-rf", path], capture_output=True)
+            subprocess.run(["sudo", "install", "-d", "-m", "755", "-o", "root", "-g", "root", path], capture_output=True)
+    elif not os.path.isdir(path) or not os.access(path, os.W_OK):
+        subprocess.run(["sudo", "mkdir", "-p", path], capture_output=True)
+        subprocess.run(["sudo", "chown", f"{os.getuid()}:{os.getgid()}", path], capture_output=True)
+    return path
+
+def write_root_file(path: str, content: str, desc: str = None, mode: str = None, owner: str = None) -> bool:
+    """
+    Writes a file via tempfile + sudo mv (works for any CWD and user).
+    Overwritten files keep their mode and owner, new files get mode 644 and the owner
+    of their directory. mode (e.g. "600") and owner (e.g. "root:root") override this.
+    In plan mode (dvm --plan) the content is recorded as a single step instead.
+    """
+    import shlex
+    from dockervm_cli import plan
+
+    if plan.recording():
+        plan.add_write(path, content, desc, mode, owner)
+        console.print(f"[dim]📝 Geplant: {desc or path + ' schreiben'}[/dim]")
+        return True
+
+    with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+        f.write(content)
+        tmp_path = f.name
+
+    directory = os.path.dirname(path)
+    run_command(f"sudo mkdir -p {shlex.quote(directory)}", check=False)
+    exists = subprocess.run(["sudo", "test", "-e", path], capture_output=True).returncode == 0
+    # Rechte und Besitzer am Tempfile setzen, damit die Datei nie mit falschen Rechten sichtbar ist
+    reference = shlex.quote(path if exists else directory)
+    chown = shlex.quote(owner) if owner else f"--reference={reference}"
+    chmod = mode or (f"--reference={reference}" if exists else "644")
+    tmp = shlex.quote(tmp_path)
+    if not run_command(f"sudo chown {chown} {tmp} && sudo chmod {chmod} {tmp} && sudo mv {tmp} {shlex.quote(path)}", desc=desc):
+        subprocess.run(["sudo", "rm", "-f", tmp_path], capture_output=True)
+        return False
+    return True
+
+def merge_config(current: dict, updates: dict) -> dict:
+    """
+    Merges updates into a JSON config dict.
+    Nested dicts are merged, lists are extended (without duplicates), scalars are replaced.
+    """
+    merged = dict(current)
+    for key, value in updates.items():
+        old = merged.get(key)
+        if isinstance(old, dict) and isinstance(value, dict):
+            merged[key] = merge_config(old, value)
+        elif isinstance(old, list) and isinstance(value, list):
+            merged[key] = old + [v for v in value if v not in old]
+        else:
+            merged[key] = value
+    return merged
+
+def read_daemon_json(path: str = "/etc/docker/daemon.json") -> dict:
+    """
+    Reads the Docker daemon.json (via sudo). Returns {} if missing or invalid.
+    """
+    import json
+    try:
+        result = subprocess.run(['sudo', 'cat', path], capture_output=True, text=True)
+        if result.returncode == 0 and result.stdout.strip():
+            return json.loads(result.stdout.strip())
+    except Exception:
+        pass  # Ignorieren falls nicht da oder kein valides JSON
+    return {}
+
+def update_daemon_json(updates: dict, path: str = "/etc/docker/daemon.json") -> bool:
+    """
+    Merges updates into /etc/docker/daemon.json, keeping all other settings.
+    Docker must be restarted afterwards for the changes to take effect.
+    """
+    import json
+    daemon_data = merge_config(read_daemon_json(path), updates)
+    return write_root_file(path, json.dumps(daemon_data, indent=4) + "\n", desc="Setze Konfiguration in daemon.json")
+
 def print_header(title: str):
     console.print(Panel(f"[bold yellow]{title}[/bold yellow]", expand=False))
@@ -6,12 +6,13 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     package_data={
-        "dockervm_cli": ["templates/**/*", "templates/**/.*"],
+        "dockervm_cli": ["templates/*", "templates/**/*", "templates/**/.*"],
     },
     install_requires=[
         "typer[all]",
         "rich",
         "questionary",
+        "pyyaml",
     ],
     entry_points={
         "console_scripts": [
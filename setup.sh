@@ -46,10 +46,26 @@ else
 fi
 
 # 3. Setup Virtual Environment
+# Local cache for the uv binary and Python wheels (shared with 'dvm update self')
+# The cache root and bin/ (executed by root) stay root-owned; only uv/ and state/ belong to the user
+DVM_CACHE_DIR=/var/cache/dvm
+sudo install -d -m 755 -o root -g root "$DVM_CACHE_DIR" "$DVM_CACHE_DIR/bin"
+sudo mkdir -p "$DVM_CACHE_DIR/uv" "$DVM_CACHE_DIR/state"
+sudo chown "$(id -u):$(id -g)" "$DVM_CACHE_DIR/uv" "$DVM_CACHE_DIR/state"
+export UV_CACHE_DIR="$DVM_CACHE_DIR/uv"
+
 echo "Setting up virtual environment..."
 if ! command -v uv &> /dev/null; then
-    echo "Installing uv..."
-    curl -LsSf https://astral.sh/uv/install.sh | sudo env CARGO_DIST_FORCE_INSTALL_DIR=/usr/local/bin sh
+    if [ "$(stat -c %u "$DVM_CACHE_DIR/bin/uv" 2>/dev/null)" != "0" ]; then
+        echo "Installing uv..."
+        UV_DOWNLOAD="$(mktemp -d)"
+        curl -LsSf https://astral.sh/uv/install.sh | env CARGO_DIST_FORCE_INSTALL_DIR="$UV_DOWNLOAD" INSTALLER_NO_MODIFY_PATH=1 sh
+        sudo install -m 755 -o root -g root "$UV_DOWNLOAD/uv" "$DVM_CACHE_DIR/bin/uv"
+        rm -rf "$UV_DOWNLOAD"
+    else
+        echo "Installing uv from local cache..."
+    fi
+    sudo install -m 755 "$DVM_CACHE_DIR/bin/uv" /usr/local/bin/uv
 fi
 
 if [ -d ".venv" ]; then
@@ -62,7 +78,13 @@ source .venv/bin/activate
 
 # 4. Install Package
 echo "Installing DVM CLI..."
-uv pip install .
+PINS="$(cat requirements.txt setup.py | sha256sum | cut -d' ' -f1)"
+if [ "$(cat "$DVM_CACHE_DIR/state/wheel-pins" 2>/dev/null)" = "$PINS" ] && uv pip install --offline .; then
+    echo "Installed from local wheel cache."
+else
+    uv pip install .
+    echo "$PINS" > "$DVM_CACHE_DIR/state/wheel-pins"
+fi
 
 # 5. Save repo path & Configure Base Path
 sudo mkdir -p /etc/dvm
@@ -0,0 +1,55 @@
+import os
+import subprocess
+
+import pytest
+
+from dockervm_cli import bench, utils
+from dockervm_cli.bench import FakeSystem
+
+
+@pytest.mark.parametrize("name", list(bench.BENCHMARKS))
+def test_benchmark_flows_pass_their_checks(name):
+    # Kleine Größe: prüft nur das Ergebnis der Abläufe gegen das Testsystem, nicht die Laufzeit
+    result = bench.run_benchmark(name, scale=0.05, repeat=1)
+
+    assert result["error"] is None
+    assert result["best"] is not None
+
+
+def test_fake_binaries_record_calls_and_emit_output():
+    with FakeSystem() as fs:
+        fs.output("lsblk", "NAME=\"sda\"\n", exit_code=3)
+
+        proc = subprocess.run(["lsblk", "-P", "-o", "NAME"], capture_output=True, text=True)
+        subprocess.run(["sudo", "-n", "mount", "-a"], check=True)
+        subprocess.run(["sudo", "mv", "/tmp/x", "/etc/fstab"], check=True)
+
+        assert proc.stdout == "NAME=\"sda\"\n"
+        assert proc.returncode == 3
+        # sudo reicht nur an Fakes weiter, alles andere wird bloß protokolliert
+        assert fs.calls() == [
+            ["lsblk", "-P", "-o", "NAME"],
+            ["sudo", "-n", "mount", "-a"],
+            ["mount", "-a"],
+            ["sudo", "mv", "/tmp/x", "/etc/fstab"],
+        ]
+
+
+def test_fake_system_restores_environment():
+    path, cache_dir = os.environ["PATH"], utils.DVM_CACHE_DIR
+
+    with FakeSystem() as fs:
+        proc_mounts = fs.file("/proc/mounts", "/dev/sda1 / ext4 rw 0 0\n")
+        assert proc_mounts.startswith(fs.root)
+        assert utils.DVM_CACHE_DIR == os.path.join(fs.root, "cache")
+
+    assert os.environ["PATH"] == path
+    assert utils.DVM_CACHE_DIR == cache_dir
+    assert not os.path.exists(fs.root)
+
+
+def test_compare_uses_best_time():
+    results = {"a": {"best": 0.2, "median": 0.3, "error": None}, "b": {"best": None, "median": None, "error": "x"}}
+    baseline = {"results": {"a": {"best": 0.1, "median": 0.1}, "b": {"best": 0.1}}}
+
+    assert bench.compare(results, baseline) == {"a": 2.0}
@@ -0,0 +1,324 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+import subprocess
+import functools
+import http.server
+
+import pytest
+
+from dockervm_cli import catalog, compose_templates, utils
+
+pytestmark = pytest.mark.skipif(not shutil.which("ssh-keygen"), reason="ssh-keygen nicht installiert")
+
+COMPOSE = "services:\n  app:\n    image: nginx\n    ports:\n      - \"${APP_PORT}:80\"\n"
+
+
+def _manifest(port: int = 8080) -> dict:
+    return {
+        "title": "App",
+        "variables": [{"name": "APP_PORT", "type": "port", "default": port}],
+        "ports": [{"port": "{APP_PORT}"}],
+        "files": ["docker-compose.yml"],
+    }
+
+
+def _write(path, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def _keygen(path) -> str:
+    subprocess.run(["ssh-keygen", "-q", "-t", "ed25519", "-N", "", "-C", "test", "-f", str(path)], check=True)
+    with open(f"{path}.pub") as f:
+        return f.read().strip()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Vorhanden und beschreibbar, damit ensure_cache_dir() kein sudo aufruft
+    (tmp_path / "cache" / "catalog").mkdir(parents=True)
+    monkeypatch.setattr(utils, "DVM_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("DVM_TEMPLATE_CATALOG", raising=False)
+    compose_templates.load_index.cache_clear()
+    yield tmp_path / "cache"
+    compose_templates.load_index.cache_clear()
+
+
+@pytest.fixture
+def keys(tmp_path):
+    """Signierschlüssel, ein fremder Schlüssel und die allowed_signers Datei für den ersten."""
+    trusted, foreign = tmp_path / "trusted", tmp_path / "foreign"
+    public = _keygen(trusted)
+    _keygen(foreign)
+    allowed = tmp_path / "allowed_signers"
+    allowed.write_text(f'dvm@test namespaces="{catalog.NAMESPACE}" {public}\n')
+    return {"trusted": str(trusted), "foreign": str(foreign), "allowed": str(allowed)}
+
+
+@pytest.fixture
+def source(tmp_path, keys):
+    """Katalog-Quelle mit zwei Templates; publish() erzeugt catalog.json neu und signiert sie."""
+    root = tmp_path / "source"
+    for name in ("alpha", "beta"):
+        _write(root / name / "template.json", json.dumps(_manifest()))
+        _write(root / name / "docker-compose.yml", COMPOSE)
+
+    def sign(key: str = keys["trusted"]):
+        path = str(root / catalog.CATALOG_FILE)
+        if os.path.exists(f"{path}.sig"):
+            os.remove(f"{path}.sig")
+        subprocess.run(["ssh-keygen", "-Y", "sign", "-f", key, "-n", catalog.NAMESPACE, path], check=True, capture_output=True)
+        # SimpleHTTPRequestHandler vergleicht If-Modified-Since sekundengenau
+        for file in (path, f"{path}.sig"):
+            stat = os.stat(file)
+            os.utime(file, (stat.st_atime, stat.st_mtime + publish.bump))
+        publish.bump += 10
+
+    def publish(key: str = keys["trusted"]):
+        catalog.write_catalog(str(root))
+        sign(key)
+
+    publish.bump = 10
+    publish.root = root
+    publish.sign = sign
+    publish()
+    return publish
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_response(self, code, message=None):
+        self.server.requests.append((self.path, code))
+        super().send_response(code, message)
+
+
+@pytest.fixture
+def server(source):
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_Handler, directory=str(source.root)))
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _file_requests(httpd) -> list:
+    return sorted(path for path, _ in httpd.requests if not path.startswith("/catalog.json"))
+
+
+def test_http_sync_downloads_all_files(cache, server, keys):
+    result = catalog.sync(server.url, keys["allowed"])
+
+    assert result["status"] == "updated"
+    assert sorted(result["downloaded"]) == ["alpha/docker-compose.yml", "alpha/template.json",
+                                            "beta/docker-compose.yml", "beta/template.json"]
+    assert set(catalog.cached_templates()) == {"alpha", "beta"}
+    template = compose_templates.get_template("alpha")
+    assert template["source"] == "catalog"
+    assert compose_templates.read_file(template, "docker-compose.yml") == COMPOSE
+    assert not os.path.exists(os.path.join(catalog.catalog_dir(), "staging"))
+
+
+def test_unchanged_catalog_uses_conditional_request(cache, server, keys):
+    catalog.sync(server.url, keys["allowed"])
+    server.requests.clear()
+
+    result = catalog.sync(server.url, keys["allowed"])
+
+    assert result["status"] == "unchanged"
+    assert server.requests == [("/catalog.json", 304)]
+
+
+def test_delta_download_fetches_only_changed_files(cache, server, source, keys):
+    catalog.sync(server.url, keys["allowed"])
+    _write(source.root / "beta" / "docker-compose.yml", COMPOSE + "    restart: always\n")
+    source()
+    server.requests.clear()
+
+    result = catalog.sync(server.url, keys["allowed"])
+
+    assert result["status"] == "updated"
+    assert result["downloaded"] == ["beta/docker-compose.yml"]
+    assert _file_requests(server) == ["/beta/docker-compose.yml"]
+    assert "restart: always" in compose_templates.read_file(compose_templates.get_template("beta"), "docker-compose.yml")
+
+
+def test_removed_template_is_deleted_locally(cache, server, source, keys):
+    catalog.sync(server.url, keys["allowed"])
+    shutil.rmtree(source.root / "beta")
+    source()
+
+    result = catalog.sync(server.url, keys["allowed"])
+
+    assert result["removed"] == ["beta"]
+    assert set(catalog.cached_templates()) == {"alpha"}
+    assert not os.path.exists(os.path.join(catalog.templates_dir(), "beta"))
+
+
+def test_bad_signature_keeps_local_state(cache, server, source, keys):
+    catalog.sync(server.url, keys["allowed"])
+    _write(source.root / "alpha" / "docker-compose.yml", "services: {}\n")
+    source(keys["foreign"])
+
+    with pytest.raises(catalog.CatalogError, match="Signatur"):
+        catalog.sync(server.url, keys["allowed"])
+
+    assert _file_requests(server) == sorted(["/alpha/docker-compose.yml", "/alpha/template.json",
+                                             "/beta/docker-compose.yml", "/beta/template.json"])
+    assert compose_templates.read_file(compose_templates.get_template("alpha"), "docker-compose.yml") == COMPOSE
+
+
+def test_missing_signature_is_rejected(cache, server, source, keys):
+    os.remove(source.root / "catalog.json.sig")
+
+    with pytest.raises(catalog.CatalogError, match="fehlt"):
+        catalog.sync(server.url, keys["allowed"])
+    assert catalog.cached_templates() == {}
+
+
+def test_hash_mismatch_aborts_without_changes(cache, server, source, keys):
+    catalog.sync(server.url, keys["allowed"])
+    _write(source.root / "alpha" / "template.json", json.dumps(_manifest(9090)))
+    source()
+    # Datei nach dem Signieren verändert: Katalog passt nicht mehr zum Inhalt
+    _write(source.root / "alpha" / "template.json", json.dumps(_manifest(6666)))
+
+    with pytest.raises(catalog.CatalogError, match="SHA-256"):
+        catalog.sync(server.url, keys["allowed"])
+
+    assert compose_templates.get_template("alpha")["variables"][0]["default"] == 8080
+    assert not os.path.exists(os.path.join(catalog.catalog_dir(), "staging"))
+
+
+def test_invalid_manifest_keeps_local_state(cache, server, source, keys):
+    catalog.sync(server.url, keys["allowed"])
+    before = catalog.cached_templates()
+    # write_catalog prüft Manifeste, daher den Katalog von Hand um ein ungültiges Manifest ergänzen
+    manifest = {**_manifest(9090), "variables": [{"name": "APP_PORT", "type": "unbekannt"}]}
+    _write(source.root / "alpha" / "template.json", json.dumps(manifest))
+    catalog_path = source.root / catalog.CATALOG_FILE
+    data = json.loads(catalog_path.read_text())
+    data["templates"]["alpha"]["files"]["template.json"] = hashlib.sha256(
+        (source.root / "alpha" / "template.json").read_bytes()).hexdigest()
+    catalog_path.write_text(json.dumps(data))
+    source.sign()
+
+    with pytest.raises(catalog.CatalogError, match="ungültiges Template"):
+        catalog.sync(server.url, keys["allowed"])
+
+    assert catalog.cached_templates() == before
+    with open(os.path.join(catalog.templates_dir(), "alpha", "template.json")) as f:
+        assert json.load(f)["variables"][0]["type"] == "port"
+
+
+def test_offline_falls_back_to_cache(cache, server, keys):
+    catalog.sync(server.url, keys["allowed"])
+    server.shutdown()
+    server.server_close()
+
+    result = catalog.sync(server.url, keys["allowed"])
+
+    assert result["status"] == "offline"
+    assert result["templates"] == 2
+    assert set(compose_templates.load_index()["templates"]) >= {"alpha", "beta"}
+
+
+def test_offline_without_cache_raises(cache, keys):
+    with pytest.raises(catalog.OfflineError):
+        catalog.sync("http://127.0.0.1:9", keys["allowed"])
+
+
+def test_tampered_cache_file_is_detected(cache, server, keys):
+    catalog.sync(server.url, keys["allowed"])
+    template = compose_templates.get_template("alpha")
+    _write(os.path.join(catalog.templates_dir(), "alpha", "docker-compose.yml"), "services: {}\n")
+
+    with pytest.raises(compose_templates.TemplateError, match="verändert"):
+        compose_templates.read_file(template, "docker-compose.yml")
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git nicht installiert")
+def test_git_source_over_file_remote(cache, tmp_path, source, keys):
+    def git(*args):
+        subprocess.run(["git", "-C", str(source.root), *args], check=True, capture_output=True)
+
+    git("init", "-q")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "add", "-A")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "catalog")
+    url = f"git+file://{source.root}"
+
+    assert catalog.sync(url, keys["allowed"])["status"] == "updated"
+    assert catalog.sync(url, keys["allowed"])["status"] == "unchanged"
+
+    _write(source.root / "alpha" / "docker-compose.yml", COMPOSE + "    restart: always\n")
+    source()
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qam", "update")
+    result = catalog.sync(url, keys["allowed"])
+    assert result["status"] == "updated"
+    assert result["downloaded"] == ["alpha/docker-compose.yml"]
+
+
+def test_manifest_files_must_stay_inside_template(tmp_path):
+    manifest = {**_manifest(), "files": ["../outside.yml"]}
+    _write(tmp_path / "evil" / "template.json", json.dumps(manifest))
+    _write(tmp_path / "outside.yml", COMPOSE)
+
+    with pytest.raises(compose_templates.TemplateError, match="relativ"):
+        compose_templates.read_manifest("evil", str(tmp_path / "evil"))
+
+
+def _dns_server_install(monkeypatch, install_dir):
+    """Führt 'dvm install dns-server' aus; Host-Befehle werden nur protokolliert, Dateien landen in install_dir."""
+    from typer.testing import CliRunner
+    from dockervm_cli import ports
+    from dockervm_cli.commands import install
+
+    commands = []
+
+    def write_root_file(path, content, desc=None, mode=None, owner=None):
+        _write(path, content)
+        return True
+
+    monkeypatch.setattr(install, "run_command", lambda cmd, *args, **kwargs: commands.append(cmd) or True)
+    monkeypatch.setattr(install, "write_root_file", write_root_file)
+    monkeypatch.setattr(install, "get_docker_compose_cmd", lambda: "docker compose")
+    monkeypatch.setattr(install, "get_host_ip", lambda: "127.0.0.1")
+    monkeypatch.setattr(ports, "check", lambda *args, **kwargs: [])
+    result = CliRunner().invoke(install.app, ["dns-server", "--install-dir", str(install_dir), "--keep-resolved", "--yes"])
+    return result, commands
+
+
+def test_dns_server_files_come_from_catalog(cache, server, source, keys, tmp_path, monkeypatch):
+    adguard = "dns:\n  upstream_dns:\n    - 1.1.1.1\n"
+    _write(source.root / "dns-server" / "template.json",
+           json.dumps({"title": "DNS Server", "files": ["docker-compose.yml", "config/adguard/AdGuardHome.yaml"]}))
+    _write(source.root / "dns-server" / "docker-compose.yml", COMPOSE)
+    _write(source.root / "dns-server" / "config" / "adguard" / "AdGuardHome.yaml", adguard)
+    source()
+    catalog.sync(server.url, keys["allowed"])
+    install_dir = tmp_path / "dns"
+
+    result, commands = _dns_server_install(monkeypatch, install_dir)
+
+    assert result.exit_code == 0, result.output
+    assert (install_dir / "docker-compose.yml").read_text() == COMPOSE
+    assert (install_dir / "config" / "adguard" / "AdGuardHome.yaml").read_text() == adguard
+    assert not any("wget" in cmd for cmd in commands)
+
+
+def test_dns_server_without_catalog_template_downloads(cache, tmp_path, monkeypatch):
+    result, commands = _dns_server_install(monkeypatch, tmp_path / "dns")
+
+    assert result.exit_code == 0, result.output
+    assert [cmd for cmd in commands if "wget" in cmd] == [
+        f"sudo wget -O {tmp_path}/dns/docker-compose.yml 'https://raw.githubusercontent.com/D4rk-Sh4dw/dns-server/main/docker-compose.yml'",
+        f"sudo wget -O {tmp_path}/dns/config/adguard/AdGuardHome.yaml 'https://raw.githubusercontent.com/D4rk-Sh4dw/dns-server/main/config/adguard/AdGuardHome.yaml'",
+    ]
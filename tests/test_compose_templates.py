@@ -0,0 +1,45 @@
+from dockervm_cli import compose_templates
+
+TEMPLATE = {
+    "name": "app",
+    "variables": [
+        {"name": "APP_PORT", "type": "port", "default": 8080},
+        {"name": "DB_PASSWORD", "type": "secret", "generate": True, "length": 24},
+        {"name": "APP_SECRET", "type": "secret", "generate": True, "length": 32},
+    ],
+}
+
+
+def test_env_round_trip():
+    variables = {"PLAIN": "abc", "SPACE": "a b", "QUOTE": "it's $HOME \\ \"x\"", "EMPTY": ""}
+
+    assert compose_templates.parse_env(compose_templates.render_env(variables)) == variables
+
+
+def test_resolve_generates_secrets_without_previous_install():
+    variables = compose_templates.resolve(TEMPLATE, {})
+
+    assert variables["APP_PORT"] == "8080"
+    assert len(variables["DB_PASSWORD"]) >= 24
+    assert variables["DB_PASSWORD"] != compose_templates.resolve(TEMPLATE, {})["DB_PASSWORD"]
+
+
+def test_resolve_keeps_existing_env_and_generates_only_missing_secrets(tmp_path):
+    (tmp_path / ".env").write_text(compose_templates.render_env({"APP_PORT": "9090", "DB_PASSWORD": "bestehend"}))
+    previous = compose_templates.read_env(str(tmp_path))
+
+    variables = compose_templates.resolve(TEMPLATE, {}, previous=previous)
+
+    assert variables["APP_PORT"] == "9090"
+    assert variables["DB_PASSWORD"] == "bestehend"
+    assert variables["APP_SECRET"]
+
+
+def test_explicit_values_override_existing_env():
+    variables = compose_templates.resolve(TEMPLATE, {"DB_PASSWORD": "neu"}, previous={"DB_PASSWORD": "alt"})
+
+    assert variables["DB_PASSWORD"] == "neu"
+
+
+def test_read_env_without_install_is_empty(tmp_path):
+    assert compose_templates.read_env(str(tmp_path / "fehlt")) == {}
@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import textwrap
+
+import pytest
+from typer.testing import CliRunner
+
+from dockervm_cli import fleet
+
+# Stand-in für ssh: emuliert ControlMaster über eine Datei am ControlPath, protokolliert jeden Aufruf
+# und führt den Remote-Befehl lokal aus. Host "down" ist nicht erreichbar (Exit 255 wie ssh).
+FAKE_SSH = textwrap.dedent("""\
+    #!{python}
+    import os, sys, json, time, hashlib, subprocess
+    args, options = sys.argv[1:], {{}}
+    while args[0].startswith("-"):
+        flag, value = args.pop(0), args.pop(0)
+        if flag == "-o":
+            key, _, value = value.partition("=")
+            options[key] = value
+        else:
+            options[flag] = value
+    target, remote = args
+    host = target.split("@")[-1]
+    path = options["ControlPath"].replace("%C", hashlib.sha1(target.encode()).hexdigest())
+    reused = os.path.exists(path)
+    start = time.time()
+    if host == "down":
+        print("ssh: connect to host down port 22: Connection refused", file=sys.stderr)
+        code = 255
+    else:
+        if options.get("ControlMaster") == "auto" and not reused:
+            open(path, "w").close()
+        code = subprocess.run(["/bin/sh", "-c", remote], env={{**os.environ, "FAKE_HOST": host}}).returncode
+    with open(os.environ["FAKE_SSH_LOG"], "a") as log:
+        log.write(json.dumps({{"host": host, "options": options, "reused": reused, "start": start, "end": time.time()}}) + "\\n")
+    sys.exit(code)
+""")
+
+# Stand-in für dvm auf dem Zielhost: Exit-Code und Dauer hängen vom Hostnamen ab
+FAKE_DVM = textwrap.dedent("""\
+    #!/bin/sh
+    echo "start $*"
+    case "$FAKE_HOST" in
+        fail-*) echo "kaputt" >&2; exit 3 ;;
+        slow-*) sleep 2 ;;
+        *) sleep "${FAKE_SLEEP:-0}" ;;
+    esac
+    echo "fertig auf $FAKE_HOST"
+""")
+
+
+def _executable(path, content: str) -> str:
+    path.write_text(content)
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.fixture
+def stand_ins(tmp_path, monkeypatch):
+    monkeypatch.setattr(fleet, "CONTROL_DIR", str(tmp_path / "control"))
+    monkeypatch.setenv("FAKE_SSH_LOG", str(tmp_path / "ssh.log"))
+    monkeypatch.delenv("DVM_SSH", raising=False)
+    ssh = _executable(tmp_path / "ssh", FAKE_SSH.format(python=sys.executable))
+    dvm = _executable(tmp_path / "dvm", FAKE_DVM)
+
+    def inventory(*names):
+        path = tmp_path / "inventory.yaml"
+        path.write_text(json.dumps({"defaults": {"user": "admin", "dvm": dvm}, "hosts": list(names)}))
+        return str(path)
+
+    def calls():
+        with open(tmp_path / "ssh.log") as f:
+            return [json.loads(line) for line in f]
+
+    return {"ssh": ssh, "dvm": dvm, "inventory": inventory, "calls": calls}
+
+
+def _hosts(stand_ins, *names):
+    return fleet.load_inventory(stand_ins["inventory"](*names))
+
+
+def test_control_master_is_reused_across_runs(stand_ins):
+    hosts = _hosts(stand_ins, "a", "b")
+
+    fleet.run(hosts, ["version"], ssh=stand_ins["ssh"])
+    fleet.run(hosts, ["version"], ssh=stand_ins["ssh"])
+
+    calls = stand_ins["calls"]()
+    assert sorted((c["host"], c["reused"]) for c in calls[:2]) == [("a", False), ("b", False)]
+    assert sorted((c["host"], c["reused"]) for c in calls[2:]) == [("a", True), ("b", True)]
+    for call in calls:
+        assert call["options"]["ControlMaster"] == "auto"
+        assert call["options"]["ControlPath"] == f"{fleet.CONTROL_DIR}/%C"
+        assert call["options"]["BatchMode"] == "yes"
+    assert oct(os.stat(fleet.CONTROL_DIR).st_mode & 0o777) == "0o700"
+
+
+def test_concurrency_limits_parallel_hosts(stand_ins, monkeypatch):
+    monkeypatch.setenv("FAKE_SLEEP", "0.5")
+    hosts = _hosts(stand_ins, "h1", "h2", "h3", "h4")
+
+    start = time.perf_counter()
+    results = fleet.run(hosts, ["version"], concurrency=2, ssh=stand_ins["ssh"])
+    duration = time.perf_counter() - start
+
+    events = sorted([(c["start"], 1) for c in stand_ins["calls"]()] + [(c["end"], -1) for c in stand_ins["calls"]()])
+    running = peak = 0
+    for _, delta in events:
+        running += delta
+        peak = max(peak, running)
+    assert peak == 2
+    # Nur die Untergrenze: zwei Wellen à 0.5s, die Obergrenze hängt von der Last des Runners ab
+    assert duration >= 1.0
+    # Ergebnisse in Inventar-Reihenfolge, unabhängig von der Laufzeit
+    assert [r["name"] for r in results] == ["h1", "h2", "h3", "h4"]
+
+
+def test_output_lines_are_passed_per_host(stand_ins):
+    lines = []
+    fleet.run(_hosts(stand_ins, "a", "b"), ["update", "stacks"], ssh=stand_ins["ssh"],
+              on_line=lambda host, line: lines.append((host["name"], line)))
+
+    assert sorted(lines) == [("a", "fertig auf a"), ("a", "start update stacks"),
+                             ("b", "fertig auf b"), ("b", "start update stacks")]
+
+
+def test_cli_prefixes_output_and_summarises_exit_codes(stand_ins, monkeypatch):
+    from dockervm_cli.commands.fleet import app
+
+    monkeypatch.setenv("DVM_SSH", stand_ins["ssh"])
+    monkeypatch.setenv("COLUMNS", "200")
+    inventory = stand_ins["inventory"]("ok-1", "fail-1", "down", "slow-1")
+
+    result = CliRunner().invoke(app, ["--hosts", inventory, "--timeout", "1", "--", "update", "stacks"])
+
+    assert result.exit_code == 1
+    output = result.output.splitlines()
+    assert "ok-1   | start update stacks" in output
+    assert "ok-1   | fertig auf ok-1" in output
+    assert "fail-1 | kaputt" in output
+    assert any(line.startswith("down   | ssh: connect to host down") for line in output)
+    summary = {line.split("│")[1].strip(): line.split("│")[2].strip() for line in output
+               if line.count("│") >= 4 and line.split("│")[1].strip() in ("ok-1", "fail-1", "down", "slow-1")}
+    assert summary == {"ok-1": "0", "fail-1": "3", "down": "SSH", "slow-1": "Timeout"}
+    assert "1/4 erfolgreich" in result.output
+
+
+def test_results_report_exit_codes(stand_ins):
+    results = fleet.run(_hosts(stand_ins, "ok-1", "fail-1", "down"), ["version"], ssh=stand_ins["ssh"])
+
+    assert [(r["name"], r["exit_code"], r["last_line"]) for r in results] == [
+        ("ok-1", 0, "fertig auf ok-1"),
+        ("fail-1", 3, "kaputt"),
+        ("down", fleet.SSH_ERROR, "ssh: connect to host down port 22: Connection refused"),
+    ]
+
+
+def test_missing_ssh_binary_counts_as_ssh_error(stand_ins, tmp_path):
+    results = fleet.run(_hosts(stand_ins, "a"), ["version"], ssh=str(tmp_path / "fehlt"))
+
+    assert results[0]["exit_code"] == fleet.SSH_ERROR
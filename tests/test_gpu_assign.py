@@ -0,0 +1,135 @@
+import textwrap
+
+import pytest
+import yaml
+
+from dockervm_cli import gpu_assign
+
+UUID = "GPU-1234"
+
+
+def _compose(text: str) -> str:
+    return textwrap.dedent(text).lstrip("\n")
+
+
+def _assign(text: str, service: str = "app") -> str:
+    compose = yaml.safe_load(text)
+    gpu_assign.set_gpu_reservation(compose, service, UUID)
+    return gpu_assign.edit_service_text(text, service, {"deploy": compose["services"][service]["deploy"]}, remove=["gpus"])
+
+
+def _devices(text: str, service: str = "app") -> list:
+    return yaml.safe_load(text)["services"][service]["deploy"]["resources"]["reservations"]["devices"]
+
+
+def test_insert_deploy_block_keeps_comments_and_other_services():
+    text = _compose("""
+        # Mein Stack
+        services:
+          app:
+            image: ollama/ollama  # angepinnt
+            ports:
+              - "11434:11434"
+
+          web:
+            image: nginx
+        """)
+
+    result = _assign(text)
+
+    assert result.startswith("# Mein Stack\n")
+    assert "image: ollama/ollama  # angepinnt\n" in result
+    assert _devices(result) == [{"driver": "nvidia", "device_ids": [UUID], "capabilities": ["gpu"]}]
+    # Der Block wird direkt am Ende des Services eingefügt, web bleibt unverändert
+    assert result.index("deploy:") < result.index("  web:")
+    assert result.endswith("  web:\n    image: nginx\n")
+
+
+def test_replace_existing_deploy_block_and_remove_gpus():
+    text = _compose("""
+        services:
+            app:
+                image: app
+                gpus: all
+                deploy:
+                    resources:
+                        reservations:
+                            devices:
+                                - driver: nvidia
+                                  count: all
+                                  capabilities: [gpu]
+                restart: always   # bleibt
+        """)
+
+    result = _assign(text)
+
+    assert "gpus:" not in result
+    assert "count: all" not in result
+    assert "        restart: always   # bleibt\n" in result
+    assert "        deploy:\n" in result
+    assert _devices(result)[0]["device_ids"] == [UUID]
+
+
+def test_empty_service_gets_deploy_block():
+    text = "services:\n  app:\n  other:\n    image: x\n"
+
+    result = _assign(text)
+
+    assert _devices(result)[0]["device_ids"] == [UUID]
+    assert yaml.safe_load(result)["services"]["other"] == {"image": "x"}
+
+
+@pytest.mark.parametrize("text", [
+    # Anker am Service selbst
+    "services:\n  app: &app\n    image: x\n  web:\n    <<: *app\n",
+    # Alias im ersetzten deploy Block
+    "x-gpu: &gpu\n  resources: {}\nservices:\n  app:\n    image: x\n    deploy: *gpu\n",
+    # Merge-Key im ersetzten deploy Block
+    "x-gpu: &gpu\n  resources: {}\nservices:\n  app:\n    image: x\n    deploy:\n      <<: *gpu\n",
+    # Service in Flow-Style
+    "services:\n  app: {image: x}\n",
+])
+def test_anchors_and_flow_style_are_refused(text):
+    compose = yaml.safe_load(text)
+    gpu_assign.set_gpu_reservation(compose, "app", UUID)
+
+    assert gpu_assign.edit_service_text(text, "app", {"deploy": compose["services"]["app"]["deploy"]}) is None
+
+
+def test_render_compose_falls_back_to_full_rewrite(tmp_path):
+    path = tmp_path / "docker-compose.yml"
+    path.write_text("services:\n  app: &app\n    image: x\n  web:\n    <<: *app\n")
+    compose = gpu_assign.load_compose(str(path))
+    gpu_assign.set_gpu_reservation(compose, "app", UUID)
+
+    content, targeted = gpu_assign.render_compose(str(path), compose, "app")
+
+    assert targeted is False
+    parsed = yaml.safe_load(content)
+    assert parsed["services"]["app"]["deploy"]["resources"]["reservations"]["devices"][0]["device_ids"] == [UUID]
+    # Der über den Anker geteilte Block von web bleibt ohne GPU
+    assert "deploy" not in parsed["services"]["web"]
+
+
+def test_missing_assignments_file_is_empty(tmp_path, monkeypatch):
+    monkeypatch.setattr(gpu_assign, "STATE_FILE", str(tmp_path / "gpu_assignments.json"))
+
+    assert gpu_assign.load_assignments() == {}
+
+
+def test_invalid_assignments_file_raises(tmp_path, monkeypatch):
+    state = tmp_path / "gpu_assignments.json"
+    state.write_text("{kaputt")
+    monkeypatch.setattr(gpu_assign, "STATE_FILE", str(state))
+
+    with pytest.raises(gpu_assign.AssignmentError, match="kein gültiges JSON"):
+        gpu_assign.load_assignments()
+
+
+def test_unreadable_assignments_file_raises(tmp_path, monkeypatch):
+    # Ein Verzeichnis statt der Datei scheitert auch für root beim Lesen
+    (tmp_path / "gpu_assignments.json").mkdir()
+    monkeypatch.setattr(gpu_assign, "STATE_FILE", str(tmp_path / "gpu_assignments.json"))
+
+    with pytest.raises(gpu_assign.AssignmentError, match="konnte nicht gelesen werden"):
+        gpu_assign.load_assignments()
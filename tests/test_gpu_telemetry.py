@@ -0,0 +1,157 @@
+import sys
+import time
+import textwrap
+
+import pytest
+from typer.testing import CliRunner
+
+from dockervm_cli import gpu_telemetry
+from dockervm_cli.gpu_telemetry import GpuSampler
+
+# Stand-in für nvidia-smi: gibt pro --loop-ms Intervall eine CSV-Zeile je GPU aus.
+# FAKE_SMI_LINES begrenzt die Zeilen pro Lauf (danach Exit 0 wie bei einem abgerissenen Stream),
+# FAKE_SMI_CRASH lässt den Lauf danach mit dieser Meldung und Code 9 enden - stdout wird dabei
+# vor dem Exit geschlossen, wie bei einem nvidia-smi, das beim Aufräumen noch hängt.
+FAKE_SMI = textwrap.dedent("""\
+    #!{python}
+    import os, sys, time
+    with open(os.environ["FAKE_SMI_LOG"], "a") as log:
+        log.write(" ".join(sys.argv[1:]) + "\\n")
+    options = dict(arg.lstrip("-").split("=", 1) for arg in sys.argv[1:] if "=" in arg)
+    fields = options["query-gpu"].split(",")
+    limit = int(os.environ.get("FAKE_SMI_LINES", "0"))
+    emitted = 0
+    while not limit or emitted < limit:
+        for index in range(int(os.environ.get("FAKE_SMI_GPUS", "1"))):
+            values = {{"index": str(index), "uuid": f"GPU-{{index}}", "name": "Fake GPU",
+                       "utilization.gpu": str(10 * (emitted + 1)), "power.limit": "[N/A]",
+                       "temperature.gpu": "45", "power.draw": "70.5"}}
+            print(", ".join(values.get(field, "1024") for field in fields), flush=True)
+        emitted += 1
+        time.sleep(int(options["loop-ms"]) / 1000.0)
+    if os.environ.get("FAKE_SMI_CRASH"):
+        print(os.environ["FAKE_SMI_CRASH"], file=sys.stderr, flush=True)
+        os.close(1)
+        time.sleep(0.3)
+        sys.exit(9)
+""")
+
+
+@pytest.fixture
+def fake_smi(tmp_path, monkeypatch):
+    path = tmp_path / "nvidia-smi"
+    path.write_text(FAKE_SMI.format(python=sys.executable))
+    path.chmod(0o755)
+    monkeypatch.setenv("FAKE_SMI_LOG", str(tmp_path / "calls.log"))
+    monkeypatch.setattr(gpu_telemetry, "RECONNECT_DELAY", 0.1)
+    fake = str(path)
+
+    def calls():
+        with open(tmp_path / "calls.log") as f:
+            return f.read().splitlines()
+
+    return fake, calls
+
+
+def _wait(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_parse_sample_converts_values():
+    sample = gpu_telemetry.parse_sample("0, GPU-abc, Tesla T4, 37, 5, 512, 15360, 48, 27.31, [N/A]\n")
+
+    assert sample["index"] == 0
+    assert sample["uuid"] == "GPU-abc"
+    assert sample["utilization.gpu"] == 37
+    assert sample["power.draw"] == 27.31
+    assert sample["power.limit"] is None
+    assert gpu_telemetry.parse_sample("0, GPU-abc, Tesla T4\n") is None
+
+
+def test_sampler_streams_into_ring_buffer(fake_smi, monkeypatch):
+    binary, calls = fake_smi
+    monkeypatch.setenv("FAKE_SMI_GPUS", "2")
+    sampler = GpuSampler(interval_ms=100, buffer_size=4, binary=binary).start()
+    try:
+        assert _wait(lambda: len(sampler.samples) == 4 and len(sampler.latest) == 2)
+    finally:
+        sampler.stop()
+
+    assert sampler.backend == "nvidia-smi"
+    assert sampler.error is None
+    assert [s["index"] for s in sampler.snapshot()] == [0, 1]
+    assert sampler.snapshot()[1]["temperature.gpu"] == 45
+    # Ein einziger langlebiger Prozess, keine Abfrage pro Intervall
+    assert calls() == [f"--query-gpu={','.join(gpu_telemetry.GPU_FIELDS)} --format=csv,noheader,nounits --loop-ms=100"]
+
+
+def test_sampler_reconnects_when_stream_ends(fake_smi, monkeypatch):
+    binary, calls = fake_smi
+    monkeypatch.setenv("FAKE_SMI_LINES", "2")
+    sampler = GpuSampler(interval_ms=100, binary=binary).start()
+    try:
+        # Zwei Zeilen pro Lauf: das fünfte Sample stammt aus dem dritten Prozess
+        assert _wait(lambda: len(sampler.samples) >= 5)
+    finally:
+        sampler.stop()
+
+    assert sampler.error is None
+    assert sampler.reconnects >= 2
+    assert len(calls()) >= 3
+
+
+def test_sampler_reports_crash_after_stdout_closed(fake_smi, monkeypatch):
+    binary, _ = fake_smi
+    monkeypatch.setenv("FAKE_SMI_LINES", "1")
+    monkeypatch.setenv("FAKE_SMI_CRASH", "Unable to determine the device handle for GPU 0: GPU is lost")
+    sampler = GpuSampler(interval_ms=100, binary=binary).start()
+    try:
+        assert _wait(lambda: not sampler.running)
+    finally:
+        sampler.stop()
+
+    assert sampler.error == "Unable to determine the device handle for GPU 0: GPU is lost"
+    assert sampler.reconnects == 0
+    assert len(sampler.samples) == 1
+
+
+def test_sampler_reports_missing_binary(tmp_path):
+    sampler = GpuSampler(binary=str(tmp_path / "fehlt")).start()
+
+    assert sampler.error
+    assert not sampler.running
+
+
+def test_monitor_json_output(fake_smi):
+    from dockervm_cli.commands.gpu import app
+
+    binary, _ = fake_smi
+    result = CliRunner().invoke(app, ["monitor", "--format", "json", "--interval", "100", "--count", "3",
+                                      "--nvidia-smi", binary])
+
+    assert result.exit_code == 0
+    assert '"name": "Fake GPU"' in result.output
+
+
+def test_monitor_exits_with_error_on_crash(fake_smi, monkeypatch):
+    from dockervm_cli.commands.gpu import app
+
+    binary, _ = fake_smi
+    monkeypatch.setenv("FAKE_SMI_LINES", "1")
+    monkeypatch.setenv("FAKE_SMI_CRASH", "NVIDIA-SMI has failed")
+    monkeypatch.setenv("COLUMNS", "200")
+    result = CliRunner().invoke(app, ["monitor", "--format", "json", "--interval", "100", "--nvidia-smi", binary])
+
+    assert result.exit_code == 1
+    assert "NVIDIA-SMI has failed" in result.output
+
+
+def test_prometheus_lines_escape_labels():
+    sample = gpu_telemetry.parse_sample('0, GPU-abc, Tesla "T4" \\ PCIe, 37, 5, 512, 15360, 48, 27.31, [N/A]\n')
+
+    lines = gpu_telemetry.prometheus_lines([sample])
+
+    assert 'dvm_gpu_utilization_percent{gpu="0",uuid="GPU-abc",name="Tesla \\"T4\\" \\\\ PCIe"} 37' in lines
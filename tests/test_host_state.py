@@ -0,0 +1,83 @@
+import pytest
+
+from dockervm_cli import host_state
+
+
+@pytest.fixture
+def host_file(tmp_path):
+    def write(content: str) -> str:
+        path = tmp_path / "host.yaml"
+        path.write_text(content)
+        return str(path)
+    return write
+
+
+@pytest.mark.parametrize("content, message", [
+    ("- mounts\n", "muss ein Mapping"),
+    ("42\n", "muss ein Mapping"),
+    ("mounts: {data: /mnt/data}\n", "Abschnitt 'mounts' muss eine Liste sein"),
+    ("packages: [curl]\n", "Abschnitt 'packages' muss ein Mapping sein"),
+    ("packages: {install: curl}\n", "'packages.install' muss eine Liste sein"),
+    ("cron: [backup]\n", "Abschnitt 'cron' muss ein Mapping sein"),
+    ("cron: {backup: '0 3 * * * /usr/local/bin/backup'}\n", "Cron-Job 'backup' muss ein Mapping sein"),
+    ("cron: {backup: {schedule: 5, command: backup}}\n", "'schedule' von Cron-Job 'backup' muss ein Text sein"),
+    ("mounts: ['/mnt/data']\n", "Eintrag in 'mounts'"),
+    ("mounts: [null]\n", "Eintrag in 'mounts'"),
+    ("networks: [proxy]\n", "Eintrag in 'networks'"),
+    ("stacks: [{path: 1}]\n", "'path' von Stack"),
+])
+def test_wrong_types_raise_host_file_error(host_file, content, message):
+    with pytest.raises(host_state.HostFileError, match=message):
+        host_state.load_host_file(host_file(content))
+
+
+def test_valid_host_file_resolves_stack_paths(host_file, tmp_path):
+    spec = host_state.load_host_file(host_file(
+        "packages: {install: [curl], hold: [docker-ce]}\n"
+        "cron: {backup: {schedule: '0 3 * * *', command: backup}, alt: null}\n"
+        "networks: [{name: proxy}]\n"
+        "stacks: [{path: stacks/app}]\n"
+    ))
+
+    assert spec["stacks"][0]["path"] == str(tmp_path / "stacks" / "app")
+    assert spec["cron"]["alt"] is None
+
+
+def test_empty_host_file_is_allowed(host_file):
+    assert host_state.load_host_file(host_file("")) == {}
+
+
+def _container(project: str, service: str, digest: str, state: str = "running") -> dict:
+    return {"State": state, "Status": "Up 2 hours", "Labels": {
+        "com.docker.compose.project": project,
+        "com.docker.compose.service": service,
+        "com.docker.compose.config-hash": digest,
+    }}
+
+
+def _stack_actions(tmp_path, containers: list, hashes: dict) -> list:
+    (tmp_path / "app").mkdir(exist_ok=True)
+    spec = {"stacks": [{"path": str(tmp_path / "app")}]}
+    facts = {"docker": {"containers": containers}, "config_hashes": hashes}
+    return [(step["name"], step["action"]) for step in host_state.diff_stacks(spec, facts)]
+
+
+def test_unchanged_stack_needs_no_step(tmp_path):
+    containers = [_container("app", "web", "aaa"), _container("app", "db", "bbb")]
+
+    assert _stack_actions(tmp_path, containers, {"app": {"web": "aaa", "db": "bbb"}}) == []
+
+
+def test_changed_compose_file_recreates_stack(tmp_path):
+    containers = [_container("app", "web", "aaa"), _container("app", "db", "bbb")]
+
+    # Neues Image-Tag für web, zusätzlicher Service worker
+    actions = _stack_actions(tmp_path, containers, {"app": {"web": "ccc", "db": "bbb", "worker": "ddd"}})
+
+    assert actions == [("app (web, worker)", "aktualisieren")]
+
+
+def test_stopped_stack_is_started_without_hashes(tmp_path):
+    containers = [_container("app", "web", "aaa", state="exited")]
+
+    assert _stack_actions(tmp_path, containers, {}) == [("app", "starten")]
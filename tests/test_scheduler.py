@@ -0,0 +1,37 @@
+import os
+import pwd
+
+import pytest
+
+from dockervm_cli import scheduler
+
+
+def test_timer_runs_as_crontab_user():
+    user = pwd.getpwuid(os.getuid()).pw_name
+
+    service, _ = scheduler.render_timer(scheduler.job("self-update", "0 4 * * *", "dvm update self", backend="systemd"))
+
+    assert f"User={user}\n" in service
+    assert "Group=" in service
+
+
+def test_timer_runs_as_explicit_user():
+    service, timer = scheduler.render_timer(scheduler.job("prune", "30 2 * * 0", "echo 100%", user="root"))
+
+    assert "User=root\nGroup=root\n" in service
+    assert 'ExecStart=/bin/sh -c "echo 100%%"' in service
+    assert "OnCalendar=Sun *-*-* 2:30:00" in timer
+
+
+@pytest.mark.parametrize("schedule, calendar", [
+    ("0 4 * * *", "*-*-* 4:0:00"),
+    ("*/15 8-18 * * 1-5", "Mon,Tue,Wed,Thu,Fri *-*-* 8..18:0/15:00"),
+    ("0 0 * * 7", "Sun *-*-* 0:0:00"),
+])
+def test_cron_to_oncalendar(schedule, calendar):
+    assert scheduler.cron_to_oncalendar(schedule) == calendar
+
+
+def test_unknown_user_is_rejected():
+    with pytest.raises(scheduler.ScheduleError, match="existiert nicht"):
+        scheduler.render_timer(scheduler.job("x", "0 4 * * *", "true", user="gibt-es-nicht"))
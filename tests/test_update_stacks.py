@@ -0,0 +1,70 @@
+import subprocess
+
+import pytest
+from typer.testing import CliRunner
+
+from dockervm_cli import stacks
+from dockervm_cli.commands import update
+
+PROJECTS = [
+    {"name": "web", "dir": "/srv/web", "file": "/srv/web/docker-compose.yml"},
+    {"name": "wiki", "dir": "/srv/wiki", "file": "/srv/wiki/docker-compose.yml"},
+]
+SERVICES = {"web": {"nginx": "nginx:1.27"}, "wiki": {"app": "docmost/docmost:latest", "db": "postgres:16"}}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Stacks und Registry-Stände ohne Docker; Compose-Aufrufe werden nur protokolliert."""
+    states, calls = {}, []
+    monkeypatch.setattr(stacks, "find_compose_projects", lambda base: PROJECTS)
+    monkeypatch.setattr(stacks, "get_compose_services", lambda project, cmd: SERVICES[project["name"]])
+    monkeypatch.setattr(stacks, "check_image", lambda image: states.get(image, "current"))
+    monkeypatch.setattr(update, "get_docker_compose_cmd", lambda: "docker compose")
+
+    def run(command, **kwargs):
+        calls.append(command)
+        return subprocess.CompletedProcess(command, 0, "", "")
+    monkeypatch.setattr(update.subprocess, "run", run)
+    monkeypatch.setenv("COLUMNS", "200")
+    return states, calls
+
+
+def _invoke(*args):
+    return CliRunner().invoke(update.app, ["stacks", *args])
+
+
+def test_unknown_digest_is_skipped(registry):
+    states, calls = registry
+    states.update({"nginx:1.27": "outdated", "docmost/docmost:latest": "unknown", "postgres:16": "unknown"})
+
+    result = _invoke()
+
+    assert result.exit_code == 0
+    assert calls == ["sudo docker compose -f /srv/web/docker-compose.yml pull -q nginx",
+                     "sudo docker compose -f /srv/web/docker-compose.yml up -d --no-deps nginx"]
+    assert "Übersprungen" in result.output
+    assert "2 Images ließen sich nicht gegen die Registry prüfen" in result.output
+
+
+def test_pull_unknown_updates_unchecked_images(registry):
+    states, calls = registry
+    states.update({"docmost/docmost:latest": "unknown"})
+
+    result = _invoke("--pull-unknown")
+
+    assert result.exit_code == 0
+    assert calls == ["sudo docker compose -f /srv/wiki/docker-compose.yml pull -q app",
+                     "sudo docker compose -f /srv/wiki/docker-compose.yml up -d --no-deps app"]
+    assert "Aktualisiert" in result.output
+
+
+def test_check_reports_without_pulling(registry):
+    states, calls = registry
+    states.update({"postgres:16": "outdated"})
+
+    result = _invoke("--check")
+
+    assert result.exit_code == 0
+    assert calls == []
+    assert "Update verfügbar" in result.output